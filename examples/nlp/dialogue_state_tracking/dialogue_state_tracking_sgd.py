@@ -127,7 +127,7 @@ parser.add_argument(
     "--schema_embedding_dir",
     type=str,
     default='schema_embedding_dir',
-    help="Directory where .npy file for embedding of entities (slots, values, intents) in the dataset_split's schema are stored.",
+    help="Directory where embeddings of entities (slots, values, intents) in the services' schemas are stored. Embeddings of services already stored for the same tokenizer and BERT checkpoint are reused.",
 )
 parser.add_argument(
     "--no_overwrite_schema_emb_files",
@@ -212,6 +212,12 @@ parser.add_argument(
     choices=['baseline', 'nemotracker'],
     help="Specifies the state tracker model",
 )
+parser.add_argument(
+    "--num_tracker_workers",
+    default=1,
+    type=int,
+    help="Number of processes running the state tracker on the evaluation dialogues, set >1 to track them in parallel",
+)
 parser.add_argument(
     "--schema_emb_init",
     type=str,
@@ -250,6 +256,13 @@ parser.add_argument(
     dest="add_carry_status",
 )
 
+parser.add_argument(
+    "--no_prediction_files",
+    action="store_false",
+    help="Evaluates the predicted dialogues in memory only, without writing them to files in the work_dir.",
+    dest="write_predictions",
+)
+
 args = parser.parse_args()
 logging.info(args)
 
@@ -456,6 +469,8 @@ def get_eval_callback(eval_dataset):
             schema_preprocessor,
             args.joint_acc_across_turn,
             args.no_fuzzy_match,
+            args.write_predictions,
+            args.num_tracker_workers,
         ),
         tb_writer=nf.tb_writer,
         eval_step=args.eval_epoch_freq * steps_per_epoch,
@@ -111,6 +111,18 @@ decoder = TRADEGenerator(
     teacher_forcing=args.teacher_forcing,
 )
 
+# The evaluation decodes greedily into token ids with the weights of the generator being trained
+eval_decoder = TRADEGenerator(
+    data_desc.vocab,
+    encoder.embedding,
+    args.hid_dim,
+    args.dropout,
+    data_desc.slots,
+    len(data_desc.gating_dict),
+    inference_mode=True,
+)
+eval_decoder.tie_weights_with(decoder, list(decoder.get_weights().keys()))
+
 gate_loss_fn = CrossEntropyLossNM(logits_ndim=3)
 ptr_loss_fn = MaskedLogLoss()
 total_loss_fn = LossAggregatorNM(num_inputs=2)
@@ -150,24 +162,31 @@ def create_pipeline(num_samples, batch_size, num_gpus, input_dropout, data_prefi
 
     outputs, hidden = encoder(inputs=input_data.src_ids, input_lens=input_data.src_lens)
 
-    point_outputs, gate_outputs = decoder(
-        encoder_hidden=hidden,
-        encoder_outputs=outputs,
-        dialog_lens=input_data.src_lens,
-        dialog_ids=input_data.src_ids,
-        targets=input_data.tgt_ids,
-    )
-
-    gate_loss = gate_loss_fn(logits=gate_outputs, labels=input_data.gating_labels)
-    ptr_loss = ptr_loss_fn(logits=point_outputs, labels=input_data.tgt_ids, length_mask=input_data.tgt_lens)
-    total_loss = total_loss_fn(loss_1=gate_loss, loss_2=ptr_loss)
-
     if is_training:
+        point_outputs, gate_outputs = decoder(
+            encoder_hidden=hidden,
+            encoder_outputs=outputs,
+            dialog_lens=input_data.src_lens,
+            dialog_ids=input_data.src_ids,
+            targets=input_data.tgt_ids,
+        )
+
+        gate_loss = gate_loss_fn(logits=gate_outputs, labels=input_data.gating_labels)
+        ptr_loss = ptr_loss_fn(logits=point_outputs, labels=input_data.tgt_ids, length_mask=input_data.tgt_lens)
+        total_loss = total_loss_fn(loss_1=gate_loss, loss_2=ptr_loss)
         tensors_to_evaluate = [total_loss, gate_loss, ptr_loss]
     else:
+        # Without the distributions over the vocabulary there are no losses to evaluate
+        point_ids, _, gate_outputs = eval_decoder(
+            encoder_hidden=hidden,
+            encoder_outputs=outputs,
+            dialog_lens=input_data.src_lens,
+            dialog_ids=input_data.src_ids,
+            targets=input_data.tgt_ids,
+        )
+        total_loss, ptr_loss, gate_loss = None, None, None
         tensors_to_evaluate = [
-            total_loss,
-            point_outputs,
+            point_ids,
             gate_outputs,
             input_data.gating_labels,
             input_data.turn_domain,
@@ -211,6 +211,11 @@ parser_text.add_argument(
     type=float,
     help="Probability of having a sequence shorter than the maximum sequence length `max_seq_length` in data processing.",
 )
+parser_text.add_argument(
+    "--use_mmap_corpus",
+    action="store_true",
+    help="Tokenize the corpus once into a memory-mapped token buffer instead of tokenizing text on the fly.",
+)
 parser_text.add_argument(
     "--dataset_name", default="wikitext-2", choices=["wikitext-2"], type=str, help="Dataset name."
 )
@@ -335,6 +340,7 @@ def create_pipeline(data_file, batch_size, preprocessed_data=False, batches_per_
             short_seq_prob,
             batch_size=batch_size,
             shuffle=kwargs['mode'] == "train",
+            use_mmap_corpus=kwargs['use_mmap_corpus'],
         )
     else:
         mode, max_predictions_per_seq = (kwargs['mode'], kwargs['max_predictions_per_seq'])
@@ -367,6 +373,7 @@ if 'data_text' in sys.argv:
         max_seq_length=args.max_seq_length,
         mask_probability=args.mask_probability,
         short_seq_prob=args.short_seq_prob,
+        use_mmap_corpus=args.use_mmap_corpus,
         batch_size=args.batch_size,
         batches_per_step=args.batches_per_step,
         mode="train",
@@ -377,6 +384,7 @@ if 'data_text' in sys.argv:
         max_seq_length=args.max_seq_length,
         mask_probability=args.mask_probability,
         short_seq_prob=args.short_seq_prob,
+        use_mmap_corpus=args.use_mmap_corpus,
         batch_size=args.batch_size,
         batches_per_step=args.batches_per_step,
         mode="eval",
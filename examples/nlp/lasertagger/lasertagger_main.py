@@ -28,6 +28,7 @@ import nemo.collections.nlp as nemo_nlp
 from nemo import logging
 from nemo.backends.pytorch.common.losses import CrossEntropyLossNM
 from nemo.collections.nlp.callbacks.lasertagger_callback import eval_epochs_done_callback, eval_iter_callback
+from nemo.collections.nlp.data.feature_store import has_features
 from nemo.collections.nlp.nm.data_layers.lasertagger_datalayer import LaserTaggerDataLayer
 from nemo.core import EvaluatorCallback, NeuralModuleFactory, SimpleLossLoggerCallback, WeightShareTransform
 from nemo.core.callbacks import CheckpointCallback
@@ -108,10 +109,10 @@ def parse_args():
         work_dir='outputs/msr_ab_sum/lt',
     )
     parser_train.add_argument(
-        "--train_file_preprocessed", type=str, help="The path to training pkl file",
+        "--train_file_preprocessed", type=str, help="The path to the training features (or pkl file)",
     )
     parser_train.add_argument(
-        "--eval_file_preprocessed", type=str, help="The path to evaluation pkl file",
+        "--eval_file_preprocessed", type=str, help="The path to the evaluation features (or pkl file)",
     )
     parser_train.add_argument(
         "--test_file_preprocessed", type=str, help="The path to test pkl file",
@@ -180,14 +181,24 @@ def _calculate_steps(num_examples, batch_size, num_epochs, warmup_proportion=0):
     return steps, warmup_steps
 
 
+def load_preprocessed_examples(path):
+    """Returns the training or evaluation examples saved by lasertagger_preprocessor.py: the path of their
+    features, which LaserTaggerDataset memory-maps, or the examples of a pkl file."""
+    if has_features(path):
+        return path
+    examples = torch.load(path)
+    # evaluation pkl files also contain the special tokens
+    return examples[0] if isinstance(examples, tuple) else examples
+
+
 if __name__ == "__main__":
 
     args = parse_args()
 
     if args.command == 'train':
-        train_examples = torch.load(args.train_file_preprocessed)
+        train_examples = load_preprocessed_examples(args.train_file_preprocessed)
         if args.eval_file_preprocessed:
-            eval_examples, eval_special_tokens = torch.load(args.eval_file_preprocessed)
+            eval_examples = load_preprocessed_examples(args.eval_file_preprocessed)
     test_examples, test_special_tokens = torch.load(args.test_file_preprocessed)
 
     label_map = utils.read_label_map(args.label_map_file)
@@ -284,19 +295,19 @@ if __name__ == "__main__":
         if mode != "infer":
             loss = loss_fn(logits=log_softmax, labels=labels, loss_mask=labels_mask)
             per_example_loss = loss_eval_metric(logits=log_softmax, labels=labels, loss_mask=labels_mask)
-            return [loss, per_example_loss, log_softmax, labels, labels_mask]
+            return [loss, per_example_loss, log_softmax, labels, labels_mask], data_layer
         else:
             if args.use_t2t_decoder:
-                return [beam_search(hidden_states_src=src_hiddens, input_mask_src=input_mask)]
+                return [beam_search(hidden_states_src=src_hiddens, input_mask_src=input_mask)], data_layer
             else:
-                return [log_softmax]
+                return [log_softmax], data_layer
 
     if args.command == "train":
         # training pipeline
-        train_tensors = create_pipeline(train_examples, args.batch_size, mode="train")
+        train_tensors, train_data_layer = create_pipeline(train_examples, args.batch_size, mode="train")
 
         # evaluation pipelines
-        eval_tensors = create_pipeline(eval_examples, args.eval_batch_size, mode="eval")
+        eval_tensors, _ = create_pipeline(eval_examples, args.eval_batch_size, mode="eval")
 
         def print_loss(x):
             loss = x[0].item()
@@ -328,7 +339,7 @@ if __name__ == "__main__":
         callbacks.append(checkpointer_callback)
 
         max_steps, warmup_steps = _calculate_steps(
-            len(train_examples), args.batch_size, args.num_epochs, args.warmup_proportion
+            len(train_data_layer), args.batch_size, args.num_epochs, args.warmup_proportion
         )
 
         # define learning rate decay policy
@@ -350,7 +361,7 @@ if __name__ == "__main__":
         )
 
     elif args.command == 'infer':
-        tensors_pred = create_pipeline(test_examples, args.batch_size, mode="infer")
+        tensors_pred, _ = create_pipeline(test_examples, args.batch_size, mode="infer")
         computed_tensors = nf.infer(tensors=tensors_pred, checkpoint_dir=args.work_dir)
 
         id_2_tag = {tag_id: tagging.Tag(tag) for tag, tag_id in label_map.items()}
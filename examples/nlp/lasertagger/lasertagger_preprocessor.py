@@ -19,16 +19,23 @@ LaserTagger preprocessor for converting the training, validation, and test files
 to examples used in the LaserTagger main file.
 '''
 
+import itertools
+import multiprocessing
 import os
-from collections import deque
 
+import numpy as np
 import torch
 from official_lasertagger import bert_example, tagging_converter, utils
 
 import nemo.collections.nlp as nemo_nlp
 from nemo import logging
+from nemo.collections.nlp.data.datasets.lasertagger_dataset import examples_to_features
+from nemo.collections.nlp.data.feature_store import features_cache_dir, has_features, load_features, save_features
 from nemo.utils import NemoArgParser
 
+# number of examples converted at once by a worker
+CHUNK_SIZE = 1000
+
 
 def parse_args():
     '''
@@ -60,15 +67,69 @@ def parse_args():
     )
     parser.add_argument("--max_seq_length", default=128, type=int)
     parser.add_argument("--save_path", default=None, help="Path to the save the preprocessed data.")
+    parser.add_argument(
+        "--num_workers", default=os.cpu_count(), type=int, help="Number of processes converting the examples."
+    )
+    parser.add_argument(
+        "--overwrite_cache",
+        action='store_true',
+        help="Convert the training and evaluation examples even if their features are cached in save_path.",
+    )
 
     return parser.parse_args()
 
 
+def create_builder(args):
+    '''Returns the BertExampleBuilder converting the examples.'''
+    label_map = utils.read_label_map(args.label_map_file)
+    converter = tagging_converter.TaggingConverter(
+        tagging_converter.get_phrase_vocabulary_from_label_map(label_map), True
+    )
+    return bert_example.BertExampleBuilder(
+        label_map, args.pretrained_model_name, args.max_seq_length, False, converter
+    )
+
+
+# BertExampleBuilder of a worker process
+_builder = None
+
+
+def _init_worker(args):
+    global _builder
+    _builder = create_builder(args)
+
+
+def _convert_chunk(chunk, output_arbitrary_targets_for_infeasible_examples, save_tokens, infer, to_features):
+    '''Converts (sources, target) pairs with the builder of the process, returns the examples (or their
+    features) and the out-of-vocab special tokens found so far.'''
+    examples = []
+    for sources, target in chunk:
+        example = _builder.build_bert_example(
+            sources, target, output_arbitrary_targets_for_infeasible_examples, save_tokens, infer
+        )
+        if example is not None:
+            examples.append(example)
+    if to_features:
+        examples = examples_to_features(examples)
+    return examples, _builder.get_special_tokens_and_ids()
+
+
+def _convert_chunk_star(chunk_and_params):
+    return _convert_chunk(*chunk_and_params)
+
+
 def read_input_file(
-    args, input_file, output_arbitrary_targets_for_infeasible_examples=False, save_tokens=False, infer=False
+    args,
+    input_file,
+    output_arbitrary_targets_for_infeasible_examples=False,
+    save_tokens=False,
+    infer=False,
+    to_features=False,
 ):
     '''Reads in Tab Separated Value file and converts to training/infernece-ready examples.
 
+    The examples are converted in chunks by args.num_workers processes.
+
     Args:
         args: Parsed args returned by the parse_args().
         input_file: Path to the TSV input file.
@@ -80,31 +141,69 @@ def read_input_file(
             getting more accurate eval scores during training.
         save_tokens: To save tokens required in example.task, only needs to be True for testing.
         infer: Whether test files or not.
+        to_features: Whether to return the features of the examples instead of the examples,
+            see lasertagger_dataset.examples_to_features.
 
     Returns:
-        examples: List of converted examples(features and Editing Tasks).
+        examples: List of converted examples(features and Editing Tasks), or their features.
         saved_tokens: List of additional out-of-vocab special tokens in test files.
     '''
-
-    label_map = utils.read_label_map(args.label_map_file)
-    converter = tagging_converter.TaggingConverter(
-        tagging_converter.get_phrase_vocabulary_from_label_map(label_map), True
-    )
-    builder = bert_example.BertExampleBuilder(
-        label_map, args.pretrained_model_name, args.max_seq_length, False, converter
-    )
-    examples = deque()
-    for i, (sources, target) in enumerate(utils.yield_sources_and_targets(input_file)):
-        if len(examples) % 1000 == 0:
-            logging.info("{} examples processed.".format(len(examples)))
-        example = builder.build_bert_example(
-            sources, target, output_arbitrary_targets_for_infeasible_examples, save_tokens, infer
+    lines = utils.yield_sources_and_targets(input_file)
+    chunks = iter(lambda: list(itertools.islice(lines, CHUNK_SIZE)), [])
+    params = (output_arbitrary_targets_for_infeasible_examples, save_tokens, infer, to_features)
+    chunks_and_params = ((chunk,) + params for chunk in chunks)
+
+    if args.num_workers > 1:
+        pool = multiprocessing.Pool(args.num_workers, initializer=_init_worker, initargs=(args,))
+        results = pool.imap(_convert_chunk_star, chunks_and_params)
+    else:
+        pool = None
+        _init_worker(args)
+        results = map(_convert_chunk_star, chunks_and_params)
+
+    examples = []
+    special_tokens = {}
+    num_examples = 0
+    try:
+        # results are in the order of the chunks, and every process reports its special tokens in the order
+        # it found them, so they are merged in the same order as if the file were converted by one process
+        for chunk_examples, chunk_special_tokens in results:
+            examples.append(chunk_examples)
+            special_tokens.update(dict.fromkeys(chunk_special_tokens))
+            num_examples += len(chunk_examples['input_ids']) if to_features else len(chunk_examples)
+            logging.info("{} examples processed.".format(num_examples))
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    logging.info(f'Done. {num_examples} examples converted.')
+    if to_features:
+        chunks = [chunk for chunk in examples if len(chunk['input_ids'])] or [examples_to_features([])]
+        examples = {name: np.concatenate([chunk[name] for chunk in chunks]) for name in chunks[0]}
+    else:
+        examples = list(itertools.chain.from_iterable(examples))
+    return examples, list(special_tokens)
+
+
+def convert_to_features(args, input_file, features_dir, output_arbitrary_targets_for_infeasible_examples):
+    '''Converts a TSV file to features saved in features_dir, unless they are already saved there for the
+    same input file, label map, pretrained model and max_seq_length.'''
+    fingerprint = os.path.basename(
+        features_cache_dir(
+            [input_file, args.label_map_file],
+            None,
+            args.max_seq_length,
+            pretrained_model_name=args.pretrained_model_name,
+            output_arbitrary_targets_for_infeasible_examples=output_arbitrary_targets_for_infeasible_examples,
         )
-        if example is None:
-            continue
-        examples.append(example)
-    logging.info(f'Done. {len(examples)} examples converted.')
-    return examples, builder.get_special_tokens_and_ids()
+    )
+    if not args.overwrite_cache and has_features(features_dir):
+        if load_features(features_dir)[1].get("fingerprint") == fingerprint:
+            logging.info(f'Using the features cached in {features_dir}')
+            return
+    features, _ = read_input_file(args, input_file, output_arbitrary_targets_for_infeasible_examples, to_features=True)
+    save_features(features_dir, features, metadata={"fingerprint": fingerprint})
 
 
 if __name__ == "__main__":
@@ -114,10 +213,10 @@ if __name__ == "__main__":
     if not os.path.exists(args.save_path):
         os.makedirs(args.save_path)
 
-    train_examples, _ = read_input_file(args, args.train_file, False)
-    eval_examples, eval_special_tokens = read_input_file(args, args.eval_file, True)
+    # The features of the training and evaluation examples are memory-mapped by LaserTaggerDataset, the test
+    # examples are also needed to realize the predictions
+    convert_to_features(args, args.train_file, os.path.join(args.save_path, "lt_train_features"), False)
+    convert_to_features(args, args.eval_file, os.path.join(args.save_path, "lt_eval_features"), True)
     test_examples, test_special_tokens = read_input_file(args, args.test_file, False, save_tokens=True, infer=True)
 
-    torch.save((train_examples), args.save_path + "/lt_train_examples.pkl")
-    torch.save((eval_examples, eval_special_tokens), args.save_path + "/lt_eval_examples.pkl")
     torch.save((test_examples, test_special_tokens), args.save_path + "/lt_test_examples.pkl")
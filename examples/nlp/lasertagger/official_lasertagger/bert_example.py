@@ -38,6 +38,7 @@ https://github.com/google-research/lasertagger/blob/master/bert_example.py
 """Build BERT Examples from text (source, target) pairs."""
 
 import collections
+import functools
 
 from official_lasertagger import tagging
 
@@ -156,6 +157,8 @@ class BertExampleBuilder(object):
         self._pad_id = self._get_pad_id()
         self._keep_tag_id = self._label_map['KEEP']
         self._task_tokens = collections.OrderedDict()
+        # Tokens repeat a lot across examples, memoize their WordPieces
+        self._tokenize_token = functools.lru_cache(maxsize=1 << 17)(self._tokenizer.tokenizer.tokenize)
 
     def build_bert_example(
         self,
@@ -256,7 +259,7 @@ class BertExampleBuilder(object):
         for i, token in enumerate(tokens):
             # '+ 1' is because bert_tokens will be prepended by [CLS] token later.
             token_start_indices.append(len(bert_tokens) + 1)
-            pieces = self._tokenizer.tokenizer.tokenize(token)
+            pieces = self._tokenize_token(token)
             bert_tokens.extend(pieces)
             bert_labels.extend([labels[i]] * len(pieces))
         return bert_tokens, bert_labels, token_start_indices
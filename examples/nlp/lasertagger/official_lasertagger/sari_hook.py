@@ -56,6 +56,8 @@ This implementation has two differences with the GitHub [1] implementation:
 
 import collections
 
+import numpy as np
+
 # The paper that intoduces the SARI score uses only the precision of the deleted
 # tokens (i.e. beta=0). To give more emphasis on recall, you may set, e.g.,
 # beta=1.
@@ -187,3 +189,128 @@ def get_sari_score(source_ids, prediction_ids, list_of_targets, max_gram_size=4,
     avg_deletion_score = sum(deletion_scores) / max_gram_size
     sari = (avg_keep_score + avg_addition_score + avg_deletion_score) / 3.0
     return sari, avg_keep_score, avg_addition_score, avg_deletion_score
+
+
+def _get_fbeta_scores(true_positives, selected, relevant, beta=1):
+    """Vectorized _get_fbeta_score over arrays of counts."""
+    precision = np.divide(true_positives, selected, out=np.ones(len(selected)), where=selected > 0)
+    if beta == 0:
+        return precision
+    recall = np.divide(true_positives, relevant, out=np.ones(len(relevant)), where=relevant > 0)
+    beta2 = beta * beta
+    denominator = np.where((precision > 0) & (recall > 0), beta2 * precision + recall, 1)
+    return np.where((precision > 0) & (recall > 0), (1 + beta2) * precision * recall / denominator, 0)
+
+
+def _get_ngram_codes(ids, max_gram_size):
+    """Assigns the same integer code to equal n-grams of the rows of a padded ID array.
+
+    The code of an n-gram is the rank of the pair (code of its (n-1)-gram prefix,
+    last ID) among all such pairs, so codes are exact and never collide.
+
+    Args:
+        ids: np.array [num_rows, max_len] of IDs with zero IDs at the end of the rows
+        max_gram_size: int. largest n-gram size
+
+    Returns:
+        list with an np.array [num_rows, max_len + 1 - n] of n-gram codes for every n,
+        where 0 marks positions without an n-gram.
+    """
+    lengths = np.sum(ids != 0, axis=1)
+    codes = [ids]
+    for n in range(2, max_gram_size + 1):
+        num_positions = max(ids.shape[1] + 1 - n, 0)
+        valid = np.arange(num_positions)[None, :] < (lengths[:, None] + 1 - n)
+        pairs = codes[-1][:, :num_positions] * (int(ids.max(initial=0)) + 1) + ids[:, n - 1 :]
+        _, ranks = np.unique(pairs[valid], return_inverse=True)
+        ngram_codes = np.zeros(pairs.shape, dtype=np.int64)
+        ngram_codes[valid] = ranks.reshape(-1) + 1
+        codes.append(ngram_codes)
+    return codes
+
+
+def get_sari_scores(source_ids, prediction_ids, target_ids, max_gram_size=4, beta_for_deletion=0):
+    """Compute the SARI scores of a batch of predictions, equal to get_sari_score for every example.
+
+    The n-grams of all the sentences are coded as integers, and the keep, addition and
+    deletion statistics of all examples are counted at once with sorted unique codes.
+
+    Args:
+        source_ids: np.array [batch_size, source_len] of IDs, padded with zero IDs
+        prediction_ids: np.array [batch_size, prediction_len] of IDs, padded with zero IDs
+        target_ids: np.array [batch_size, num_targets, target_len] of IDs, padded with
+            zero IDs. Examples with fewer targets are padded with empty targets.
+        max_gram_size: int. largest n-gram size we care about (e.g. 3 for unigrams,
+            bigrams, and trigrams)
+        beta_for_deletion: beta for deletion F score.
+
+    Returns:
+        np.arrays [batch_size] of the SARI scores and their three components:
+        add, keep, and deletion scores
+    """
+    source_ids = np.asarray(source_ids, dtype=np.int64)
+    prediction_ids = np.asarray(prediction_ids, dtype=np.int64)
+    target_ids = np.asarray(target_ids, dtype=np.int64)
+    batch_size, num_targets = target_ids.shape[:2]
+    target_ids = target_ids.reshape(batch_size * num_targets, target_ids.shape[2])
+
+    # Zero IDs are removed from the sentences, move them to the ends of the rows
+    max_len = max(source_ids.shape[1], prediction_ids.shape[1], target_ids.shape[1])
+    rows = [np.pad(ids, [(0, 0), (0, max_len - ids.shape[1])]) for ids in [source_ids, prediction_ids, target_ids]]
+    ids = np.concatenate(rows)
+    ids = np.take_along_axis(ids, np.argsort(ids == 0, axis=1, kind='stable'), axis=1)
+    target_lengths = np.sum(ids[2 * batch_size :] != 0, axis=1).reshape(batch_size, num_targets)
+
+    keep_scores = np.zeros(batch_size)
+    addition_scores = np.zeros(batch_size)
+    deletion_scores = np.zeros(batch_size)
+    for n, codes in enumerate(_get_ngram_codes(ids, max_gram_size), 1):
+        # keys of the unique ngrams of each example, example * num_codes + code
+        num_codes = int(codes.max(initial=0)) + 1
+        keys = np.arange(len(codes))[:, None] * num_codes + codes
+        valid = codes != 0
+        source_keys = np.unique(keys[:batch_size][valid[:batch_size]])
+        prediction_keys = np.unique(keys[batch_size : 2 * batch_size][valid[batch_size : 2 * batch_size]])
+        prediction_keys -= batch_size * num_codes
+        # unique ngrams of every target, then the number of targets of the example with each ngram
+        target_keys = np.unique(keys[2 * batch_size :][valid[2 * batch_size :]]) - 2 * batch_size * num_codes
+        target_keys = (target_keys // num_codes) // num_targets * num_codes + target_keys % num_codes
+        target_keys, target_key_counts = np.unique(target_keys, return_counts=True)
+        num_nonempty_targets = np.sum(target_lengths >= n, axis=1)
+        weighted_target_counts = target_key_counts / num_nonempty_targets[target_keys // num_codes]
+
+        source_examples = source_keys // num_codes
+        prediction_examples = prediction_keys // num_codes
+        source_in_prediction = np.isin(source_keys, prediction_keys, assume_unique=True)
+        source_in_target = np.isin(source_keys, target_keys, assume_unique=True)
+        source_weights = np.zeros(len(source_keys))
+        source_weights[source_in_target] = weighted_target_counts[
+            np.searchsorted(target_keys, source_keys[source_in_target])
+        ]
+
+        def count(examples, weights):
+            return np.bincount(examples, weights=weights, minlength=batch_size)
+
+        keep_scores += _get_fbeta_scores(
+            count(source_examples, source_weights * source_in_prediction),
+            count(source_examples, source_in_prediction),
+            count(source_examples, source_weights),
+        )
+        deletion_scores += _get_fbeta_scores(
+            count(source_examples, (1 - source_weights) * ~source_in_prediction),
+            count(source_examples, ~source_in_prediction),
+            count(source_examples, 1 - source_weights),
+            beta=beta_for_deletion,
+        )
+        added = ~np.isin(prediction_keys, source_keys, assume_unique=True)
+        addition_scores += _get_fbeta_scores(
+            count(prediction_examples, added & np.isin(prediction_keys, target_keys, assume_unique=True)),
+            count(prediction_examples, added),
+            count(target_keys // num_codes, ~np.isin(target_keys, source_keys, assume_unique=True)),
+        )
+
+    avg_keep_score = keep_scores / max_gram_size
+    avg_addition_score = addition_scores / max_gram_size
+    avg_deletion_score = deletion_scores / max_gram_size
+    sari = (avg_keep_score + avg_addition_score + avg_deletion_score) / 3.0
+    return sari, avg_keep_score, avg_addition_score, avg_deletion_score
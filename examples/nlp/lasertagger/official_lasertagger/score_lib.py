@@ -40,6 +40,7 @@ https://github.com/google-research/lasertagger/blob/master/score_lib.py
 
 import re
 
+import numpy as np
 from official_lasertagger import sari_hook
 
 
@@ -63,7 +64,7 @@ def compute_exact_score(predictions, target_lists):
 def compute_sari_scores(sources, predictions, target_lists, ignore_wikisplit_separators=True):
     """Computes SARI scores.
 
-    Wraps the t2t implementation of SARI computation.
+    Scores all the predictions at once with the batched SARI computation.
 
     Args:
         sources: List of sources.
@@ -80,24 +81,39 @@ def compute_sari_scores(sources, predictions, target_lists, ignore_wikisplit_sep
     Returns:
         Tuple (SARI score, keep score, addition score, deletion score).
     """
-    sari_sum = 0
-    keep_sum = 0
-    add_sum = 0
-    del_sum = 0
-    for source, pred, targets in zip(sources, predictions, target_lists):
-        if ignore_wikisplit_separators:
-            source = re.sub(' <::::> ', ' ', source)
-            pred = re.sub(' <::::> ', ' ', pred)
-            targets = [re.sub(' <::::> ', ' ', t) for t in targets]
-        source_ids = source.split()
-        pred_ids = pred.split()
-        list_of_targets = [t.split() for t in targets]
-        sari, keep, addition, deletion = sari_hook.get_sari_score(
-            source_ids, pred_ids, list_of_targets, beta_for_deletion=1
-        )
-        sari_sum += sari
-        keep_sum += keep
-        add_sum += addition
-        del_sum += deletion
+    examples = list(zip(sources, predictions, target_lists))
+    if ignore_wikisplit_separators:
+        examples = [
+            (_remove_separators(source), _remove_separators(pred), [_remove_separators(t) for t in targets])
+            for source, pred, targets in examples
+        ]
+    # Map the tokens to nonzero IDs, zero IDs are padding
+    vocab = {}
+
+    def to_ids(text):
+        return [vocab.setdefault(token, len(vocab) + 1) for token in text.split()]
+
+    source_ids = _pad([to_ids(source) for source, _, _ in examples])
+    pred_ids = _pad([to_ids(pred) for _, pred, _ in examples])
+    target_ids = [[to_ids(t) for t in targets] for _, _, targets in examples]
+    num_targets = max([len(targets) for targets in target_ids], default=1)
+    target_ids = _pad([t for targets in target_ids for t in targets + [[]] * (num_targets - len(targets))])
+    target_ids = target_ids.reshape(len(examples), num_targets, target_ids.shape[1])
+
+    scores = sari_hook.get_sari_scores(source_ids, pred_ids, target_ids, beta_for_deletion=1)
     n = max(len(sources), 0.1)  # Avoids 0/0.
-    return (sari_sum / n, keep_sum / n, add_sum / n, del_sum / n)
+    sari, keep, addition, deletion = [float(np.sum(score)) / n for score in scores]
+    return (sari, keep, addition, deletion)
+
+
+def _remove_separators(text):
+    return re.sub(' <::::> ', ' ', text)
+
+
+def _pad(ids):
+    """Pads lists of IDs with zero IDs to an np.array [num_lists, max_len]."""
+    max_len = max([len(x) for x in ids], default=0)
+    padded = np.zeros((len(ids), max_len), dtype=np.int64)
+    for i, x in enumerate(ids):
+        padded[i, : len(x)] = x
+    return padded
@@ -80,12 +80,14 @@ class TaggingConverter(object):
             target via tagging, returns an empty list.
         """
         target_tokens = utils.get_token_list(target.lower())
-        tags = self._compute_tags_fixed_order(task.source_tokens, target_tokens)
+        # The phrases which can be added at each target position don't depend on the source order
+        added_phrases = {}
+        tags = self._compute_tags_fixed_order(task.source_tokens, target_tokens, added_phrases)
         # If conversion fails, try to obtain the target after swapping the source
         # order.
         if not tags and len(task.sources) == 2 and self._do_swap:
             swapped_task = tagging.EditingTask(task.sources[::-1])
-            tags = self._compute_tags_fixed_order(swapped_task.source_tokens, target_tokens)
+            tags = self._compute_tags_fixed_order(swapped_task.source_tokens, target_tokens, added_phrases)
             if tags:
                 tags = tags[swapped_task.first_tokens[1] :] + tags[: swapped_task.first_tokens[1]]
                 # We assume that the last token (typically a period) is never deleted,
@@ -94,24 +96,29 @@ class TaggingConverter(object):
                 tags[task.first_tokens[1] - 1].tag_type = tagging.TagType.SWAP
         return tags
 
-    def _compute_tags_fixed_order(self, source_tokens, target_tokens):
+    def _compute_tags_fixed_order(self, source_tokens, target_tokens, added_phrases=None):
         """Computes tags when the order of sources is fixed.
 
         Args:
             source_tokens: List of source tokens.
             target_tokens: List of tokens to be obtained via edit operations.
+            added_phrases: Optional memo of the phrases which can be added at each
+                target position, see _get_added_phrases. Shared by the calls with the
+                same target tokens.
 
         Returns:
             List of tagging.Tag objects. If the source couldn't be converted into the
             target via tagging, returns an empty list.
         """
+        if added_phrases is None:
+            added_phrases = {}
         tags = [tagging.Tag('DELETE') for _ in source_tokens]
         # Indices of the tokens currently being processed.
         source_token_idx = 0
         target_token_idx = 0
         while target_token_idx < len(target_tokens):
             tags[source_token_idx], target_token_idx = self._compute_single_tag(
-                source_tokens[source_token_idx], target_token_idx, target_tokens
+                source_tokens[source_token_idx], target_token_idx, target_tokens, added_phrases
             )
             # If we're adding a phrase and the previous source token(s) were deleted,
             # we could add the phrase before a previously deleted token and still get
@@ -141,7 +148,7 @@ class TaggingConverter(object):
             return tags
         return []
 
-    def _compute_single_tag(self, source_token, target_token_idx, target_tokens):
+    def _compute_single_tag(self, source_token, target_token_idx, target_tokens, added_phrases=None):
         """Computes a single tag.
 
         The tag may match multiple target tokens (via tag.added_phrase) so we return
@@ -151,6 +158,8 @@ class TaggingConverter(object):
             source_token: The token to be tagged.
             target_token_idx: Index of the current target tag.
             target_tokens: List of all target tokens.
+            added_phrases: Optional memo of the phrases which can be added at each
+                target position, see _get_added_phrases.
 
         Returns:
             A tuple with (1) the computed tag and (2) the next target_token_idx.
@@ -160,7 +169,33 @@ class TaggingConverter(object):
         if source_token == target_token:
             return tagging.Tag('KEEP'), target_token_idx + 1
 
+        if added_phrases is None:
+            added_phrases = {}
+        if target_token_idx not in added_phrases:
+            added_phrases[target_token_idx] = self._get_added_phrases(target_token_idx, target_tokens)
+        if source_token in added_phrases[target_token_idx]:
+            added_phrase, next_target_token_idx = added_phrases[target_token_idx][source_token]
+            return tagging.Tag('KEEP|' + added_phrase), next_target_token_idx
+        return tagging.Tag('DELETE'), target_token_idx
+
+    def _get_added_phrases(self, target_token_idx, target_tokens):
+        """Finds the phrases of the vocabulary which can be added at a target position.
+
+        A source token that differs from the current target token is kept with an
+        added phrase if the phrase matches the target tokens from the current one and
+        the source token matches the target token after the phrase. The shortest such
+        phrase is used.
+
+        Args:
+            target_token_idx: Index of the current target tag.
+            target_tokens: List of all target tokens.
+
+        Returns:
+            Dict mapping source tokens to (the added phrase, the next target_token_idx).
+        """
+        added_phrases = {}
         added_phrase = ''
+        target_token = target_tokens[target_token_idx].lower()
         for num_added_tokens in range(1, self._max_added_phrase_length + 1):
             if target_token not in self._token_vocabulary:
                 break
@@ -169,9 +204,9 @@ class TaggingConverter(object):
             if next_target_token_idx >= len(target_tokens):
                 break
             target_token = target_tokens[next_target_token_idx].lower()
-            if source_token == target_token and added_phrase in self._phrase_vocabulary:
-                return tagging.Tag('KEEP|' + added_phrase), next_target_token_idx + 1
-        return tagging.Tag('DELETE'), target_token_idx
+            if added_phrase in self._phrase_vocabulary and target_token not in added_phrases:
+                added_phrases[target_token] = (added_phrase, next_target_token_idx + 1)
+        return added_phrases
 
     def _find_first_deletion_idx(self, source_token_idx, tags):
         """Finds the start index of a span of deleted tokens.
@@ -60,8 +60,8 @@ python lasertagger_preprocessor.py \
 
 # Training and evaluation, comment --eval_file_preprocessed to skip evaluation
 python lasertagger_main.py train \
-    --train_file_preprocessed=${OUTPUT_DIR}/lt_train_examples.pkl \
-    --eval_file_preprocessed=${OUTPUT_DIR}/lt_eval_examples.pkl \
+    --train_file_preprocessed=${OUTPUT_DIR}/lt_train_features \
+    --eval_file_preprocessed=${OUTPUT_DIR}/lt_eval_features \
     --test_file_preprocessed=${OUTPUT_DIR}/lt_test_examples.pkl \
     --pretrained_model_name=${PRETRAINED_MODEL_NAME} \
     --label_map_file=${OUTPUT_DIR}/label_map.txt \
@@ -16,9 +16,11 @@ import torch.optim as optim
 from torch.nn.parallel import DistributedDataParallel as DDP
 
 from nemo import logging
+from nemo.backends.pytorch.distributed_utils import all_gather_ragged
 from nemo.backends.pytorch.module_wrapper import TrainableNeuralModuleWrapper
 from nemo.backends.pytorch.nm import DataLayerNM, TrainableNM
 from nemo.backends.pytorch.optimizers import AdamW, Novograd, master_params
+from nemo.backends.pytorch.prefetch import BatchPrefetcher, move_to_device
 from nemo.core import DeploymentFormat, DeviceType, NeuralModule, NeuralModuleFactory, NmTensor
 from nemo.core.actions import Actions, TrainingState, topological_sort_from_leaves
 from nemo.core.callbacks import ActionCallback, NeMoCallback, SimpleLossLoggerCallback
@@ -51,7 +53,12 @@ _float_2_half_req = {
 
 class PtActions(Actions):
     def __init__(
-        self, local_rank=None, global_rank=None, tb_writer=None, optimization_level=Optimization.mxprO0,
+        self,
+        local_rank=None,
+        global_rank=None,
+        tb_writer=None,
+        optimization_level=Optimization.mxprO0,
+        prefetch_batches=False,
     ):
         need_apex = local_rank is not None or optimization_level != Optimization.mxprO0
         if need_apex:
@@ -93,6 +100,8 @@ class PtActions(Actions):
         self.ddp_initialized = False
         self.ddp_module_dict = {}
         self._train_called = False
+        self._prefetch_batches = prefetch_batches
+        self._callbacks = None
 
     @property
     def step(self):
@@ -124,6 +133,24 @@ class PtActions(Actions):
     def optimizers(self):
         return self._optimizers
 
+    @property
+    def prefetch_batches(self):
+        return self._prefetch_batches
+
+    @property
+    def callbacks(self):
+        """Callbacks passed to the current (or last) train() call."""
+        return self._callbacks
+
+    def _get_batch_iterator(self, loader, device):
+        """Returns the iterable over batches of `loader` used by train, eval and infer. If batch prefetching
+        is enabled, `loader` is wrapped into a BatchPrefetcher that moves the next batch to `device` while the
+        current one is being processed.
+        """
+        if not self._prefetch_batches:
+            return loader
+        return BatchPrefetcher(loader, device)
+
     def __get_top_sorted_modules_and_dataloader(self, hook: List[NmTensor]):
         """A function that accepts a list of NmTensors that need to be computed and constructs a call DAG that starts
         from a datalayerNM and can be used to compute the NmTensors.
@@ -384,40 +411,30 @@ class PtActions(Actions):
                     raise ValueError(f"A NMTensor was produced twice in the same DAG. {t_name}")
 
     @staticmethod
-    def pad_tensor(t: torch.Tensor, target_size: torch.Size):
-        padded_shape = target_size.cpu().data.numpy().tolist()
-        padded_t = torch.zeros(padded_shape).cuda().type_as(t)
-        t_size = t.size()
-        if len(t_size) == 0:
-            padded_t = t
-        elif len(t_size) == 1:
-            padded_t[: t_size[0]] = t
-        elif len(t_size) == 2:
-            padded_t[: t_size[0], : t_size[1]] = t
-        elif len(t_size) == 3:
-            padded_t[: t_size[0], : t_size[1], : t_size[2]] = t
-        elif len(t_size) == 4:
-            padded_t[: t_size[0], : t_size[1], : t_size[2], : t_size[3]] = t
-        else:
-            raise NotImplementedError
-        return padded_t
-
-    @staticmethod
-    def depad_tensor(t: torch.Tensor, original_size: torch.Size):
-        t_size = original_size
-        if len(t_size) == 0:
-            depadded_t = t
-        elif len(t_size) == 1:
-            depadded_t = t[: t_size[0]]
-        elif len(t_size) == 2:
-            depadded_t = t[: t_size[0], : t_size[1]]
-        elif len(t_size) == 3:
-            depadded_t = t[: t_size[0], : t_size[1], : t_size[2]]
-        elif len(t_size) == 4:
-            depadded_t = t[: t_size[0], : t_size[1], : t_size[2], : t_size[3]]
+    def _create_eval_dataloader(dl_nm, is_distributed):
+        """Creates the dataloader used to evaluate or infer on the data of a data layer. In distributed mode, a
+        DistributedSampler gives every worker a disjoint subset of the data.
+        """
+        if dl_nm.dataset is None:
+            eval_dataloader = dl_nm.data_iterator
         else:
-            raise NotImplementedError
-        return depadded_t
+            sampler = None
+            if is_distributed and not isinstance(dl_nm.dataset, torch.utils.data.IterableDataset):
+                sampler = torch.utils.data.distributed.DistributedSampler(dataset=dl_nm.dataset, shuffle=dl_nm.shuffle)
+            dataloader_params = {
+                'dataset': dl_nm.dataset,
+                'sampler': sampler,
+                'num_workers': dl_nm.num_workers,
+                'batch_size': dl_nm.batch_size,
+                'shuffle': False if is_distributed else dl_nm.shuffle,
+                'pin_memory': dl_nm.pin_memory,
+            }
+            if hasattr(dl_nm, 'collate_fn'):
+                dataloader_params['collate_fn'] = dl_nm.collate_fn
+            eval_dataloader = torch.utils.data.DataLoader(**dataloader_params)
+        if is_distributed and hasattr(eval_dataloader, 'sampler') and hasattr(eval_dataloader.sampler, 'set_epoch'):
+            eval_dataloader.sampler.set_epoch(0)
+        return eval_dataloader
 
     def _eval(self, tensors_2_evaluate, callback, step, verbose=False):
         """
@@ -441,51 +458,10 @@ class PtActions(Actions):
             # Prepare eval_dataloader
             # For distributed training it should have disjoint subsets of
             # all data on every worker
-            is_distributed = False
-            world_size = None
-            if dl_nm.placement == DeviceType.AllGpu:
+            is_distributed = dl_nm.placement == DeviceType.AllGpu
+            if is_distributed:
                 assert dist.is_initialized()
-                is_distributed = True
-                world_size = torch.distributed.get_world_size()
-
-                if dl_nm.dataset is not None:
-                    sampler = None
-                    if not isinstance(dl_nm.dataset, torch.utils.data.IterableDataset):
-                        sampler = torch.utils.data.distributed.DistributedSampler(
-                            dataset=dl_nm.dataset, shuffle=dl_nm.shuffle
-                        )
-                    dataloader_params = {
-                        'dataset': dl_nm.dataset,
-                        'sampler': sampler,
-                        'num_workers': dl_nm.num_workers,
-                        'batch_size': dl_nm.batch_size,
-                        'shuffle': False,
-                        'pin_memory': dl_nm.pin_memory,
-                    }
-                    if hasattr(dl_nm, 'collate_fn'):
-                        dataloader_params['collate_fn'] = dl_nm.collate_fn
-                    eval_dataloader = torch.utils.data.DataLoader(**dataloader_params)
-                else:
-                    eval_dataloader = dl_nm.data_iterator
-
-                if hasattr(eval_dataloader, 'sampler'):
-                    eval_dataloader.sampler.set_epoch(0)
-            else:  # Not distributed
-                if dl_nm.dataset is not None:
-                    # Todo: remove local_parameters
-                    dataloader_params = {
-                        'dataset': dl_nm.dataset,
-                        'sampler': None,  # not distributed sampler
-                        'num_workers': dl_nm.num_workers,
-                        'batch_size': dl_nm.batch_size,
-                        'shuffle': dl_nm.shuffle,
-                        'pin_memory': dl_nm.pin_memory,
-                    }
-                    if hasattr(dl_nm, 'collate_fn'):
-                        dataloader_params['collate_fn'] = dl_nm.collate_fn
-                    eval_dataloader = torch.utils.data.DataLoader(**dataloader_params)
-                else:
-                    eval_dataloader = dl_nm.data_iterator
+            eval_dataloader = self._create_eval_dataloader(dl_nm, is_distributed)
             # after this eval_dataloader is ready to be used
             # reset global_var_dict - results of evaluation will be stored
             # there
@@ -497,7 +473,7 @@ class PtActions(Actions):
             num_batches = None
             if hasattr(eval_dataloader, "__len__"):
                 num_batches = len(eval_dataloader)
-            for epoch_i, data in enumerate(eval_dataloader, 0):
+            for epoch_i, data in enumerate(self._get_batch_iterator(eval_dataloader, dl_device), 0):
                 if (
                     verbose
                     and num_batches is not None
@@ -509,7 +485,7 @@ class PtActions(Actions):
                     data = (data,)
                 for d in data:
                     if isinstance(d, torch.Tensor):
-                        tensors.append(d.to(dl_device))
+                        tensors.append(d.to(dl_device, non_blocking=True))
                     else:
                         tensors.append(d)
 
@@ -524,61 +500,30 @@ class PtActions(Actions):
                     values_dict = {}
                 # If distributed. For the outer loop, we need to ensure that
                 # all processes loop through the elements in the same order
+                keys_to_gather = []
                 for t2e in tensors_2_evaluate:
                     key = t2e.unique_name
                     if key not in registered_e_tensors.keys():
                         logging.info("WARNING: Tensor {} was not found during eval".format(key))
                         continue
                     if is_distributed:
-                        # where we will all_gather results from all workers
-                        tensors_list = []
-                        # where we will all_gather tensor sizes
                         tensor_on_worker = registered_e_tensors[key]
 
                         if not isinstance(tensor_on_worker, torch.Tensor):  # For string and other.
                             if self.global_rank == 0:
-                                values_dict[key] = [tensor_on_worker] + ([None] * (world_size - 1))
+                                values_dict[key] = [tensor_on_worker] + ([None] * (dist.get_world_size() - 1))
                             continue
-
-                        # https://github.com/pytorch/pytorch/issues/24137
-                        is_bool = False
-                        if tensor_on_worker.dtype == torch.bool:
-                            is_bool = True
-                            tensor_on_worker = tensor_on_worker.to(dtype=torch.long)
-
-                        if tensor_on_worker.shape != torch.Size([]):
-                            tensor_on_worker_size_as_tensor = torch.tensor(tensor_on_worker.shape).cuda()
-                            sizes = []
-                            for ind in range(world_size):
-                                sizes.append(torch.empty_like(tensor_on_worker_size_as_tensor))
-                            dist.all_gather(sizes, tensor_on_worker_size_as_tensor)
-                            mx_dim, _ = torch.max(torch.stack(sizes), dim=0)
-                        else:  # this is a singleton. For example, loss value
-                            sizes = [torch.Size([])] * world_size
-                            mx_dim = None
-                        for ind in range(world_size):
-                            # we have to use max shape for all_gather
-                            if mx_dim is None:  # singletons
-                                tensors_list.append(torch.tensor(2).cuda().type_as(tensor_on_worker))
-                            else:  # non-singletons
-                                tensors_list.append(
-                                    torch.empty(mx_dim.cpu().data.numpy().tolist()).cuda().type_as(tensor_on_worker)
-                                )
-
-                        if mx_dim is not None:
-                            t_to_send = self.pad_tensor(tensor_on_worker, mx_dim)
-                        else:
-                            t_to_send = tensor_on_worker
-                        dist.all_gather(tensors_list, t_to_send)
-                        tensors_list = [self.depad_tensor(t, size) for t, size in zip(tensors_list, sizes)]
-                        if self.global_rank == 0:
-                            values_dict["IS_FROM_DIST_EVAL"] = True
-                            if is_bool:
-                                tensors_list = [t.to(dtype=torch.bool) for t in tensors_list]
-                            values_dict[key] = tensors_list
+                        keys_to_gather.append(key)
                     else:  # NON-DISTRIBUTED TRAINING
                         values_dict["IS_FROM_DIST_EVAL"] = False
                         values_dict[key] = [registered_e_tensors[key]]
+                if keys_to_gather:
+                    # all_gather results of all tensors from all workers at once
+                    gathered = all_gather_ragged([registered_e_tensors[key] for key in keys_to_gather])
+                    if self.global_rank == 0:
+                        values_dict["IS_FROM_DIST_EVAL"] = True
+                        for ind, key in enumerate(keys_to_gather):
+                            values_dict[key] = [worker_tensors[ind] for worker_tensors in gathered]
                 if callback.user_iter_callback and (self.global_rank is None or self.global_rank == 0):
                     # values_dict will contain results from all workers
                     callback.user_iter_callback(values_dict, callback._global_var_dict)
@@ -626,52 +571,15 @@ class PtActions(Actions):
             # Prepare eval_dataloader
             # For distributed training it should have disjoint subsets of
             # all data on every worker
-            is_distributed = False
-            world_size = None
-            if dl_nm.placement == DeviceType.AllGpu:
+            is_distributed = dl_nm.placement == DeviceType.AllGpu
+            if is_distributed:
                 if self.cache or use_cache:
                     raise NotImplementedError("Caching is not available for distributed training.")
                 assert dist.is_initialized()
-                is_distributed = True
-                world_size = torch.distributed.get_world_size()
-                if dl_nm.dataset is not None:
-                    sampler = None
-                    if not isinstance(dl_nm.dataset, torch.utils.data.IterableDataset):
-                        sampler = torch.utils.data.distributed.DistributedSampler(
-                            dataset=dl_nm.dataset, shuffle=dl_nm.shuffle
-                        )
-                    dataloader_params = {
-                        'dataset': dl_nm.dataset,
-                        'sampler': sampler,
-                        'num_workers': dl_nm.num_workers,
-                        'batch_size': dl_nm.batch_size,
-                        'shuffle': False,
-                        'pin_memory': dl_nm.pin_memory,
-                    }
-                    if hasattr(dl_nm, 'collate_fn'):
-                        dataloader_params['collate_fn'] = dl_nm.collate_fn
-                    eval_dataloader = torch.utils.data.DataLoader(**dataloader_params)
-                else:
-                    eval_dataloader = dl_nm.data_iterator
-                eval_dataloader.sampler.set_epoch(0)
-            elif not use_cache:  # Not distributed and not using cache
+            if not use_cache:
                 # Dataloaders are only used if use_cache is False
                 # When caching, the DAG must cache all outputs from dataloader
-                if dl_nm.dataset is not None:
-                    # Todo: remove local_parameters
-                    dataloader_params = {
-                        'dataset': dl_nm.dataset,
-                        'sampler': None,  # not distributed sampler
-                        'num_workers': dl_nm.num_workers,
-                        'batch_size': dl_nm.batch_size,
-                        'shuffle': dl_nm.shuffle,
-                        'pin_memory': dl_nm.pin_memory,
-                    }
-                    if hasattr(dl_nm, 'collate_fn'):
-                        dataloader_params['collate_fn'] = dl_nm.collate_fn
-                    eval_dataloader = torch.utils.data.DataLoader(**dataloader_params)
-                else:
-                    eval_dataloader = dl_nm.data_iterator
+                eval_dataloader = self._create_eval_dataloader(dl_nm, is_distributed)
             # after this eval_dataloader is ready to be used
             # reset global_var_dict - results of evaluation will be stored
             # there
@@ -685,30 +593,27 @@ class PtActions(Actions):
             # Evaluation mini-batch for loop
             if use_cache:
                 num_batches = len(self.cache)
-                loop_iterator = self.cache
+                loop_iterator = self._get_batch_iterator(self.cache, dl_device)
             else:
                 num_batches = len(eval_dataloader)
-                loop_iterator = eval_dataloader
+                loop_iterator = self._get_batch_iterator(eval_dataloader, dl_device)
 
             for epoch_i, data in enumerate(loop_iterator, 0):
                 if verbose and (num_batches < 10 or (epoch_i % int(num_batches / 10) == 0)):
                     logging.info(f"Evaluating batch {epoch_i} out of {num_batches}")
                 tensors = []
                 if use_cache:
-                    registered_e_tensors = data
-                    # delete tensors_to_return
-                    for t in tensors_to_return:
-                        if t.unique_name in registered_e_tensors:
-                            del registered_e_tensors[t.unique_name]
+                    # skip tensors_to_return, they have to be recomputed
+                    names_to_return = {t.unique_name for t in tensors_to_return}
+                    registered_e_tensors = {k: v for k, v in data.items() if k not in names_to_return}
                     # Need to check for device type mismatch
-                    for t in registered_e_tensors:
-                        registered_e_tensors[t].to(dl_device)
+                    registered_e_tensors = move_to_device(registered_e_tensors, dl_device, non_blocking=True)
                 else:
                     if isinstance(data, torch.Tensor):
                         data = (data,)
                     for d in data:
                         if isinstance(d, torch.Tensor):
-                            tensors.append(d.to(dl_device))
+                            tensors.append(d.to(dl_device, non_blocking=True))
                         else:
                             tensors.append(d)
 
@@ -727,50 +632,28 @@ class PtActions(Actions):
 
                 # If distributed. For the outer loop, we need to ensure that
                 # all processes loop through the elements in the same order
+                keys_to_gather = []
                 for t2e in tensors_to_return:
                     key = t2e.unique_name
                     if key not in registered_e_tensors.keys():
                         logging.info("WARNING: Tensor {} was not found during eval".format(key))
                         continue
                     if is_distributed:
-                        # where we will all_gather results from all workers
-                        tensors_list = []
-                        # where we will all_gather tensor sizes
-                        tensor_on_worker = registered_e_tensors[key]
-                        if tensor_on_worker.shape != torch.Size([]):
-                            tensor_on_worker_size_as_tensor = torch.tensor(tensor_on_worker.shape).cuda()
-                            sizes = []
-                            for ind in range(world_size):
-                                sizes.append(torch.empty_like(tensor_on_worker_size_as_tensor))
-                            dist.all_gather(sizes, tensor_on_worker_size_as_tensor)
-                            mx_dim, _ = torch.max(torch.stack(sizes), dim=0)
-                        else:  # this is a singleton. For example, loss value
-                            sizes = [torch.Size([])] * world_size
-                            mx_dim = None
-                        for ind in range(world_size):
-                            # we have to use max shape for all_gather
-                            if mx_dim is None:  # singletons
-                                tensors_list.append(torch.tensor(2).cuda().type_as(tensor_on_worker))
-                            else:  # non-singletons
-                                tensors_list.append(
-                                    torch.empty(mx_dim.cpu().data.numpy().tolist()).cuda().type_as(tensor_on_worker)
-                                )
-
-                        if mx_dim is not None:
-                            t_to_send = self.pad_tensor(tensor_on_worker, mx_dim)
-                        else:
-                            t_to_send = tensor_on_worker
-                        dist.all_gather(tensors_list, t_to_send)
-                        tensors_list = [self.depad_tensor(t, size) for t, size in zip(tensors_list, sizes)]
-                        if offload_to_cpu:
-                            tensors_list = [t.cpu() for t in tensors_list]
-                        if self.global_rank == 0:
-                            values_dict[key] += tensors_list
+                        keys_to_gather.append(key)
                     else:  # NON-DISTRIBUTED TRAINING
                         tensor = registered_e_tensors[key]
                         if offload_to_cpu and isinstance(tensor, torch.Tensor):
                             tensor = tensor.cpu()
                         values_dict[key] += [tensor]
+                if keys_to_gather:
+                    # all_gather results of all tensors from all workers at once
+                    gathered = all_gather_ragged([registered_e_tensors[key] for key in keys_to_gather])
+                    if self.global_rank == 0:
+                        for ind, key in enumerate(keys_to_gather):
+                            tensors_list = [worker_tensors[ind] for worker_tensors in gathered]
+                            if offload_to_cpu:
+                                tensors_list = [t.cpu() for t in tensors_list]
+                            values_dict[key] += tensors_list
 
             if not is_distributed or self.global_rank == 0:
                 inferred_tensors = []
@@ -781,6 +664,49 @@ class PtActions(Actions):
             # For all other ranks
             return None
 
+    def _infer_iter(self, tensors_to_return, verbose=False, offload_to_cpu=True):
+        """
+        Generator version of _infer(): yields, for every batch, a list with the values of tensors_to_return
+        instead of accumulating them for the whole dataset. In distributed mode every rank yields the results
+        of its own shard of the data; nothing is gathered across ranks.
+        """
+        call_chain, _ = self.__get_top_sorted_modules_and_dataloader(hook=tensors_to_return)
+        dl_nm = call_chain[0][0]
+
+        # Prepare eval_dataloader
+        # For distributed training it should have disjoint subsets of
+        # all data on every worker
+        is_distributed = dl_nm.placement == DeviceType.AllGpu
+        eval_dataloader = self._create_eval_dataloader(dl_nm, is_distributed)
+        dl_device = dl_nm._device
+
+        num_batches = len(eval_dataloader) if hasattr(eval_dataloader, "__len__") else None
+        for epoch_i, data in enumerate(self._get_batch_iterator(eval_dataloader, dl_device), 0):
+            if verbose and num_batches is not None and (num_batches < 10 or (epoch_i % int(num_batches / 10) == 0)):
+                logging.info(f"Evaluating batch {epoch_i} out of {num_batches}")
+            # Gradients are disabled only around the forward pass, so that the
+            # caller's code between iterations is not affected
+            with torch.no_grad():
+                if isinstance(data, torch.Tensor):
+                    data = (data,)
+                tensors = move_to_device(list(data), dl_device, non_blocking=True)
+                registered_e_tensors = {
+                    t.unique_name: d for t, d in zip(call_chain[0][2].values(), tensors) if t is not None
+                }
+                self.__nm_graph_forward_pass(
+                    call_chain=call_chain, registered_tensors=registered_e_tensors, mode=OperationMode.evaluation,
+                )
+
+                values = []
+                for t in tensors_to_return:
+                    value = registered_e_tensors.get(t.unique_name)
+                    if value is None:
+                        logging.info("WARNING: Tensor {} was not found during eval".format(t.unique_name))
+                    elif offload_to_cpu and isinstance(value, torch.Tensor):
+                        value = value.cpu()
+                    values.append(value)
+            yield values
+
     def append_to_cache(self, registered_tensors: dict, offload_to_cpu):
         """Simpler helper function to add results of __nm_graph_forward_pass to
         current cache.
@@ -997,6 +923,7 @@ class PtActions(Actions):
         synced_batchnorm_groupsize=0,
         gradient_predivide=False,
         amp_max_loss_scale=2.0 ** 24,
+        defer_nan_check=False,
     ):
         def _perform_on_step_start(callbacks, state):
             # TODO: Most of these checks can be relaxed since we enforce callbacks
@@ -1180,6 +1107,7 @@ class PtActions(Actions):
         self._train_called = True
 
         self._training_state = TrainingState(self)
+        self._callbacks = callbacks
         # Analyse the arguments passed to train.
         if tensors_to_optimize is not None and training_graph is not None:
             raise ValueError("Cannot pass both `tensors_to_optimize` and `training_graph` to the train() function")
@@ -1335,10 +1263,7 @@ class PtActions(Actions):
                 train_dataloader = torch.utils.data.DataLoader(**dataloader_params)
             else:
                 train_dataloader = dataNM.data_iterator
-                if hasattr(train_dataloader, 'sampler'):
-                    train_sampler = train_dataloader.sampler
-                else:
-                    train_sampler = None
+                train_sampler = getattr(train_dataloader, 'sampler', None)
 
             self.ddp_initialized = True
             module_list = [mod.name for mod in AppState().modules]
@@ -1394,16 +1319,19 @@ class PtActions(Actions):
                 train_dataloader = torch.utils.data.DataLoader(**dataloader_params)
             else:
                 train_dataloader = dataNM.data_iterator
-                train_sampler = None
+                # Data layers that batch on their own, e.g. TranslationDataLayer, may still reshuffle each epoch
+                train_sampler = getattr(train_dataloader, 'sampler', None)
 
         _init_callbacks(callbacks, self)
         # Do action start callbacks
         _perform_on_action_start(callbacks, get_state(self))
 
+        train_batches = self._get_batch_iterator(train_dataloader, dataNM._device)
+
         # MAIN TRAINING LOOP
         # iteration over epochs
         while num_epochs is None or self.epoch < num_epochs:
-            if train_sampler is not None:
+            if hasattr(train_sampler, 'set_epoch'):
                 train_sampler.set_epoch(self.epoch)
             if max_steps is not None and self.step >= max_steps:
                 break
@@ -1413,7 +1341,7 @@ class PtActions(Actions):
 
             # iteration over batches in epoch
             batch_counter = 0
-            for _, data in enumerate(train_dataloader, 0):
+            for _, data in enumerate(train_batches, 0):
                 if max_steps is not None and self.step >= max_steps:
                     break
 
@@ -1421,6 +1349,8 @@ class PtActions(Actions):
                     # Started step, zero gradients
                     curr_optimizer = training_loop[self.step % len(training_loop)][0]
                     curr_optimizer.zero_grad()
+                    # Device-side flag accumulating NaN/inf losses over the step (if defer_nan_check)
+                    step_nan_inf = None
                     # Register iteration start with callbacks
                     _perform_on_step_start(callbacks, get_state(self))
 
@@ -1451,7 +1381,7 @@ class PtActions(Actions):
                     data = (data,)
                 for d in data:
                     if isinstance(d, torch.Tensor):
-                        tensors.append(d.to(dl_device))
+                        tensors.append(d.to(dl_device, non_blocking=True))
                     else:
                         tensors.append(d)
 
@@ -1468,20 +1398,26 @@ class PtActions(Actions):
                 for tensor in curr_tensors_to_optimize:
                     final_loss += self._training_state.tensor_dict[tensor.unique_name]
 
-                # Check for NaN/inf loss (across workers if applicable)
-                loss_nan_inf_checker = final_loss.clone()
-                if placement_gpu:
-                    dist.all_reduce(loss_nan_inf_checker, torch.distributed.ReduceOp.MAX)
-                if torch.isnan(loss_nan_inf_checker).any() or torch.isinf(loss_nan_inf_checker).any():
-                    if stop_on_nan_loss:
-                        raise ValueError('Loss is NaN or inf - exiting')
-                    if self._optim_level in AmpOptimizations and self._optim_level != Optimization.mxprO0:
-                        logging.warning('Loss is NaN or inf.')
-                    else:
-                        # Skip this step across workers if loss is NaN/inf and using fp32
-                        logging.warning('Loss is NaN or inf. Skipping update.')
-                        self._training_state.clear_dict()  # Clear state dict here
-                        continue
+                if defer_nan_check:
+                    # Only accumulate the flag on device, without syncing. It is
+                    # checked (across workers) once per optimizer step
+                    loss_nan_inf = ~torch.isfinite(final_loss.detach()).all()
+                    step_nan_inf = loss_nan_inf if step_nan_inf is None else step_nan_inf | loss_nan_inf
+                else:
+                    # Check for NaN/inf loss (across workers if applicable)
+                    loss_nan_inf_checker = final_loss.clone()
+                    if placement_gpu:
+                        dist.all_reduce(loss_nan_inf_checker, torch.distributed.ReduceOp.MAX)
+                    if torch.isnan(loss_nan_inf_checker).any() or torch.isinf(loss_nan_inf_checker).any():
+                        if stop_on_nan_loss:
+                            raise ValueError('Loss is NaN or inf - exiting')
+                        if self._optim_level in AmpOptimizations and self._optim_level != Optimization.mxprO0:
+                            logging.warning('Loss is NaN or inf.')
+                        else:
+                            # Skip this step across workers if loss is NaN/inf and using fp32
+                            logging.warning('Loss is NaN or inf. Skipping update.')
+                            self._training_state.clear_dict()  # Clear state dict here
+                            continue
 
                 if self._optim_level in AmpOptimizations and self._optim_level != Optimization.mxprO0:
                     with amp.scale_loss(final_loss, curr_optimizer, delay_unscale=disable_allreduce) as scaled_loss:
@@ -1519,6 +1455,23 @@ class PtActions(Actions):
                 _perform_on_batch_end(callbacks, get_state(self))
 
                 batch_counter += 1
+                if batch_counter == batches_per_step and defer_nan_check:
+                    # Check for NaN/inf loss once per step (across workers if applicable)
+                    step_nan_inf = step_nan_inf.int()
+                    if placement_gpu:
+                        dist.all_reduce(step_nan_inf, torch.distributed.ReduceOp.MAX)
+                    if step_nan_inf.item() > 0:
+                        if stop_on_nan_loss:
+                            raise ValueError('Loss is NaN or inf - exiting')
+                        if self._optim_level in AmpOptimizations and self._optim_level != Optimization.mxprO0:
+                            logging.warning('Loss is NaN or inf.')
+                        else:
+                            # Skip the whole step across workers if loss is NaN/inf and using fp32
+                            logging.warning('Loss is NaN or inf. Skipping update.')
+                            curr_optimizer.zero_grad()
+                            batch_counter = 0
+                            self._training_state.clear_dict()
+                            continue
                 if batch_counter == batches_per_step:
                     # Ended step. Do optimizer update
                     if grad_norm_clip is not None:
@@ -1544,10 +1497,105 @@ class PtActions(Actions):
         use_cache=False,
         offload_to_cpu=True,
         modules_to_restore=None,
+        sink=None,
     ):
         """See NeuralModuleFactory.infer()
         """
+        if sink is not None:
+            if cache or use_cache:
+                raise ValueError("Caching is not available when writing inference results to a sink.")
+            return self.infer_to_sink(
+                tensors=tensors,
+                sink=sink,
+                checkpoint_dir=checkpoint_dir,
+                ckpt_pattern=ckpt_pattern,
+                verbose=verbose,
+                modules_to_restore=modules_to_restore,
+            )
+
+        self.__prepare_for_infer(
+            tensors=tensors,
+            checkpoint_dir=checkpoint_dir,
+            ckpt_pattern=ckpt_pattern,
+            modules_to_restore=modules_to_restore,
+        )
+
+        # Run infer
+        return self._infer(
+            tensors_to_return=tensors,
+            verbose=verbose,
+            cache=cache,
+            use_cache=use_cache,
+            offload_to_cpu=offload_to_cpu,
+        )
+
+    def infer_iter(
+        self,
+        tensors,
+        checkpoint_dir=None,
+        ckpt_pattern='',
+        verbose=False,
+        offload_to_cpu=True,
+        modules_to_restore=None,
+    ):
+        """See NeuralModuleFactory.infer_iter()
+        """
+        self.__prepare_for_infer(
+            tensors=tensors,
+            checkpoint_dir=checkpoint_dir,
+            ckpt_pattern=ckpt_pattern,
+            modules_to_restore=modules_to_restore,
+        )
+        return self._infer_iter(tensors_to_return=tensors, verbose=verbose, offload_to_cpu=offload_to_cpu)
 
+    def infer_to_sink(
+        self, tensors, sink, checkpoint_dir=None, ckpt_pattern='', verbose=False, modules_to_restore=None,
+    ):
+        """Runs streaming inference and writes the values of `tensors` batch by batch into `sink`. In distributed
+        inference every rank writes its own results, and rank 0 merges them once all ranks are done.
+        """
+        call_chain, _ = self.__get_top_sorted_modules_and_dataloader(hook=tensors)
+        dl_nm = call_chain[0][0]
+        is_distributed = dl_nm.placement == DeviceType.AllGpu
+        rank = dist.get_rank() if is_distributed else 0
+        world_size = dist.get_world_size() if is_distributed else 1
+
+        # DistributedSampler pads the shards of all ranks to the same length with the first examples of the
+        # dataset, which come last in the shards of the last ranks: every rank only writes the examples of its shard
+        num_examples = None
+        if is_distributed and dl_nm.dataset is not None:
+            if not isinstance(dl_nm.dataset, torch.utils.data.IterableDataset):
+                num_examples = len(range(rank, len(dl_nm.dataset), world_size))
+
+        names = [t.unique_name for t in tensors]
+        sink.open(names, rank=rank, world_size=world_size)
+        try:
+            for values in self.infer_iter(
+                tensors=tensors,
+                checkpoint_dir=checkpoint_dir,
+                ckpt_pattern=ckpt_pattern,
+                verbose=verbose,
+                offload_to_cpu=True,
+                modules_to_restore=modules_to_restore,
+            ):
+                if num_examples is not None:
+                    if num_examples <= 0:
+                        continue
+                    batch_size = len(values[0])
+                    values = [value[:num_examples] for value in values]
+                    num_examples -= batch_size
+                sink.write(dict(zip(names, values)))
+        finally:
+            sink.close()
+
+        if is_distributed:
+            dist.barrier()
+        if rank == 0:
+            sink.merge()
+        return None
+
+    def __prepare_for_infer(self, tensors, checkpoint_dir=None, ckpt_pattern='', modules_to_restore=None):
+        """Restores modules from checkpoint_dir (if given) and initializes Amp before inference."""
         call_chain, _ = self.__get_top_sorted_modules_and_dataloader(hook=tensors)
         if checkpoint_dir:
             # Find all modules that need to be restored
@@ -1592,15 +1640,6 @@ class PtActions(Actions):
             )
             self.amp_initialized = True
 
-        # Run infer
-        return self._infer(
-            tensors_to_return=tensors,
-            verbose=verbose,
-            cache=cache,
-            use_cache=use_cache,
-            offload_to_cpu=offload_to_cpu,
-        )
-
     def get_DDP_modules(self, call_chain):
         modules = []
         for ind in range(1, len(call_chain)):
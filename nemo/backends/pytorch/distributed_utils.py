@@ -0,0 +1,158 @@
+# =============================================================================
+# Copyright (c) 2020, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+from typing import List
+
+import torch
+import torch.distributed as dist
+
+__all__ = ['all_gather_ragged', 'pack_tensors', 'unpack_tensors']
+
+# Every tensor payload starts at a multiple of this many bytes, so that it can be viewed as any dtype in place
+_ALIGNMENT = 8
+
+_DTYPES = [
+    torch.float32,
+    torch.float64,
+    torch.float16,
+    torch.bfloat16,
+    torch.uint8,
+    torch.int8,
+    torch.int16,
+    torch.int32,
+    torch.int64,
+    torch.bool,
+    torch.complex64,
+    torch.complex128,
+]
+_DTYPE_CODES = {dtype: code for code, dtype in enumerate(_DTYPES)}
+
+
+def _aligned(num_bytes):
+    return (num_bytes + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+def _as_bytes(t: torch.Tensor) -> torch.Tensor:
+    return t.contiguous().reshape(-1).view(torch.uint8)
+
+
+def pack_tensors(tensors: List[torch.Tensor], device=None) -> torch.Tensor:
+    """Packs tensors of arbitrary shapes and dtypes into a single flat uint8 buffer.
+
+    The buffer starts with an int64 header: the header length (in int64 words), the number of tensors and
+    ``[dtype code, number of dims, *shape]`` for every tensor. Tensor payloads follow the header, each starting
+    at an 8-byte aligned offset.
+
+    Args:
+        tensors: list of tensors to pack
+        device: device of the resulting buffer. Defaults to the device of the first tensor (CPU if the list is
+            empty).
+
+    Returns:
+        1D uint8 tensor
+    """
+    if device is None:
+        device = tensors[0].device if tensors else torch.device('cpu')
+    header = [0, len(tensors)]
+    for t in tensors:
+        if t.dtype not in _DTYPE_CODES:
+            raise TypeError(f"Tensors of dtype {t.dtype} can not be packed")
+        header += [_DTYPE_CODES[t.dtype], t.dim()] + list(t.shape)
+    header[0] = len(header)
+    offsets = []
+    total = len(header) * 8
+    for t in tensors:
+        offsets.append(total)
+        total = _aligned(total + t.numel() * t.element_size())
+
+    buffer = torch.zeros(total, dtype=torch.uint8, device=device)
+    buffer[: len(header) * 8].view(torch.int64).copy_(torch.tensor(header, dtype=torch.int64))
+    for t, offset in zip(tensors, offsets):
+        num_bytes = t.numel() * t.element_size()
+        if num_bytes > 0:
+            buffer[offset : offset + num_bytes].copy_(_as_bytes(t.detach()))
+    return buffer
+
+
+def unpack_tensors(buffer: torch.Tensor) -> List[torch.Tensor]:
+    """Unpacks a buffer created by `pack_tensors`. The returned tensors are views into `buffer`, no data is
+    copied.
+
+    Args:
+        buffer: 1D uint8 tensor; may be longer than the packed data (e.g. padded)
+
+    Returns:
+        list of tensors
+    """
+    # Only the (small) header is read on the host
+    header_len = int(buffer[:8].view(torch.int64).item())
+    header = buffer[: 8 * header_len].cpu().view(torch.int64).tolist()
+
+    tensors = []
+    pos = 2
+    offset = 8 * header_len
+    for _ in range(header[1]):
+        dtype = _DTYPES[header[pos]]
+        ndim = header[pos + 1]
+        shape = header[pos + 2 : pos + 2 + ndim]
+        pos += 2 + ndim
+        numel = 1
+        for dim in shape:
+            numel *= dim
+        num_bytes = numel * torch.empty((), dtype=dtype).element_size()
+        tensors.append(buffer[offset : offset + num_bytes].view(dtype).reshape(shape))
+        offset = _aligned(offset + num_bytes)
+    return tensors
+
+
+def all_gather_ragged(tensors: List[torch.Tensor], group=None) -> List[List[torch.Tensor]]:
+    """Gathers a list of tensors of any shape and dtype from all workers. Shapes (and even the number of tensors)
+    may differ across workers.
+
+    All tensors are packed into one flat byte buffer, so the whole list costs a single size exchange and a single
+    all_gather, instead of a size exchange plus a padded all_gather per tensor. Gathered tensors are views into the
+    received buffers.
+
+    Works with any backend supporting all_gather; the buffers live on the current CUDA device for NCCL and on the
+    CPU otherwise (e.g. for gloo).
+
+    Args:
+        tensors: list of tensors on this worker
+        group: process group to work on. Defaults to the default group.
+
+    Returns:
+        list with one entry per rank, each entry being the list of tensors sent by that rank
+    """
+    if group is None:
+        group = dist.group.WORLD
+    world_size = dist.get_world_size(group)
+    if dist.get_backend(group) == dist.Backend.NCCL:
+        device = torch.device('cuda', torch.cuda.current_device())
+    else:
+        device = torch.device('cpu')
+
+    buffer = pack_tensors(tensors, device=device)
+    size = torch.tensor([buffer.numel()], dtype=torch.int64, device=device)
+    sizes = [torch.empty_like(size) for _ in range(world_size)]
+    dist.all_gather(sizes, size, group=group)
+    sizes = [int(s.item()) for s in sizes]
+
+    max_size = max(sizes)
+    if buffer.numel() < max_size:
+        buffer = torch.cat([buffer, buffer.new_zeros(max_size - buffer.numel())])
+    buffers = [torch.empty(max_size, dtype=torch.uint8, device=device) for _ in range(world_size)]
+    dist.all_gather(buffers, buffer, group=group)
+    return [unpack_tensors(b[:s]) for b, s in zip(buffers, sizes)]
@@ -0,0 +1,167 @@
+# =============================================================================
+# Copyright (c) 2020, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+import queue
+import threading
+
+import torch
+
+__all__ = ['move_to_device', 'BatchPrefetcher']
+
+
+def move_to_device(data, device, non_blocking=False, pin_memory=False):
+    """Recursively moves all tensors found in (possibly nested) tuples, lists and dicts to `device`.
+    Non-tensor leaves are returned unchanged.
+
+    Args:
+        data: tensor or (nested) tuple/list/dict of tensors
+        device (torch.device): target device
+        non_blocking (bool): issue asynchronous host-to-device copies
+        pin_memory (bool): page-lock CPU tensors before copying them to a CUDA device, so that
+            the copy can actually run asynchronously
+
+    Returns:
+        Structure of the same type as `data` with tensors placed on `device`.
+    """
+    if isinstance(data, torch.Tensor):
+        if pin_memory and device.type == 'cuda' and data.device.type == 'cpu' and not data.is_pinned():
+            data = data.pin_memory()
+        return data.to(device, non_blocking=non_blocking)
+    if isinstance(data, dict):
+        return {k: move_to_device(v, device, non_blocking, pin_memory) for k, v in data.items()}
+    if isinstance(data, tuple) and hasattr(data, '_fields'):  # namedtuple
+        return type(data)(*(move_to_device(d, device, non_blocking, pin_memory) for d in data))
+    if isinstance(data, (tuple, list)):
+        return type(data)(move_to_device(d, device, non_blocking, pin_memory) for d in data)
+    return data
+
+
+def _record_stream(data, stream):
+    """Marks all CUDA tensors in `data` as used by `stream`, so that the caching allocator does not reuse
+    their memory while the consumer stream still works on them."""
+    if isinstance(data, torch.Tensor):
+        if data.is_cuda:
+            data.record_stream(stream)
+    elif isinstance(data, dict):
+        for d in data.values():
+            _record_stream(d, stream)
+    elif isinstance(data, (tuple, list)):
+        for d in data:
+            _record_stream(d, stream)
+
+
+class BatchPrefetcher(object):
+    """Wraps an iterable of batches (usually a torch.utils.data.DataLoader) and moves batch i+1 to `device`
+    while batch i is being processed.
+
+    On CUDA devices the copy of the next batch is issued on a side stream with pinned memory and
+    ``non_blocking=True``; the compute stream waits on the side stream only when the batch is handed out.
+    On CPU devices (or any other non-CUDA device) a background thread fetches batches from the wrapped
+    iterable into a bounded queue, which overlaps data loading and collation with compute.
+
+    Batches can be tensors or arbitrarily nested tuples, lists and dicts of tensors; the structure is
+    preserved. The prefetcher can be iterated over several times (e.g. once per epoch); every iteration
+    creates a fresh iterator over the wrapped iterable.
+
+    Args:
+        loader: iterable of batches
+        device (torch.device): device to move the batches to
+        depth (int): number of batches fetched ahead of the consumer by the background thread.
+            Only used on non-CUDA devices. Defaults to 2.
+        pin_memory (bool): page-lock batches before the host-to-device copy. Only used on CUDA devices.
+            Defaults to True.
+    """
+
+    def __init__(self, loader, device, depth=2, pin_memory=True):
+        if depth < 1:
+            raise ValueError(f"Prefetch depth must be a positive integer, got {depth}")
+        self._loader = loader
+        self._device = torch.device(device)
+        self._depth = depth
+        self._pin_memory = pin_memory
+
+    @property
+    def loader(self):
+        """ Property returning the wrapped iterable. """
+        return self._loader
+
+    def __len__(self):
+        return len(self._loader)
+
+    def __iter__(self):
+        if self._device.type == 'cuda' and torch.cuda.is_available():
+            return self._iter_cuda()
+        return self._iter_threaded()
+
+    def _iter_cuda(self):
+        stream = torch.cuda.Stream(device=self._device)
+
+        def _preload(it):
+            try:
+                batch = next(it)
+            except StopIteration:
+                return None, False
+            with torch.cuda.stream(stream):
+                batch = move_to_device(batch, self._device, non_blocking=True, pin_memory=self._pin_memory)
+            return batch, True
+
+        it = iter(self._loader)
+        batch, has_batch = _preload(it)
+        while has_batch:
+            current_stream = torch.cuda.current_stream(self._device)
+            current_stream.wait_stream(stream)
+            _record_stream(batch, current_stream)
+            next_batch, has_next = _preload(it)
+            yield batch
+            batch, has_batch = next_batch, has_next
+
+    def _iter_threaded(self):
+        batches = queue.Queue(maxsize=self._depth)
+        stop = threading.Event()
+        end_of_data = object()
+
+        def _put(item):
+            # Poll the stop flag so that the producer exits when the consumer stops early
+            while not stop.is_set():
+                try:
+                    batches.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def _produce():
+            try:
+                for batch in self._loader:
+                    if not _put((move_to_device(batch, self._device), None)):
+                        return
+                _put((end_of_data, None))
+            except Exception as e:
+                _put((end_of_data, e))
+
+        producer = threading.Thread(target=_produce, name="BatchPrefetcher", daemon=True)
+        producer.start()
+        try:
+            while True:
+                batch, error = batches.get()
+                if batch is end_of_data:
+                    if error is not None:
+                        raise error
+                    break
+                yield batch
+        finally:
+            stop.set()
+            producer.join()
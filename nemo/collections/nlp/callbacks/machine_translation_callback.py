@@ -19,36 +19,64 @@ import numpy as np
 from nemo import logging
 from nemo.collections.asr.metrics import word_error_rate
 from nemo.collections.nlp.metrics.sacrebleu import corpus_bleu
+from nemo.collections.nlp.metrics.token_bleu import bleu_from_statistics, bleu_statistics, remove_special_ids
 
 __all__ = ['eval_iter_callback', 'eval_epochs_done_callback']
 
-GLOBAL_KEYS = ["eval_loss", "ref", "sys", "sent_ids", "nonpad_tokens"]
+GLOBAL_KEYS = ["eval_loss", "ref", "sys", "sent_ids", "nonpad_tokens", "bleu_stats", "samples"]
 
+NUM_SAMPLES = 3
 
-def eval_iter_callback(tensors, global_vars, tgt_tokenizer):
+
+def _special_ids(tokenizer):
+    special_ids = []
+    for name in ["pad_id", "bos_id", "eos_id"]:
+        try:
+            special_ids.append(getattr(tokenizer, name))
+        except (AttributeError, KeyError, TypeError):
+            continue
+    return special_ids
+
+
+def eval_iter_callback(tensors, global_vars, tgt_tokenizer, detokenize=True):
+    """Accumulates evaluation results of a batch. BLEU statistics are computed on the token ids of the
+    translations and targets, hypotheses and references are converted to text if `detokenize` is set.
+
+    Args:
+        tensors: evaluated tensors
+        global_vars: dict of values accumulated over the evaluation
+        tgt_tokenizer: tokenizer of the target language
+        detokenize (bool): convert translations and targets to text, which eval_epochs_done_callback needs
+            for token BLEU and SacreBLEU and eval_epochs_done_callback_wer for WER. Disable it to only compute
+            BLEU over token ids, which does not decode the sentences
+    """
     for key in GLOBAL_KEYS:
         if key not in global_vars.keys():
             global_vars[key] = []
 
+    translations, targets = [], []
     for kv, v in tensors.items():
 
         if "output_ids" in kv:
-            sys = []
-            for beam in v:
-                beam_search_translation = beam.cpu().numpy().tolist()
-                for sentence in beam_search_translation:
-                    sys.append(tgt_tokenizer.ids_to_text(sentence))
-            global_vars["sys"].append(sys)
+            translations = [beam.cpu().numpy() for beam in v]
+            if detokenize:
+                sys = []
+                for beam_search_translation in translations:
+                    for sentence in beam_search_translation.tolist():
+                        sys.append(tgt_tokenizer.ids_to_text(sentence))
+                global_vars["sys"].append(sys)
 
         if "tgt" in kv:
+            targets = [tgt.cpu().numpy() for tgt in v]
             ref = []
-            for tgt in v:
+            for tgt in targets:
                 nonpad_tokens = (tgt != tgt_tokenizer.pad_id).sum().item()
-                tgt_sentences = tgt.cpu().numpy().tolist()
-                for sentence in tgt_sentences:
-                    ref.append(tgt_tokenizer.ids_to_text(sentence))
+                if detokenize:
+                    for sentence in tgt.tolist():
+                        ref.append(tgt_tokenizer.ids_to_text(sentence))
                 global_vars["nonpad_tokens"].append(nonpad_tokens)
-            global_vars["ref"].append(ref)
+            if detokenize:
+                global_vars["ref"].append(ref)
 
         if "sent_ids" in kv:
             for sent_ids in v:
@@ -58,42 +86,69 @@ def eval_iter_callback(tensors, global_vars, tgt_tokenizer):
             for eval_loss in v:
                 global_vars["eval_loss"].append(eval_loss.item())
 
+    special_ids = _special_ids(tgt_tokenizer)
+    for translation, tgt in zip(translations, targets):
+        hyp_ids, hyp_lengths = remove_special_ids(translation, special_ids)
+        ref_ids, ref_lengths = remove_special_ids(tgt, special_ids)
+        global_vars["bleu_stats"].append(bleu_statistics(hyp_ids, ref_ids, hyp_lengths, ref_lengths))
+
+        for i in range(min(NUM_SAMPLES - len(global_vars["samples"]), len(translation))):
+            global_vars["samples"].append(
+                (tgt_tokenizer.ids_to_text(tgt[i].tolist()), tgt_tokenizer.ids_to_text(translation[i].tolist()))
+            )
+
 
 def eval_epochs_done_callback(global_vars, validation_dataset=None):
+    """Computes the validation loss and BLEU over the token ids of all evaluated sentences (token_bleu_ids), as
+    well as token BLEU over tokenized text and SacreBLEU if eval_iter_callback converted translations to text
+    (`detokenize`).
+
+    Args:
+        global_vars: dict of values accumulated by eval_iter_callback
+        validation_dataset (str): file with the references for SacreBLEU. Defaults to the detokenized targets.
+    """
     losses = np.array(global_vars["eval_loss"])
     counts = np.array(global_vars["nonpad_tokens"])
     eval_loss = np.sum(losses * counts) / np.sum(counts)
 
-    all_sys = [j for i in global_vars["sys"] for j in i]
+    # Sentences evaluated more than once (e.g. padding of distributed samplers) are counted once
     _, indices = np.unique(global_vars["sent_ids"], return_index=True)
-    all_sys = [all_sys[i] for i in indices]
-
-    if validation_dataset is not None:
-        all_ref = [open(validation_dataset, "r").readlines()]
-        # _, *refs = download_test_set("wmt14/full", "en-de")
-        # all_ref = [smart_open(x).readlines() for x in refs]
-    else:
-        all_ref = [[j for i in global_vars["ref"] for j in i]]
-
-    token_bleu = corpus_bleu(all_sys, all_ref, tokenize="fairseq").score
-    sacre_bleu = corpus_bleu(all_sys, all_ref, tokenize="13a").score
-
-    for i in range(3):
-        sent_id = np.random.randint(len(all_sys))
-        logging.info("Ground truth: {0}\n".format(all_ref[0][sent_id]))
-        logging.info("Translation:  {0}\n".format(all_sys[sent_id]))
+    bleu_stats = np.concatenate(global_vars["bleu_stats"])
+    if len(indices) > 0:
+        bleu_stats = bleu_stats[indices]
+    token_bleu_ids = bleu_from_statistics(bleu_stats).score
+    metrics = dict({"eval_loss": eval_loss, "token_bleu_ids": token_bleu_ids})
+
+    if global_vars["sys"]:
+        all_sys = [j for i in global_vars["sys"] for j in i]
+        all_sys = [all_sys[i] for i in indices]
+
+        if validation_dataset is not None:
+            all_ref = [open(validation_dataset, "r").readlines()]
+            # _, *refs = download_test_set("wmt14/full", "en-de")
+            # all_ref = [smart_open(x).readlines() for x in refs]
+        else:
+            all_ref = [[j for i in global_vars["ref"] for j in i]]
+            all_ref = [[all_ref[0][i] for i in indices]]
+
+        metrics["token_bleu"] = corpus_bleu(all_sys, all_ref, tokenize="fairseq").score
+        metrics["sacre_bleu"] = corpus_bleu(all_sys, all_ref, tokenize="13a").score
+
+    for ref, sys in global_vars["samples"]:
+        logging.info("Ground truth: {0}\n".format(ref))
+        logging.info("Translation:  {0}\n".format(sys))
 
     logging.info("------------------------------------------------------------")
     logging.info("Validation loss: {0}".format(np.round(eval_loss, 3)))
-    logging.info("TokenBLEU: {0}".format(np.round(token_bleu, 2)))
-    logging.info("SacreBLEU: {0}".format(np.round(sacre_bleu, 2)))
+    logging.info("TokenBLEU on ids: {0}".format(np.round(token_bleu_ids, 2)))
+    if "sacre_bleu" in metrics:
+        logging.info("TokenBLEU: {0}".format(np.round(metrics["token_bleu"], 2)))
+        logging.info("SacreBLEU: {0}".format(np.round(metrics["sacre_bleu"], 2)))
     logging.info("------------------------------------------------------------")
 
     for key in GLOBAL_KEYS:
         global_vars[key] = []
 
-    metrics = dict({"eval_loss": eval_loss, "token_bleu": token_bleu, "sacre_bleu": sacre_bleu})
-
     return metrics
 
 
@@ -115,8 +170,7 @@ def eval_epochs_done_callback_wer(global_vars):
 
     logging.info("Validation loss: {0}".format(np.round(eval_loss, 3)))
     logging.info("Validation WER: {0}".format(eval_wer))
-    global_vars["eval_loss"] = []
-    global_vars["ref"] = []
-    global_vars["sys"] = []
+    for key in GLOBAL_KEYS:
+        global_vars[key] = []
 
     return dict({"eval_loss": eval_loss, "eval_wer": eval_wer})
@@ -33,9 +33,8 @@ from nemo.collections.nlp.data.datasets.sgd_dataset.evaluate import (
     PER_FRAME_OUTPUT_FILENAME,
     SEEN_SERVICES,
     UNSEEN_SERVICES,
-    get_dataset_as_dict,
+    MetricsAggregator,
     get_in_domain_services,
-    get_metrics,
 )
 
 __all__ = ['eval_iter_callback', 'eval_epochs_done_callback']
@@ -98,26 +97,11 @@ def eval_iter_callback(tensors, global_vars, schema_processor, eval_dataset):
     start_scores = softmax(output['logit_noncat_slot_start'])
     end_scores = softmax(output['logit_noncat_slot_end'])
 
-    batch_size, max_num_noncat_slots, max_num_tokens = end_scores.size()
+    batch_size = end_scores.size(0)
     # Find the span with the maximum sum of scores for start and end indices.
-    total_scores = torch.unsqueeze(start_scores, axis=3) + torch.unsqueeze(end_scores, axis=2)
-    # Mask out scores where start_index > end_index.
-    # device = total_scores.device
-    start_idx = torch.arange(max_num_tokens, device=total_scores.device).view(1, 1, -1, 1)
-    end_idx = torch.arange(max_num_tokens, device=total_scores.device).view(1, 1, 1, -1)
-    invalid_index_mask = (start_idx > end_idx).repeat(batch_size, max_num_noncat_slots, 1, 1)
-    total_scores = torch.where(
-        invalid_index_mask,
-        torch.zeros(total_scores.size(), device=total_scores.device, dtype=total_scores.dtype),
-        total_scores,
-    )
-    max_span_index = torch.argmax(total_scores.view(-1, max_num_noncat_slots, max_num_tokens ** 2), axis=-1)
-    max_span_p = torch.max(total_scores.view(-1, max_num_noncat_slots, max_num_tokens ** 2), axis=-1)[0]
+    span_start_index, span_end_index, max_span_p = get_best_spans(start_scores, end_scores)
     predictions['noncat_slot_p'] = max_span_p
 
-    span_start_index = torch.div(max_span_index, max_num_tokens)
-    span_end_index = torch.fmod(max_span_index, max_num_tokens)
-
     predictions['noncat_slot_start'] = span_start_index
     predictions['noncat_slot_end'] = span_end_index
 
@@ -130,9 +114,42 @@ def eval_iter_callback(tensors, global_vars, schema_processor, eval_dataset):
     predictions['noncat_slot_status_GT'] = output['noncategorical_slot_status']
     predictions['cat_slot_value_GT'] = output['categorical_slot_values']
 
+    # Move the (small) predictions of the whole batch to the host at once
+    for k, v in predictions.items():
+        if k != 'example_id':
+            predictions[k] = v.cpu()
+
     global_vars['predictions'].extend(combine_predictions_in_example(predictions, batch_size))
 
 
+def get_best_spans(start_scores, end_scores):
+    """
+    Finds the span (start <= end) with the maximum sum of start and end
+    scores along the last dimension, for all leading dimensions (e.g. examples
+    and slots) at once. The best start for every end is the first position of
+    the running maximum of the start scores, so this takes linear time in the
+    number of tokens instead of scoring all pairs of start and end tokens.
+    Ties are resolved like an argmax over all pairs in (start, end) order.
+
+    Args:
+        start_scores: scores of span starts (... x num_tokens)
+        end_scores: scores of span ends (... x num_tokens)
+    Returns:
+        span start indices, span end indices and span scores (...)
+    """
+
+    positions = torch.arange(start_scores.size(-1), device=start_scores.device).expand_as(start_scores)
+    prefix_max = torch.cummax(start_scores, dim=-1)[0]
+    previous_max = torch.cat([torch.full_like(prefix_max[..., :1], float('-inf')), prefix_max[..., :-1]], dim=-1)
+    # position at which the running maximum was reached first
+    new_max_positions = torch.where(start_scores > previous_max, positions, torch.zeros_like(positions))
+    best_start = torch.cummax(new_max_positions, dim=-1)[0]
+
+    span_scores, span_end = torch.max(prefix_max + end_scores, dim=-1)
+    span_start = best_start.gather(-1, span_end.unsqueeze(-1)).squeeze(-1)
+    return span_start, span_end, span_scores
+
+
 def combine_predictions_in_example(predictions, batch_size):
     '''
     Combines predicted values to a single example.
@@ -162,47 +179,54 @@ def eval_epochs_done_callback(
     schema_emb_preprocessor,
     joint_acc_across_turn,
     no_fuzzy_match,
+    write_predictions=True,
+    num_tracker_workers=1,
 ):
+    """
+    Runs the state tracker on the evaluation dialogues and evaluates the predicted
+    dialogues in memory, as soon as the dialogues of each file are predicted.
+
+    Args:
+        write_predictions (bool): whether to also write the predicted dialogues and the per-frame
+            metrics in the DSTC8/SGD format to prediction_dir
+        num_tracker_workers (int): number of processes running the state tracker on the dialogues
+    """
     # added for debugging
     in_domain_services = get_in_domain_services(
         os.path.join(data_dir, eval_dataset, "schema.json"), dialogues_processor.get_seen_services("train")
     )
+    with open(os.path.join(data_dir, eval_dataset, "schema.json")) as f:
+        eval_services = {service["service_name"]: service for service in json.load(f)}
+    aggregator = MetricsAggregator(eval_services, in_domain_services, joint_acc_across_turn, no_fuzzy_match)
+
     ##############
-    # we'll write predictions to file in Dstc8/SGD format during evaluation callback
-    prediction_dir = os.path.join(prediction_dir, 'predictions', 'pred_res_{}_{}'.format(eval_dataset, task_name))
-    os.makedirs(prediction_dir, exist_ok=True)
+    # optionally, we'll write predictions to file in Dstc8/SGD format during evaluation callback
+    if write_predictions:
+        prediction_dir = os.path.join(prediction_dir, 'predictions', 'pred_res_{}_{}'.format(eval_dataset, task_name))
+        os.makedirs(prediction_dir, exist_ok=True)
+        logging.info(f"Writing predictions to {prediction_dir} started.")
+    dataset_hyp = {}
 
     input_json_files = SGDDataProcessor.get_dialogue_files(data_dir, eval_dataset, task_name)
-    pred_utils.write_predictions_to_file(
+    for input_file_path, ref_dialogs, pred_dialogs in pred_utils.get_predicted_dialogs(
         global_vars['predictions'],
         input_json_files,
-        prediction_dir,
         schemas=schema_emb_preprocessor.schemas,
         tracker_model=tracker_model,
         eval_debug=eval_debug,
         in_domain_services=in_domain_services,
-    )
-    metrics = evaluate(
-        prediction_dir, data_dir, eval_dataset, in_domain_services, joint_acc_across_turn, no_fuzzy_match,
-    )
-    return metrics[SEEN_SERVICES]
-
-
-def evaluate(prediction_dir, data_dir, eval_dataset, in_domain_services, joint_acc_across_turn, no_fuzzy_match):
-
-    with open(os.path.join(data_dir, eval_dataset, "schema.json")) as f:
-        eval_services = {}
-        list_services = json.load(f)
-        for service in list_services:
-            eval_services[service["service_name"]] = service
-        f.close()
-
-    dataset_ref = get_dataset_as_dict(os.path.join(data_dir, eval_dataset, "dialogues_*.json"))
-    dataset_hyp = get_dataset_as_dict(os.path.join(prediction_dir, "*.json"))
-
-    all_metric_aggregate, _ = get_metrics(
-        dataset_ref, dataset_hyp, eval_services, in_domain_services, joint_acc_across_turn, no_fuzzy_match
-    )
+        num_workers=num_tracker_workers,
+    ):
+        if write_predictions:
+            pred_utils.write_dialogs_to_file(
+                pred_dialogs, os.path.join(prediction_dir, os.path.basename(input_file_path))
+            )
+        for dial_ref, dial_hyp in zip(ref_dialogs, pred_dialogs):
+            aggregator.add_dialog(dial_hyp["dialogue_id"], dial_ref, dial_hyp)
+            if write_predictions:
+                dataset_hyp[dial_hyp["dialogue_id"]] = dial_hyp
+
+    all_metric_aggregate, _ = aggregator.aggregate()
     if SEEN_SERVICES in all_metric_aggregate:
         logging.info(f'Dialog metrics for {SEEN_SERVICES}  : {sorted(all_metric_aggregate[SEEN_SERVICES].items())}')
     if UNSEEN_SERVICES in all_metric_aggregate:
@@ -210,8 +234,8 @@ def evaluate(prediction_dir, data_dir, eval_dataset, in_domain_services, joint_a
     if ALL_SERVICES in all_metric_aggregate:
         logging.info(f'Dialog metrics for {ALL_SERVICES}   : {sorted(all_metric_aggregate[ALL_SERVICES].items())}')
 
-    # Write the per-frame metrics values with the corrresponding dialogue frames.
-    with open(os.path.join(prediction_dir, PER_FRAME_OUTPUT_FILENAME), "w") as f:
-        json.dump(dataset_hyp, f, indent=2, separators=(",", ": "))
-        f.close()
-    return all_metric_aggregate
+    if write_predictions:
+        # Write the per-frame metrics values with the corrresponding dialogue frames.
+        with open(os.path.join(prediction_dir, PER_FRAME_OUTPUT_FILENAME), "w") as f:
+            json.dump(dataset_hyp, f, indent=2, separators=(",", ": "))
+    return all_metric_aggregate[SEEN_SERVICES]
@@ -14,68 +14,62 @@
 # limitations under the License.
 # =============================================================================
 
-import numpy as np
 import torch
 
 from nemo import logging
-from nemo.collections.nlp.utils.callback_utils import tensor2list, tensor2numpy
+from nemo.collections.nlp.utils.callback_utils import tensor2list
 
 __all__ = ['eval_iter_callback', 'eval_epochs_done_callback']
 
 
 def eval_iter_callback(tensors, global_vars, data_desc):
-
-    if 'loss' not in global_vars:
-        global_vars['loss'] = []
-    if 'comp_res' not in global_vars:
-        global_vars['comp_res'] = []
-    if 'gating_labels' not in global_vars:
-        global_vars['gating_labels'] = []
-    if 'gating_preds' not in global_vars:
-        global_vars['gating_preds'] = []
-
-    point_outputs_max_list = []
+    """
+    Compares the predicted slot values and gates of a batch with the targets as token ids, on the device of the
+    tensors, and accumulates the counts of the correct turns, slots and gates there. Nothing is copied to the host
+    until the end of the evaluation.
+    """
+    point_ids_list = []
     tgt_ids_list = []
-    gate_outputs_max_list = []
+    gating_labels_list = []
+    gating_preds_list = []
     for tensor_name, values_list in tensors.items():
         if tensor_name.startswith('gating_labels'):
-            for values in values_list:
-                global_vars['gating_labels'].extend(tensor2list(values))
+            gating_labels_list.extend(values_list)
         elif tensor_name.startswith('point_outputs'):
-            for values in values_list:
-                p_max = torch.argmax(values, dim=-1)
-                point_outputs_max_list.append(tensor2numpy(p_max))
+            point_ids_list.extend(torch.argmax(values, dim=-1) for values in values_list)
+        elif tensor_name.startswith('point_ids'):
+            # token ids predicted by TRADEGenerator in inference mode
+            point_ids_list.extend(values_list)
         elif tensor_name.startswith('gate_outputs'):
-            for values in values_list:
-                g_max = torch.argmax(values, axis=-1)
-                gate_outputs_max_list.append(tensor2numpy(g_max))
+            gating_preds_list.extend(torch.argmax(values, dim=-1) for values in values_list)
         elif tensor_name.startswith('tgt_ids'):
-            for values in values_list:
-                tgt_ids_list.append(tensor2numpy(values))
-
-    comp_res_list = []
-    for i in range(len(point_outputs_max_list)):
-        mask_paddings = tgt_ids_list[i] == data_desc.vocab.pad_id
-        comp_res = (point_outputs_max_list[i] == tgt_ids_list[i]) | mask_paddings
-        comp_res = np.all(comp_res, axis=-1, keepdims=False)
-        comp_res_list.extend(comp_res.tolist())
-
-    gate_outputs_max = np.concatenate(gate_outputs_max_list, axis=0).tolist()
-
-    global_vars['comp_res'].extend(comp_res_list)
-    global_vars['gating_preds'].extend(gate_outputs_max)
+            tgt_ids_list.extend(values_list)
+
+    # one tensor per worker in distributed evaluation
+    for point_ids, tgt_ids, gating_labels, gating_preds in zip(
+        point_ids_list, tgt_ids_list, gating_labels_list, gating_preds_list
+    ):
+        counts = compute_metric_counts(
+            point_ids, tgt_ids, gating_labels, gating_preds, data_desc.vocab.pad_id, data_desc.gating_dict["ptr"]
+        )
+        if 'metric_counts' in global_vars:
+            global_vars['metric_counts'] += counts
+        else:
+            global_vars['metric_counts'] = counts
+        global_vars['total_turns'] = global_vars.get('total_turns', 0) + gating_labels.shape[0]
+        global_vars['total_slots'] = global_vars.get('total_slots', 0) + gating_labels.numel()
 
 
 def eval_epochs_done_callback(global_vars, data_desc):
-    joint_acc, slot_acc = evaluate_metrics(
-        global_vars['comp_res'],
-        global_vars['gating_labels'],
-        global_vars['gating_preds'],
-        data_desc.gating_dict["ptr"],
-    )
+    correct_turns, correct_slots, correct_gates = 0, 0, 0
+    if 'metric_counts' in global_vars:
+        correct_turns, correct_slots, correct_gates = tensor2list(global_vars['metric_counts'])
+    total_turns = global_vars.get('total_turns', 0)
+    total_slots = global_vars.get('total_slots', 0)
 
-    gating_comp_flatten = (np.asarray(global_vars['gating_labels']) == np.asarray(global_vars['gating_preds'])).ravel()
-    gating_acc = np.sum(gating_comp_flatten) / len(gating_comp_flatten)
+    joint_acc = correct_turns / float(total_turns) if total_turns != 0 else 0
+    slot_acc = correct_slots / float(total_slots) if total_slots != 0 else 0
+    gating_acc = correct_gates / float(total_slots) if total_slots != 0 else 0
 
     evaluation_metrics = {"Joint_Goal_Acc": joint_acc, "Slot_Acc": slot_acc, "Gate_Acc": gating_acc}
     logging.info(evaluation_metrics)
@@ -83,31 +77,24 @@ def eval_epochs_done_callback(global_vars, data_desc):
     return evaluation_metrics
 
 
-def evaluate_metrics(comp_res, gating_labels, gating_preds, ptr_code):
-    # TODO: Calculate precision, recall, and F1
-    total_slots = 0
-    correct_slots = 0
-    total_turns = 0
-    correct_turns = 0
-    for result_idx, result in enumerate(comp_res):
-        turn_wrong = False
-        total_turns += 1
-        for slot_idx, slot_eq in enumerate(result):
-            total_slots += 1
-            if gating_labels[result_idx][slot_idx] == ptr_code:
-                if slot_eq:
-                    correct_slots += 1
-                else:
-                    turn_wrong = True
-            elif gating_labels[result_idx][slot_idx] == gating_preds[result_idx][slot_idx] or (
-                slot_eq and gating_preds[result_idx][slot_idx] == ptr_code
-            ):
-                correct_slots += 1
-            else:
-                turn_wrong = True
-        if not turn_wrong:
-            correct_turns += 1
-
-    slot_acc = correct_slots / float(total_slots) if total_slots != 0 else 0
-    joint_acc = correct_turns / float(total_turns) if total_turns != 0 else 0
-    return joint_acc, slot_acc
+def compute_metric_counts(point_ids, tgt_ids, gating_labels, gating_preds, pad_id, ptr_code):
+    """
+    Counts the correct turns, slots and gates of a batch. A slot whose value is pointed to is correct if all the
+    tokens of its target value are predicted, the padding of the targets is ignored. Any other slot is correct if
+    its gate is predicted, or if its value is predicted and its gate is predicted as pointed to. A turn is correct
+    if all its slots are.
+
+    Args:
+        point_ids: predicted token ids of the slot values (batch x slots x tokens)
+        tgt_ids: target token ids of the slot values (batch x slots x tokens)
+        gating_labels: target gates of the slots (batch x slots)
+        gating_preds: predicted gates of the slots (batch x slots)
+        pad_id: id of the padding token
+        ptr_code: gate of the slots whose value is pointed to
+    Returns:
+        the numbers of correct turns, slots and gates as a tensor on the device of the inputs
+    """
+    values_eq = ((point_ids == tgt_ids) | (tgt_ids == pad_id)).all(dim=-1)
+    gates_eq = gating_labels == gating_preds
+    slots_eq = torch.where(gating_labels == ptr_code, values_eq, gates_eq | (values_eq & (gating_preds == ptr_code)))
+    return torch.stack([slots_eq.all(dim=-1).sum(), slots_eq.sum(), gates_eq.sum()])
@@ -23,9 +23,15 @@ from nemo.collections.nlp.data.datasets.lasertagger_dataset import LaserTaggerDa
 from nemo.collections.nlp.data.datasets.lm_bert_dataset import (
     BertPretrainingDataset,
     BertPretrainingPreprocessedDataset,
+    BertPretrainingPreprocessedShardedDataset,
+    compile_bert_pretraining_corpus,
+    mask_whole_words,
 )
 from nemo.collections.nlp.data.datasets.lm_transformer_dataset import LanguageModelingDataset
-from nemo.collections.nlp.data.datasets.machine_translation_dataset import TranslationDataset
+from nemo.collections.nlp.data.datasets.machine_translation_dataset import (
+    TokenBucketTranslationDataset,
+    TranslationDataset,
+)
 from nemo.collections.nlp.data.datasets.multiwoz_dataset.multiwoz_dataset import MultiWOZDataDesc, MultiWOZDataset
 from nemo.collections.nlp.data.datasets.punctuation_capitalization_dataset import (
     BertPunctuationCapitalizationDataset,
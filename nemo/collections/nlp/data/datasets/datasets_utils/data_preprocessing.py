@@ -285,10 +285,11 @@ def remove_punctuation_from_sentence(sentence):
     return sentence
 
 
-def dataset_to_ids(dataset, tokenizer, cache_ids=False, add_bos_eos=True):
+def dataset_to_ids(dataset, tokenizer, cache_ids=False, add_bos_eos=True, num_workers=1):
     """
-    Reads dataset from file line by line, tokenizes each line with tokenizer,
-    and returns list of lists which corresponds to ids of tokenized strings.
+    Reads dataset from file in chunks of lines, tokenizes the lines with
+    the batch API of the tokenizer, and returns list of lists which
+    corresponds to ids of tokenized strings.
 
     Args:
         dataset: path to dataset
@@ -296,9 +297,12 @@ def dataset_to_ids(dataset, tokenizer, cache_ids=False, add_bos_eos=True):
         cache_ids: if True, ids are saved to disk as pickle file
             with similar name (e.g., data.txt --> data.txt.pkl)
         add_bos_eos: bool, whether to add <s> and </s> symbols (e.g., for NMT)
+        num_workers: number of tokenization processes, see ParallelTokenizer
     Returns:
         ids: list of ids which correspond to tokenized strings of the dataset
     """
+    # Imported here, the tokenizers package imports the datasets package
+    from nemo.collections.nlp.data.tokenizers.parallel_tokenizer import ParallelTokenizer
 
     cached_ids_dataset = dataset + str(".pkl")
     if os.path.isfile(cached_ids_dataset):
@@ -306,13 +310,10 @@ def dataset_to_ids(dataset, tokenizer, cache_ids=False, add_bos_eos=True):
         ids = pickle.load(open(cached_ids_dataset, "rb"))
     else:
         logging.info("Tokenizing dataset ...")
-        data = open(dataset, "rb").readlines()
-        ids = []
-        for sentence in data:
-            sent_ids = tokenizer.text_to_ids(sentence.decode("utf-8"))
-            if add_bos_eos:
-                sent_ids = [tokenizer.bos_id] + sent_ids + [tokenizer.eos_id]
-            ids.append(sent_ids)
+        ids = ParallelTokenizer(tokenizer, num_workers=num_workers).file_to_ids(dataset)
+        if add_bos_eos:
+            bos_id, eos_id = tokenizer.bos_id, tokenizer.eos_id
+            ids = [[bos_id] + sent_ids + [eos_id] for sent_ids in ids]
         if cache_ids:
             logging.info("Caching tokenized dataset ...")
             pickle.dump(ids, open(cached_ids_dataset, "wb"))
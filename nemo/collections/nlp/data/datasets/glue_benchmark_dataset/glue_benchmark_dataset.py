@@ -19,15 +19,12 @@
 # Some code of this file was adapted from the HuggingFace library available at
 # https://github.com/huggingface/transformers
 
-import os
-import pickle
-
 import numpy as np
-import torch
 from torch.utils.data import Dataset
 
 from nemo import logging
 from nemo.collections.nlp.data.datasets.glue_benchmark_dataset.data_processors import *
+from nemo.collections.nlp.data.feature_store import features_cache_dir, load_or_create_features
 
 __all__ = ['GLUEDataset', 'output_modes', 'processors']
 
@@ -76,19 +73,17 @@ class GLUEDataset(Dataset):
         self.examples = processor.get_dev_examples(data_dir) if evaluate else processor.get_train_examples(data_dir)
         processor_name = type(processor).__name__
         tokenizer_type = type(tokenizer.tokenizer).__name__
-        vocab_size = getattr(tokenizer, "vocab_size", 0)
-        cached_features_file = os.path.join(
-            data_dir,
-            "cached_{}_{}_{}_{}_{}".format(
-                processor_name, "dev" if evaluate else "train", tokenizer_type, str(max_seq_length), str(vocab_size)
-            ),
+        cache_dir = features_cache_dir(
+            None,
+            tokenizer,
+            max_seq_length,
+            cache_dir=data_dir,
+            prefix="cached_{}_{}".format(processor_name, "dev" if evaluate else "train"),
+            content=(f"{e.guid}\t{e.text_a}\t{e.text_b}\t{e.label}" for e in self.examples),
+            output_mode=output_mode,
         )
 
-        if use_data_cache and os.path.exists(cached_features_file):
-            logging.info(f"loading from {cached_features_file}")
-            with open(cached_features_file, "rb") as reader:
-                self.features = pickle.load(reader)
-        else:
+        def create_features():
             token_params = {
                 'bos_token': None,
                 'eos_token': tokenizer.eos_token,
@@ -97,26 +92,30 @@ class GLUEDataset(Dataset):
                 'sep_token_extra': tokenizer.eos_token if 'roberta' in tokenizer_type.lower() else None,
             }
 
-            self.features = self.convert_examples_to_features(
+            features = self.convert_examples_to_features(
                 self.examples, self.label_list, max_seq_length, tokenizer, output_mode, **token_params
             )
-            if use_data_cache:
-                master_device = not torch.distributed.is_initialized() or torch.distributed.get_rank() == 0
-                if master_device:
-                    logging.info(f'Saving train features into {cached_features_file}')
-                    with open(cached_features_file, "wb") as writer:
-                        pickle.dump(self.features, writer)
+            return (
+                {
+                    'input_ids': np.array([f.input_ids for f in features], dtype=np.int32),
+                    'segment_ids': np.array([f.segment_ids for f in features], dtype=np.int32),
+                    'input_mask': np.array([f.input_mask for f in features], dtype=np.int32),
+                    'label_ids': np.array([f.label_id for f in features]),
+                },
+                {},
+            )
+
+        self.features, _ = load_or_create_features(cache_dir, create_features, use_cache=use_data_cache)
 
     def __len__(self):
-        return len(self.features)
+        return len(self.features['input_ids'])
 
     def __getitem__(self, idx):
-        feature = self.features[idx]
         return (
-            np.array(feature.input_ids),
-            np.array(feature.segment_ids),
-            np.array(feature.input_mask, dtype=np.long),
-            np.array(feature.label_id),
+            np.array(self.features['input_ids'][idx], dtype=np.long),
+            np.array(self.features['segment_ids'][idx], dtype=np.long),
+            np.array(self.features['input_mask'][idx], dtype=np.long),
+            np.array(self.features['label_ids'][idx]),
         )
 
     def convert_examples_to_features(
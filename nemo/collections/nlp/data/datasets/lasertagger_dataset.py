@@ -16,10 +16,33 @@
 
 """Pytorch Dataset for training LaserTagger."""
 
+import numpy as np
 import torch
 from torch.utils.data import Dataset
 
-__all__ = ['LaserTaggerDataset']
+from nemo.collections.nlp.data.feature_store import load_features
+
+__all__ = ['LaserTaggerDataset', 'examples_to_features']
+
+# name and numpy dtype of every feature stored for an example
+EXAMPLE_FEATURES = [
+    ('input_ids', np.int32),
+    ('input_mask', np.int8),
+    ('segment_ids', np.int8),
+    ('labels', np.int32),
+    ('labels_mask', np.int8),
+]
+
+
+def examples_to_features(examples):
+    """
+    Converts LaserTagger BertExamples (padded to the same length) to a dict mapping the name of every feature
+    in EXAMPLE_FEATURES to an array [num_examples, max_seq_length], as saved by feature_store.save_features.
+    """
+    features = {}
+    for name, dtype in EXAMPLE_FEATURES:
+        features[name] = np.array([example.features[name] for example in examples], dtype=dtype)
+    return features
 
 
 class LaserTaggerDataset(Dataset):
@@ -28,22 +51,25 @@ class LaserTaggerDataset(Dataset):
     pipelines.
 
     Args:
-        preprocessed_data (str): path to preprocessed train/validation/test data
+        preprocessed_data (list or str): preprocessed train/validation/test examples,
+            or the path of their features saved by feature_store.save_features, which are memory-mapped
         use_t2t_decoder (bool): whether to use Autoregressive Decoder
     """
 
     def __init__(self, preprocessed_data, use_t2t_decoder):
-
-        self.examples = preprocessed_data
+        if isinstance(preprocessed_data, str):
+            self.features, _ = load_features(preprocessed_data)
+        else:
+            self.features = examples_to_features(preprocessed_data)
         self.use_t2t_decoder = use_t2t_decoder
 
     def __len__(self):
-        return len(self.examples)
+        return len(self.features['input_ids'])
 
     def __getitem__(self, idx):
-        input_ids = torch.Tensor(self.examples[idx].features['input_ids']).long()
-        input_mask = torch.Tensor(self.examples[idx].features['input_mask'])
-        segment_ids = torch.Tensor(self.examples[idx].features['segment_ids']).long()
-        labels_mask = torch.Tensor(self.examples[idx].features['labels_mask'])
-        labels = torch.Tensor(self.examples[idx].features['labels']).long()
+        input_ids = torch.from_numpy(self.features['input_ids'][idx].astype(np.int64))
+        input_mask = torch.from_numpy(self.features['input_mask'][idx].astype(np.float32))
+        segment_ids = torch.from_numpy(self.features['segment_ids'][idx].astype(np.int64))
+        labels_mask = torch.from_numpy(self.features['labels_mask'][idx].astype(np.float32))
+        labels = torch.from_numpy(self.features['labels'][idx].astype(np.int64))
         return input_ids, input_mask, segment_ids, labels, labels_mask, labels, input_mask
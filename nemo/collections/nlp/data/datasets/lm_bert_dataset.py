@@ -18,20 +18,30 @@
 
 import array
 import glob
+import multiprocessing
 import os
 import pickle
 import random
+from concurrent.futures import ThreadPoolExecutor
 
 import h5py
 import numpy as np
+import torch
 from sentencepiece import SentencePieceTrainer as SPT
-from torch.utils.data import Dataset
+from torch.utils.data import Dataset, IterableDataset, get_worker_info
 from tqdm import tqdm
 
 from nemo import logging
 from nemo.collections.nlp.data.datasets.datasets_utils.data_preprocessing import DATABASE_EXISTS_TMP, if_exist
+from nemo.collections.nlp.data.feature_store import tokenizer_fingerprint
 
-__all__ = ['BertPretrainingDataset', 'BertPretrainingPreprocessedDataset']
+__all__ = [
+    'BertPretrainingDataset',
+    'BertPretrainingPreprocessedDataset',
+    'BertPretrainingPreprocessedShardedDataset',
+    'compile_bert_pretraining_corpus',
+    'mask_whole_words',
+]
 
 
 class BertPretrainingDataset(Dataset):
@@ -44,8 +54,59 @@ class BertPretrainingDataset(Dataset):
         short_seq_prob=0.1,
         seq_a_ratio=0.6,
         sentence_idx_file=None,
+        use_mmap_corpus=False,
+        tokenized_corpus_prefix=None,
+        num_workers=None,
+        seed=None,
     ):
+        """
+        Args:
+            tokenizer (TokenizerSpec): tokenizer
+            dataset (str): directory or a single file with dataset documents
+            max_seq_length (int): maximum allowed length of the text segments
+            mask_probability (float): probability of masking input sequence tokens
+            short_seq_prob (float): probability of creating sequences which are shorter than the maximum length
+            seq_a_ratio (float): ratio of the length of the first segment to the target sequence length
+            sentence_idx_file (str): file with newline indices of the corpus. Only used if use_mmap_corpus is False.
+            use_mmap_corpus (bool): read token ids from a pre-tokenized, memory-mapped corpus (see
+                compile_bert_pretraining_corpus) instead of tokenizing lines of the text files on every access.
+                The corpus is compiled on first use, and again if it was compiled with another tokenizer.
+            tokenized_corpus_prefix (str): path prefix of the pre-tokenized corpus files. Defaults to
+                "<data dir>/<dataset name>_tokenized_<tokenizer fingerprint>".
+            num_workers (int): number of processes used to compile the pre-tokenized corpus.
+                Defaults to the number of CPUs.
+            seed (int): seed of the random generator used for masking. Every data loader worker derives its own
+                generator from it. Defaults to None, i.e. a non-reproducible seed.
+        """
         self.tokenizer = tokenizer
+        self.dataset = dataset
+        self.mask_probability = mask_probability
+        self.max_seq_length = max_seq_length
+        self.vocab_size = self.tokenizer.vocab_size
+        self.short_seq_prob = short_seq_prob
+        self.seq_a_ratio = seq_a_ratio
+        self.use_mmap_corpus = use_mmap_corpus
+        self.seed = seed
+        self._rng = None
+        self._rng_worker_id = None
+
+        # Whole-word masking groups a token with the previous one if its piece starts with '\u2581',
+        # precompute that decision for the whole vocabulary
+        tokens = self.tokenizer.ids_to_tokens(list(range(self.vocab_size)))
+        self.word_start = np.array([not token.startswith('\u2581') for token in tokens], dtype=bool)
+
+        if use_mmap_corpus:
+            fingerprint = tokenizer_fingerprint(tokenizer)
+            if tokenized_corpus_prefix is None:
+                tokenized_corpus_prefix = _default_file_prefix(dataset) + f"_tokenized_{fingerprint[:16]}"
+            master_device = not torch.distributed.is_initialized() or torch.distributed.get_rank() == 0
+            if master_device and _get_tokenized_corpus_fingerprint(tokenized_corpus_prefix) != fingerprint:
+                compile_bert_pretraining_corpus(tokenizer, dataset, tokenized_corpus_prefix, num_workers=num_workers)
+            # wait until the master process writes the tokenized corpus
+            if torch.distributed.is_initialized():
+                torch.distributed.barrier()
+            self._load_tokenized_corpus(tokenized_corpus_prefix)
+            return
 
         # Loading enormous datasets into RAM isn't always feasible -- for
         # example, the pubmed corpus is 200+ GB, which doesn't fit into RAM on
@@ -54,9 +115,7 @@ class BertPretrainingDataset(Dataset):
         # from main memory when needed during training.
 
         if sentence_idx_file is None:
-            data_dir = dataset[: dataset.rfind('/')]
-            mode = dataset[dataset.rfind('/') + 1 : dataset.rfind('.')]
-            sentence_idx_file = f"{data_dir}/{mode}_sentence_indices.pkl"
+            sentence_idx_file = _default_file_prefix(dataset) + "_sentence_indices.pkl"
 
         if os.path.isfile(sentence_idx_file):
             # If the sentence indices file already exists, load from it
@@ -66,39 +125,10 @@ class BertPretrainingDataset(Dataset):
             # Otherwise, generate and store sentence indices
             sentence_indices = {}
 
-            # Finds all of the newline indices in a string
-            def find_newlines(contents):
-                start = 0
-
-                while True:
-                    try:
-                        # index and split are much faster than Python for loops
-                        new_start = contents.index(b"\n", start)
-                        line = (
-                            contents[start:new_start]
-                            .replace(b"\xc2\x99", b" ")
-                            .replace(b"\xc2\xa0", b" ")
-                            .decode("utf-8", errors="ignore")
-                        )
-
-                        if len(line.split()) > 0:
-                            yield start
-
-                        start = new_start + 1
-
-                    except ValueError:
-                        break
-
-            if os.path.isdir(dataset):
-                dataset_pattern = os.path.join(dataset, "**", "*.txt")
-                filenames = glob.glob(dataset_pattern, recursive=True)
-            else:
-                filenames = [dataset]
-
-            for filename in tqdm(filenames):
+            for filename in tqdm(_get_corpus_files(dataset)):
                 with open(filename, "rb") as f:
                     contents = f.read()
-                    newline_indices = find_newlines(contents)
+                    newline_indices = _find_newlines(contents)
 
                 if os.path.isdir(dataset):
                     # Only keep the parts of the filepath that are invariant to
@@ -127,14 +157,40 @@ class BertPretrainingDataset(Dataset):
             del sentence_indices[filename]
 
         self.corpus_size = corpus_size
-        self.dataset = dataset
         self.filenames = list(sentence_indices.keys())
-        self.mask_probability = mask_probability
-        self.max_seq_length = max_seq_length
         self.sentence_indices = sentence_indices
-        self.vocab_size = self.tokenizer.vocab_size
-        self.short_seq_prob = short_seq_prob
-        self.seq_a_ratio = seq_a_ratio
+
+    def _load_tokenized_corpus(self, prefix):
+        with np.load(f"{prefix}.idx.npz") as index:
+            self._token_ids_dtype = np.dtype(str(index["dtype"]))
+            # sentence_offsets[i] is the position of the first token of sentence i in the flat token buffer,
+            # doc_offsets[d] is the index of the first sentence of document (file) d
+            self.sentence_offsets = index["sentence_offsets"]
+            self.doc_offsets = index["doc_offsets"]
+        self._token_ids_file = f"{prefix}.bin"
+        self._token_ids = None
+
+        # Documents with a single sentence can't provide sentence pairs
+        num_sentences = np.diff(self.doc_offsets)
+        self.documents = np.flatnonzero(num_sentences > 1)
+        self.corpus_size = int(num_sentences[self.documents].sum())
+
+    @property
+    def token_ids(self):
+        """Flat buffer with the token ids of the pre-tokenized corpus. Memory-mapped lazily, so that every
+        data loader worker maps the file itself instead of receiving a copy."""
+        if self._token_ids is None:
+            if os.path.getsize(self._token_ids_file) == 0:
+                self._token_ids = np.zeros(0, dtype=self._token_ids_dtype)
+            else:
+                self._token_ids = np.memmap(self._token_ids_file, dtype=self._token_ids_dtype, mode="r")
+        return self._token_ids
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        if state.get("_token_ids") is not None:
+            state["_token_ids"] = None
+        return state
 
     def __len__(self):
         return self.corpus_size
@@ -154,6 +210,12 @@ class BertPretrainingDataset(Dataset):
         target_seq_length_a = int(round(target_seq_length * self.seq_a_ratio))
         target_seq_length_b = target_seq_length - target_seq_length_a
 
+        if self.use_mmap_corpus:
+            a_document, b_document, is_next = self._get_tokenized_pair(
+                target_seq_length_a, target_seq_length_b, max_num_tokens
+            )
+            return self._build_example(a_document, b_document, is_next)
+
         def get_document(filepath, offset):
             # Retrieve a specific line from a file and return as a document
             if os.path.isdir(self.dataset):
@@ -252,87 +314,205 @@ class BertPretrainingDataset(Dataset):
 
         truncate_seq_pair(a_document, b_document, max_num_tokens)
 
+        return self._build_example(a_document, b_document, is_next)
+
+    def _get_tokenized_pair(self, target_seq_length_a, target_seq_length_b, max_num_tokens):
+        # Same sampling as for text corpora, but documents are token ranges of the memory-mapped corpus,
+        # so a pair is assembled with index arithmetic and two slices
+        sentence_offsets = self.sentence_offsets
+
+        def match_target_seq_length(doc, first, target_seq_length):
+            # Returns the range [first, last] of sentences starting at `first` that holds at least
+            # target_seq_length tokens. If the document ends before, start over from a random sentence.
+            doc_start, doc_end = self.doc_offsets[doc], self.doc_offsets[doc + 1]
+            if sentence_offsets[doc_end] - sentence_offsets[doc_start] < target_seq_length:
+                # The whole document is too short, take all of it
+                return doc_start, doc_end - 1
+            while True:
+                target_end = sentence_offsets[first] + target_seq_length
+                end = first + int(np.searchsorted(sentence_offsets[first : doc_end + 1], target_end))
+                if end <= doc_end:
+                    return first, max(end - 1, first)
+                first = random.randrange(doc_start, doc_end)
+
+        def random_sentence(doc):
+            return random.randrange(self.doc_offsets[doc], self.doc_offsets[doc + 1])
+
+        # Take sequence A from a random document and a random sentence
+        a_doc = random.choice(self.documents)
+        a_first, a_last = match_target_seq_length(a_doc, random_sentence(a_doc), target_seq_length_a)
+
+        is_last_sentence = a_last >= self.doc_offsets[a_doc + 1] - 1
+        # About 50% of the time, B is a random sentence from the corpus
+        take_random_b = (random.random() < 0.5) or is_last_sentence
+
+        if take_random_b:
+            for _ in range(10):
+                b_doc = random.choice(self.documents)
+                b_first = random_sentence(b_doc)
+                if b_doc != a_doc:
+                    break
+                # Take another sentence from the same document, far enough from A
+                if abs(int(sentence_offsets[b_first]) - int(sentence_offsets[a_first])) > max_num_tokens:
+                    break
+        else:
+            b_doc = a_doc
+            b_first = a_last + 1
+
+        b_first, b_last = match_target_seq_length(b_doc, b_first, target_seq_length_b)
+
+        a_start, a_end = int(sentence_offsets[a_first]), int(sentence_offsets[a_last + 1])
+        b_start, b_end = int(sentence_offsets[b_first]), int(sentence_offsets[b_last + 1])
+
+        # Truncates the pair to max_num_tokens, randomly from the front or the back of the longer sequence
+        a_range, b_range = [a_start, a_end], [b_start, b_end]
+        while (a_range[1] - a_range[0]) + (b_range[1] - b_range[0]) > max_num_tokens:
+            trunc_range = a_range if a_range[1] - a_range[0] > b_range[1] - b_range[0] else b_range
+            if trunc_range[1] - trunc_range[0] <= 1:
+                raise ValueError(
+                    "Input text corpora probably too small. "
+                    "Failed to truncate sequence pair to "
+                    "maximum sequence legnth."
+                )
+            if random.random() < 0.5:
+                trunc_range[0] += 1
+            else:
+                trunc_range[1] -= 1
+
+        token_ids = self.token_ids
+        a_document = token_ids[a_range[0] : a_range[1]].tolist()
+        b_document = token_ids[b_range[0] : b_range[1]].tolist()
+        return a_document, b_document, int(not take_random_b)
+
+    def _build_example(self, a_document, b_document, is_next):
         output_ids = (
             [self.tokenizer.cls_id] + a_document + [self.tokenizer.sep_id] + b_document + [self.tokenizer.eos_id]
         )
+        seq_length = len(output_ids)
 
         input_ids, output_mask = self.mask_ids(output_ids)
 
         input_mask = np.zeros(self.max_seq_length, dtype=np.long)
-        input_mask[: len(input_ids)] = 1
+        input_mask[:seq_length] = 1
 
         input_type_ids = np.zeros(self.max_seq_length, dtype=np.int)
-        input_type_ids[len(a_document) + 2 : len(output_ids) + 1] = 1
+        input_type_ids[len(a_document) + 2 : seq_length + 1] = 1
 
-        padding_length = max(0, self.max_seq_length - len(input_ids))
+        padding_length = max(0, self.max_seq_length - seq_length)
         if padding_length > 0:
-            input_ids.extend([self.tokenizer.pad_id] * padding_length)
+            input_ids = np.pad(input_ids, (0, padding_length), constant_values=self.tokenizer.pad_id)
             output_ids.extend([self.tokenizer.pad_id] * padding_length)
-            output_mask.extend([0] * padding_length)
+            output_mask = np.pad(output_mask, (0, padding_length))
 
         # TODO: wrap the return value with () for consistent style.
         return (
-            np.array(input_ids),
+            input_ids,
             input_type_ids,
-            np.array(input_mask, dtype=np.long),
+            input_mask,
             np.array(output_ids),
-            np.array(output_mask, dtype=np.float32),
+            output_mask.astype(np.float32),
             is_next,
         )
 
+    @property
+    def rng(self):
+        """numpy random Generator used for masking. Every data loader worker gets its own generator, derived
+        from the seed and the worker id."""
+        worker_info = get_worker_info()
+        worker_id = worker_info.id if worker_info is not None else -1
+        if self._rng is None or self._rng_worker_id != worker_id:
+            if self.seed is None:
+                self._rng = np.random.default_rng()
+            else:
+                self._rng = np.random.default_rng(np.random.SeedSequence(self.seed, spawn_key=(worker_id + 1,)))
+            self._rng_worker_id = worker_id
+        return self._rng
+
     def mask_ids(self, ids):
         """
         Args:
-          ids: list of token ids representing a chunk of text
+          ids: list or array of token ids representing a chunk of text
         Returns:
-          masked_ids: list of input tokens with some of the entries masked
+          masked_ids: array of input tokens with some of the entries masked
             according to the following protocol from the original BERT paper:
             each token is masked with a probability of 15% and is replaced with
             1) the [MASK] token 80% of the time,
             2) random token 10% of the time,
             3) the same token 10% of the time.
-          output_mask: list of binary variables which indicate what tokens has
+          output_mask: int array of binary variables which indicate what tokens has
             been masked (to calculate the loss function for these tokens only)
         """
-
         # Whole-word masking by default, as it gives better performance.
-        cand_indexes = [[ids[0]]]
-        for tid in ids[1:]:
-            token = self.tokenizer.ids_to_tokens([tid])[0]
-            is_suffix = token.startswith('\u2581')
-            if is_suffix:
-                # group together with its previous token to form a whole-word
-                cand_indexes[-1].append(tid)
-            else:
-                cand_indexes.append([tid])
-
-        masked_ids, output_mask = [], []
-        mask_id = self.tokenizer.token_to_id("[MASK]")
+        return mask_whole_words(
+            np.asarray(ids, dtype=np.int64),
+            self.word_start,
+            self.mask_probability,
+            mask_id=self.tokenizer.token_to_id("[MASK]"),
+            special_ids=(self.tokenizer.cls_id, self.tokenizer.sep_id),
+            rng=self.rng,
+        )
 
-        for word_ids in cand_indexes:
-            is_special = (word_ids[0] == self.tokenizer.cls_id) or (word_ids[0] == self.tokenizer.sep_id)
-            if is_special or (random.random() > self.mask_probability):
-                output_mask.extend([0] * len(word_ids))
-                masked_ids.extend(word_ids)
-            else:
-                output_mask.extend([1] * len(word_ids))
-                p = random.random()
-                # for 80%, replace with mask
-                if p < 0.8:
-                    masked_ids.extend([mask_id] * len(word_ids))
-                # for 10%, replace by a random token
-                elif p < 0.9:
-                    for _ in word_ids:
-                        # randomly select a valid word
-                        random_word = random.randrange(self.vocab_size)
-                        while random_word in (self.tokenizer.cls_id, self.tokenizer.sep_id):
-                            random_word = random.randrange(self.vocab_size)
-                        masked_ids.append(random_word)
-                # for 10%, use same token
-                else:
-                    masked_ids.extend(word_ids)
 
-        return masked_ids, output_mask
+def mask_whole_words(ids, word_start, mask_probability, mask_id, special_ids, rng, valid_mask=None):
+    """Whole-word masking of a sequence or a padded batch of sequences of token ids.
+
+    Words are masked as a whole: a word is selected with probability mask_probability and then all of its tokens are
+    1) replaced with mask_id 80% of the time,
+    2) replaced with random tokens (excluding special_ids) 10% of the time,
+    3) left unchanged 10% of the time.
+    Words starting with one of special_ids are never masked.
+
+    Args:
+        ids (np.ndarray): int array of token ids of shape [seq_length] or [batch_size, seq_length]
+        word_start (np.ndarray): boolean array over the vocabulary, True for tokens that start a new word.
+            The first token of every sequence always starts a word.
+        mask_probability (float): probability of masking a word
+        mask_id (int): id of the mask token
+        special_ids (tuple of int): ids of tokens which are never masked nor used as random replacements
+        rng (np.random.Generator): random generator
+        valid_mask (np.ndarray): optional boolean array of the shape of ids, False for (padding) positions which
+            must not be masked
+
+    Returns:
+        masked_ids: array of the shape of ids with the masked tokens replaced
+        output_mask: int array of the shape of ids with 1 for masked tokens and 0 otherwise
+    """
+    ids = np.asarray(ids)
+    if ids.size == 0:
+        return ids.copy(), np.zeros(ids.shape, dtype=np.int64)
+    vocab_size = len(word_start)
+
+    # Assign every token the (flat) index of its word
+    starts = word_start[ids]
+    starts[..., 0] = True
+    flat_starts = starts.reshape(-1)
+    word_idx = np.cumsum(flat_starts) - 1
+    num_words = int(word_idx[-1]) + 1
+
+    first_ids = ids.reshape(-1)[flat_starts]
+    is_special = np.isin(first_ids, special_ids)
+    selected = (rng.random(num_words) <= mask_probability) & ~is_special
+    action = rng.random(num_words)
+
+    token_selected = selected[word_idx].reshape(ids.shape)
+    if valid_mask is not None:
+        token_selected &= valid_mask
+    token_action = action[word_idx].reshape(ids.shape)
+
+    masked_ids = ids.copy()
+    masked_ids[token_selected & (token_action < 0.8)] = mask_id
+
+    replace = token_selected & (token_action >= 0.8) & (token_action < 0.9)
+    num_replace = int(replace.sum())
+    if num_replace > 0:
+        # Sample uniformly from the vocabulary without the special tokens, by shifting the samples over them
+        excluded = np.unique(np.asarray(special_ids, dtype=np.int64))
+        random_ids = rng.integers(0, vocab_size - len(excluded), size=num_replace)
+        for excluded_id in excluded:
+            random_ids += random_ids >= excluded_id
+        masked_ids[replace] = random_ids
+
+    return masked_ids, token_selected.astype(np.int64)
 
 
 class BertPretrainingPreprocessedDataset(Dataset):
@@ -376,6 +556,301 @@ class BertPretrainingPreprocessedDataset(Dataset):
         return (input_ids, segment_ids, input_mask, output_ids, output_mask, next_sentence_labels)
 
 
+_PREPROCESSED_KEYS = [
+    'input_ids',
+    'input_mask',
+    'segment_ids',
+    'masked_lm_positions',
+    'masked_lm_ids',
+    'next_sentence_labels',
+]
+
+
+class BertPretrainingPreprocessedShardedDataset(IterableDataset):
+    """Iterable dataset over one or more preprocessed HDF5 files (shards), which are never loaded into memory
+    as a whole.
+
+    The rows of every shard are split into chunks of contiguous rows. Chunks are distributed over ranks and data
+    loader workers without overlap, each worker opens the HDF5 files it needs lazily and reads one chunk at a time
+    with a single slice per dataset, while the next chunk is read in a background thread.
+
+    Samples are yielded raw, as (input_ids, segment_ids, input_mask, masked_lm_positions, masked_lm_ids,
+    next_sentence_label); collate_fn builds output_ids and output_mask for a whole batch at once.
+
+    Args:
+        input_files (list of str): HDF5 files
+        max_pred_length (int): maximum number of masked tokens per sequence
+        shuffle (bool): shuffle the order of chunks and the rows within every chunk. Default: False.
+        chunk_size (int): number of rows read at once. Default: 8192.
+        prefetch (bool): read the next chunk in a background thread. Default: True.
+        seed (int): seed for shuffling. Must be the same on all ranks, as it determines the assignment of chunks
+            to ranks. Default: 0.
+        global_rank (int): rank of this process. Default: 0.
+        world_size (int): number of ranks the chunks are distributed over. Default: 1.
+    """
+
+    def __init__(
+        self,
+        input_files,
+        max_pred_length,
+        shuffle=False,
+        chunk_size=8192,
+        prefetch=True,
+        seed=0,
+        global_rank=0,
+        world_size=1,
+    ):
+        self.input_files = list(input_files)
+        self.max_pred_length = max_pred_length
+        self.shuffle = shuffle
+        self.prefetch = prefetch
+        self.seed = seed
+        self.global_rank = global_rank
+        self.world_size = world_size
+        self.epoch = 0
+
+        # Only the lengths are read here, data is read lazily by the workers
+        self.file_lengths = []
+        for input_file in self.input_files:
+            with h5py.File(input_file, "r") as f:
+                self.file_lengths.append(len(f['input_ids']))
+        self.chunks = [
+            (file_idx, start, min(start + chunk_size, length))
+            for file_idx, length in enumerate(self.file_lengths)
+            for start in range(0, length, chunk_size)
+        ]
+
+    def __len__(self):
+        return sum(self.file_lengths)
+
+    def set_epoch(self, epoch):
+        """Sets the epoch, which seeds the shuffling. Call it before iterating over every epoch."""
+        self.epoch = epoch
+
+    def set_rank(self, global_rank, world_size):
+        """Sets the rank of this process and the number of ranks the chunks are distributed over."""
+        self.global_rank = global_rank
+        self.world_size = world_size
+
+    def _assigned_chunks(self):
+        worker_info = get_worker_info()
+        num_workers = worker_info.num_workers if worker_info is not None else 1
+        worker_id = worker_info.id if worker_info is not None else 0
+
+        # All ranks and workers compute the same order, so every chunk is read by exactly one of them
+        order = np.arange(len(self.chunks))
+        if self.shuffle:
+            np.random.default_rng([self.seed, self.epoch]).shuffle(order)
+        consumer_id = self.global_rank * num_workers + worker_id
+        return [self.chunks[i] for i in order[consumer_id :: self.world_size * num_workers]], consumer_id
+
+    def _read_chunk(self, files, chunk):
+        file_idx, start, end = chunk
+        if file_idx not in files:
+            files[file_idx] = h5py.File(self.input_files[file_idx], "r")
+        f = files[file_idx]
+        return [np.asarray(f[key][start:end]) for key in _PREPROCESSED_KEYS]
+
+    def __iter__(self):
+        chunks, consumer_id = self._assigned_chunks()
+        rng = np.random.default_rng([self.seed, self.epoch, consumer_id])
+        files = {}
+        executor = ThreadPoolExecutor(max_workers=1) if self.prefetch else None
+        try:
+            next_chunk = None
+            for i, chunk in enumerate(chunks):
+                if executor is None:
+                    data = self._read_chunk(files, chunk)
+                else:
+                    if next_chunk is None:
+                        next_chunk = executor.submit(self._read_chunk, files, chunk)
+                    data = next_chunk.result()
+                    next_chunk = (
+                        executor.submit(self._read_chunk, files, chunks[i + 1]) if i + 1 < len(chunks) else None
+                    )
+
+                input_ids, input_mask, segment_ids, masked_lm_positions, masked_lm_ids, next_sentence_labels = data
+                rows = rng.permutation(len(input_ids)) if self.shuffle else range(len(input_ids))
+                for row in rows:
+                    yield (
+                        input_ids[row],
+                        segment_ids[row],
+                        input_mask[row],
+                        masked_lm_positions[row],
+                        masked_lm_ids[row],
+                        next_sentence_labels[row],
+                    )
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True)
+            for f in files.values():
+                f.close()
+
+    def collate_fn(self, batch):
+        """Stacks a list of samples and builds output_ids and output_mask for the whole batch with a single
+        scatter.
+
+        Returns:
+            input_ids, segment_ids, input_mask, output_ids, output_mask, next_sentence_labels as int64 arrays,
+                masks included, as the preprocessed data layer has always returned them
+        """
+        input_ids, segment_ids, input_mask, masked_lm_positions, masked_lm_ids, next_sentence_labels = [
+            np.stack(component).astype(np.int64) for component in zip(*batch)
+        ]
+
+        # Masked positions are padded with zeros, only the positions before the first zero are valid
+        valid = np.cumprod(masked_lm_positions != 0, axis=1).astype(bool)
+        valid[:, self.max_pred_length :] = False
+        rows = np.nonzero(valid)[0]
+        cols = masked_lm_positions[valid]
+
+        output_ids = input_ids.copy()
+        output_ids[rows, cols] = masked_lm_ids[valid]
+        output_mask = np.zeros_like(input_ids)
+        output_mask[rows, cols] = 1
+
+        return input_ids, segment_ids, input_mask, output_ids, output_mask, next_sentence_labels
+
+
+def _default_file_prefix(dataset):
+    data_dir = dataset[: dataset.rfind('/')]
+    mode = dataset[dataset.rfind('/') + 1 : dataset.rfind('.')]
+    return f"{data_dir}/{mode}"
+
+
+def _get_corpus_files(dataset):
+    if os.path.isdir(dataset):
+        dataset_pattern = os.path.join(dataset, "**", "*.txt")
+        return sorted(glob.glob(dataset_pattern, recursive=True))
+    return [dataset]
+
+
+def _iter_lines(contents):
+    # Yields the start offsets and the contents of all non-empty, newline terminated lines
+    start = 0
+
+    while True:
+        try:
+            # index and split are much faster than Python for loops
+            new_start = contents.index(b"\n", start)
+            line = contents[start:new_start]
+            text = line.replace(b"\xc2\x99", b" ").replace(b"\xc2\xa0", b" ").decode("utf-8", errors="ignore")
+
+            if len(text.split()) > 0:
+                yield start, line
+
+            start = new_start + 1
+
+        except ValueError:
+            break
+
+
+def _find_newlines(contents):
+    # Finds the start offsets of all non-empty lines in a string
+    for start, _ in _iter_lines(contents):
+        yield start
+
+
+# Tokenizer used by corpus compilation workers; inherited by forked processes
+_corpus_tokenizer = None
+
+
+def _tokenize_corpus_file(filename):
+    with open(filename, "rb") as f:
+        contents = f.read()
+
+    lines = [line.decode("utf-8", errors="ignore") for _, line in _iter_lines(contents)]
+    all_line_ids = _corpus_tokenizer.batch_text_to_ids(lines)
+    ids = np.fromiter((i for line_ids in all_line_ids for i in line_ids), dtype=np.int64)
+    return ids, np.array([len(line_ids) for line_ids in all_line_ids], dtype=np.int64)
+
+
+def compile_bert_pretraining_corpus(tokenizer, dataset, output_prefix, num_workers=None):
+    """Tokenizes a text corpus once and stores it in a format which BertPretrainingDataset(use_mmap_corpus=True)
+    reads with plain slicing:
+
+        <output_prefix>.bin: token ids of all sentences (non-empty lines) of all files, as one flat uint16 buffer
+            (uint32 if the vocabulary has more than 65536 tokens)
+        <output_prefix>.idx.npz: "sentence_offsets" (position of the first token of every sentence in the buffer,
+            plus the total number of tokens), "doc_offsets" (index of the first sentence of every document, i.e.
+            file, plus the total number of sentences), "dtype", "filenames" and "tokenizer_fingerprint"
+
+    Files are tokenized in parallel by a pool of processes.
+
+    Args:
+        tokenizer (TokenizerSpec): tokenizer
+        dataset (str): directory (all *.txt files are used, recursively) or a single file with dataset documents
+        output_prefix (str): path prefix of the output files
+        num_workers (int): number of tokenization processes. Defaults to the number of CPUs.
+    """
+    global _corpus_tokenizer
+
+    filenames = _get_corpus_files(dataset)
+    dtype = np.uint16 if tokenizer.vocab_size <= np.iinfo(np.uint16).max + 1 else np.uint32
+    if num_workers is None:
+        num_workers = os.cpu_count() or 1
+    num_workers = min(num_workers, len(filenames))
+    logging.info(f"Tokenizing {len(filenames)} files into {output_prefix} with {num_workers} worker(s)")
+
+    output_dir = os.path.dirname(output_prefix)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    sentence_lengths, doc_offsets = [], [0]
+    num_sentences = 0
+    tmp_bin_file = f"{output_prefix}.bin.tmp"
+    _corpus_tokenizer = tokenizer
+    pool = None
+    try:
+        # Workers inherit the tokenizer when forked, so it doesn't need to be picklable
+        if num_workers > 1 and "fork" in multiprocessing.get_all_start_methods():
+            pool = multiprocessing.get_context("fork").Pool(num_workers)
+            results = pool.imap(_tokenize_corpus_file, filenames)
+        else:
+            results = map(_tokenize_corpus_file, filenames)
+
+        with open(tmp_bin_file, "wb") as f:
+            for ids, lengths in tqdm(results, total=len(filenames)):
+                ids.astype(dtype).tofile(f)
+                sentence_lengths.append(lengths)
+                num_sentences += len(lengths)
+                doc_offsets.append(num_sentences)
+
+    finally:
+        if pool is not None:
+            pool.terminate()
+        _corpus_tokenizer = None
+
+    sentence_offsets = np.zeros(num_sentences + 1, dtype=np.int64)
+    if num_sentences > 0:
+        np.cumsum(np.concatenate(sentence_lengths), out=sentence_offsets[1:])
+
+    if os.path.isdir(dataset):
+        # Only keep the parts of the filepath that are invariant to the dataset's location on disk
+        filenames = [os.path.relpath(filename, dataset) for filename in filenames]
+
+    os.replace(tmp_bin_file, f"{output_prefix}.bin")
+    # The index is written last, its presence marks a complete corpus
+    with open(f"{output_prefix}.idx.npz.tmp", "wb") as f:
+        np.savez(
+            f,
+            sentence_offsets=sentence_offsets,
+            doc_offsets=np.array(doc_offsets, dtype=np.int64),
+            dtype=np.dtype(dtype).name,
+            filenames=np.array(filenames),
+            tokenizer_fingerprint=tokenizer_fingerprint(tokenizer),
+        )
+    os.replace(f"{output_prefix}.idx.npz.tmp", f"{output_prefix}.idx.npz")
+
+
+def _get_tokenized_corpus_fingerprint(prefix):
+    # Returns the fingerprint of the tokenizer a corpus was compiled with, None if there is no complete corpus
+    if not os.path.isfile(f"{prefix}.idx.npz"):
+        return None
+    with np.load(f"{prefix}.idx.npz") as index:
+        return str(index["tokenizer_fingerprint"]) if "tokenizer_fingerprint" in index else None
+
+
 class BERTPretrainingDataDesc:
     def __init__(
         self, dataset_name, vocab_size, sample_size, special_tokens, train_data, eval_data=None, test_data=None,
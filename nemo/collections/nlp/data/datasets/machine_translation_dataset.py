@@ -16,14 +16,23 @@
 
 """Pytorch Dataset for training Neural Machine Translation."""
 
-from collections import OrderedDict
+import os
+import uuid
+from collections import OrderedDict, deque
 
 import numpy as np
 from torch.utils.data import Dataset
 
+from nemo import logging
 from nemo.collections.nlp.data.datasets.datasets_utils.data_preprocessing import dataset_to_ids
+from nemo.collections.nlp.data.feature_store import (
+    RaggedArray,
+    features_cache_dir,
+    load_or_create_features,
+    tokenizer_fingerprint,
+)
 
-__all__ = ['TranslationDataset']
+__all__ = ['TranslationDataset', 'TokenBucketTranslationDataset']
 
 
 class TranslationDataset(Dataset):
@@ -89,7 +98,7 @@ class TranslationDataset(Dataset):
                 buckets[src_len].append((tgt_len, i))
 
         for b_idx in buckets:
-            buckets[b_idx] = sorted(buckets[b_idx])
+            buckets[b_idx] = deque(sorted(buckets[b_idx]))
 
         buckets = OrderedDict(sorted(buckets.items()))
         indices = list(buckets.keys())
@@ -118,11 +127,11 @@ class TranslationDataset(Dataset):
                 if i_src + i_tgt <= ip1_src + ip1_tgt:
                     src_len = i_src
                     tgt_len = i_tgt
-                    _, idx = buckets[indices[i]].pop(0)
+                    _, idx = buckets[indices[i]].popleft()
                 else:
                     src_len = ip1_src
                     tgt_len = ip1_tgt
-                    _, idx = buckets[indices[i + 1]].pop(0)
+                    _, idx = buckets[indices[i + 1]].popleft()
 
                 batches[num_batches].append(idx)
                 batch_size += 1
@@ -189,3 +198,216 @@ class TranslationDataset(Dataset):
             src_ids_.append(src_ids[i])
             tgt_ids_.append(tgt_ids[i])
         return src_ids_, tgt_ids_
+
+
+class TokenBucketTranslationDataset(Dataset):
+    """
+    Translation dataset for large corpora. Every item is a batch, as in
+    TranslationDataset, but token ids are kept in flat memory-mapped buffers
+    (cached next to the source data, see feature_store) together with the
+    lengths of all sentences, and batches are padded only when they are
+    fetched. Batches are built from the length arrays alone: sentence pairs
+    are sorted by source and target length and cut into batches of at most
+    tokens_in_batch (padded) tokens.
+
+    Every item is a whole batch, so the order of batches is shuffled each
+    epoch and split across ranks by the sampler of the data loader.
+
+    Args:
+        tokenizer_src (TokenizerSpec): source language tokenizer
+        tokenizer_tgt (TokenizerSpec): target language tokenizer
+        dataset_src (str): path to source data
+        dataset_tgt (str): path to target data
+        tokens_in_batch (int): maximum number of (padded) source and target
+            tokens in a batch
+        clean (bool): whether to remove noisy sentence pairs, see
+            TranslationDataset.clean_src_and_target
+        cache_dir (str): directory of the cached token ids, defaults to the
+            directory of dataset_src
+        num_workers (int): number of tokenization processes
+    """
+
+    def __init__(
+        self,
+        tokenizer_src,
+        tokenizer_tgt,
+        dataset_src,
+        dataset_tgt,
+        tokens_in_batch=1024,
+        clean=False,
+        cache_dir=None,
+        num_workers=1,
+    ):
+        self.src_tokenizer = tokenizer_src
+        self.tgt_tokenizer = tokenizer_tgt
+        self.tokens_in_batch = tokens_in_batch
+
+        cache_dir = features_cache_dir(
+            [dataset_src, dataset_tgt],
+            tokenizer_src,
+            max_seq_length=None,
+            cache_dir=cache_dir,
+            prefix=os.path.basename(dataset_src),
+            tgt_tokenizer=tokenizer_fingerprint(tokenizer_tgt),
+        )
+
+        def create_features():
+            return (
+                {
+                    'src_ids': _tokenize_to_memmap(dataset_src, tokenizer_src, cache_dir, num_workers),
+                    'tgt_ids': _tokenize_to_memmap(dataset_tgt, tokenizer_tgt, cache_dir, num_workers),
+                },
+                {},
+            )
+
+        features, _ = load_or_create_features(cache_dir, create_features)
+        self.src_ids = features['src_ids']
+        self.tgt_ids = features['tgt_ids']
+        if len(self.src_ids) != len(self.tgt_ids):
+            raise ValueError("Source and target corpora have different lengths!")
+
+        src_lengths = self.src_ids.lengths()
+        tgt_lengths = self.tgt_ids.lengths()
+        self.sentence_indices = np.arange(len(src_lengths))
+        if clean:
+            self.sentence_indices = np.flatnonzero(self.clean_src_and_target(self.src_ids, self.tgt_ids))
+            logging.info(f"{len(self.sentence_indices)} of {len(src_lengths)} sentence pairs kept after cleaning")
+        self.batch_indices = pack_into_token_batches(
+            src_lengths[self.sentence_indices], tgt_lengths[self.sentence_indices], tokens_in_batch
+        )
+
+    def __len__(self):
+        return len(self.batch_indices)
+
+    def __getitem__(self, idx):
+        sent_ids = self.sentence_indices[self.batch_indices[idx]]
+        src_ids = _pad_batch(self.src_ids, sent_ids, self.src_tokenizer.pad_id)
+        tgt = _pad_batch(self.tgt_ids, sent_ids, self.tgt_tokenizer.pad_id)
+        labels = tgt[:, 1:]
+        tgt_ids = tgt[:, :-1]
+        src_mask = (src_ids != self.src_tokenizer.pad_id).astype(np.int32)
+        tgt_mask = (tgt_ids != self.tgt_tokenizer.pad_id).astype(np.int32)
+        return src_ids, src_mask, tgt_ids, tgt_mask, labels, sent_ids
+
+    def clean_src_and_target(
+        self, src_ids, tgt_ids, max_tokens=128, min_tokens=3, max_tokens_diff=25, max_tokens_ratio=2.5
+    ):
+        """
+        Same criteria as TranslationDataset.clean_src_and_target, computed
+        on the length arrays of RaggedArrays of source and target ids.
+        Returns a boolean mask of the sentence pairs to keep.
+        """
+
+        src_lengths, tgt_lengths = src_ids.lengths(), tgt_ids.lengths()
+        ratio = np.maximum(src_lengths - 2, 1) / np.maximum(tgt_lengths - 2, 1)
+        keep = (
+            (src_lengths <= max_tokens)
+            & (tgt_lengths <= max_tokens)
+            & (src_lengths >= min_tokens)
+            & (tgt_lengths >= min_tokens)
+            & (np.abs(src_lengths - tgt_lengths) <= max_tokens_diff)
+            & (ratio <= max_tokens_ratio)
+            & (ratio >= 1 / max_tokens_ratio)
+        )
+
+        # Compare the ids of the remaining pairs of equal lengths, all of them at once
+        candidates = np.flatnonzero(keep & (src_lengths == tgt_lengths))
+        lengths = src_lengths[candidates]
+        ends = np.cumsum(lengths)
+        within = np.arange(ends[-1] if len(ends) else 0) - np.repeat(ends - lengths, lengths)
+        same_ids = (
+            src_ids.values[np.repeat(src_ids.offsets[candidates], lengths) + within]
+            == tgt_ids.values[np.repeat(tgt_ids.offsets[candidates], lengths) + within]
+        )
+        nonempty = lengths > 0
+        same_pairs = np.ones(len(candidates), dtype=bool)
+        if nonempty.any():
+            same_pairs[nonempty] = np.logical_and.reduceat(same_ids, (ends - lengths)[nonempty])
+        keep[candidates[same_pairs]] = False
+        return keep
+
+
+def pack_into_token_batches(src_lengths, tgt_lengths, tokens_in_batch):
+    """
+    Sorts sentence pairs by source and then target length and cuts them into
+    consecutive batches, each as large as possible under the constraint
+    batch size * (max source length + max target length) <= tokens_in_batch.
+    Batch sizes are rounded down to multiples of 8 where possible, sentence
+    pairs which exceed tokens_in_batch on their own form single batches.
+
+    Args:
+        src_lengths: lengths of source sentences
+        tgt_lengths: lengths of target sentences
+
+    Returns:
+        RaggedArray with the indices of the sentences of every batch
+    """
+
+    src_lengths = np.asarray(src_lengths, dtype=np.int64)
+    tgt_lengths = np.asarray(tgt_lengths, dtype=np.int64)
+    order = np.lexsort((tgt_lengths, src_lengths))
+    src_sorted, tgt_sorted = src_lengths[order], tgt_lengths[order]
+
+    # Within a batch starting at `start`, the number of padded tokens is non-decreasing in the batch size, so the
+    # largest batch is found with a binary search over a window of candidates, grown until the batch fits into it
+    offsets = [0]
+    start, window, num_sentences = 0, 64, len(order)
+    while start < num_sentences:
+        end = min(start + window, num_sentences)
+        num_tokens = np.arange(1, end - start + 1) * (
+            src_sorted[start:end] + np.maximum.accumulate(tgt_sorted[start:end])
+        )
+        batch_size = int(np.searchsorted(num_tokens, tokens_in_batch, side='right'))
+        if batch_size == end - start and end < num_sentences:
+            window *= 2
+            continue
+        if batch_size > 8:
+            batch_size -= batch_size % 8
+        batch_size = max(batch_size, 1)
+        start += batch_size
+        offsets.append(start)
+        window = max(64, 2 * batch_size)
+
+    return RaggedArray(order, np.array(offsets, dtype=np.int64))
+
+
+def _tokenize_to_memmap(dataset, tokenizer, cache_dir, num_workers):
+    """Tokenizes a file chunk by chunk into a flat buffer of ids (with <s>
+    and </s> around every sentence) on disk and returns it as a memory-mapped
+    RaggedArray. The buffer file is removed once mapped."""
+    # Imported here, the tokenizers package imports the datasets package
+    from nemo.collections.nlp.data.tokenizers.parallel_tokenizer import ParallelTokenizer
+
+    bos_id, eos_id = tokenizer.bos_id, tokenizer.eos_id
+    buffer_file = f"{cache_dir}.{os.path.basename(dataset)}.{uuid.uuid4().hex[:8]}.ids"
+    lengths = []
+    try:
+        with open(buffer_file, "wb") as f:
+            for chunk_ids in ParallelTokenizer(tokenizer, num_workers=num_workers).iter_file_to_ids(dataset):
+                chunk_lengths = np.array([len(sent_ids) + 2 for sent_ids in chunk_ids], dtype=np.int64)
+                values = np.fromiter(
+                    (i for sent_ids in chunk_ids for i in [bos_id] + sent_ids + [eos_id]),
+                    dtype=np.int32,
+                    count=int(chunk_lengths.sum()),
+                )
+                f.write(values.tobytes())
+                lengths.append(chunk_lengths)
+
+        offsets = np.zeros(sum(len(l) for l in lengths) + 1, dtype=np.int64)
+        if lengths:
+            np.cumsum(np.concatenate(lengths), out=offsets[1:])
+        if offsets[-1] > 0:
+            values = np.memmap(buffer_file, dtype=np.int32, mode="r", shape=(int(offsets[-1]),))
+        else:
+            values = np.zeros(0, dtype=np.int32)
+    finally:
+        os.remove(buffer_file)
+    return RaggedArray(values, offsets)
+
+
+def _pad_batch(ids, sent_ids, pad_id):
+    starts, ends = ids.offsets[sent_ids], ids.offsets[sent_ids + 1]
+    batch = np.full((len(sent_ids), (ends - starts).max()), pad_id, dtype=np.int64)
+    for i, (start, end) in enumerate(zip(starts, ends)):
+        batch[i, : end - start] = ids.values[start:end]
+    return batch
@@ -21,9 +21,77 @@ https://github.com/thu-coai/ConvLab-2/blob/master/convlab2/util/multiwoz/dbquery
 import json
 import os
 import random
+from bisect import bisect_left, bisect_right
 
 __all__ = ['Database']
 
+DONT_CARE_VALUES = {"", "dont care", "not mentioned", "don't care", "dontcare", "do n't care"}
+INDEXED_DOMAINS = ['restaurant', 'hotel', 'attraction', 'train']
+
+
+def time_to_int(time):
+    """Converts a "HH:MM" string to the integer HHMM, raises an exception if the string is not a valid time"""
+    return int(time.split(':')[0]) * 100 + int(time.split(':')[1])
+
+
+class DomainIndex(object):
+    """Indices of the records of a domain database, built once when the database is loaded.
+
+    A record is only constrained by the slots it has (with exactly the same name): the values of the string
+    valued slots are indexed by hash, and the times of leaveAt and arriveBy are kept in sorted columns.
+
+    Args:
+        records (list): records of the domain database
+    """
+
+    time_keys = ['leaveAt', 'arriveBy']
+
+    def __init__(self, records):
+        self.num_records = len(records)
+        # slot -> stripped value -> ids of the records with that value
+        self.values = {}
+        # slot -> ids of the records the slot doesn't constrain
+        self.unconstrained = {}
+        for i, record in enumerate(records):
+            for key, value in record.items():
+                if isinstance(value, str):
+                    self.values.setdefault(key, {}).setdefault(value.strip(), set()).add(i)
+        for key, values in self.values.items():
+            constrained = set().union(*values.values())
+            self.unconstrained[key] = set(range(self.num_records)) - constrained
+
+        # slot -> (sorted times, ids of the records in the same order)
+        self.times = {}
+        for key in self.time_keys:
+            times = []
+            for i, record in enumerate(records):
+                try:
+                    times.append((time_to_int(record[key]), i))
+                except Exception:
+                    continue
+            times.sort()
+            self.times[key] = ([t for t, _ in times], [i for _, i in times])
+            self.unconstrained[key] = set(range(self.num_records)) - set(self.times[key][1])
+
+    def matches(self, key, val, ignore_open):
+        """Returns the ids of the records satisfying a constraint, or None if the constraint is ignored"""
+        if not isinstance(key, str) or not isinstance(val, str) or val in DONT_CARE_VALUES:
+            return None
+        if key in self.times:
+            try:
+                time = time_to_int(val)
+            except Exception:
+                return None
+            times, ids = self.times[key]
+            if key == 'leaveAt':
+                found = ids[bisect_left(times, time) :]
+            else:
+                found = ids[: bisect_right(times, time)]
+            return self.unconstrained[key].union(found)
+        if (ignore_open and key in ['destination', 'departure']) or key not in self.values:
+            return None
+        return self.unconstrained[key] | self.values[key].get(val.strip(), set())
+
 
 class Database(object):
     def __init__(self, data_dir):
@@ -34,6 +102,7 @@ class Database(object):
         for domain in domains:
             with open(os.path.join(data_dir, 'db/{}_db.json'.format(domain))) as f:
                 self.dbs[domain] = json.load(f)
+        self.indices = {domain: DomainIndex(self.dbs[domain]) for domain in INDEXED_DOMAINS}
 
     def query(self, domain, constraints, ignore_open=True):
         """Returns the list of entities for a given domain
@@ -52,43 +121,20 @@ class Database(object):
         if domain == 'hospital':
             return self.dbs['hospital']
 
+        # a record is found if it satisfies every constraint: intersect the records matching each of them,
+        # starting from the smallest set
+        index = self.indices[domain]
+        matches = [index.matches(key, val, ignore_open) for key, val in constraints]
+        matches = sorted((m for m in matches if m is not None), key=len)
+        if matches:
+            found_ids = sorted(matches[0].intersection(*matches[1:]))
+        else:
+            found_ids = range(index.num_records)
+
         found = []
-        for i, record in enumerate(self.dbs[domain]):
-            for key, val in constraints:
-                if (
-                    val == ""
-                    or val == "dont care"
-                    or val == 'not mentioned'
-                    or val == "don't care"
-                    or val == "dontcare"
-                    or val == "do n't care"
-                ):
-                    pass
-                else:
-                    try:
-                        record_keys = [k.lower() for k in record]
-                        if key.lower() not in record_keys:
-                            continue
-                        if key == 'leaveAt':
-                            val1 = int(val.split(':')[0]) * 100 + int(val.split(':')[1])
-                            val2 = int(record['leaveAt'].split(':')[0]) * 100 + int(record['leaveAt'].split(':')[1])
-                            if val1 > val2:
-                                break
-                        elif key == 'arriveBy':
-                            val1 = int(val.split(':')[0]) * 100 + int(val.split(':')[1])
-                            val2 = int(record['arriveBy'].split(':')[0]) * 100 + int(record['arriveBy'].split(':')[1])
-                            if val1 < val2:
-                                break
-                        # elif ignore_open and key in ['destination', 'departure', 'name']:
-                        elif ignore_open and key in ['destination', 'departure']:
-                            continue
-                        else:
-                            if val.strip() != record[key].strip():
-                                break
-                    except Exception:
-                        continue
-            else:
-                record['Ref'] = '{0:08d}'.format(i)
-                found.append(record)
+        for i in found_ids:
+            record = self.dbs[domain][i]
+            record['Ref'] = '{0:08d}'.format(i)
+            found.append(record)
 
         return found
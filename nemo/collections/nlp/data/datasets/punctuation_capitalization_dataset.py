@@ -16,9 +16,7 @@
 
 __all__ = ['BertPunctuationCapitalizationDataset', 'BertPunctuationCapitalizationInferDataset']
 
-import itertools
 import os
-import pickle
 
 import numpy as np
 import torch
@@ -26,6 +24,7 @@ from torch.utils.data import Dataset
 
 from nemo import logging
 from nemo.collections.nlp.data.datasets.datasets_utils import get_label_stats, get_stats
+from nemo.collections.nlp.data.feature_store import features_cache_dir, has_features, load_features, save_features
 
 
 def get_features(
@@ -74,8 +73,11 @@ def get_features(
     if punct_labels_lines and capit_labels_lines:
         with_label = True
 
-    for i, query in enumerate(queries):
-        words = query.strip().split()
+    all_words = [query.strip().split() for query in queries]
+    # Tokenize the words of all queries with a single call to the batch API of the tokenizer
+    all_word_tokens = iter(tokenizer.batch_text_to_tokens([word for words in all_words for word in words]))
+
+    for i, words in enumerate(all_words):
 
         # add bos token
         subtokens = [tokenizer.cls_token]
@@ -90,7 +92,7 @@ def get_features(
             capit_query_labels = [capit_label_ids[lab] for lab in capit_labels_lines[i]]
 
         for j, word in enumerate(words):
-            word_tokens = tokenizer.text_to_tokens(word)
+            word_tokens = next(all_word_tokens)
             subtokens.extend(word_tokens)
 
             loss_mask.append(1)
@@ -227,22 +229,27 @@ class BertPunctuationCapitalizationDataset(Dataset):
     ):
 
         # Cache features
-        data_dir = os.path.dirname(text_file)
         filename = os.path.basename(text_file)
 
         if not filename.endswith('.txt'):
             raise ValueError("{text_file} should have extension .txt")
 
-        filename = filename[:-4]
-        tokenizer_type = type(tokenizer.tokenizer).__name__
-        vocab_size = getattr(tokenizer, "vocab_size", 0)
-        features_pkl = os.path.join(
-            data_dir, "cached_{}_{}_{}_{}".format(filename, tokenizer_type, str(max_seq_length), str(vocab_size)),
+        cache_dir = features_cache_dir(
+            [text_file, label_file],
+            tokenizer,
+            max_seq_length,
+            prefix=filename[:-4],
+            num_samples=num_samples,
+            pad_label=pad_label,
+            punct_label_ids=punct_label_ids,
+            capit_label_ids=capit_label_ids,
+            ignore_extra_tokens=ignore_extra_tokens,
+            ignore_start_end=ignore_start_end,
         )
 
         master_device = not torch.distributed.is_initialized() or torch.distributed.get_rank() == 0
 
-        if master_device and (not os.path.exists(features_pkl) or overwrite_processed_files):
+        if master_device and (not has_features(cache_dir) or overwrite_processed_files):
             if num_samples == 0:
                 raise ValueError("num_samples has to be positive", num_samples)
             logging.info(f'Processing {text_file}')
@@ -311,7 +318,17 @@ class BertPunctuationCapitalizationDataset(Dataset):
                 punct_label_ids = create_label_ids(punct_unique_labels)
                 capit_label_ids = create_label_ids(capit_unique_labels)
 
-            features = get_features(
+            (
+                input_ids,
+                segment_ids,
+                input_mask,
+                loss_mask,
+                subtokens_mask,
+                punct_labels,
+                capit_labels,
+                punct_label_ids,
+                capit_label_ids,
+            ) = get_features(
                 text_lines,
                 max_seq_length,
                 tokenizer,
@@ -324,29 +341,37 @@ class BertPunctuationCapitalizationDataset(Dataset):
                 ignore_start_end=ignore_start_end,
             )
 
-            pickle.dump(features, open(features_pkl, "wb"))
-            logging.info(f'Features saved to {features_pkl}')
+            features = {
+                'input_ids': np.array(input_ids, dtype=np.int32),
+                'segment_ids': np.array(segment_ids, dtype=np.int32),
+                'input_mask': np.array(input_mask, dtype=np.int32),
+                'loss_mask': np.array(loss_mask, dtype=np.int32),
+                'subtokens_mask': np.array(subtokens_mask, dtype=np.int32),
+                'punct_labels': np.array(punct_labels, dtype=np.int32),
+                'capit_labels': np.array(capit_labels, dtype=np.int32),
+            }
+            metadata = {'punct_label_ids': punct_label_ids, 'capit_label_ids': capit_label_ids}
+            save_features(cache_dir, features, metadata)
 
         # wait until the master process writes to the processed data files
         if torch.distributed.is_initialized():
             torch.distributed.barrier()
-        features = pickle.load(open(features_pkl, 'rb'))
-        logging.info(f'Features restored from {features_pkl}')
-
-        self.all_input_ids = features[0]
-        self.all_segment_ids = features[1]
-        self.all_input_mask = features[2]
-        self.all_loss_mask = features[3]
-        self.all_subtokens_mask = features[4]
-        self.punct_all_labels = features[5]
-        self.capit_all_labels = features[6]
-        self.punct_label_ids = features[7]
-        self.capit_label_ids = features[8]
+        features, metadata = load_features(cache_dir)
+
+        self.all_input_ids = features['input_ids']
+        self.all_segment_ids = features['segment_ids']
+        self.all_input_mask = features['input_mask']
+        self.all_loss_mask = features['loss_mask']
+        self.all_subtokens_mask = features['subtokens_mask']
+        self.punct_all_labels = features['punct_labels']
+        self.capit_all_labels = features['capit_labels']
+        self.punct_label_ids = metadata['punct_label_ids']
+        self.capit_label_ids = metadata['capit_label_ids']
 
         # save label_ids
         def get_stats_and_save(all_labels, label_ids, name):
             infold = text_file[: text_file.rfind('/')]
-            merged_labels = itertools.chain.from_iterable(all_labels)
+            merged_labels = np.asarray(all_labels).reshape(-1).tolist()
             logging.info('Three most popular labels')
             _, label_frequencies, _ = get_label_stats(merged_labels, infold + '/label_count_' + name + '.tsv')
 
@@ -366,13 +391,13 @@ class BertPunctuationCapitalizationDataset(Dataset):
 
     def __getitem__(self, idx):
         return (
-            np.array(self.all_input_ids[idx]),
-            np.array(self.all_segment_ids[idx]),
+            np.array(self.all_input_ids[idx], dtype=np.long),
+            np.array(self.all_segment_ids[idx], dtype=np.long),
             np.array(self.all_input_mask[idx], dtype=np.long),
-            np.array(self.all_loss_mask[idx]),
-            np.array(self.all_subtokens_mask[idx]),
-            np.array(self.punct_all_labels[idx]),
-            np.array(self.capit_all_labels[idx]),
+            np.array(self.all_loss_mask[idx], dtype=np.long),
+            np.array(self.all_subtokens_mask[idx], dtype=np.long),
+            np.array(self.punct_all_labels[idx], dtype=np.long),
+            np.array(self.capit_all_labels[idx], dtype=np.long),
         )
 
 
@@ -19,10 +19,8 @@
 import collections
 import json
 import os
-import pickle
 
 import numpy as np
-import torch
 from torch.utils.data import Dataset
 from tqdm import tqdm
 
@@ -30,8 +28,9 @@ from nemo import logging
 from nemo.collections.nlp.data.datasets.datasets_utils.data_preprocessing import is_whitespace
 from nemo.collections.nlp.data.datasets.datasets_utils.datasets_processing import DataProcessor
 from nemo.collections.nlp.data.datasets.qa_squad_dataset.qa_squad_processing import convert_examples_to_features
+from nemo.collections.nlp.data.feature_store import RaggedArray, features_cache_dir, load_or_create_features
 from nemo.collections.nlp.metrics.squad_metrics import (
-    _get_best_indexes,
+    _get_best_indexes_batch,
     apply_no_ans_threshold,
     exact_match_score,
     f1_score,
@@ -92,22 +91,17 @@ class SquadDataset(Dataset):
             raise ValueError(f"mode should be either 'train', 'eval', or 'test' but got {mode}")
         self.examples = self.processor.get_examples()
 
-        tokenizer_type = type(tokenizer.tokenizer).__name__
-        vocab_size = getattr(tokenizer, "vocab_size", 0)
-        cached_features_file = (
-            data_file
-            + '_cache'
-            + '_{}_{}_{}_{}_{}_{}'.format(
-                mode, tokenizer_type, str(vocab_size), str(max_seq_length), str(doc_stride), str(max_query_length)
-            )
+        cache_dir = features_cache_dir(
+            data_file,
+            tokenizer,
+            max_seq_length,
+            prefix=f"{os.path.basename(data_file)}_{mode}",
+            doc_stride=doc_stride,
+            max_query_length=max_query_length,
         )
 
-        if use_cache and os.path.exists(cached_features_file):
-            logging.info(f"loading from {cached_features_file}")
-            with open(cached_features_file, "rb") as reader:
-                self.features = pickle.load(reader)
-        else:
-            self.features = convert_examples_to_features(
+        def create_features():
+            features = convert_examples_to_features(
                 examples=self.examples,
                 tokenizer=tokenizer,
                 max_seq_length=max_seq_length,
@@ -115,34 +109,30 @@ class SquadDataset(Dataset):
                 max_query_length=max_query_length,
                 has_groundtruth=mode != "test",
             )
+            return _features_to_arrays(features, max_seq_length), {}
 
-            if use_cache:
-                master_device = not torch.distributed.is_initialized() or torch.distributed.get_rank() == 0
-                if master_device:
-                    logging.info("  Saving train features into cached file %s", cached_features_file)
-                    with open(cached_features_file, "wb") as writer:
-                        pickle.dump(self.features, writer)
+        self.features, _ = load_or_create_features(cache_dir, create_features, use_cache=use_cache)
 
     def __len__(self):
-        return len(self.features)
+        return len(self.features['input_ids'])
 
     def __getitem__(self, idx):
-        feature = self.features[idx]
+        features = self.features
         if self.mode == "test":
             return (
-                np.array(feature.input_ids),
-                np.array(feature.segment_ids),
-                np.array(feature.input_mask),
-                np.array(feature.unique_id),
+                np.array(features['input_ids'][idx], dtype=np.int64),
+                np.array(features['segment_ids'][idx], dtype=np.int64),
+                np.array(features['input_mask'][idx], dtype=np.int64),
+                np.array(features['unique_id'][idx]),
             )
         else:
             return (
-                np.array(feature.input_ids),
-                np.array(feature.segment_ids),
-                np.array(feature.input_mask),
-                np.array(feature.unique_id),
-                np.array(feature.start_position),
-                np.array(feature.end_position),
+                np.array(features['input_ids'][idx], dtype=np.int64),
+                np.array(features['segment_ids'][idx], dtype=np.int64),
+                np.array(features['input_mask'][idx], dtype=np.int64),
+                np.array(features['unique_id'][idx]),
+                np.array(features['start_position'][idx]),
+                np.array(features['end_position'][idx]),
             )
 
     def get_predictions(
@@ -156,14 +146,47 @@ class SquadDataset(Dataset):
         version_2_with_negative,
         null_score_diff_threshold,
     ):
-        example_index_to_features = collections.defaultdict(list)
-
         unique_id_to_pos = {}
         for index, unique_id in enumerate(unique_ids):
             unique_id_to_pos[unique_id] = index
 
-        for feature in self.features:
-            example_index_to_features[feature.example_index].append(feature)
+        example_index_to_features = collections.defaultdict(list)
+        for feature_index, example_index in enumerate(self.features['example_index'].tolist()):
+            example_index_to_features[example_index].append(feature_index)
+
+        all_tokens = self.features['tokens']
+        all_token_to_orig_map = self.features['token_to_orig_map']
+        all_positions = np.array([unique_id_to_pos[int(uid)] for uid in self.features['unique_id']], dtype=np.int64)
+
+        # Logits of all features, one row per feature; in test mode they have a trailing dimension of size 1
+        num_logits = len(start_logits)
+        start_logits_array = np.asarray(start_logits).reshape(num_logits, -1)[all_positions]
+        end_logits_array = np.asarray(end_logits).reshape(num_logits, -1)[all_positions]
+        seq_length = start_logits_array.shape[1]
+
+        # Tokens a span can start and end at: within the context of the feature, which must also be the
+        # max context of the start token
+        within_context = np.arange(seq_length)[None, :] < all_tokens.lengths()[:, None]
+        within_context &= np.asarray(all_token_to_orig_map)[:, :seq_length] >= 0
+        valid_starts = within_context & np.asarray(self.features['token_is_max_context'])[:, :seq_length]
+        valid_ends = within_context
+
+        # Score all pairs of the n-best start and end indexes of every feature at once, shape
+        # [num features, n_best_size (start), n_best_size (end)]
+        start_indexes = _get_best_indexes_batch(start_logits_array, n_best_size)
+        end_indexes = _get_best_indexes_batch(end_logits_array, n_best_size)
+        span_lengths = end_indexes[:, None, :] - start_indexes[:, :, None] + 1
+        valid_spans = (
+            np.take_along_axis(valid_starts, start_indexes, axis=1)[:, :, None]
+            & np.take_along_axis(valid_ends, end_indexes, axis=1)[:, None, :]
+            & (span_lengths >= 1)
+            & (span_lengths <= max_answer_length)
+        )
+        span_scores = (
+            np.take_along_axis(start_logits_array, start_indexes, axis=1)[:, :, None]
+            + np.take_along_axis(end_logits_array, end_indexes, axis=1)[:, None, :]
+        )
+        null_scores = start_logits_array[:, 0] + end_logits_array[:, 0]
 
         _PrelimPrediction = collections.namedtuple(
             "PrelimPrediction", ["feature_index", "start_index", "end_index", "start_logit", "end_logit"]
@@ -177,7 +200,6 @@ class SquadDataset(Dataset):
 
             features = example_index_to_features[example_index]
 
-            prelim_predictions = []
             # keep track of the minimum score of null start+end of position 0
             # large and positive
             score_null = 1000000
@@ -187,73 +209,59 @@ class SquadDataset(Dataset):
             null_start_logit = 0
             # end logit at the slice with min null score
             null_end_logit = 0
-            for (feature_index, feature) in enumerate(features):
-                pos = unique_id_to_pos[feature.unique_id]
-                start_indexes = _get_best_indexes(start_logits[pos], n_best_size)
-                end_indexes = _get_best_indexes(end_logits[pos], n_best_size)
-                # if we could have irrelevant answers,
-                # get the min score of irrelevant
-                if version_2_with_negative:
-                    feature_null_score = start_logits[pos][0] + end_logits[pos][0]
-                    if feature_null_score < score_null:
-                        score_null = feature_null_score
-                        min_null_feature_index = feature_index
-                        null_start_logit = start_logits[pos][0]
-                        null_end_logit = end_logits[pos][0]
-                for start_index in start_indexes:
-                    for end_index in end_indexes:
-                        # We could hypothetically create invalid predictions,
-                        # e.g., predict that the start of the span is in the
-                        # question. We throw out all invalid predictions.
-                        if start_index >= len(feature.tokens):
-                            continue
-                        if end_index >= len(feature.tokens):
-                            continue
-                        if start_index not in feature.token_to_orig_map:
-                            continue
-                        if end_index not in feature.token_to_orig_map:
-                            continue
-                        if not feature.token_is_max_context.get(start_index, False):
-                            continue
-                        if end_index < start_index:
-                            continue
-                        length = end_index - start_index + 1
-                        if length > max_answer_length:
-                            continue
-                        prelim_predictions.append(
-                            _PrelimPrediction(
-                                feature_index=feature_index,
-                                start_index=start_index,
-                                end_index=end_index,
-                                start_logit=start_logits[pos][start_index],
-                                end_logit=end_logits[pos][end_index],
-                            )
-                        )
-
+            # if we could have irrelevant answers,
+            # get the min score of irrelevant
+            if version_2_with_negative and features:
+                feature_index = int(np.argmin(null_scores[features]))
+                pos = all_positions[features[feature_index]]
+                feature_null_score = start_logits[pos][0] + end_logits[pos][0]
+                if feature_null_score < score_null:
+                    score_null = feature_null_score
+                    min_null_feature_index = feature_index
+                    null_start_logit = start_logits[pos][0]
+                    null_end_logit = end_logits[pos][0]
+
+            # Valid spans of all features of the example, in the order of features, start and end indexes,
+            # sorted by decreasing score; the order of spans with equal scores is kept
+            example_shape = (len(features),) + valid_spans.shape[1:]
+            spans = np.flatnonzero(valid_spans[features])
+            scores = span_scores[features].ravel()[spans]
             if version_2_with_negative:
-                prelim_predictions.append(
-                    _PrelimPrediction(
-                        feature_index=min_null_feature_index,
-                        start_index=0,
-                        end_index=0,
-                        start_logit=null_start_logit,
-                        end_logit=null_end_logit,
+                spans = np.append(spans, -1)
+                scores = np.append(scores, null_start_logit + null_end_logit)
+            spans = spans[np.argsort(-scores, kind='stable')]
+
+            def prelim_predictions():
+                # Only the spans which are needed for the n-best are materialized
+                for span in spans.tolist():
+                    if span < 0:
+                        yield _PrelimPrediction(min_null_feature_index, 0, 0, null_start_logit, null_end_logit)
+                        continue
+                    feature_index, start_rank, end_rank = np.unravel_index(span, example_shape)
+                    feature = features[feature_index]
+                    pos = all_positions[feature]
+                    start_index = int(start_indexes[feature, start_rank])
+                    end_index = int(end_indexes[feature, end_rank])
+                    yield _PrelimPrediction(
+                        feature_index=feature_index,
+                        start_index=start_index,
+                        end_index=end_index,
+                        start_logit=start_logits[pos][start_index],
+                        end_logit=end_logits[pos][end_index],
                     )
-                )
-            prelim_predictions = sorted(prelim_predictions, key=lambda x: (x.start_logit + x.end_logit), reverse=True)
 
             _NbestPrediction = collections.namedtuple("NbestPrediction", ["text", "start_logit", "end_logit"])
 
             seen_predictions = {}
             nbest = []
-            for pred in prelim_predictions:
+            for pred in prelim_predictions():
                 if len(nbest) >= n_best_size:
                     break
                 feature = features[pred.feature_index]
                 if pred.start_index > 0:  # this is a non-null prediction
-                    tok_tokens = feature.tokens[pred.start_index : (pred.end_index + 1)]
-                    orig_doc_start = feature.token_to_orig_map[pred.start_index]
-                    orig_doc_end = feature.token_to_orig_map[pred.end_index]
+                    tok_tokens = all_tokens[feature][pred.start_index : (pred.end_index + 1)]
+                    orig_doc_start = int(all_token_to_orig_map[feature][pred.start_index])
+                    orig_doc_end = int(all_token_to_orig_map[feature][pred.end_index])
                     orig_tokens = example.doc_tokens[orig_doc_start : (orig_doc_end + 1)]
                     tok_text = " ".join(tok_tokens)
 
@@ -548,3 +556,34 @@ class SquadExample(object):
             self.end_position = char_to_word_offset[
                 min(start_position_character + len(answer_text) - 1, len(char_to_word_offset) - 1)
             ]
+
+
+def _features_to_arrays(features, max_seq_length):
+    """Converts a list of InputFeatures into the arrays stored in the feature cache. Token to word maps and
+    max context flags are stored densely per token position, positions without an entry are -1 and False."""
+    num_features = len(features)
+    token_to_orig_map = np.full((num_features, max_seq_length), -1, dtype=np.int32)
+    token_is_max_context = np.zeros((num_features, max_seq_length), dtype=bool)
+    for i, feature in enumerate(features):
+        for token_index, orig_index in feature.token_to_orig_map.items():
+            token_to_orig_map[i, token_index] = orig_index
+        for token_index, is_max_context in feature.token_is_max_context.items():
+            token_is_max_context[i, token_index] = is_max_context
+
+    def _or_minus_one(value):
+        return -1 if value is None else int(value)
+
+    return {
+        'input_ids': np.array([f.input_ids for f in features], dtype=np.int32).reshape(-1, max_seq_length),
+        'segment_ids': np.array([f.segment_ids for f in features], dtype=np.int32).reshape(-1, max_seq_length),
+        'input_mask': np.array([f.input_mask for f in features], dtype=np.int32).reshape(-1, max_seq_length),
+        'unique_id': np.array([f.unique_id for f in features], dtype=np.int64),
+        'example_index': np.array([f.example_index for f in features], dtype=np.int64),
+        'doc_span_index': np.array([f.doc_span_index for f in features], dtype=np.int64),
+        'start_position': np.array([_or_minus_one(f.start_position) for f in features], dtype=np.int64),
+        'end_position': np.array([_or_minus_one(f.end_position) for f in features], dtype=np.int64),
+        'is_impossible': np.array([_or_minus_one(f.is_impossible) for f in features], dtype=np.int64),
+        'tokens': RaggedArray.from_string_lists([f.tokens for f in features]),
+        'token_to_orig_map': token_to_orig_map,
+        'token_is_max_context': token_is_max_context,
+    }
@@ -31,9 +31,10 @@ import numpy as np
 import torch
 
 from nemo.collections.nlp.data.datasets.sgd_dataset.input_example import InputExample
+from nemo.collections.nlp.data.feature_store import StringArray, has_features, save_features
 from nemo.utils import logging
 
-__all__ = ['FILE_RANGES', 'PER_FRAME_OUTPUT_FILENAME', 'SGDDataProcessor']
+__all__ = ['EXAMPLE_FEATURES', 'FILE_RANGES', 'PER_FRAME_OUTPUT_FILENAME', 'SGDDataProcessor', 'examples_to_features']
 
 FILE_RANGES = {
     "dstc8_single_domain": {"train": range(1, 44), "dev": range(1, 8), "test": range(1, 12)},
@@ -48,6 +49,56 @@ FILE_RANGES = {
 # Name of the file containing all predictions and their corresponding frame metrics.
 PER_FRAME_OUTPUT_FILENAME = "dialogues_and_metrics.json"
 
+# Features of the processed examples which SGDDataset returns, in order, with the dtype they are returned with.
+# All features are fixed-width int arrays (one row per example), stored with the smallest int dtype which fits.
+EXAMPLE_FEATURES = [
+    ("example_id_num", np.int64),
+    ("service_id", np.int64),
+    ("is_real_example", np.int64),
+    ("utterance_ids", np.int64),
+    ("utterance_segment", np.int64),
+    ("utterance_mask", np.int64),
+    ("categorical_slot_status", np.int64),
+    ("cat_slot_status_mask", np.int64),
+    ("categorical_slot_values", np.int64),
+    ("cat_slot_values_mask", np.int64),
+    ("noncategorical_slot_status", np.int64),
+    ("noncat_slot_status_mask", np.int64),
+    ("noncategorical_slot_value_start", np.int64),
+    ("noncategorical_slot_value_end", np.int64),
+    ("start_char_idx", np.int64),  # noncat_alignment_start
+    ("end_char_idx", np.int64),  # noncat_alignment_end
+    ("num_slots", np.int64),  # num_requested_slots
+    ("requested_slot_status", np.float32),
+    ("requested_slot_mask", np.int64),
+    ("intent_status_mask", np.int64),
+    ("intent_status_labels", np.int64),
+]
+
+
+def _compact_int_array(values):
+    values = np.array(values, dtype=np.int64)
+    for dtype in [np.int8, np.int16, np.int32]:
+        info = np.iinfo(dtype)
+        if values.size == 0 or (values.min() >= info.min and values.max() <= info.max):
+            return values.astype(dtype)
+    return values
+
+
+def examples_to_features(examples):
+    """
+    Converts `InputExample`s to columnar features: a dict mapping the name of every feature in EXAMPLE_FEATURES
+    to an array with one row per example, and "example_id" to the string ids of the examples.
+    """
+    features = {
+        "example_id": StringArray.from_strings([ex.example_id for ex in examples]),
+        "service_id": _compact_int_array([ex.service_schema.service_id for ex in examples]),
+    }
+    for name, _ in EXAMPLE_FEATURES:
+        if name not in features:
+            features[name] = _compact_int_array([getattr(ex, name) for ex in examples])
+    return features
+
 
 class SGDDataProcessor(object):
     """Data generator for SGD dialogues."""
@@ -100,8 +151,8 @@ class SGDDataProcessor(object):
 
         master_device = not torch.distributed.is_initialized() or torch.distributed.get_rank() == 0
         for dataset in ["train", "dev", "test"]:
-            # Process dialogue files
-            dial_file = f"{task_name}_{dataset}_examples.processed"
+            # Process dialogue files, the examples are stored as a directory of features, see feature_store
+            dial_file = f"{task_name}_{dataset}_examples_features"
             dial_file = os.path.join(dialogues_example_dir, dial_file)
             self.dial_files[(task_name, dataset)] = dial_file
 
@@ -110,7 +161,7 @@ class SGDDataProcessor(object):
             for dialog in dialogs:
                 self._seen_services[dataset].update(set(dialog['services']))
 
-            if not os.path.exists(dial_file) or overwrite_dial_files:
+            if not has_features(dial_file) or overwrite_dial_files:
                 logging.debug(f"Start generating the dialogue examples for {dataset} dataset.")
                 if master_device:
                     if not os.path.exists(dialogues_example_dir):
@@ -118,8 +169,7 @@ class SGDDataProcessor(object):
                     dial_examples, slots_relation_list = self._generate_dialog_examples(
                         dataset, schema_emb_processor.schemas
                     )
-                    with open(dial_file, "wb") as f:
-                        np.save(f, dial_examples)
+                    save_features(dial_file, examples_to_features(dial_examples))
 
                     if dataset == "train":
                         with open(self.slots_relation_file, "wb") as f:
@@ -137,13 +187,13 @@ class SGDDataProcessor(object):
 
     def get_dialog_examples(self, dataset):
         """
-        Returns a list of `InputExample`s of the data splits' dialogues.
+        Returns the directory of the columnar features of the data splits' dialogue examples.
         Args:
           dataset(str): can be "train", "dev", or "test".
         Returns:
-          examples: a list of `InputExample`s.
+          examples_dir: directory of features, see examples_to_features and feature_store.load_features.
         """
-        if (self._task_name, dataset) not in self.dial_files or not os.path.exists(
+        if (self._task_name, dataset) not in self.dial_files or not has_features(
             self.dial_files[(self._task_name, dataset)]
         ):
             raise ValueError(
@@ -152,9 +202,6 @@ class SGDDataProcessor(object):
         dial_file = self.dial_files[(self._task_name, dataset)]
         logging.info(f"Loading dialogue examples from {dial_file}.")
 
-        with open(dial_file, "rb") as f:
-            dial_examples = np.load(f, allow_pickle=True)
-
         if not os.path.exists(self.slots_relation_file):
             raise ValueError(
                 f"Slots relation file {self.slots_relation_file} does not exist. It is needed for the carry-over mechanism of state tracker for switches between services."
@@ -166,7 +213,7 @@ class SGDDataProcessor(object):
             f"Loaded the slot relation list for value carry-over between services from {self.slots_relation_file}."
         )
 
-        return dial_examples
+        return dial_file
 
     def get_seen_services(self, dataset_split):
         return self._seen_services[dataset_split]
@@ -16,7 +16,7 @@
 # =============================================================================
 
 """
-Evaluate predictions JSON file, w.r.t. ground truth file.
+Evaluate predictions JSON file, w.r.t. ground truth file, or predicted dialogues in memory (see MetricsAggregator).
 This file contains code artifacts adapted from the original implementation:
 https://github.com/google-research/google-research/blob/master/schema_guided_dst/evaluate.py
 """
@@ -37,6 +37,7 @@ __all__ = [
     'SEEN_SERVICES',
     'UNSEEN_SERVICES',
     'get_metrics',
+    'MetricsAggregator',
     'PER_FRAME_OUTPUT_FILENAME',
 ]
 
@@ -107,24 +108,62 @@ def get_metrics(dataset_ref, dataset_hyp, service_schemas, in_domain_services, j
     for various metrics. Each metric collection aggregates the metrics across
     a specific set of frames in the dialogues.
   """
-    # Metrics can be aggregated in various ways, eg over all dialogues, only for
-    # dialogues containing unseen services or for dialogues corresponding to a
-    # single service. This aggregation is done through metric_collections, which
-    # is a dict mapping a collection name to a dict, which maps a metric to a list
-    # of values for that metric. Each value in this list is the value taken by
-    # the metric on a frame.
-    metric_collections = collections.defaultdict(lambda: collections.defaultdict(list))
-
     # Ensure the dialogs in dataset_hyp also occur in dataset_ref.
     assert set(dataset_hyp.keys()).issubset(set(dataset_ref.keys()))
     logging.debug("len(dataset_hyp)=%d, len(dataset_ref)=%d", len(dataset_hyp), len(dataset_ref))
 
-    # Store metrics for every frame for debugging.
-    per_frame_metric = {}
-
+    aggregator = MetricsAggregator(service_schemas, in_domain_services, joint_acc_across_turn, no_fuzzy_match)
     for dial_id, dial_hyp in dataset_hyp.items():
+        aggregator.add_dialog(dial_id, dataset_ref[dial_id], dial_hyp)
+    return aggregator.aggregate()
+
+
+class MetricsAggregator(object):
+    """Calculates the DSTC8/SGD metrics incrementally, one dialogue at a time.
+
+    The frame metrics of every dialogue are kept by dialogue id, so predicted
+    dialogues can be added as soon as they are produced (e.g. by the state
+    tracker during evaluation) without writing them to files and reading them
+    back. Adding a dialogue id again replaces its metrics.
+
+    Args:
+        service_schemas (dict): mapping of service name to the schema for the service
+        in_domain_services (set): services which are present in the training set
+        joint_acc_across_turn (bool): whether to compute joint goal accuracy across
+            all the services of a turn (MultiWOZ style)
+        no_fuzzy_match (bool): whether to use exact string match for non-categorical slot values
+    """
+
+    def __init__(self, service_schemas, in_domain_services, joint_acc_across_turn, no_fuzzy_match):
+        self.service_schemas = service_schemas
+        self.in_domain_services = in_domain_services
+        self.joint_acc_across_turn = joint_acc_across_turn
+        self.no_fuzzy_match = no_fuzzy_match
+        # dialogue id -> list of (metric collection name, metric name, value)
+        self._dialog_metric_values = collections.OrderedDict()
+        # dialogue id -> dict mapping frame id to the frame metrics
+        self._dialog_frame_metrics = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._dialog_metric_values)
+
+    def add_dialog(self, dial_id, dial_ref, dial_hyp):
+        """Calculates the metrics of all frames of a dialogue and adds the metrics to
+        every frame of the predicted dialogue.
+
+        Args:
+            dial_id (str): dialogue id
+            dial_ref (dict): the ground truth dialogue
+            dial_hyp (dict): the predicted dialogue
+        """
+        # Metrics can be aggregated in various ways, eg over all dialogues, only for
+        # dialogues containing unseen services or for dialogues corresponding to a
+        # single service. Each value is the value taken by a metric on a frame
+        # (or on a turn for the joint metrics across turns), along with the metric
+        # collection it belongs to.
+        metric_values = []
+        frame_metrics = {}
         seen = True
-        dial_ref = dataset_ref[dial_id]
 
         if set(dial_ref["services"]) != set(dial_hyp["services"]):
             raise ValueError(
@@ -156,7 +195,7 @@ def get_metrics(dataset_ref, dataset_hyp, service_schemas, in_domain_services, j
                     raise ValueError(
                         "Frame for service {} not found in dialogue with id {}".format(service_name, dial_id)
                     )
-                service = service_schemas[service_name]
+                service = self.service_schemas[service_name]
                 frame_hyp = hyp_frames_by_service[service_name]
 
                 active_intent_acc = metrics.get_active_intent_accuracy(frame_ref, frame_hyp)
@@ -165,7 +204,7 @@ def get_metrics(dataset_ref, dataset_hyp, service_schemas, in_domain_services, j
                 )
                 requested_slots_f1_scores = metrics.get_requested_slots_f1(frame_ref, frame_hyp)
                 goal_accuracy_dict = metrics.get_average_and_joint_goal_accuracy(
-                    frame_ref, frame_hyp, service, no_fuzzy_match
+                    frame_ref, frame_hyp, service, self.no_fuzzy_match
                 )
 
                 frame_metric = {
@@ -181,14 +220,14 @@ def get_metrics(dataset_ref, dataset_hyp, service_schemas, in_domain_services, j
                 frame_metric.update(goal_accuracy_dict)
 
                 frame_id = "{:s}-{:03d}-{:s}".format(dial_id, turn_id, frame_hyp["service"])
-                per_frame_metric[frame_id] = frame_metric
+                frame_metrics[frame_id] = frame_metric
                 # Add the frame-level metric result back to dialogues.
                 frame_hyp["metrics"] = frame_metric
 
                 # Get the domain name of the service.
                 domain_name = frame_hyp["service"].split("_")[0]
                 domain_keys = [ALL_SERVICES, frame_hyp["service"], domain_name]
-                if frame_hyp["service"] in in_domain_services and seen:
+                if frame_hyp["service"] in self.in_domain_services and seen:
                     domain_keys.append(SEEN_SERVICES)
                 else:
                     seen = False
@@ -196,25 +235,43 @@ def get_metrics(dataset_ref, dataset_hyp, service_schemas, in_domain_services, j
                 for domain_key in domain_keys:
                     for metric_key, metric_value in frame_metric.items():
                         if metric_value != metrics.NAN_VAL:
-                            if joint_acc_across_turn and metric_key in joint_metrics:
+                            if self.joint_acc_across_turn and metric_key in joint_metrics:
                                 metric_collections_per_turn[domain_key][metric_key] *= metric_value
                             else:
-                                metric_collections[domain_key][metric_key].append(metric_value)
-            if joint_acc_across_turn:
+                                metric_values.append((domain_key, metric_key, metric_value))
+            if self.joint_acc_across_turn:
                 # Conduct multiwoz style evaluation that computes joint goal accuracy
                 # across all the slot values of all the domains for each turn.
                 for domain_key in metric_collections_per_turn:
                     for metric_key, metric_value in metric_collections_per_turn[domain_key].items():
-                        metric_collections[domain_key][metric_key].append(metric_value)
-
-    all_metric_aggregate = {}
-    for domain_key, domain_metric_vals in metric_collections.items():
-        domain_metric_aggregate = {}
-        for metric_key, value_list in domain_metric_vals.items():
-            if value_list:
-                # Metrics are macro-averaged across all frames.
-                domain_metric_aggregate[metric_key] = round(float(np.mean(value_list)) * 100.0, 2)
-            else:
-                domain_metric_aggregate[metric_key] = metrics.NAN_VAL
-        all_metric_aggregate[domain_key] = domain_metric_aggregate
-    return all_metric_aggregate, per_frame_metric
+                        metric_values.append((domain_key, metric_key, metric_value))
+
+        self._dialog_metric_values[dial_id] = metric_values
+        self._dialog_frame_metrics[dial_id] = frame_metrics
+
+    def aggregate(self):
+        """Aggregates the metrics of all dialogues added so far.
+
+        Returns:
+            all_metric_aggregate (dict): mapping of a metric collection name to a dict containing the
+                values for various metrics, macro-averaged across the frames of the collection
+            per_frame_metric (dict): mapping of frame id to the metrics of the frame
+        """
+        metric_collections = collections.defaultdict(lambda: collections.defaultdict(list))
+        per_frame_metric = {}
+        for dial_id, metric_values in self._dialog_metric_values.items():
+            for domain_key, metric_key, metric_value in metric_values:
+                metric_collections[domain_key][metric_key].append(metric_value)
+            per_frame_metric.update(self._dialog_frame_metrics[dial_id])
+
+        all_metric_aggregate = {}
+        for domain_key, domain_metric_vals in metric_collections.items():
+            domain_metric_aggregate = {}
+            for metric_key, value_list in domain_metric_vals.items():
+                if value_list:
+                    # Metrics are macro-averaged across all frames.
+                    domain_metric_aggregate[metric_key] = round(float(np.mean(value_list)) * 100.0, 2)
+                else:
+                    domain_metric_aggregate[metric_key] = metrics.NAN_VAL
+            all_metric_aggregate[domain_key] = domain_metric_aggregate
+        return all_metric_aggregate, per_frame_metric
@@ -22,8 +22,10 @@ https://github.com/google-research/google-research/blob/master/schema_guided_dst
 """
 
 import json
+import multiprocessing
 import os
 from collections import OrderedDict, defaultdict
+from functools import partial
 
 from nemo import logging
 from nemo.collections.nlp.data.datasets.sgd_dataset.input_example import (
@@ -39,13 +41,50 @@ REQ_SLOT_THRESHOLD = 0.5
 # MIN_SLOT_RELATION specifes the minimum number of relations between two slots in the training dialogues to get considered for carry-over
 MIN_SLOT_RELATION = 0.1
 
-__all__ = ['get_predicted_dialog_baseline', 'write_predictions_to_file']
+# Number of dialogues sent to a worker of the state tracker at once
+DIALOGS_CHUNK_SIZE = 16
+
+__all__ = [
+    'SlotsRelationIndex',
+    'get_predicted_dialog_baseline',
+    'get_predicted_dialogs',
+    'write_dialogs_to_file',
+    'write_predictions_to_file',
+]
+
+
+class SlotsRelationIndex(object):
+    """Index tables of the candidate list for carry-over, to look up the candidates of a slot, or of a switch
+    between two services, without scanning the whole list. Candidates which were seen less often than
+    MIN_SLOT_RELATION in the training dialogues are left out, the order of the candidates is kept.
+
+    Args:
+        slots_relation_list: list of the candidates for carry-over for each (service, slot)
+    """
+
+    def __init__(self, slots_relation_list):
+        # (service, slot) -> [(candidate service, candidate slot)]
+        self._slot_cands = {}
+        # (service, previous service) -> [(slot, candidate slot)]
+        self._service_cands = defaultdict(list)
+        for (service_dest, slot_dest), cands_list in slots_relation_list.items():
+            self._slot_cands[(service_dest, slot_dest)] = [
+                (service_src, slot_src) for service_src, slot_src, freq in cands_list if freq >= MIN_SLOT_RELATION
+            ]
+            for service_src, slot_src in self._slot_cands[(service_dest, slot_dest)]:
+                self._service_cands[(service_dest, service_src)].append((slot_dest, slot_src))
+
+    def get_slot_cands(self, service, slot):
+        return self._slot_cands.get((service, slot), [])
+
+    def get_service_cands(self, service, service_prev):
+        return self._service_cands.get((service, service_prev), [])
 
 
 def carry_over_slots(
     cur_usr_frame,
     all_slot_values,
-    slots_relation_list,
+    slots_relation_index,
     frame_service_prev,
     slot_values,
     sys_slots_agg,
@@ -56,7 +95,7 @@ def carry_over_slots(
     Args:
         cur_usr_frame: the current frame of the user
         all_slot_values: dictionary of all the slots and their values extracted from the dialogue until the current turn for all services
-        slots_relation_list: list of the candidates for carry-over for each (service, slot)
+        slots_relation_index: SlotsRelationIndex of the candidates for carry-over for each (service, slot)
         frame_service_prev: the service of the last system's frame
         sys_slots_last: dictionary of all the slots and values mentioned in the last system utterance
         sys_slots_agg:  dictionary of all the slots and values mentioned in the all the system utterances until the current turn
@@ -67,25 +106,21 @@ def carry_over_slots(
 
     if frame_service_prev == "" or frame_service_prev == cur_usr_frame["service"]:
         return
-    for (service_dest, slot_dest), cands_list in slots_relation_list.items():
-        if service_dest != cur_usr_frame["service"]:
-            continue
-        for service_src, slot_src, freq in cands_list:
-            if freq < MIN_SLOT_RELATION or service_src != frame_service_prev:
-                continue
-            if service_src in all_slot_values and slot_src in all_slot_values[service_src]:
-                slot_values[slot_dest] = all_slot_values[service_src][slot_src]
-            if service_src in sys_slots_agg and slot_src in sys_slots_agg[service_src]:
-                slot_values[slot_dest] = sys_slots_agg[service_src][slot_src]
-            if service_src in sys_slots_last and slot_src in sys_slots_last[service_src]:
-                slot_values[slot_dest] = sys_slots_last[service_src][slot_src]
+    service_src = frame_service_prev
+    for slot_dest, slot_src in slots_relation_index.get_service_cands(cur_usr_frame["service"], service_src):
+        if service_src in all_slot_values and slot_src in all_slot_values[service_src]:
+            slot_values[slot_dest] = all_slot_values[service_src][slot_src]
+        if service_src in sys_slots_agg and slot_src in sys_slots_agg[service_src]:
+            slot_values[slot_dest] = sys_slots_agg[service_src][slot_src]
+        if service_src in sys_slots_last and slot_src in sys_slots_last[service_src]:
+            slot_values[slot_dest] = sys_slots_last[service_src][slot_src]
 
 
 def get_carryover_value(
     slot,
     cur_usr_frame,
     all_slot_values,
-    slots_relation_list,
+    slots_relation_index,
     frame_service_prev,
     sys_slots_last,
     sys_slots_agg,
@@ -100,7 +135,7 @@ def get_carryover_value(
         all_slot_values: dictionary of all the slots and their values extracted from the dialogue until the current turn for all services
         sys_slots_last: dictionary of all the slots and values mentioned in the last system utterance
         sys_slots_agg:  dictionary of all the slots and values mentioned in the all the system utterances until the current turn
-        slots_relation_list: list of the candidates for carry-over for each (service, slot)
+        slots_relation_index: SlotsRelationIndex of the candidates for carry-over for each (service, slot)
         sys_rets: list of the extracted slots and values from system utterances until the current turn, used for debugging
       Returns:
         the extracted value for the slot
@@ -109,11 +144,8 @@ def get_carryover_value(
     if slot in sys_slots_agg[cur_usr_frame["service"]]:
         extracted_value = sys_slots_agg[cur_usr_frame["service"]][slot]
         sys_rets[slot] = extracted_value
-    elif (cur_usr_frame["service"], slot) in slots_relation_list:
-        cands_list = slots_relation_list[(cur_usr_frame["service"], slot)]
-        for dmn, slt, freq in cands_list:
-            if freq < MIN_SLOT_RELATION:
-                continue
+    else:
+        for dmn, slt in slots_relation_index.get_slot_cands(cur_usr_frame["service"], slot):
             if dmn in all_slot_values and slt in all_slot_values[dmn]:
                 extracted_value = all_slot_values[dmn][slt]
             if dmn in sys_slots_agg and slt in sys_slots_agg[dmn]:
@@ -123,7 +155,9 @@ def get_carryover_value(
     return extracted_value
 
 
-def get_predicted_dialog_nemotracker(dialog, all_predictions, schemas, eval_debug, in_domain_services):
+def get_predicted_dialog_nemotracker(
+    dialog, all_predictions, schemas, eval_debug, in_domain_services, slots_relation_index=None
+):
     """This is NeMo Tracker which would be enabled by passing "--tracker_model=nemotracker".
     It improves the performance significantly by employing carry-over mechanism for in-service and cross-service.
 
@@ -142,6 +176,8 @@ def get_predicted_dialog_nemotracker(dialog, all_predictions, schemas, eval_debu
         schemas: A Schema object wrapping all the schemas for the dataset.
         eval_debug: specifies if it is running in DEBUG mode, so to generate the error analysis outputs
         in_domain_services: list of the seen services
+        slots_relation_index: SlotsRelationIndex of the candidate list for carry-over of the schemas, to reuse it
+            for all the dialogues. It is built from the schemas if not given.
     Returns:
         A json object containing the dialogue with labels predicted by the model.
   """
@@ -156,7 +192,8 @@ def get_predicted_dialog_nemotracker(dialog, all_predictions, schemas, eval_debu
     true_state_prev = OrderedDict()
     true_state = OrderedDict()
     frame_service_prev = ""
-    slots_relation_list = schemas._slots_relation_list
+    if slots_relation_index is None:
+        slots_relation_index = SlotsRelationIndex(schemas._slots_relation_list)
 
     for turn_idx, turn in enumerate(dialog["turns"]):
         if turn["speaker"] == "SYSTEM":
@@ -247,7 +284,7 @@ def get_predicted_dialog_nemotracker(dialog, all_predictions, schemas, eval_debu
                             slot,
                             frame,
                             all_slot_values,
-                            slots_relation_list,
+                            slots_relation_index,
                             frame_service_prev,
                             sys_slots_last,
                             sys_slots_agg,
@@ -268,7 +305,7 @@ def get_predicted_dialog_nemotracker(dialog, all_predictions, schemas, eval_debu
                             slot,
                             frame,
                             all_slot_values,
-                            slots_relation_list,
+                            slots_relation_index,
                             frame_service_prev,
                             sys_slots_last,
                             sys_slots_agg,
@@ -333,7 +370,7 @@ def get_predicted_dialog_nemotracker(dialog, all_predictions, schemas, eval_debu
                                 slot,
                                 frame,
                                 all_slot_values,
-                                slots_relation_list,
+                                slots_relation_index,
                                 frame_service_prev,
                                 sys_slots_last,
                                 sys_slots_agg,
@@ -345,7 +382,7 @@ def get_predicted_dialog_nemotracker(dialog, all_predictions, schemas, eval_debu
                             slot,
                             frame,
                             all_slot_values,
-                            slots_relation_list,
+                            slots_relation_index,
                             frame_service_prev,
                             sys_slots_last,
                             sys_slots_agg,
@@ -392,7 +429,7 @@ def get_predicted_dialog_nemotracker(dialog, all_predictions, schemas, eval_debu
                 carry_over_slots(
                     frame,
                     all_slot_values,
-                    slots_relation_list,
+                    slots_relation_index,
                     frame_service_prev,
                     slot_values,
                     sys_slots_agg,
@@ -589,10 +626,39 @@ def get_predicted_dialog_baseline(dialog, all_predictions, schemas):
     return dialog
 
 
-def write_predictions_to_file(
-    predictions, input_json_files, output_dir, schemas, tracker_model, eval_debug, in_domain_services
+_tracker = None
+
+
+def _init_tracker(tracker):
+    global _tracker
+    _tracker = tracker
+
+
+def _track_dialog(tracker, dialog):
+    """Returns a ground truth copy of the dialogue, with its own turns and frames, and the dialogue updated by
+    the tracker."""
+    ref_dialog = dict(dialog)
+    ref_dialog["turns"] = [dict(turn, frames=[dict(frame) for frame in turn["frames"]]) for turn in dialog["turns"]]
+    return ref_dialog, tracker(dialog)
+
+
+def _track_dialog_in_worker(dialog):
+    return _track_dialog(_tracker, dialog)
+
+
+def get_predicted_dialogs(
+    predictions, input_json_files, schemas, tracker_model, eval_debug, in_domain_services, num_workers=1
 ):
-    """Write the predicted dialogues as json files.
+    """Runs the state tracker on the dialogues of the input files, one file at a time.
+
+  The trackers remove the ground truth slot spans and state from the dialogues they
+  update, so the ground truth dialogues are shallow copies of the dialogues with their
+  own turns and frames, made before tracking. They are returned along with the
+  predictions to evaluate them in memory, see evaluate.MetricsAggregator.
+
+  The dialogues are independent of each other, so they are tracked by a pool of
+  worker processes if num_workers is greater than one. The workers are started once
+  for all the input files and get the predictions and the schemas when they start.
 
   Args:
     predictions: An iterator containing model predictions. This is the output of
@@ -600,9 +666,16 @@ def write_predictions_to_file(
     input_json_files: A list of json paths containing the dialogues to run
       inference on.
     schemas: Schemas to all services in the dst dataset (train, dev and test splits).
-    output_dir: The directory where output json files will be created.
+    tracker_model: The state tracker model, "baseline" or "nemotracker".
+    eval_debug: specifies if it is running in DEBUG mode, so to generate the error analysis outputs
+    in_domain_services: list of the seen services
+    num_workers: number of processes tracking the dialogues
+  Yields:
+    The input file path, the list of its ground truth dialogues and the list of
+    the corresponding predicted dialogues.
   """
-    logging.info(f"Writing predictions to {output_dir} started.")
+    if tracker_model not in ['baseline', 'nemotracker']:
+        raise ValueError(f"tracker_mode {tracker_model} is not defined.")
 
     # Index all predictions.
     all_predictions = {}
@@ -613,25 +686,66 @@ def write_predictions_to_file(
         all_predictions[(dialog_id, turn_id, service_name)] = prediction
     logging.info(f'Predictions for {idx} examples in {eval_dataset} dataset are getting processed.')
 
-    # Read each input file and write its predictions.
-    for input_file_path in input_json_files:
-        with open(input_file_path) as f:
-            dialogs = json.load(f)
-            logging.debug(f'{input_file_path} file is loaded')
+    if tracker_model == 'baseline':
+        tracker = partial(get_predicted_dialog_baseline, all_predictions=all_predictions, schemas=schemas)
+    else:
+        tracker = partial(
+            get_predicted_dialog_nemotracker,
+            all_predictions=all_predictions,
+            schemas=schemas,
+            eval_debug=eval_debug,
+            in_domain_services=in_domain_services,
+            slots_relation_index=SlotsRelationIndex(schemas._slots_relation_list),
+        )
+
+    pool = None
+    if num_workers > 1:
+        pool = multiprocessing.Pool(num_workers, initializer=_init_tracker, initargs=(tracker,))
+    try:
+        for input_file_path in input_json_files:
+            with open(input_file_path) as f:
+                dialogs = json.load(f)
+                logging.debug(f'{input_file_path} file is loaded')
+            if pool is None:
+                tracked_dialogs = map(partial(_track_dialog, tracker), dialogs)
+            else:
+                tracked_dialogs = pool.imap(_track_dialog_in_worker, dialogs, chunksize=DIALOGS_CHUNK_SIZE)
+            ref_dialogs = []
             pred_dialogs = []
-            for d in dialogs:
-                if tracker_model == 'baseline':
-                    pred_dialog = get_predicted_dialog_baseline(d, all_predictions, schemas)
-                elif tracker_model == 'nemotracker':
-                    pred_dialog = get_predicted_dialog_nemotracker(
-                        d, all_predictions, schemas, eval_debug, in_domain_services
-                    )
-                else:
-                    raise ValueError(f"tracker_mode {tracker_model} is not defined.")
+            for ref_dialog, pred_dialog in tracked_dialogs:
+                ref_dialogs.append(ref_dialog)
                 pred_dialogs.append(pred_dialog)
-            f.close()
+            yield input_file_path, ref_dialogs, pred_dialogs
+    finally:
+        if pool is not None:
+            pool.terminate()
+
+
+def write_dialogs_to_file(dialogs, output_file_path):
+    """Writes dialogues as a json file in the DSTC8/SGD format."""
+    with open(output_file_path, "w") as f:
+        json.dump(dialogs, f, indent=2, separators=(",", ": "), sort_keys=True)
+
+
+def write_predictions_to_file(
+    predictions, input_json_files, output_dir, schemas, tracker_model, eval_debug, in_domain_services, num_workers=1
+):
+    """Write the predicted dialogues as json files.
+
+  Args:
+    predictions: An iterator containing model predictions. This is the output of
+      the predict method in the estimator.
+    input_json_files: A list of json paths containing the dialogues to run
+      inference on.
+    schemas: Schemas to all services in the dst dataset (train, dev and test splits).
+    output_dir: The directory where output json files will be created.
+    num_workers: number of processes tracking the dialogues
+  """
+    logging.info(f"Writing predictions to {output_dir} started.")
+
+    # Read each input file and write its predictions.
+    for input_file_path, _, pred_dialogs in get_predicted_dialogs(
+        predictions, input_json_files, schemas, tracker_model, eval_debug, in_domain_services, num_workers
+    ):
         input_file_name = os.path.basename(input_file_path)
-        output_file_path = os.path.join(output_dir, input_file_name)
-        with open(output_file_path, "w") as f:
-            json.dump(pred_dialogs, f, indent=2, separators=(",", ": "), sort_keys=True)
-            f.close()
+        write_dialogs_to_file(pred_dialogs, os.path.join(output_dir, input_file_name))
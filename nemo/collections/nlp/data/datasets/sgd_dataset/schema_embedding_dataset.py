@@ -27,7 +27,6 @@ import random
 import re
 
 import numpy as np
-import torch
 from torch.utils.data import Dataset
 
 from nemo import logging
@@ -40,17 +39,19 @@ __all__ = ['SchemaEmbeddingDataset']
 
 
 class SchemaEmbeddingDataset(Dataset):
-    def __init__(self, schema_config, tokenizer, schemas):
+    def __init__(self, schema_config, tokenizer, schemas, services=None):
         """Generate the embeddings for a schema's elements.
 
         Args:
           tokenizer (tokenizer): such as NemoBertTokenizer
           max_seq_length: Sequence length used for BERT model
           schemas: Schemas for all services in the datasets
+          services: Services to generate the embeddings for. Defaults to all services of schemas.
         """
         self._tokenizer = tokenizer
         self.schema_config = schema_config
         self.schemas = schemas
+        self.services = list(schemas.services) if services is None else list(services)
 
         input_features = self._get_input_features()
 
@@ -256,7 +257,7 @@ class SchemaEmbeddingDataset(Dataset):
         """
         # Obtain all the features.
         features = []
-        for service in self.schemas.services:
+        for service in self.services:
             service_schema = self.schemas.get_service_schema(service)
             features.extend(self._get_intents_input_features(service_schema))
             features.extend(self._get_req_slots_input_features(service_schema))
@@ -270,6 +271,7 @@ class SchemaEmbeddingDataset(Dataset):
         """
         completed_services = set()
         batch_size, seq_len, hidden_size = hidden_states[0].shape
+        service_rows = {service: row for row, service in enumerate(self.services)}
 
         for idx in range(len(self)):
             service_id = self.features['service_id'][idx]
@@ -279,20 +281,21 @@ class SchemaEmbeddingDataset(Dataset):
                 logging.debug(f"Generating embeddings for service {service}.")
                 completed_services.add(service)
             tensor_name = self.features["embedding_tensor_name"][idx]
-            emb_mat = schema_embeddings[service_id][tensor_name]
+            emb_mat = schema_embeddings[tensor_name][service_rows[service]]
 
             if mode == 'random':
                 # randomly initialize schema embeddings
                 random_token = random.randint(0, seq_len - 1)
-                embedding = [round(float(x), 6) for x in hidden_states[0][idx, random_token, :].flat]
+                embedding = hidden_states[0][idx, random_token, :]
             elif mode == 'last_layer_average':
                 # Obtain the encoding of the [CLS] token.
-                embedding = [round(float(x), 6) for x in np.mean(hidden_states[0][idx, :], 0).flat]
+                embedding = np.mean(hidden_states[0][idx, :], 0)
             elif mode == 'baseline':
                 # Obtain the encoding of the [CLS] token.
-                embedding = [round(float(x), 6) for x in hidden_states[0][idx, 0, :].flat]
+                embedding = hidden_states[0][idx, 0, :]
             else:
                 raise ValueError(f'Mode {mode} for generation schema embeddings is not supported')
+            embedding = np.round(np.asarray(embedding, dtype=np.float64), 6)
             intent_or_slot_id = self.features['intent_or_slot_id'][idx]
             value_id = self.features['value_id'][idx]
 
@@ -301,36 +304,32 @@ class SchemaEmbeddingDataset(Dataset):
             else:
                 emb_mat[intent_or_slot_id] = embedding
 
-    def save_embeddings(self, bert_hidden_states, output_file, mode):
-        """Generate schema element embeddings and save it as a numpy file."""
-        schema_embeddings = []
+    def get_embeddings(self, bert_hidden_states, mode):
+        """Generate schema element embeddings.
+
+        Returns:
+          A dict mapping the name of every embedding tensor to an array with the
+          embeddings of all services of the dataset, one row per service.
+        """
         max_num_intent = self.schema_config["MAX_NUM_INTENT"]
         max_num_cat_slot = self.schema_config["MAX_NUM_CAT_SLOT"]
         max_num_noncat_slot = self.schema_config["MAX_NUM_NONCAT_SLOT"]
         max_num_slot = max_num_cat_slot + max_num_noncat_slot
         max_num_value = self.schema_config["MAX_NUM_VALUE_PER_CAT_SLOT"]
         embedding_dim = self.schema_config["EMBEDDING_DIMENSION"]
+        num_services = len(self.services)
 
-        for _ in self.schemas.services:
-            schema_embeddings.append(
-                {
-                    "intent_emb": np.zeros([max_num_intent, embedding_dim]),
-                    "req_slot_emb": np.zeros([max_num_slot, embedding_dim]),
-                    "cat_slot_emb": np.zeros([max_num_cat_slot, embedding_dim]),
-                    "noncat_slot_emb": np.zeros([max_num_noncat_slot, embedding_dim]),
-                    "cat_slot_value_emb": np.zeros([max_num_cat_slot, max_num_value, embedding_dim]),
-                }
-            )
-
-        # Populate the embeddings based on bert inference results and save them.
-        self._populate_schema_embeddings(schema_embeddings, bert_hidden_states, mode)
+        schema_embeddings = {
+            "intent_emb": np.zeros([num_services, max_num_intent, embedding_dim]),
+            "req_slot_emb": np.zeros([num_services, max_num_slot, embedding_dim]),
+            "cat_slot_emb": np.zeros([num_services, max_num_cat_slot, embedding_dim]),
+            "noncat_slot_emb": np.zeros([num_services, max_num_noncat_slot, embedding_dim]),
+            "cat_slot_value_emb": np.zeros([num_services, max_num_cat_slot, max_num_value, embedding_dim]),
+        }
 
-        master_device = not torch.distributed.is_initialized() or torch.distributed.get_rank() == 0
-        if master_device:
-            with open(output_file, "wb") as f_s:
-                np.save(f_s, schema_embeddings)
-                logging.info(f"The schema embeddings saved at {output_file}")
-                f_s.close()
+        # Populate the embeddings based on bert inference results.
+        self._populate_schema_embeddings(schema_embeddings, bert_hidden_states, mode)
+        return schema_embeddings
 
 
 class InputFeatures(object):
@@ -0,0 +1,122 @@
+# =============================================================================
+# Copyright 2020 NVIDIA. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+"""
+Persistent store of the BERT embeddings of schema elements (intents, slots and
+categorical slot values) of services.
+
+The store is a feature_store directory named after a fingerprint of everything
+the embeddings depend on except the schemas: the tokenizer, the encoder
+checkpoint, the embedding mode and the schema config. Within the store, every
+embedding tensor is one memory-mapped array with a row per service, and the row
+of a service is looked up by a fingerprint of its schema. Services can be added
+to the store without recomputing the embeddings of the services already in it,
+and a changed schema gets a new fingerprint, so stale embeddings are never used.
+"""
+
+import hashlib
+import json
+
+import numpy as np
+
+from nemo.collections.nlp.data.feature_store import has_features, load_features, save_features
+from nemo.utils.helpers import get_checkpoint_from_dir
+
+__all__ = ['SchemaEmbeddingStore', 'encoder_fingerprint', 'service_fingerprint']
+
+EMBEDDING_TENSOR_NAMES = ["intent_emb", "req_slot_emb", "cat_slot_emb", "noncat_slot_emb", "cat_slot_value_emb"]
+
+
+def service_fingerprint(service_schema):
+    """Returns a string identifying the schema elements of a service (a ServiceSchema) which are embedded."""
+    categorical_slot_values = {
+        slot: service_schema.get_categorical_slot_values(slot) for slot in service_schema.categorical_slots
+    }
+    content = json.dumps([service_schema.schema_json, categorical_slot_values], sort_keys=True)
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+
+def encoder_fingerprint(bert_model, bert_ckpt_dir=None):
+    """Returns a string identifying the weights of the encoder the embeddings are computed with.
+
+    Args:
+        bert_model: BERT neural module
+        bert_ckpt_dir (str): directory of the checkpoint of bert_model which is restored for inference.
+            If None, the current weights of bert_model are used.
+    """
+    sha = hashlib.sha1()
+    if bert_ckpt_dir:
+        checkpoint = get_checkpoint_from_dir([str(bert_model)], bert_ckpt_dir)[0]
+        with open(checkpoint, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                sha.update(block)
+    else:
+        for name, tensor in bert_model.state_dict().items():
+            sha.update(name.encode())
+            sha.update(tensor.detach().cpu().numpy().tobytes())
+    return sha.hexdigest()
+
+
+class SchemaEmbeddingStore(object):
+    """Memory-mapped schema embeddings of services, looked up by service fingerprint.
+
+    Args:
+        store_dir (str): directory of the store, see feature_store.features_cache_dir
+    """
+
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        self.embeddings = None
+        self._rows = {}
+        if has_features(store_dir):
+            self.embeddings, metadata = load_features(store_dir)
+            self._rows = {fingerprint: row for row, fingerprint in enumerate(metadata["services"])}
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, fingerprint):
+        return fingerprint in self._rows
+
+    def get(self, fingerprint):
+        """Returns a dict mapping the names of the embedding tensors to the (memory-mapped) embeddings of a service."""
+        row = self._rows[fingerprint]
+        return {name: self.embeddings[name][row] for name in EMBEDDING_TENSOR_NAMES}
+
+    def add(self, fingerprints, embeddings):
+        """Adds (or replaces) the embeddings of services and writes the store.
+
+        Args:
+            fingerprints (list): fingerprints of the services
+            embeddings (dict): maps the names of the embedding tensors to arrays with one row per service
+        """
+        fingerprints = list(fingerprints)
+        rows = dict(self._rows)
+        for fingerprint in fingerprints:
+            rows.setdefault(fingerprint, len(rows))
+        new_embeddings = {}
+        for name in EMBEDDING_TENSOR_NAMES:
+            values = np.asarray(embeddings[name], dtype=np.float32)
+            merged = np.zeros((len(rows),) + values.shape[1:], dtype=np.float32)
+            if self.embeddings is not None:
+                merged[: len(self._rows)] = self.embeddings[name]
+            merged[[rows[fingerprint] for fingerprint in fingerprints]] = values
+            new_embeddings[name] = merged
+
+        services = sorted(rows, key=rows.get)
+        save_features(self.store_dir, new_embeddings, metadata={"services": services})
+        self.embeddings, _ = load_features(self.store_dir)
+        self._rows = rows
@@ -23,12 +23,17 @@ https://github.com/google-research/google-research/blob/master/schema_guided_dst
 import collections
 import os
 
-import numpy as np
 import torch
 
 from nemo import logging
 from nemo.collections.nlp.data.datasets.sgd_dataset import schema
 from nemo.collections.nlp.data.datasets.sgd_dataset.schema_embedding_dataset import SchemaEmbeddingDataset
+from nemo.collections.nlp.data.datasets.sgd_dataset.schema_embedding_store import (
+    SchemaEmbeddingStore,
+    encoder_fingerprint,
+    service_fingerprint,
+)
+from nemo.collections.nlp.data.feature_store import features_cache_dir
 from nemo.collections.nlp.nm.data_layers.bert_inference_datalayer import BertInferDataLayer
 from nemo.collections.nlp.utils.data_utils import concatenate
 
@@ -44,9 +49,11 @@ class SchemaPreprocessor:
         data_dir (str) - Directory for the downloaded DSTC8/SGD data, which contains
             the dialogue files and schema files of all datasets (eg train, dev)
         dialogues_example_dir (str) - Directory where preprocessed DSTC8/SGD dialogues are stored
-        schema_embedding_dir (str) - Directory where .npy file for embedding of
-            entities (slots, values, intents) in the dataset_split's
-            schema are stored.
+        schema_embedding_dir (str) - Directory where the embeddings of
+            entities (slots, values, intents) in the services' schemas
+            are stored, see SchemaEmbeddingStore. Embeddings of services
+            which are already stored for the same tokenizer, BERT checkpoint
+            and mode are reused.
         task_name (str) - The name of the task to train
         vocab_file (str) - The path to BERT vocab file
         do_lower_case - (bool) - Whether to lower case the input text.
@@ -57,8 +64,8 @@ class SchemaPreprocessor:
         tokenizer - tokenizer
         bert_model - pretrained BERT model
         dataset_split (str) - Dataset split for training / prediction (train/dev/test)
-        overwrite_dial_file (bool) - Whether to generate a new file saving
-            the dialogue examples overwrite_schema_emb_file,
+        overwrite_schema_emb_files (bool) - Whether to regenerate the schema
+            embeddings of all services even if they are stored
         bert_ckpt_dir (str) - Directory containing pre-trained BERT checkpoint
         nf - NeuralModuleFactory
         mode(str): Schema embeddings initialization mode, baseline is ['CLS'] token embeddings
@@ -105,14 +112,6 @@ class SchemaPreprocessor:
                 )
         os.makedirs(schema_embedding_dir, exist_ok=True)
 
-        tokenizer_type = type(tokenizer.tokenizer).__name__
-        vocab_size = getattr(tokenizer, "vocab_size", 0)
-        self.schema_embedding_file = os.path.join(
-            schema_embedding_dir,
-            "{}_{}_{}_{}_pretrained_schema_embedding.npy".format(
-                '_'.join(self.datasets), mode, tokenizer_type, vocab_size
-            ),
-        )
         all_schema_json_paths = []
         for dataset_split in self.datasets:
             all_schema_json_paths.append(os.path.join(data_dir, dataset_split, "schema.json"))
@@ -120,13 +119,39 @@ class SchemaPreprocessor:
             all_schema_json_paths, add_carry_value=self._add_carry_value, add_carry_status=self._add_carry_status
         )
 
-        if not os.path.exists(self.schema_embedding_file) or overwrite_schema_emb_files:
-            # Generate the schema embeddings if needed or specified
-            logging.info(f"Start generating the schema embeddings.")
+        # The embeddings of every service are stored by the fingerprint of its schema in a store which is
+        # specific to the tokenizer, the encoder checkpoint, the mode and the schema config
+        self.schema_embedding_dir = features_cache_dir(
+            [],
+            tokenizer,
+            schema_config["MAX_SEQ_LENGTH"],
+            cache_dir=schema_embedding_dir,
+            prefix="{}_schema_embedding".format(mode),
+            encoder=encoder_fingerprint(bert_model, bert_ckpt_dir),
+            mode=mode,
+            schema_config=schema_config,
+        )
+        service_fingerprints = {
+            service: service_fingerprint(self.schemas.get_service_schema(service)) for service in self.schemas.services
+        }
+        store = SchemaEmbeddingStore(self.schema_embedding_dir)
+        missing_services = [
+            service
+            for service in self.schemas.services
+            if overwrite_schema_emb_files or service_fingerprints[service] not in store
+        ]
+
+        if missing_services:
+            # Generate the schema embeddings of the services which are not in the store yet
+            logging.info(
+                f"Start generating the schema embeddings of {len(missing_services)} out of "
+                f"{len(self.schemas.services)} services."
+            )
             dataset_params = {
                 "schema_config": schema_config,
                 "tokenizer": tokenizer,
                 "schemas": self.schemas,
+                "services": missing_services,
             }
             emb_datalayer = BertInferDataLayer(
                 dataset_type=SchemaEmbeddingDataset, dataset_params=dataset_params, batch_size=1, shuffle=False,
@@ -140,16 +165,17 @@ class SchemaPreprocessor:
             master_device = not torch.distributed.is_initialized() or torch.distributed.get_rank() == 0
             if master_device:
                 hidden_states = [concatenate(tensors) for tensors in evaluated_tensors]
-                emb_datalayer.dataset.save_embeddings(hidden_states, self.schema_embedding_file, mode)
+                embeddings = emb_datalayer.dataset.get_embeddings(hidden_states, mode)
+                store.add([service_fingerprints[service] for service in missing_services], embeddings)
                 logging.info(f"Finish generating the schema embeddings.")
 
-        # wait until the master process writes to the schema embedding file
+        # wait until the master process writes to the schema embedding store
         if torch.distributed.is_initialized():
             torch.distributed.barrier()
+            store = SchemaEmbeddingStore(self.schema_embedding_dir)
 
-        with open(self.schema_embedding_file, "rb") as f:
-            self.schema_embeddings = np.load(f, allow_pickle=True)
-            f.close()
+        # Memory-mapped embeddings of all services, in the order of the service ids
+        self.schema_embeddings = [store.get(service_fingerprints[service]) for service in self.schemas.services]
 
     def get_schema_embeddings(self):
         # Convert from list of dict to dict of list
@@ -162,9 +188,6 @@ class SchemaPreprocessor:
             schema_data_dict["intent_emb"].append(service["intent_emb"])
         return schema_data_dict
 
-    def _get_schema_embedding_file_name(self):
-        return self.schema_embedding_file
-
     def get_service_names_to_id_dict(self):
         return self.schemas._services_vocab
 
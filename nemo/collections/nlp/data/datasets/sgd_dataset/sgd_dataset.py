@@ -21,6 +21,9 @@ https://github.com/google-research/google-research/blob/master/schema_guided_dst
 import numpy as np
 from torch.utils.data import Dataset
 
+from nemo.collections.nlp.data.datasets.sgd_dataset.data_processor import EXAMPLE_FEATURES
+from nemo.collections.nlp.data.feature_store import load_features
+
 __all__ = ['SGDDataset']
 
 
@@ -30,38 +33,32 @@ class SGDDataset(Dataset):
     Args:
         dataset_split (str): train/dev/test
         dialogues_processor (obj): Data generator for SGD dialogues
+
+    The processed examples are stored as fixed-width int arrays, which are
+    memory-mapped on first access in every process (e.g. data loader worker)
+    instead of being unpickled and copied.
     """
 
     def __init__(self, dataset_split, dialogues_processor):
-        self.features = dialogues_processor.get_dialog_examples(dataset_split)
+        self.features_dir = dialogues_processor.get_dialog_examples(dataset_split)
+        self._features = None
+        self._num_examples = len(self.features["service_id"])
+
+    @property
+    def features(self):
+        if self._features is None:
+            self._features, _ = load_features(self.features_dir)
+        return self._features
+
+    def __getstate__(self):
+        # Memory-maps are not pickled, so that workers map the features themselves
+        state = self.__dict__.copy()
+        state["_features"] = None
+        return state
 
     def __len__(self):
-        return len(self.features)
+        return self._num_examples
 
     def __getitem__(self, idx):
-        ex = self.features[idx]
-        service_id = ex.service_schema.service_id
-
-        return (
-            np.array(ex.example_id_num),
-            np.array(service_id),
-            np.array(ex.is_real_example, dtype=int),
-            np.array(ex.utterance_ids),
-            np.array(ex.utterance_segment),
-            np.array(ex.utterance_mask, dtype=np.long),
-            np.array(ex.categorical_slot_status),
-            np.array(ex.cat_slot_status_mask),
-            np.array(ex.categorical_slot_values),
-            np.array(ex.cat_slot_values_mask),
-            np.array(ex.noncategorical_slot_status),
-            np.array(ex.noncat_slot_status_mask),
-            np.array(ex.noncategorical_slot_value_start),
-            np.array(ex.noncategorical_slot_value_end),
-            np.array(ex.start_char_idx),  # noncat_alignment_start
-            np.array(ex.end_char_idx),  # noncat_alignment_end
-            np.array(ex.num_slots),  # num_requested_slots
-            np.array(ex.requested_slot_status, dtype=np.float32),
-            np.array(ex.requested_slot_mask),
-            np.array(ex.intent_status_mask),
-            np.array(ex.intent_status_labels),
-        )
+        features = self.features
+        return tuple(np.array(features[name][idx], dtype=dtype) for name, dtype in EXAMPLE_FEATURES)
@@ -23,12 +23,12 @@ https://github.com/huggingface/pytorch-pretrained-BERT
 import os
 import random
 
-import h5py
 import numpy as np
 from torch.utils.data import Dataset
 
 from nemo import logging
 from nemo.collections.nlp.data.datasets.datasets_utils.data_preprocessing import get_stats
+from nemo.collections.nlp.data.feature_store import features_cache_dir, load_or_create_features
 from nemo.collections.nlp.utils.callback_utils import list2str
 
 __all__ = ['BertTextClassificationDataset']
@@ -59,22 +59,20 @@ class BertTextClassificationDataset(Dataset):
         self.shuffle = shuffle
         self.vocab_size = self.tokenizer.tokenizer.vocab_size
 
+        cache_dir = None
         if use_cache:
-            data_dir, filename = os.path.split(input_file)
-            vocab_size = getattr(tokenizer, "vocab_size", 0)
-            tokenizer_type = type(tokenizer.tokenizer).__name__
-            cached_features_file = os.path.join(
-                data_dir,
-                "cached_{}_{}_{}_{}".format(
-                    filename[:-4], tokenizer_type, str(max_seq_length), str(vocab_size), '.hdf5'
-                ),
+            cache_dir = features_cache_dir(
+                input_file,
+                tokenizer,
+                max_seq_length,
+                prefix=os.path.basename(input_file)[:-4],
+                num_samples=num_samples,
+                shuffle=shuffle,
             )
 
-        if use_cache and os.path.exists(cached_features_file):
-            self.load_cached_features(cached_features_file)
-        else:
+        def create_features():
             with open(input_file, "r") as f:
-                sent_labels, all_sent_subtokens = [], []
+                sent_labels, all_sent_words, all_sent_subtokens = [], [], []
                 sent_lengths = []
                 too_long_count = 0
 
@@ -94,11 +92,17 @@ class BertTextClassificationDataset(Dataset):
                     line_splited = line.strip().split()
                     sent_label = int(line_splited[-1])
                     sent_labels.append(sent_label)
-                    sent_words = line_splited[:-1]
+                    all_sent_words.append(line_splited[:-1])
+
+                # Tokenize the words of all sentences with a single call to the batch API of the tokenizer
+                all_word_tokens = iter(
+                    tokenizer.batch_text_to_tokens([word for sent_words in all_sent_words for word in sent_words])
+                )
+                for sent_words in all_sent_words:
                     sent_subtokens = [tokenizer.cls_token]
 
-                    for word in sent_words:
-                        word_tokens = tokenizer.text_to_tokens(word)
+                    for _ in sent_words:
+                        word_tokens = next(all_word_tokens)
                         sent_subtokens.extend(word_tokens)
 
                     sent_subtokens.append(tokenizer.sep_token)
@@ -118,122 +122,46 @@ class BertTextClassificationDataset(Dataset):
                         sentences with more than {max_seq_length} subtokens.'
             )
 
-            self.convert_sequences_to_features(all_sent_subtokens, sent_labels, tokenizer, max_seq_length)
+            return self.convert_sequences_to_features(all_sent_subtokens, sent_labels, tokenizer, max_seq_length), {}
 
-            if self.use_cache:
-                self.cache_features(cached_features_file, self.features)
-
-                # update self.features to use features from hdf5
-                self.load_cached_features(cached_features_file)
+        features, _ = load_or_create_features(cache_dir, create_features, use_cache=use_cache)
+        keys = ['input_ids', 'segment_ids', 'input_mask', 'sent_labels']
+        self.features = [features[key] for key in keys]
 
     def __len__(self):
-        if self.use_cache:
-            return len(self.features[0])
-
-        else:
-            return len(self.features)
+        return len(self.features[0])
 
     def __getitem__(self, idx):
-        if self.use_cache:
-            return (self.features[0][idx], self.features[1][idx], self.features[2][idx], self.features[3][idx])
-
-        else:
-            feature = self.features[idx]
-
-            return (
-                np.array(feature.input_ids),
-                np.array(feature.segment_ids),
-                np.array(feature.input_mask, dtype=np.long),
-                feature.sent_label,
-            )
+        return tuple(np.array(feature[idx], dtype=np.long) for feature in self.features)
 
     def convert_sequences_to_features(self, all_sent_subtokens, sent_labels, tokenizer, max_seq_length):
-        """Loads a data file into a list of `InputBatch`s.
+        """Converts tokenized sentences into a dict of input_ids, segment_ids, input_mask and sent_labels arrays.
         """
 
-        self.features = []
-        for sent_id in range(len(all_sent_subtokens)):
+        num_features = len(all_sent_subtokens)
+        features = {
+            'input_ids': np.zeros((num_features, max_seq_length), dtype=np.int32),
+            'segment_ids': np.zeros((num_features, max_seq_length), dtype=np.int32),
+            'input_mask': np.zeros((num_features, max_seq_length), dtype=np.int32),
+            'sent_labels': np.array(sent_labels, dtype=np.int64).reshape(num_features),
+        }
+        for sent_id in range(num_features):
             sent_subtokens = all_sent_subtokens[sent_id]
             sent_label = sent_labels[sent_id]
 
             input_ids = [tokenizer.tokens_to_ids(t) for t in sent_subtokens]
 
-            # The mask has 1 for real tokens and 0 for padding tokens.
-            # Only real tokens are attended to.
-            input_mask = [1] * len(input_ids)
-
-            # Zero-pad up to the sequence length.
-            while len(input_ids) < max_seq_length:
-                input_ids.append(0)
-                input_mask.append(0)
-            segment_ids = [0] * max_seq_length
-
-            assert len(input_ids) == max_seq_length
-            assert len(input_mask) == max_seq_length
+            # The mask has 1 for real tokens and 0 for padding tokens, which stay zero-padded up to the
+            # sequence length. Only real tokens are attended to.
+            features['input_ids'][sent_id, : len(input_ids)] = input_ids
+            features['input_mask'][sent_id, : len(input_ids)] = 1
 
             if sent_id < 5:
                 logging.info("*** Example ***")
                 logging.info("example_index: %s" % sent_id)
                 logging.info("subtokens: %s" % " ".join(sent_subtokens))
                 logging.info("sent_label: %s" % sent_label)
-                logging.info("input_ids: %s" % list2str(input_ids))
-                logging.info("input_mask: %s" % list2str(input_mask))
-
-            self.features.append(
-                InputFeatures(
-                    sent_id=sent_id,
-                    sent_label=sent_label,
-                    input_ids=input_ids,
-                    input_mask=input_mask,
-                    segment_ids=segment_ids,
-                )
-            )
+                logging.info("input_ids: %s" % list2str(features['input_ids'][sent_id]))
+                logging.info("input_mask: %s" % list2str(features['input_mask'][sent_id]))
 
-    def cache_features(self, cached_features_file, features):
-        len_features = len(features)
-        input_ids_array = np.zeros((len_features, self.max_seq_length))
-        segment_ids_array = np.zeros((len_features, self.max_seq_length))
-        input_mask_array = np.zeros((len_features, self.max_seq_length))
-        sent_labels_array = np.zeros((len_features,))
-
-        for idx in range(len_features):
-            input_ids_array[idx] = features[idx].input_ids
-            segment_ids_array[idx] = features[idx].segment_ids
-            input_mask_array[idx] = features[idx].input_mask
-            sent_labels_array[idx] = features[idx].sent_label
-
-        f = h5py.File(cached_features_file, mode='w')
-        f.create_dataset('input_ids', data=input_ids_array)
-        f.create_dataset('segment_ids', data=segment_ids_array)
-        f.create_dataset('input_mask', data=input_mask_array)
-        f.create_dataset('sent_labels', data=sent_labels_array)
-        f.close()
-
-    def load_cached_features(self, cached_features_file):
-        f = h5py.File(cached_features_file, 'r')
-        keys = ['input_ids', 'segment_ids', 'input_mask', 'sent_labels']
-        self.features = [np.asarray(f[key], dtype=np.long) for key in keys]
-        f.close()
-        logging.info(f'features restored from {cached_features_file}')
-
-        if self.shuffle:
-            np.random.seed(0)
-            idx = np.arange(len(self))
-            np.random.shuffle(idx)  # shuffle idx in place
-            shuffled_features = [arr[idx] for arr in self.features]
-            self.features = shuffled_features
-
-        if self.num_samples > 0:
-            truncated_features = [arr[0 : self.num_samples] for arr in self.features]
-            self.features = truncated_features
-
-
-class InputFeatures(object):
-    """A single set of features of data."""
-
-    def __init__(self, sent_id, sent_label, input_ids, input_mask, segment_ids):
-        self.sent_id = sent_id
-        self.sent_label = sent_label
-        self.input_ids = input_ids
-        self.input_mask = input_mask
-        self.segment_ids = segment_ids
+        return features
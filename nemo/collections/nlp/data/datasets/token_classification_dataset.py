@@ -22,15 +22,14 @@ Some parts of this code were adapted from the HuggingFace library at
 https://github.com/huggingface/pytorch-pretrained-BERT
 """
 
-import itertools
 import os
-import pickle
 
 import numpy as np
 from torch.utils.data import Dataset
 
 from nemo import logging
 from nemo.collections.nlp.data.datasets.datasets_utils.data_preprocessing import get_label_stats, get_stats
+from nemo.collections.nlp.data.feature_store import features_cache_dir, load_or_create_features
 
 __all__ = ['BertTokenClassificationDataset', 'BertTokenClassificationInferDataset']
 
@@ -74,8 +73,11 @@ def get_features(
     if raw_labels is not None:
         with_label = True
 
-    for i, query in enumerate(queries):
-        words = query.strip().split()
+    all_words = [query.strip().split() for query in queries]
+    # Tokenize the words of all queries with a single call to the batch API of the tokenizer
+    all_word_tokens = iter(tokenizer.batch_text_to_tokens([word for words in all_words for word in words]))
+
+    for i, words in enumerate(all_words):
 
         # add bos token
         subtokens = [tokenizer.cls_token]
@@ -87,7 +89,7 @@ def get_features(
             query_labels = [label_ids[lab] for lab in raw_labels[i]]
 
         for j, word in enumerate(words):
-            word_tokens = tokenizer.text_to_tokens(word)
+            word_tokens = next(all_word_tokens)
             subtokens.extend(word_tokens)
 
             loss_mask.append(1)
@@ -203,29 +205,28 @@ class BertTokenClassificationDataset(Dataset):
         use_cache=False,
     ):
 
+        cache_dir = None
         if use_cache:
             # Cache features
-            data_dir = os.path.dirname(text_file)
             filename = os.path.basename(text_file)
 
             if not filename.endswith('.txt'):
                 raise ValueError("{text_file} should have extension .txt")
 
-            tokenizer_type = type(tokenizer.tokenizer).__name__
-            vocab_size = getattr(tokenizer, "vocab_size", 0)
-            features_pkl = os.path.join(
-                data_dir, "cached_{}_{}_{}_{}".format(filename, tokenizer_type, str(max_seq_length), str(vocab_size)),
+            cache_dir = features_cache_dir(
+                [text_file, label_file],
+                tokenizer,
+                max_seq_length,
+                prefix=filename[:-4],
+                num_samples=num_samples,
+                pad_label=pad_label,
+                label_ids=label_ids,
+                ignore_extra_tokens=ignore_extra_tokens,
+                ignore_start_end=ignore_start_end,
             )
-            label_ids_pkl = os.path.join(data_dir, "label_ids.pkl")
-
-        if use_cache and os.path.exists(features_pkl) and os.path.exists(label_ids_pkl):
-            # If text_file was already processed, load from pickle
-            features = pickle.load(open(features_pkl, 'rb'))
-            logging.info(f'features restored from {features_pkl}')
 
-            label_ids = pickle.load(open(label_ids_pkl, 'rb'))
-            logging.info(f'Labels to ids dict restored from {label_ids_pkl}')
-        else:
+        def create_features():
+            nonlocal label_ids
             if num_samples == 0:
                 raise ValueError("num_samples has to be positive", num_samples)
 
@@ -279,7 +280,7 @@ class BertTokenClassificationDataset(Dataset):
                 for label in sorted(unique_labels):
                     label_ids[label] = len(label_ids)
 
-            features = get_features(
+            input_ids, segment_ids, input_mask, loss_mask, subtokens_mask, labels = get_features(
                 text_lines,
                 max_seq_length,
                 tokenizer,
@@ -289,24 +290,28 @@ class BertTokenClassificationDataset(Dataset):
                 ignore_extra_tokens=ignore_extra_tokens,
                 ignore_start_end=ignore_start_end,
             )
-
-            if use_cache:
-                pickle.dump(features, open(features_pkl, "wb"))
-                logging.info(f'features saved to {features_pkl}')
-
-                pickle.dump(label_ids, open(label_ids_pkl, "wb"))
-                logging.info(f'labels to ids dict saved to {label_ids_pkl}')
-
-        self.all_input_ids = features[0]
-        self.all_segment_ids = features[1]
-        self.all_input_mask = features[2]
-        self.all_loss_mask = features[3]
-        self.all_subtokens_mask = features[4]
-        self.all_labels = features[5]
-        self.label_ids = label_ids
+            features = {
+                'input_ids': np.array(input_ids, dtype=np.int32),
+                'segment_ids': np.array(segment_ids, dtype=np.int32),
+                'input_mask': np.array(input_mask, dtype=np.int32),
+                'loss_mask': np.array(loss_mask, dtype=np.int32),
+                'subtokens_mask': np.array(subtokens_mask, dtype=np.int32),
+                'labels': np.array(labels, dtype=np.int32),
+            }
+            return features, {'label_ids': label_ids}
+
+        features, metadata = load_or_create_features(cache_dir, create_features, use_cache=use_cache)
+
+        self.all_input_ids = features['input_ids']
+        self.all_segment_ids = features['segment_ids']
+        self.all_input_mask = features['input_mask']
+        self.all_loss_mask = features['loss_mask']
+        self.all_subtokens_mask = features['subtokens_mask']
+        self.all_labels = features['labels']
+        self.label_ids = metadata['label_ids']
 
         infold = text_file[: text_file.rfind('/')]
-        merged_labels = itertools.chain.from_iterable(self.all_labels)
+        merged_labels = np.asarray(self.all_labels).reshape(-1).tolist()
         logging.info('Three most popular labels')
         _, self.label_frequencies, _ = get_label_stats(merged_labels, infold + '/label_stats.tsv')
 
@@ -322,12 +327,12 @@ class BertTokenClassificationDataset(Dataset):
 
     def __getitem__(self, idx):
         return (
-            np.array(self.all_input_ids[idx]),
-            np.array(self.all_segment_ids[idx]),
+            np.array(self.all_input_ids[idx], dtype=np.long),
+            np.array(self.all_segment_ids[idx], dtype=np.long),
             np.array(self.all_input_mask[idx], dtype=np.long),
-            np.array(self.all_loss_mask[idx]),
-            np.array(self.all_subtokens_mask[idx]),
-            np.array(self.all_labels[idx]),
+            np.array(self.all_loss_mask[idx], dtype=np.long),
+            np.array(self.all_subtokens_mask[idx], dtype=np.long),
+            np.array(self.all_labels[idx], dtype=np.long),
         )
 
 
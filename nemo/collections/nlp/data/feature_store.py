@@ -0,0 +1,259 @@
+# =============================================================================
+# Copyright 2020 NVIDIA. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+"""Memory-mapped cache of tokenized features shared by NLP datasets.
+
+Features are stored as a directory of .npy files: fixed-width features (input_ids, segment_ids, masks, labels, ...)
+as 2D or 1D arrays, ragged side data (e.g. the tokens of every sequence) as flat values plus offsets. Loading
+memory-maps all files, so a cache hit costs neither unpickling nor a copy of the features per data loader worker.
+
+The cache directory is named after a fingerprint of the contents of the input files, the tokenizer and all
+parameters which affect the features, so a stale cache is never reused.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import uuid
+
+import numpy as np
+import torch
+
+from nemo import logging
+
+__all__ = [
+    'RaggedArray',
+    'StringArray',
+    'features_cache_dir',
+    'has_features',
+    'load_features',
+    'load_or_create_features',
+    'save_features',
+    'tokenizer_fingerprint',
+]
+
+_MANIFEST = "manifest.json"
+
+# Tokenized by tokenizer_fingerprint to detect settings such as lower casing, which don't change the vocabulary
+_PROBE_TEXT = "Hello World! NeMo's 1234 tokenizers, naïve café."
+
+
+class RaggedArray(object):
+    """A sequence of variable-length arrays, stored as one flat array of values and the offsets of every
+    element: element i is values[offsets[i]:offsets[i + 1]]. Values can themselves be a RaggedArray (or a
+    StringArray), e.g. for lists of tokens.
+
+    Args:
+        values: flat numpy array (or RaggedArray)
+        offsets: int64 numpy array of length len(self) + 1
+    """
+
+    def __init__(self, values, offsets):
+        self.values = values
+        self.offsets = offsets
+
+    @classmethod
+    def from_lists(cls, lists, dtype=np.int64):
+        """Creates a RaggedArray from a list of sequences of numbers."""
+        offsets = np.zeros(len(lists) + 1, dtype=np.int64)
+        np.cumsum([len(l) for l in lists], out=offsets[1:])
+        values = np.fromiter((v for l in lists for v in l), dtype=dtype, count=int(offsets[-1]))
+        return cls(values, offsets)
+
+    @classmethod
+    def from_string_lists(cls, lists):
+        """Creates a RaggedArray from a list of lists of strings, e.g. the tokens of every sequence."""
+        offsets = np.zeros(len(lists) + 1, dtype=np.int64)
+        np.cumsum([len(l) for l in lists], out=offsets[1:])
+        return cls(StringArray.from_strings([s for l in lists for s in l]), offsets)
+
+    def lengths(self):
+        """Returns the lengths of all elements."""
+        return np.diff(self.offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, idx):
+        start, end = int(self.offsets[idx]), int(self.offsets[idx + 1])
+        if isinstance(self.values, RaggedArray):
+            return [self.values[i] for i in range(start, end)]
+        return self.values[start:end]
+
+
+class StringArray(RaggedArray):
+    """A sequence of strings, stored as the concatenation of their UTF-8 encodings plus offsets."""
+
+    @classmethod
+    def from_strings(cls, strings):
+        encoded = [s.encode("utf-8") for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(e) for e in encoded], out=offsets[1:])
+        return cls(np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets)
+
+    def __getitem__(self, idx):
+        start, end = int(self.offsets[idx]), int(self.offsets[idx + 1])
+        return self.values[start:end].tobytes().decode("utf-8")
+
+
+def _hash_file(sha, path, block_size=1 << 20):
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            sha.update(block)
+
+
+def tokenizer_fingerprint(tokenizer):
+    """Returns a string identifying a tokenizer: its type, its vocabulary and the tokenization of a probe text."""
+    sha = hashlib.sha1()
+    sha.update(type(tokenizer).__name__.encode())
+    sha.update(type(getattr(tokenizer, "tokenizer", None)).__name__.encode())
+    vocab_size = getattr(tokenizer, "vocab_size", 0)
+    sha.update(str(vocab_size).encode())
+    try:
+        sha.update("\n".join(map(str, tokenizer.ids_to_tokens(list(range(vocab_size))))).encode())
+    except Exception:
+        pass
+    try:
+        sha.update("\n".join(map(str, tokenizer.text_to_tokens(_PROBE_TEXT))).encode())
+    except Exception:
+        pass
+    return sha.hexdigest()
+
+
+def features_cache_dir(
+    input_files, tokenizer, max_seq_length, cache_dir=None, prefix="cached", content=None, **params
+):
+    """Returns the cache directory of features computed from the given input files.
+
+    Args:
+        input_files (str or list of str): files the features are computed from; their contents are hashed
+        tokenizer (TokenizerSpec): tokenizer used to compute the features
+        max_seq_length (int): maximum sequence length
+        cache_dir (str): directory to put the cache in. Defaults to the directory of the first input file.
+        prefix (str): prefix of the cache directory name, e.g. the name of the input file
+        content (iterable of str): optional content hashed in addition to the input files, e.g. examples
+            which are read by a data processor from files not known to the caller
+        params: any other (JSON serializable) parameters which affect the features
+
+    Returns:
+        path of the cache directory: <cache_dir>/<prefix>_features_<fingerprint>
+    """
+    if isinstance(input_files, str):
+        input_files = [input_files]
+    input_files = input_files or []
+    sha = hashlib.sha1()
+    for input_file in input_files:
+        _hash_file(sha, input_file)
+    for text in content or []:
+        sha.update(text.encode("utf-8"))
+        sha.update(b"\0")
+    sha.update(tokenizer_fingerprint(tokenizer).encode())
+    sha.update(json.dumps(dict(params, max_seq_length=max_seq_length), sort_keys=True, default=str).encode())
+    if cache_dir is None:
+        cache_dir = os.path.dirname(os.path.abspath(input_files[0]))
+    return os.path.join(cache_dir, f"{prefix}_features_{sha.hexdigest()[:16]}")
+
+
+def _save_value(cache_dir, name, value):
+    if isinstance(value, RaggedArray):
+        np.save(os.path.join(cache_dir, f"{name}.offsets.npy"), value.offsets)
+        return {
+            "kind": "strings" if isinstance(value, StringArray) else "ragged",
+            "values": _save_value(cache_dir, f"{name}.values", value.values),
+        }
+    np.save(os.path.join(cache_dir, f"{name}.npy"), np.asarray(value))
+    return {"kind": "array"}
+
+
+def _load_value(cache_dir, name, spec, mmap_mode):
+    if spec["kind"] == "array":
+        return np.load(os.path.join(cache_dir, f"{name}.npy"), mmap_mode=mmap_mode)
+    offsets = np.load(os.path.join(cache_dir, f"{name}.offsets.npy"))
+    values = _load_value(cache_dir, f"{name}.values", spec["values"], mmap_mode)
+    if spec["kind"] == "strings":
+        return StringArray(values, offsets)
+    return RaggedArray(values, offsets)
+
+
+def save_features(cache_dir, features, metadata=None):
+    """Saves features to cache_dir. The directory is written under a temporary name and renamed when complete,
+    so concurrent readers never see a partial cache.
+
+    Args:
+        cache_dir (str): cache directory
+        features (dict): maps names to numpy arrays or RaggedArrays
+        metadata (dict): optional JSON serializable data, e.g. label to id mappings
+    """
+    tmp_dir = f"{cache_dir}.tmp{uuid.uuid4().hex[:8]}"
+    os.makedirs(tmp_dir)
+    try:
+        manifest = {name: _save_value(tmp_dir, name, value) for name, value in features.items()}
+        with open(os.path.join(tmp_dir, _MANIFEST), "w") as f:
+            json.dump({"features": manifest, "metadata": metadata or {}}, f)
+        if os.path.isdir(cache_dir):
+            shutil.rmtree(cache_dir)
+        os.rename(tmp_dir, cache_dir)
+    finally:
+        if os.path.isdir(tmp_dir):
+            shutil.rmtree(tmp_dir)
+    logging.info(f'Features saved to {cache_dir}')
+
+
+def load_features(cache_dir, mmap_mode='r'):
+    """Loads features saved with save_features.
+
+    Args:
+        cache_dir (str): cache directory
+        mmap_mode (str): passed to np.load, by default all arrays are memory-mapped read-only
+
+    Returns:
+        features (dict) and metadata (dict)
+    """
+    with open(os.path.join(cache_dir, _MANIFEST), "r") as f:
+        manifest = json.load(f)
+    features = {name: _load_value(cache_dir, name, spec, mmap_mode) for name, spec in manifest["features"].items()}
+    logging.info(f'Features restored from {cache_dir}')
+    return features, manifest["metadata"]
+
+
+def has_features(cache_dir):
+    """Returns True if cache_dir holds a complete set of features."""
+    return os.path.isfile(os.path.join(cache_dir, _MANIFEST))
+
+
+def load_or_create_features(cache_dir, create_features, use_cache=True, overwrite=False):
+    """Loads features from the cache if possible, otherwise creates them and, if use_cache is set, saves them
+    (on the master process only in distributed runs).
+
+    Args:
+        cache_dir (str): cache directory, see features_cache_dir
+        create_features (callable): returns a features dict and a metadata dict
+        use_cache (bool): whether to read and write the cache
+        overwrite (bool): recreate the features even if they are cached
+
+    Returns:
+        features (dict) and metadata (dict)
+    """
+    if use_cache and not overwrite and has_features(cache_dir):
+        return load_features(cache_dir)
+
+    features, metadata = create_features()
+    if use_cache:
+        master_device = not torch.distributed.is_initialized() or torch.distributed.get_rank() == 0
+        if master_device:
+            save_features(cache_dir, features, metadata)
+    return features, metadata
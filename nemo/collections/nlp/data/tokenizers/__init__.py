@@ -17,6 +17,7 @@
 from nemo.collections.nlp.data.tokenizers.bert_tokenizer import NemoBertTokenizer
 from nemo.collections.nlp.data.tokenizers.char_tokenizer import CharTokenizer
 from nemo.collections.nlp.data.tokenizers.gpt2_tokenizer import NemoGPT2Tokenizer
+from nemo.collections.nlp.data.tokenizers.parallel_tokenizer import ParallelTokenizer, TokenizationStats
 from nemo.collections.nlp.data.tokenizers.sentencepiece_tokenizer import SentencePieceTokenizer
 from nemo.collections.nlp.data.tokenizers.tokenizer_utils import *
 from nemo.collections.nlp.data.tokenizers.word_tokenizer import WordTokenizer
@@ -0,0 +1,144 @@
+# =============================================================================
+# Copyright 2020 NVIDIA. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+import multiprocessing as mp
+import os
+import time
+
+from nemo import logging
+
+__all__ = ['ParallelTokenizer', 'TokenizationStats']
+
+# Tokenizer used by pool workers; inherited by forked processes
+_worker_tokenizer = None
+
+
+def _tokenize_chunk(lines):
+    return _worker_tokenizer.batch_text_to_ids(lines)
+
+
+class TokenizationStats(object):
+    """Throughput metrics of a tokenization run."""
+
+    def __init__(self, num_lines=0, num_tokens=0, num_bytes=0, elapsed=0.0, num_workers=1):
+        self.num_lines = num_lines
+        self.num_tokens = num_tokens
+        self.num_bytes = num_bytes
+        self.elapsed = elapsed
+        self.num_workers = num_workers
+
+    @property
+    def lines_per_second(self):
+        return self.num_lines / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def tokens_per_second(self):
+        return self.num_tokens / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def megabytes_per_second(self):
+        return self.num_bytes / 2 ** 20 / self.elapsed if self.elapsed > 0 else 0.0
+
+    def __str__(self):
+        return (
+            f"{self.num_lines} lines, {self.num_tokens} tokens in {self.elapsed:.2f}s with {self.num_workers} "
+            f"worker(s): {self.lines_per_second:.0f} lines/s, {self.tokens_per_second:.0f} tokens/s, "
+            f"{self.megabytes_per_second:.2f} MB/s"
+        )
+
+
+class ParallelTokenizer(object):
+    """Converts large amounts of text to token ids with a pool of processes. Input is consumed in chunks of lines,
+    each chunk is converted with a single call to the batch API of the tokenizer (`batch_text_to_ids`), and ids
+    are returned in the order of the input lines. Throughput metrics of the last run are kept in `stats`.
+
+    Workers are forked and inherit the tokenizer, so it is never pickled.
+
+    Args:
+        tokenizer (TokenizerSpec): tokenizer
+        num_workers (int): number of tokenization processes. Defaults to the number of CPUs. With a single worker
+            lines are tokenized in the calling process.
+        chunk_size (int): number of lines sent to a worker at once
+    """
+
+    def __init__(self, tokenizer, num_workers=None, chunk_size=10000):
+        self.tokenizer = tokenizer
+        self.num_workers = num_workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.stats = TokenizationStats()
+
+    def _chunks(self, lines):
+        chunk = []
+        for line in lines:
+            if isinstance(line, bytes):
+                self.stats.num_bytes += len(line)
+                line = line.decode("utf-8")
+            else:
+                self.stats.num_bytes += len(line.encode("utf-8"))
+            chunk.append(line)
+            if len(chunk) == self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def _iter_chunk_ids(self, lines):
+        global _worker_tokenizer
+
+        self.stats = TokenizationStats(num_workers=self.num_workers)
+        start = time.perf_counter()
+        if self.num_workers == 1:
+            for chunk in self._chunks(lines):
+                chunk_ids = self.tokenizer.batch_text_to_ids(chunk)
+                self.stats.num_lines += len(chunk_ids)
+                self.stats.num_tokens += sum(len(line_ids) for line_ids in chunk_ids)
+                yield chunk_ids
+        else:
+            _worker_tokenizer = self.tokenizer
+            pool = mp.get_context("fork").Pool(self.num_workers)
+            try:
+                for chunk_ids in pool.imap(_tokenize_chunk, self._chunks(lines)):
+                    self.stats.num_lines += len(chunk_ids)
+                    self.stats.num_tokens += sum(len(line_ids) for line_ids in chunk_ids)
+                    yield chunk_ids
+            finally:
+                pool.terminate()
+                _worker_tokenizer = None
+
+        self.stats.elapsed = time.perf_counter() - start
+        logging.info(f"Tokenized {self.stats}")
+
+    def _run(self, lines):
+        ids = []
+        for chunk_ids in self._iter_chunk_ids(lines):
+            ids.extend(chunk_ids)
+        return ids
+
+    def text_to_ids(self, lines):
+        """Converts an iterable of texts (str or utf-8 encoded bytes) to a list of lists of token ids."""
+        return self._run(lines)
+
+    def file_to_ids(self, path):
+        """Converts every line of a text file to a list of token ids. The file is read in chunks of lines, so
+        tokenization starts before the whole file is read."""
+        with open(path, "rb") as f:
+            return self._run(f)
+
+    def iter_file_to_ids(self, path):
+        """Like file_to_ids, but yields the ids chunk by chunk (a list of lists of token ids per chunk_size
+        lines, in the order of the lines), so the ids of the whole file never have to be held in memory."""
+        with open(path, "rb") as f:
+            yield from self._iter_chunk_ids(f)
@@ -14,6 +14,8 @@
 # limitations under the License.
 # =============================================================================
 
+import re
+
 import sentencepiece as spm
 
 from nemo.collections.nlp.data.tokenizers.tokenizer_spec import TokenizerSpec
@@ -30,77 +32,72 @@ class SentencePieceTokenizer(TokenizerSpec):
         self.vocab_size = self.tokenizer.get_piece_size()
         self.special_token_to_id = {}
         self.id_to_special_token = {}
+        self._special_token_pattern = None
         self.add_special_tokens(special_tokens)
 
-    def text_to_tokens(self, text):
-        tokens = []
-        idx = 0
-        last_idx = 0
-
-        while 1:
-            indices = {}
+    def _split_special_tokens(self, text):
+        """Splits text into a list of (segment, is_special) pairs, special tokens being separate segments.
+        Where several special tokens start at the same position, the one added first is used."""
+        if self._special_token_pattern is None:
+            return [(text, False)]
 
-            for token in self.special_token_to_id:
-                try:
-                    indices[token] = text[idx:].index(token)
-                except ValueError:
-                    continue
-
-            if len(indices) == 0:
-                break
-
-            next_token = min(indices, key=indices.get)
-            next_idx = idx + indices[next_token]
-
-            tokens.extend(self.tokenizer.encode_as_pieces(text[idx:next_idx]))
-            tokens.append(next_token)
-            idx = next_idx + len(next_token)
-
-        tokens.extend(self.tokenizer.encode_as_pieces(text[idx:]))
-        return tokens
-
-    def text_to_ids(self, text):
-        ids = []
+        segments = []
         idx = 0
-        last_idx = 0
-
-        while 1:
-            indices = {}
-
-            for token in self.special_token_to_id:
-                try:
-                    indices[token] = text[idx:].index(token)
-                except ValueError:
-                    continue
+        for match in self._special_token_pattern.finditer(text):
+            segments.append((text[idx : match.start()], False))
+            segments.append((match.group(), True))
+            idx = match.end()
+        segments.append((text[idx:], False))
+        return segments
+
+    def _batch_encode(self, texts, encode, encode_special):
+        # Encodes the text between special tokens of all texts with a single call to the native batch encoder
+        if self._special_token_pattern is None:
+            return encode(list(texts))
+
+        all_segments = [self._split_special_tokens(text) for text in texts]
+        encoded = iter(encode([segment for segments in all_segments for segment, special in segments if not special]))
+        outputs = []
+        for segments in all_segments:
+            if len(segments) == 1:
+                outputs.append(next(encoded))
+                continue
+            output = []
+            for segment, special in segments:
+                if special:
+                    output.append(encode_special(segment))
+                else:
+                    output.extend(next(encoded))
+            outputs.append(output)
+        return outputs
 
-            if len(indices) == 0:
-                break
+    def text_to_tokens(self, text):
+        return self.batch_text_to_tokens([text])[0]
 
-            next_token = min(indices, key=indices.get)
-            next_idx = idx + indices[next_token]
+    def batch_text_to_tokens(self, texts):
+        return self._batch_encode(texts, self.tokenizer.encode_as_pieces, lambda token: token)
 
-            ids.extend(self.tokenizer.encode_as_ids(text[idx:next_idx]))
-            ids.append(self.special_token_to_id[next_token])
-            idx = next_idx + len(next_token)
+    def text_to_ids(self, text):
+        return self.batch_text_to_ids([text])[0]
 
-        ids.extend(self.tokenizer.encode_as_ids(text[idx:]))
-        return ids
+    def batch_text_to_ids(self, texts):
+        return self._batch_encode(texts, self.tokenizer.encode_as_ids, self.special_token_to_id.get)
 
     def tokens_to_text(self, tokens):
         return self.tokenizer.decode_pieces(tokens)
 
     def ids_to_text(self, ids):
-        text = ""
+        parts = []
         last_i = 0
 
         for i, id in enumerate(ids):
             if id in self.id_to_special_token:
-                text += self.tokenizer.decode_ids(ids[last_i:i]) + " "
-                text += self.id_to_special_token[id] + " "
+                parts.append(self.tokenizer.decode_ids(ids[last_i:i]) + " ")
+                parts.append(self.id_to_special_token[id] + " ")
                 last_i = i + 1
 
-        text += self.tokenizer.decode_ids(ids[last_i:])
-        return text.strip()
+        parts.append(self.tokenizer.decode_ids(ids[last_i:]))
+        return "".join(parts).strip()
 
     def tokens_to_ids(self, tokens):
         ids = []
@@ -143,6 +140,11 @@ class SentencePieceTokenizer(TokenizerSpec):
                     self.id_to_special_token[self.vocab_size] = token
                     self.vocab_size += 1
 
+        # Alternatives are tried in the order special tokens were added, which decides between special tokens
+        # starting at the same position
+        if self.special_token_to_id:
+            self._special_token_pattern = re.compile("|".join(map(re.escape, self.special_token_to_id)))
+
     @property
     def pad_id(self):
         return self.tokens_to_ids([getattr(self, 'pad_token')])[0]
@@ -45,5 +45,15 @@ class TokenizerSpec(ABC):
     def ids_to_text(self, ids):
         pass
 
+    def batch_text_to_tokens(self, texts: List[str]) -> List[List[str]]:
+        """Tokenizes a list of texts. Subclasses override it with the native batch encoder of the underlying
+        tokenizer where one exists."""
+        return [self.text_to_tokens(text) for text in texts]
+
+    def batch_text_to_ids(self, texts: List[str]) -> List[List[int]]:
+        """Converts a list of texts to lists of token ids. Subclasses override it with the native batch encoder
+        of the underlying tokenizer where one exists."""
+        return [self.text_to_ids(text) for text in texts]
+
     def add_special_tokens(self, special_tokens: List[str]):
         raise NotImplementedError("To be implemented")
@@ -33,9 +33,15 @@ class YouTokenToMeTokenizer(TokenizerSpec):
     def tokens_to_text(self, tokens):
         return self.ids_to_text(self.tokens_to_ids(tokens))
 
+    def batch_text_to_tokens(self, texts):
+        return self.tokenizer.encode(list(texts), output_type=yttm.OutputType.SUBWORD)
+
     def text_to_ids(self, text):
         return self.tokenizer.encode(text, output_type=yttm.OutputType.ID)
 
+    def batch_text_to_ids(self, texts):
+        return self.tokenizer.encode(list(texts), output_type=yttm.OutputType.ID)
+
     def ids_to_text(self, ids):
         ids_ = [id_ for id_ in ids if id_ not in self.special_tokens]
         return self.tokenizer.decode([ids_])[0]
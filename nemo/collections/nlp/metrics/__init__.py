@@ -15,3 +15,4 @@
 # =============================================================================
 
 from nemo.collections.nlp.metrics.bleu import *
+from nemo.collections.nlp.metrics.token_bleu import *
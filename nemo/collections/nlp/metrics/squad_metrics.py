@@ -18,6 +18,7 @@
 
 import collections
 
+import numpy as np
 from transformers.tokenization_bert import BasicTokenizer
 
 from nemo import logging
@@ -32,6 +33,7 @@ __all__ = [
     'find_all_best_thresh',
     'find_best_thresh',
     '_get_best_indexes',
+    '_get_best_indexes_batch',
     'get_final_text',
 ]
 
@@ -48,6 +50,27 @@ def _get_best_indexes(logits, n_best_size):
     return best_indexes
 
 
+def _get_best_indexes_batch(logits, n_best_size):
+    """Get the n-best logits of every row of a 2D array, in the same order as
+    _get_best_indexes: by decreasing logit, ties broken by the lower index."""
+    logits = np.asarray(logits)
+    k = min(n_best_size, logits.shape[1])
+    if k == 0:
+        return np.zeros((logits.shape[0], 0), dtype=np.int64)
+    best = np.argpartition(-logits, k - 1, axis=1)[:, :k]
+    best_logits = np.take_along_axis(logits, best, axis=1)
+    order = np.lexsort((best, -best_logits), axis=1)
+    best = np.take_along_axis(best, order, axis=1)
+
+    # argpartition picks any of the logits equal to the k-th best one, resolve such ties like a stable sort
+    kth_logits = np.take_along_axis(logits, best[:, -1:], axis=1)
+    num_tied = (logits == kth_logits).sum(axis=1)
+    num_tied_in_best = (np.take_along_axis(logits, best, axis=1) == kth_logits).sum(axis=1)
+    for row in np.flatnonzero(num_tied != num_tied_in_best):
+        best[row] = np.argsort(-logits[row], kind='stable')[:k]
+    return best
+
+
 def get_final_text(pred_text, orig_text, do_lower_case, verbose_logging=False):
     """Project the tokenized prediction back to the original text."""
 
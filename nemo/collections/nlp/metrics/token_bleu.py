@@ -0,0 +1,117 @@
+# =============================================================================
+# Copyright 2020 NVIDIA. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+"""BLEU computed directly on token id sequences.
+
+`bleu_statistics` returns the sufficient statistics of BLEU for every sentence of a batch: clipped n-gram matches,
+n-gram totals and hypothesis and reference lengths. Statistics of any set of sentences are the sum of their rows,
+so they can be accumulated batch by batch (and across workers) and turned into a corpus BLEU score with
+`bleu_from_statistics` at the end. N-grams are compared as exact id tuples, all sentences of a batch at once.
+"""
+
+import numpy as np
+
+from nemo.collections.nlp.metrics.sacrebleu import NGRAM_ORDER, compute_bleu
+
+__all__ = ['bleu_statistics', 'bleu_from_statistics', 'remove_special_ids']
+
+
+def remove_special_ids(ids, special_ids=()):
+    """Removes special ids (e.g. padding, bos and eos) from a batch of sequences.
+
+    Args:
+        ids: int array of shape [batch size, sequence length]
+        special_ids: ids to remove
+
+    Returns:
+        ids with all remaining ids of every sequence moved to its front (in their order), and the number of
+        remaining ids of every sequence
+    """
+    ids = np.asarray(ids, dtype=np.int64)
+    keep = ~np.isin(ids, list(special_ids))
+    order = np.argsort(~keep, axis=1, kind='stable')
+    return np.take_along_axis(ids, order, axis=1), keep.sum(axis=1)
+
+
+def _ngram_keys(ids, lengths, n):
+    # All n-grams within the lengths of the sequences, as rows (sequence index, id_1, ..., id_n) viewed as
+    # single opaque values, so that numpy can sort and compare them
+    batch_size, seq_length = ids.shape
+    if seq_length < n:
+        return np.empty(0, dtype=np.dtype((np.void, 8 * (n + 1))))
+    num_windows = seq_length - n + 1
+    windows = np.stack([ids[:, i : i + num_windows] for i in range(n)], axis=2)
+    valid = np.arange(num_windows)[None, :] + n <= lengths[:, None]
+    rows = np.broadcast_to(np.arange(batch_size)[:, None], valid.shape)[valid]
+    keys = np.ascontiguousarray(np.concatenate([rows[:, None], windows[valid]], axis=1), dtype=np.int64)
+    return keys.view(np.dtype((np.void, keys.itemsize * (n + 1)))).ravel()
+
+
+def bleu_statistics(hyp_ids, ref_ids, hyp_lengths=None, ref_lengths=None):
+    """Computes the sufficient statistics of BLEU of every sentence of a batch, with one reference per sentence.
+
+    Args:
+        hyp_ids: int array of shape [batch size, hypothesis length]
+        ref_ids: int array of shape [batch size, reference length]
+        hyp_lengths: lengths of the hypotheses. Defaults to the full length.
+        ref_lengths: lengths of the references. Defaults to the full length.
+
+    Returns:
+        int64 array of shape [batch size, 2 * NGRAM_ORDER + 2]: clipped matches of n-grams of orders 1 to
+        NGRAM_ORDER (4), totals of n-grams of orders 1 to NGRAM_ORDER, hypothesis length and reference length
+    """
+    hyp_ids = np.asarray(hyp_ids, dtype=np.int64)
+    ref_ids = np.asarray(ref_ids, dtype=np.int64)
+    batch_size = hyp_ids.shape[0]
+    hyp_lengths = np.full(batch_size, hyp_ids.shape[1]) if hyp_lengths is None else np.asarray(hyp_lengths)
+    ref_lengths = np.full(batch_size, ref_ids.shape[1]) if ref_lengths is None else np.asarray(ref_lengths)
+
+    max_order = NGRAM_ORDER
+    stats = np.zeros((batch_size, 2 * max_order + 2), dtype=np.int64)
+    for n in range(1, max_order + 1):
+        hyp_ngrams, hyp_counts = np.unique(_ngram_keys(hyp_ids, hyp_lengths, n), return_counts=True)
+        ref_ngrams, ref_counts = np.unique(_ngram_keys(ref_ids, ref_lengths, n), return_counts=True)
+        common, hyp_idx, ref_idx = np.intersect1d(hyp_ngrams, ref_ngrams, assume_unique=True, return_indices=True)
+        rows = np.ascontiguousarray(common).view(np.int64).reshape(-1, n + 1)[:, 0]
+        clipped = np.minimum(hyp_counts[hyp_idx], ref_counts[ref_idx])
+        stats[:, n - 1] = np.bincount(rows, weights=clipped, minlength=batch_size)
+        stats[:, max_order + n - 1] = np.maximum(hyp_lengths - n + 1, 0)
+    stats[:, 2 * max_order] = hyp_lengths
+    stats[:, 2 * max_order + 1] = ref_lengths
+    return stats
+
+
+def bleu_from_statistics(stats, smooth_method='exp'):
+    """Computes corpus BLEU from statistics returned by bleu_statistics.
+
+    Args:
+        stats: statistics of a single sentence, or of several sentences (one row each), which are summed
+        smooth_method: smoothing method, see sacrebleu.compute_bleu
+
+    Returns:
+        BLEU namedtuple of sacrebleu, `score` being the BLEU score (100-based)
+    """
+    stats = np.asarray(stats, dtype=np.int64)
+    if stats.ndim == 2:
+        stats = stats.sum(axis=0)
+    max_order = NGRAM_ORDER
+    return compute_bleu(
+        stats[:max_order].tolist(),
+        stats[max_order : 2 * max_order].tolist(),
+        int(stats[2 * max_order]),
+        int(stats[2 * max_order + 1]),
+        smooth_method=smooth_method,
+    )
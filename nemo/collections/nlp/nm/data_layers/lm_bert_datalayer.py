@@ -15,15 +15,12 @@
 # =============================================================================
 
 import os
-import random
 
-import h5py
-import numpy as np
 import torch
 from torch.utils import data as pt_data
 
 from nemo.backends.pytorch import DataLayerNM
-from nemo.collections.nlp.data import BertPretrainingDataset, BertPretrainingPreprocessedDataset
+from nemo.collections.nlp.data import BertPretrainingDataset, BertPretrainingPreprocessedShardedDataset
 from nemo.collections.nlp.nm.data_layers.text_datalayer import TextDataLayer
 from nemo.core import ChannelType, LabelsType, MaskType, NeuralType
 from nemo.utils.decorators import add_port_docs
@@ -45,6 +42,10 @@ class BertPretrainingDataLayer(TextDataLayer):
             shorter than the maximum length.
             Defaults to 0.1.
         shuffle (bool): whether to shuffle data or not. Default: False.
+        use_mmap_corpus (bool): whether to read token ids from a pre-tokenized, memory-mapped corpus, compiled on
+            first use, instead of tokenizing the text on the fly. Default: False.
+        tokenized_corpus_prefix (str): path prefix of the pre-tokenized corpus files. Only used if use_mmap_corpus
+            is True. Defaults to "<data dir>/<dataset name>_tokenized_<tokenizer fingerprint>".
     """
 
     @property
@@ -71,7 +72,16 @@ class BertPretrainingDataLayer(TextDataLayer):
         }
 
     def __init__(
-        self, tokenizer, dataset, max_seq_length, mask_probability, short_seq_prob=0.1, batch_size=64, shuffle=False
+        self,
+        tokenizer,
+        dataset,
+        max_seq_length,
+        mask_probability,
+        short_seq_prob=0.1,
+        batch_size=64,
+        shuffle=False,
+        use_mmap_corpus=False,
+        tokenized_corpus_prefix=None,
     ):
         dataset_params = {
             'tokenizer': tokenizer,
@@ -79,6 +89,8 @@ class BertPretrainingDataLayer(TextDataLayer):
             'max_seq_length': max_seq_length,
             'mask_probability': mask_probability,
             'short_seq_prob': short_seq_prob,
+            'use_mmap_corpus': use_mmap_corpus,
+            'tokenized_corpus_prefix': tokenized_corpus_prefix,
         }
         super().__init__(BertPretrainingDataset, dataset_params, batch_size, shuffle=shuffle)
 
@@ -92,6 +104,10 @@ class BertPretrainingPreprocessedDataLayer(DataLayerNM):
         max_seq_length (int): maximum allowed length of the text segments
         batch_size (int): batch size in segments
         mode (str): model execution mode, e.g. "training"
+        num_workers (int): number of data loader workers. Default: 0.
+        chunk_size (int): number of contiguous rows read from a file at once. Default: 8192.
+        prefetch (bool): read the next chunk in a background thread. Default: True.
+        seed (int): seed for shuffling, must be the same on all workers. Default: 0.
     """
 
     @property
@@ -118,7 +134,7 @@ class BertPretrainingPreprocessedDataLayer(DataLayerNM):
         }
 
     def __init__(
-        self, dataset, max_pred_length, mode, batch_size=64,
+        self, dataset, max_pred_length, mode, batch_size=64, num_workers=0, chunk_size=8192, prefetch=True, seed=0,
     ):
         super().__init__()
         if os.path.isdir(dataset):
@@ -132,28 +148,19 @@ class BertPretrainingPreprocessedDataLayer(DataLayerNM):
         self._batch_size = batch_size
         self.max_pred_length = max_pred_length
         self.mode = mode
-        total_length = 0
-        for f in self.files:
-            fp = h5py.File(f, 'r')
-            total_length += len(fp['input_ids'])
-            fp.close()
-        self.total_length = total_length
+        self._num_workers = num_workers
+        self._sharded_dataset = BertPretrainingPreprocessedShardedDataset(
+            input_files=self.files,
+            max_pred_length=max_pred_length,
+            shuffle=mode == "train",
+            chunk_size=chunk_size,
+            prefetch=prefetch,
+            seed=seed,
+        )
+        self.total_length = len(self._sharded_dataset)
 
     def _collate_fn(self, x):
-        num_components = len(x[0])
-        components = [[] for _ in range(num_components)]
-        batch_size = len(x)
-        for i in range(batch_size):
-            for j in range(num_components):
-                components[j].append(x[i][j])
-        src_ids, src_segment_ids, src_mask, tgt_ids, tgt_mask, sent_ids = [np.stack(x, axis=0) for x in components]
-        src_ids = torch.Tensor(src_ids).long().to(self._device)
-        src_segment_ids = torch.Tensor(src_segment_ids).long().to(self._device)
-        src_mask = torch.Tensor(src_mask).long().to(self._device)
-        tgt_ids = torch.Tensor(tgt_ids).long().to(self._device)
-        tgt_mask = torch.Tensor(tgt_mask).long().to(self._device)
-        sent_ids = torch.Tensor(sent_ids).long().to(self._device)
-        return src_ids, src_segment_ids, src_mask, tgt_ids, tgt_mask, sent_ids
+        return tuple(torch.from_numpy(t) for t in self._sharded_dataset.collate_fn(x))
 
     def __len__(self):
         return self.total_length
@@ -164,23 +171,20 @@ class BertPretrainingPreprocessedDataLayer(DataLayerNM):
 
     @property
     def data_iterator(self):
+        # Chunks of the training shards are distributed over ranks, for evaluation every rank reads all data
+        if self.mode == "train" and torch.distributed.is_available() and torch.distributed.is_initialized():
+            self._sharded_dataset.set_rank(torch.distributed.get_rank(), torch.distributed.get_world_size())
+        dataloader = pt_data.DataLoader(
+            dataset=self._sharded_dataset,
+            batch_size=self._batch_size,
+            collate_fn=self._collate_fn,
+            num_workers=self._num_workers,
+        )
+        epoch = 0
         while True:
-            if self.mode == "train":
-                random.shuffle(self.files)
-            for f_id in range(self.num_files):
-                data_file = self.files[f_id]
-                train_data = BertPretrainingPreprocessedDataset(
-                    input_file=data_file, max_pred_length=self.max_pred_length
-                )
-                train_sampler = pt_data.RandomSampler(train_data)
-                train_dataloader = pt_data.DataLoader(
-                    dataset=train_data,
-                    batch_size=self._batch_size,
-                    collate_fn=self._collate_fn,
-                    shuffle=False,
-                    sampler=train_sampler,
-                )
-                for x in train_dataloader:
-                    yield x
+            self._sharded_dataset.set_epoch(epoch)
+            for x in dataloader:
+                yield x
             if self.mode != "train":
                 break
+            epoch += 1
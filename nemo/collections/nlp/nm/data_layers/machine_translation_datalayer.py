@@ -43,7 +43,9 @@ class TranslationDataLayer(TextDataLayer):
             the same tokens in src and tgt, etc; useful for training data layer
             and should not be used in evaluation data layer
         dataset_type (Dataset):
-                the underlying dataset. Default: TranslationDataset
+                the underlying dataset. Default: TranslationDataset;
+                TokenBucketTranslationDataset keeps token ids memory-mapped
+                and pads batches on the fly, for large corpora
     """
 
     @property
@@ -21,6 +21,7 @@ import torch
 import torch.nn as nn
 
 from nemo.collections.nlp.nm.trainables.common.transformer.transformer_modules import (
+    AttentionCache,
     MultiHeadAttention,
     PositionWiseFF,
 )
@@ -67,10 +68,23 @@ class TransformerDecoderBlock(nn.Module):
         self.third_sub_layer = PositionWiseFF(hidden_size, inner_size, ffn_dropout, hidden_act)
         self.use_full_attention = use_full_attention
 
-    def forward(self, decoder_query, decoder_mask, decoder_keys, encoder_states, encoder_mask):
-        self_attn_output = self.first_sub_layer(decoder_query, decoder_keys, decoder_keys, decoder_mask)
+    def forward(
+        self,
+        decoder_query,
+        decoder_mask,
+        decoder_keys,
+        encoder_states,
+        encoder_mask,
+        self_attn_cache=None,
+        enc_dec_attn_cache=None,
+    ):
+        self_attn_output = self.first_sub_layer(
+            decoder_query, decoder_keys, decoder_keys, decoder_mask, cache=self_attn_cache
+        )
         enc_dec_attn_output = (
-            self.second_sub_layer(self_attn_output, encoder_states, encoder_states, encoder_mask)
+            self.second_sub_layer(
+                self_attn_output, encoder_states, encoder_states, encoder_mask, cache=enc_dec_attn_cache
+            )
             if self.use_full_attention
             else self_attn_output
         )
@@ -78,6 +92,43 @@ class TransformerDecoderBlock(nn.Module):
         return output_states
 
 
+class TransformerDecoderCache(object):
+    """
+    Projected attention keys and values of all layers of TransformerDecoder
+    for incremental decoding: self-attention keys and values of all decoded
+    positions, and encoder-decoder attention keys and values, which are
+    computed once per source.
+
+    Args:
+        num_layers: number of decoder layers
+        max_length: number of positions to preallocate self-attention
+            buffers for
+    """
+
+    def __init__(self, num_layers, max_length):
+        self.self_attn = [AttentionCache(max_length) for _ in range(num_layers)]
+        self.enc_dec_attn = [AttentionCache() for _ in range(num_layers)]
+
+    @property
+    def length(self):
+        """Number of decoded positions cached."""
+        return self.self_attn[0].length
+
+    def expand(self, beam_size):
+        """Repeats every batch element beam_size times, e.g. for the
+        hypotheses of beam search."""
+        for cache in self.self_attn + self.enc_dec_attn:
+            cache.expand(beam_size)
+
+    def reorder(self, indices):
+        """Selects hypotheses kept by beam search by index along the batch
+        dimension. Encoder-decoder attention keys and values are the same for
+        all hypotheses of a source and are left as they are, so indices must
+        only select among the hypotheses of the same source."""
+        for cache in self.self_attn:
+            cache.reorder(indices)
+
+
 class TransformerDecoder(nn.Module):
     def __init__(self, num_layers, hidden_size, **kwargs):
         super().__init__()
@@ -85,6 +136,11 @@ class TransformerDecoder(nn.Module):
         layer = TransformerDecoderBlock(hidden_size, **kwargs)
         self.layers = nn.ModuleList([copy.deepcopy(layer) for _ in range(num_layers)])
 
+    def init_cache(self, max_length):
+        """Returns an empty TransformerDecoderCache for incremental decoding
+        of up to max_length positions (buffers grow if needed)."""
+        return TransformerDecoderCache(len(self.layers), max_length)
+
     def _get_memory_states(self, decoder_states, decoder_mems_list=None, i=0):
         if decoder_mems_list is not None:
             memory_states = torch.cat((decoder_mems_list[i], decoder_states), dim=1)
@@ -93,7 +149,14 @@ class TransformerDecoder(nn.Module):
         return memory_states
 
     def forward(
-        self, decoder_states, decoder_mask, encoder_states, encoder_mask, decoder_mems_list=None, return_mems=False
+        self,
+        decoder_states,
+        decoder_mask,
+        encoder_states,
+        encoder_mask,
+        decoder_mems_list=None,
+        return_mems=False,
+        cache=None,
     ):
         """
         Args:
@@ -106,8 +169,15 @@ class TransformerDecoder(nn.Module):
                 of decoder_states as keys and values if not None
             return_mems: bool, whether to return outputs of all decoder layers
                 or the last layer only
+            cache: TransformerDecoderCache (see init_cache) for incremental
+                decoding, an alternative to decoder_mems_list; projected keys
+                and values of decoder_states are appended to it, and outputs
+                are returned for the positions of decoder_states only
         """
 
+        if cache is not None and decoder_mems_list is not None:
+            raise ValueError("decoder_mems_list and cache can not be used together")
+
         decoder_attn_mask = form_attention_mask(decoder_mask, diagonal=0)
         encoder_attn_mask = form_attention_mask(encoder_mask)
 
@@ -115,7 +185,10 @@ class TransformerDecoder(nn.Module):
         cached_mems_list = [memory_states]
 
         for i, layer in enumerate(self.layers):
-            decoder_states = layer(decoder_states, decoder_attn_mask, memory_states, encoder_states, encoder_attn_mask)
+            layer_caches = (cache.self_attn[i], cache.enc_dec_attn[i]) if cache is not None else (None, None)
+            decoder_states = layer(
+                decoder_states, decoder_attn_mask, memory_states, encoder_states, encoder_attn_mask, *layer_caches
+            )
             memory_states = self._get_memory_states(decoder_states, decoder_mems_list, i + 1)
             cached_mems_list.append(memory_states)
 
@@ -42,6 +42,10 @@ class GreedySequenceGenerator(nn.Module):
             source sequences plus max_delta_length
         batch_size: size of the batch of generated sequences if neither
             source nor target starting sequences are provided
+        use_kv_cache: if True, projected attention keys and values of
+            generated tokens (and of the encoder states) are cached in the
+            decoder, which must provide init_cache as TransformerDecoder does,
+            instead of passing hidden states of all layers between steps
     """
 
     def __init__(
@@ -55,6 +59,7 @@ class GreedySequenceGenerator(nn.Module):
         max_sequence_length=512,
         max_delta_length=20,
         batch_size=1,
+        use_kv_cache=False,
     ):
         super().__init__()
         self.embedding = embedding
@@ -64,6 +69,7 @@ class GreedySequenceGenerator(nn.Module):
         self.max_seq_length = max_sequence_length
         self.max_delta_len = max_delta_length
         self.batch_size = batch_size
+        self.use_kv_cache = use_kv_cache
         self.device = next(self.decoder.parameters()).device
 
     @torch.no_grad()
@@ -86,7 +92,8 @@ class GreedySequenceGenerator(nn.Module):
                 mode (e.g., language modeling)
             encoder_input_mask: input mask used in the encoder
             decoder_mems_list: list of size num_layers with cached activations
-                of sequence (x[1], ..., x[k-1]) for fast generation of x[k]
+                of sequence (x[1], ..., x[k-1]) for fast generation of x[k];
+                with use_kv_cache, the decoder cache, which is updated in place
             pos: starting position in positional encoding
         """
 
@@ -94,6 +101,17 @@ class GreedySequenceGenerator(nn.Module):
         decoder_input_mask = mask_padded_tokens(decoder_input_ids, self.pad).float()
         # TODO: make sure float() work with mixed precision
 
+        if self.use_kv_cache:
+            decoder_hidden_states = self.decoder.forward(
+                decoder_hidden_states,
+                decoder_input_mask,
+                encoder_hidden_states,
+                encoder_input_mask,
+                cache=decoder_mems_list,
+            )
+            log_probs = self.log_softmax.forward(decoder_hidden_states)
+            return log_probs, decoder_mems_list
+
         if encoder_hidden_states is not None:
             decoder_mems_list = self.decoder.forward(
                 decoder_hidden_states,
@@ -137,6 +155,13 @@ class GreedySequenceGenerator(nn.Module):
 
         return tgt, batch_size, max_generation_length
 
+    def _init_decoder_mems(self, max_length):
+        """
+        Returns the initial decoder_mems_list: an empty decoder cache for
+        max_length positions with use_kv_cache, None (nothing cached) otherwise.
+        """
+        return self.decoder.init_cache(max_length) if self.use_kv_cache else None
+
     def forward(self, decoder_input_ids=None, encoder_hidden_states=None, encoder_input_mask=None):
 
         tgt, batch_size, max_generation_length = self._prepare_for_search(decoder_input_ids, encoder_hidden_states)
@@ -145,7 +170,7 @@ class GreedySequenceGenerator(nn.Module):
         # everything after <eos> with <pad> token
         pad_profile = torch.zeros(batch_size, 1).long().to(self.device)
 
-        decoder_mems_list = None
+        decoder_mems_list = self._init_decoder_mems(max_generation_length)
         for i in range(max_generation_length):
 
             log_probs, decoder_mems_list = self._forward(
@@ -236,14 +261,22 @@ class BeamSearchSequenceGenerator(GreedySequenceGenerator):
         tgt, batch_size, max_generation_length = self._prepare_for_search(decoder_input_ids, encoder_hidden_states)
 
         # generate initial buffer of beam_size prefixes-hypotheses
-        log_probs, decoder_mems_list = self._forward(tgt, encoder_hidden_states, encoder_input_mask, None, 0)
+        decoder_mems_list = self._init_decoder_mems(tgt.size(1) + 1 + max_generation_length)
+        log_probs, decoder_mems_list = self._forward(
+            tgt, encoder_hidden_states, encoder_input_mask, decoder_mems_list, 0
+        )
         scores, prefixes = torch.topk(log_probs.permute(0, 2, 1), self.beam_size, dim=1)
         scores, prefixes = scores.view(-1, 1), prefixes.view(-1, 1)
 
-        # repeat init target prefixes and cached memory states beam_size times
+        # repeat init target prefixes and cached memory states beam_size times,
+        # hypotheses of every batch element are kept next to each other
         prefixes = torch.cat((tgt.repeat(1, self.beam_size).view(-1, 1), prefixes), dim=1)
-        for j in range(len(decoder_mems_list)):
-            decoder_mems_list[j] = decoder_mems_list[j].repeat(self.beam_size, 1, 1)
+        batch_ids = torch.arange(batch_size, device=tgt.device)
+        if self.use_kv_cache:
+            decoder_mems_list.expand(self.beam_size)
+        else:
+            for j in range(len(decoder_mems_list)):
+                decoder_mems_list[j] = decoder_mems_list[j].repeat_interleave(self.beam_size, dim=0)
 
         # repeat source sequence beam_size times for beam search
         if encoder_hidden_states is not None:
@@ -252,7 +285,7 @@ class BeamSearchSequenceGenerator(GreedySequenceGenerator):
             encoder_hidden_states = encoder_hidden_states.repeat(1, self.beam_size, 1).view(
                 -1, src_length, hidden_size
             )
-        else:
+        elif not self.use_kv_cache:
             hidden_size = decoder_mems_list[0].size(2)
 
         # pad_profile tracks finished hypotheses to generate only <pad> tokens
@@ -299,14 +332,19 @@ class BeamSearchSequenceGenerator(GreedySequenceGenerator):
 
             # reshuffle cached decoder memory states to restore the order
             # of hypotheses broken after top-k selection
-            mems_ids = indices_i.unsqueeze(2).unsqueeze(3).repeat(1, 1, p_len - 1, hidden_size) // self.beam_size
-            for j in range(len(decoder_mems_list)):
-                decoder_mems_list[j] = (
-                    decoder_mems_list[j]
-                    .view(-1, self.beam_size, p_len - 1, hidden_size)
-                    .gather(1, mems_ids)
-                    .view(-1, p_len - 1, hidden_size)
-                )
+            if self.use_kv_cache:
+                hypotheses_ids = indices_i // self.beam_size + batch_ids.unsqueeze(1) * self.beam_size
+                decoder_mems_list.reorder(hypotheses_ids.view(-1))
+            else:
+                mems_ids = indices_i.unsqueeze(2).unsqueeze(3).repeat(1, 1, p_len - 1, hidden_size)
+                mems_ids = mems_ids // self.beam_size
+                for j in range(len(decoder_mems_list)):
+                    decoder_mems_list[j] = (
+                        decoder_mems_list[j]
+                        .view(-1, self.beam_size, p_len - 1, hidden_size)
+                        .gather(1, mems_ids)
+                        .view(-1, p_len - 1, hidden_size)
+                    )
 
             # update prefixes_len and pad_profile
             not_eos_pad = prefixes.ne(self.eos) & prefixes.ne(self.pad)
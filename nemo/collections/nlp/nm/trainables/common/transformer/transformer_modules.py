@@ -121,6 +121,75 @@ class TransformerEmbedding(nn.Module):
         return embeddings
 
 
+class AttentionCache(object):
+    """
+    Projected keys and values of a multi-head attention layer cached for
+    incremental decoding, in the (B x num_heads x L x head_size) layout used
+    by MultiHeadAttention.
+
+    Args:
+        max_length: number of positions preallocated for keys and values which
+            are appended step by step (self-attention); buffers grow if needed.
+            If None, keys and values are computed once and kept as they are
+            (attention to encoder states).
+    """
+
+    def __init__(self, max_length=None):
+        self.max_length = max_length
+        self.length = 0
+        self.key = None
+        self.value = None
+
+    @property
+    def is_static(self):
+        return self.max_length is None
+
+    def update(self, key, value):
+        """Stores keys and values of new positions and returns keys and values
+        of all positions so far."""
+        if self.is_static:
+            self.key, self.value = key, value
+            self.length = key.size(2)
+            return key, value
+
+        new_length = self.length + key.size(2)
+        if self.key is None or new_length > self.key.size(2):
+            capacity = max(new_length, self.max_length, 2 * self.length)
+            self.key = self._allocate(self.key, key, capacity)
+            self.value = self._allocate(self.value, value, capacity)
+        self.key[:, :, self.length : new_length] = key
+        self.value[:, :, self.length : new_length] = value
+        self.length = new_length
+        return self.key[:, :, :new_length], self.value[:, :, :new_length]
+
+    def _allocate(self, buffer, x, capacity):
+        new_buffer = x.new_empty(x.size(0), x.size(1), capacity, x.size(3))
+        if self.length > 0:
+            new_buffer[:, :, : self.length] = buffer[:, :, : self.length]
+        return new_buffer
+
+    def expand(self, beam_size):
+        """Repeats every batch element beam_size times, e.g. for the
+        hypotheses of beam search."""
+        if self.key is None:
+            return
+        self.key = self.key.repeat_interleave(beam_size, dim=0)
+        self.value = self.value.repeat_interleave(beam_size, dim=0)
+
+    def reorder(self, indices):
+        """Selects (and possibly repeats) batch elements, e.g. hypotheses kept
+        by beam search, by index along the batch dimension."""
+        if self.key is None:
+            return
+        if not self.is_static and indices.size(0) == self.key.size(0):
+            # only the filled positions of the buffers need to be reordered
+            self.key[:, :, : self.length] = self.key[:, :, : self.length].index_select(0, indices)
+            self.value[:, :, : self.length] = self.value[:, :, : self.length].index_select(0, indices)
+        else:
+            self.key = self.key.index_select(0, indices)
+            self.value = self.value.index_select(0, indices)
+
+
 class MultiHeadAttention(nn.Module):
     """
     Multi-head scaled dot-product attention layer.
@@ -159,17 +228,27 @@ class MultiHeadAttention(nn.Module):
         x = x.view(*new_x_shape)
         return x.permute(0, 2, 1, 3)
 
-    def forward(self, queries, keys, values, attention_mask):
+    def forward(self, queries, keys, values, attention_mask, cache=None):
+        """
+        Args:
+            cache: optional AttentionCache for incremental decoding. Projections
+                of keys and values are appended to it (or, for a static cache
+                which is already filled, taken from it without projecting keys
+                and values again), and queries attend to all cached positions.
+        """
 
         # attention_mask is needed to hide the tokens which correspond to [PAD]
         # in the case of BERT, or to hide the future tokens in the case of
         # vanilla language modeling and translation
         query = self.query_net(queries)
-        key = self.key_net(keys)
-        value = self.value_net(values)
         query = self.transpose_for_scores(query) / self.attn_scale
-        key = self.transpose_for_scores(key) / self.attn_scale
-        value = self.transpose_for_scores(value)
+        if cache is not None and cache.is_static and cache.key is not None:
+            key, value = cache.key, cache.value
+        else:
+            key = self.transpose_for_scores(self.key_net(keys)) / self.attn_scale
+            value = self.transpose_for_scores(self.value_net(values))
+            if cache is not None:
+                key, value = cache.update(key, value)
 
         # for numerical stability we pre-divide query and key by sqrt(sqrt(d))
         # and perform attention probs computation in float32
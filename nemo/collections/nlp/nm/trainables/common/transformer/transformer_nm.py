@@ -290,6 +290,8 @@ class BeamSearchTranslatorNM(TrainableNM):
         max_delta_length: maximum allowed difference between generated output
             and input sequence in case of conditional decoding
         length_penalty: parameter which penalizes shorter sequences
+        use_kv_cache: whether to cache projected attention keys and values
+            between decoding steps instead of decoder hidden states
     """
 
     @property
@@ -328,6 +330,7 @@ class BeamSearchTranslatorNM(TrainableNM):
         beam_size=4,
         max_delta_length=50,
         length_penalty=0,
+        use_kv_cache=True,
     ):
         super().__init__()
 
@@ -343,6 +346,7 @@ class BeamSearchTranslatorNM(TrainableNM):
             batch_size=batch_size,
             beam_size=beam_size,
             len_pen=length_penalty,
+            use_kv_cache=use_kv_cache,
         )
 
     def forward(self, hidden_states_src, input_mask_src):
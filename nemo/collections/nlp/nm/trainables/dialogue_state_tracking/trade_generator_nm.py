@@ -62,6 +62,11 @@ class TRADEGenerator(TrainableNM):
         slots (list): list of slots
         nb_gate (int): number of gates
         teacher_forcing (float): 0.5
+        max_res_len (int): maximum length of the generated slot values when targets are not provided
+        inference_mode (bool): if True, the generator decodes greedily and returns the predicted token ids and
+            their probabilities instead of the distributions over the vocabulary. The encoder outputs are
+            shared by all slots and the slots stop decoding once they emit EOS, which reduces the memory and
+            compute needed for evaluation. Targets, if provided, only set the number of decoding steps.
     """
 
     @property
@@ -83,15 +88,35 @@ class TRADEGenerator(TrainableNM):
         """Returns definitions of module output ports.
 
         point_outputs: outputs of the generator
+        point_ids: predicted token ids of the generator, returned instead of point_outputs in inference mode
+        point_probs: probabilities of point_ids, padding after EOS has zero probability
         gate_outputs: outputs of gating heads
         """
+        if self._inference_mode:
+            return {
+                'point_ids': NeuralType(('B', 'D', 'T'), PredictionsType()),
+                'point_probs': NeuralType(('B', 'D', 'T'), ChannelType()),
+                'gate_outputs': NeuralType(('B', 'D', 'D'), LogitsType()),
+            }
         return {
             'point_outputs': NeuralType(('B', 'T', 'D', 'D'), LogitsType()),
             'gate_outputs': NeuralType(('B', 'D', 'D'), LogitsType()),
         }
 
-    def __init__(self, vocab, embeddings, hid_size, dropout, slots, nb_gate, teacher_forcing=0.5, max_res_len=10):
+    def __init__(
+        self,
+        vocab,
+        embeddings,
+        hid_size,
+        dropout,
+        slots,
+        nb_gate,
+        teacher_forcing=0.5,
+        max_res_len=10,
+        inference_mode=False,
+    ):
         super().__init__()
+        self._inference_mode = inference_mode
         self.vocab_size = len(vocab)
         self.vocab = vocab
         self.embedding = embeddings
@@ -123,6 +148,10 @@ class TRADEGenerator(TrainableNM):
         self.subslot_idx = torch.tensor([self.slot_w2i[slot] for slot in slots], device=self._device)
 
     def forward(self, encoder_hidden, encoder_outputs, dialog_ids, dialog_lens, targets=None):
+        if self._inference_mode:
+            max_res_len = targets.shape[2] if isinstance(targets, torch.Tensor) else self.max_res_len
+            return self.decode(encoder_hidden, encoder_outputs, dialog_ids, dialog_lens, max_res_len)
+
         if (not self.training) or (random.random() > self.teacher_forcing):
             use_teacher_forcing = False
         else:
@@ -191,6 +220,109 @@ class TRADEGenerator(TrainableNM):
         all_gate_outputs = all_gate_outputs.transpose(0, 1).contiguous()
         return all_point_outputs, all_gate_outputs
 
+    def decode(self, encoder_hidden, encoder_outputs, dialog_ids, dialog_lens, max_res_len):
+        """
+        Greedy decoding of the values of all slots.
+
+        Decodes the same slot x batch rows as forward without teacher forcing, but keeps only the rows which
+        have not emitted EOS yet in the active set and attends to the encoder outputs of a batch element
+        from all its slots at once instead of repeating them for every slot.
+
+        Args:
+            encoder_hidden (Tensor): hidden states of the encoder [batch, time, hidden]
+            encoder_outputs (Tensor): outputs of the encoder [batch, time, hidden]
+            dialog_ids (Tensor): token ids of the dialogue history [batch, time]
+            dialog_lens (Tensor): lengths of the dialogue history [batch]
+            max_res_len (int): maximum number of decoding steps
+        Returns:
+            point_ids (Tensor): predicted token ids [batch, slots, max_res_len], padded with vocab.pad_id after EOS
+            point_probs (Tensor): probabilities of the predicted tokens [batch, slots, max_res_len]
+            gate_outputs (Tensor): outputs of gating heads [batch, slots, nb_gate]
+        """
+        num_slots = len(self.slots)
+        batch_size = encoder_hidden.shape[0]
+        maxlen = encoder_outputs.size(1)
+
+        # rows of the decoder are ordered by slot as in forward, row = slot * batch_size + batch index
+        rows = torch.arange(num_slots * batch_size, device=self._device)
+        point_ids = torch.full(
+            (num_slots * batch_size, max_res_len), self.vocab.pad_id, dtype=torch.long, device=self._device
+        )
+        point_probs = torch.zeros(num_slots * batch_size, max_res_len, device=self._device)
+
+        slot_emb = self.slot_emb(self.domain_idx) + self.slot_emb(self.subslot_idx)
+        decoder_input = self.dropout(slot_emb.unsqueeze(1).expand(-1, batch_size, -1)).reshape(-1, self.hidden_size)
+        hidden = encoder_hidden[:, 0, :].repeat(num_slots, 1)
+
+        padding_mask_bool = ~(torch.arange(maxlen, device=self._device)[None, :] <= dialog_lens[:, None])
+        padding_mask = torch.zeros_like(padding_mask_bool, dtype=encoder_outputs.dtype, device=self._device)
+        padding_mask.masked_fill_(mask=padding_mask_bool, value=-np.inf)
+
+        for wi in range(max_res_len):
+            dec_state, hidden = self.rnn(decoder_input.unsqueeze(1), hidden.unsqueeze(0))
+            hidden = hidden.squeeze(0)
+
+            batch_idx = rows % batch_size
+            context_vec, prob = TRADEGenerator.attend_shared(
+                encoder_outputs, hidden, padding_mask, batch_idx, rows // batch_size, num_slots
+            )
+
+            if wi == 0:
+                gate_outputs = self.w_gate(context_vec).view(num_slots, batch_size, self.nb_gate)
+
+            p_vocab = TRADEGenerator.attend_vocab(self.embedding.weight, hidden)
+            p_gen_vec = torch.cat([dec_state.squeeze(1), context_vec, decoder_input], -1)
+            vocab_pointer_switches = self.sigmoid(self.w_ratio(p_gen_vec))
+            p_context_ptr = torch.zeros(p_vocab.size(), device=self._device)
+            p_context_ptr.scatter_add_(1, dialog_ids[batch_idx], prob)
+
+            final_p_vocab = (1 - vocab_pointer_switches) * p_context_ptr + vocab_pointer_switches * p_vocab
+            pred_word = torch.argmax(final_p_vocab, dim=1)
+            point_ids[rows, wi] = pred_word
+            point_probs[rows, wi] = final_p_vocab.gather(1, pred_word.unsqueeze(1)).squeeze(1)
+
+            # rows which emitted EOS are done decoding
+            active = pred_word != self.vocab.eos_id
+            if not active.any():
+                break
+            if not active.all():
+                rows, hidden, pred_word = rows[active], hidden[active], pred_word[active]
+            decoder_input = self.embedding(pred_word).to(self._device)
+
+        point_ids = point_ids.view(num_slots, batch_size, max_res_len).transpose(0, 1).contiguous()
+        point_probs = point_probs.view(num_slots, batch_size, max_res_len).transpose(0, 1).contiguous()
+        gate_outputs = gate_outputs.transpose(0, 1).contiguous()
+        return point_ids, point_probs, gate_outputs
+
+    @staticmethod
+    def attend_shared(seq, cond, padding_mask, batch_idx, slot_idx, num_slots):
+        """
+        Attention of decoder rows to the encoder outputs of their batch elements.
+
+        The rows are scattered into a [batch, slots, hidden] query so that all the slots of a batch element
+        attend to its encoder outputs with a single batched matrix product, without repeating them per row.
+
+        Args:
+            seq (Tensor): encoder outputs [batch, time, hidden]
+            cond (Tensor): queries of the rows [rows, hidden]
+            padding_mask (Tensor): additive mask of the encoder outputs [batch, time]
+            batch_idx (Tensor): batch element of each row [rows]
+            slot_idx (Tensor): slot of each row [rows]
+            num_slots (int): number of slots
+        Returns:
+            context (Tensor): attention context of each row [rows, hidden]
+            scores (Tensor): attention probabilities of each row [rows, time]
+        """
+        batch_size, maxlen, hidden_size = seq.shape
+        query = cond.new_zeros(batch_size, num_slots, hidden_size)
+        query[batch_idx, slot_idx] = cond
+        scores_ = torch.bmm(query, seq.transpose(1, 2))[batch_idx, slot_idx] + padding_mask[batch_idx]
+        scores = F.softmax(scores_, dim=1)
+        weights = scores.new_zeros(batch_size, num_slots, maxlen)
+        weights[batch_idx, slot_idx] = scores
+        context = torch.bmm(weights, seq)[batch_idx, slot_idx]
+        return context, scores
+
     @staticmethod
     def attend(seq, cond, padding_mask):
         scores_ = cond.unsqueeze(1).expand_as(seq).mul(seq).sum(2)
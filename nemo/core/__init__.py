@@ -16,6 +16,7 @@
 # limitations under the License.
 
 from nemo.core.callbacks import *
+from nemo.core.inference_sinks import *
 from nemo.core.module_decorators import *
 from nemo.core.nemo_model import NeMoModel
 from nemo.core.neural_factory import *
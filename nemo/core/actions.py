@@ -248,6 +248,7 @@ class Actions(ABC):
         lr_policy=None,
         batches_per_step=None,
         stop_on_nan_loss=False,
+        defer_nan_check=False,
     ):
         """This action executes training and (optionally) evaluation.
 
@@ -266,6 +267,11 @@ class Actions(ABC):
             stop_on_nan_loss: (default: False) If set to True, the training
                 will stop if loss=nan or inf. If set to False, the training
                 will continue.
+            defer_nan_check: (default: False) If set to True, NaN/inf losses
+                are accumulated in a device-side flag over all mini-batches of
+                a step, which is synced (and reduced across workers) once per
+                optimizer step instead of once per mini-batch. A step with a
+                NaN/inf loss in any of its mini-batches is skipped as a whole.
 
         Returns:
             None
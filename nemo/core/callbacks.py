@@ -31,7 +31,9 @@
 #     "on_step_end",
 # ]
 
+import collections
 import glob
+import json
 import os
 import time
 from abc import ABC
@@ -550,3 +552,333 @@ class CheckpointCallback(NeMoCallback):
         epoch = state["epoch"]
         if self._epoch_freq > 0 and epoch % self._epoch_freq == 0 and epoch > 0:
             self.__save_to(self._folder, state)
+
+
+class StepTimeProfiler(NeMoCallback):
+    """A callback that breaks down where the time of a training step goes. On every step_freq-th step it records:
+
+        "data_wait": time blocked waiting for the next batch of the data loader
+        "forward/<module>" and "backward/<module>": wall time spent in each neural module (measured with forward
+            hooks and gradient hooks on module outputs)
+        "cuda_forward/<module>" and "cuda_backward/<module>": the same measured with CUDA events, if modules run on
+            a GPU and use_cuda_events is set
+        "compute": time between the batch start and the batch end callbacks (forward, loss and backward)
+        "optimizer": time spent in optimizer.step()
+        "callbacks": time spent in all (including deprecated) callbacks
+        "step": total wall time of the step
+
+    All times are in milliseconds and are aggregated over sampled steps into rolling percentiles which are emitted to
+    the logger and, optionally, tensorboard. Sampled steps can also be written to a Chrome trace JSON file (open it
+    with chrome://tracing). Module hooks are only installed during sampled steps, so overhead is negligible for
+    other steps.
+
+    args:
+        step_freq (int): Profile every step_freq-th step. Defaults to 10.
+        window (int): Number of sampled steps the rolling percentiles are computed over. Defaults to 100.
+        log_freq (int): How often (in steps) the percentiles are emitted. Defaults to 100.
+        percentiles (List of int): Percentiles to report. Defaults to [50, 90, 99].
+        tb_writer: Optional tensorboard writer to log percentiles to.
+            Defaults to None.
+        chrome_trace_file (str): Optional path of a Chrome trace JSON file written at the end of training.
+            Defaults to None.
+        use_cuda_events (bool): Whether to additionally time modules with CUDA events. Defaults to True.
+    """
+
+    _STEP_START_HOOKS = ("on_step_start", "on_iteration_start")
+    _STEP_END_HOOKS = ("on_step_end", "on_iteration_end")
+    _HOOKS = (
+        "on_action_start",
+        "on_epoch_start",
+        "on_batch_start",
+        "on_step_start",
+        "on_step_end",
+        "on_batch_end",
+        "on_epoch_end",
+        "on_action_end",
+        # Hooks of deprecated ActionCallbacks
+        "on_iteration_start",
+        "on_iteration_end",
+    )
+
+    def __init__(
+        self,
+        step_freq: int = 10,
+        window: int = 100,
+        log_freq: int = 100,
+        percentiles: List[int] = (50, 90, 99),
+        tb_writer: 'torch.utils.tensorboard.SummaryWriter' = None,
+        chrome_trace_file: str = None,
+        use_cuda_events: bool = True,
+    ):
+        if step_freq < 1:
+            raise ValueError("step_freq must be a positive integer")
+        self._step_freq = step_freq
+        self._window = window
+        self._log_freq = log_freq
+        self._percentiles = list(percentiles)
+        self._tb_writer = tb_writer
+        self._chrome_trace_file = chrome_trace_file
+        self._use_cuda_events = use_cuda_events
+
+        self._windows = {}
+        self._trace_events = []
+        self._patched = []
+        self._modules = []
+        self._module_hook_handles = []
+        self._global_rank = None
+        self._time_origin = None
+        self._last_event_end = None
+        self._in_batch = False
+        self._record = None
+        self._last_emitted_step = None
+        self._action = None
+        self._compute_start = None
+        self._forward_starts = {}
+        self._open_backward = None
+
+    @property
+    def stats(self):
+        """Dictionary mapping every recorded metric to a dictionary of its percentiles (in ms) over the window."""
+        import numpy as np
+
+        return {
+            name: {f"p{q}": float(np.percentile(values, q)) for q in self._percentiles}
+            for name, values in self._windows.items()
+            if values
+        }
+
+    def on_action_start(self, state):
+        import torch
+
+        self._torch = torch
+        self._action = getattr(state, "action", None)
+        self._global_rank = state["global_rank"]
+        self._time_origin = time.perf_counter()
+        self._last_event_end = None
+
+        # Time all callbacks (including this one) and all optimizer steps
+        callbacks = getattr(self._action, "callbacks", None) or [self]
+        for callback in callbacks:
+            for hook_name in self._HOOKS:
+                if hasattr(callback, hook_name):
+                    self._patch(callback, hook_name, self._timed_hook(callback, hook_name))
+        for optimizer in state["optimizers"]:
+            self._patch(optimizer, "step", self._timed_optimizer_step(optimizer.step))
+
+        self._modules = []
+        for module in AppState().modules:
+            if isinstance(module, torch.nn.Module):
+                self._modules.append((module.name, module))
+            elif isinstance(getattr(module, "_pt_module", None), torch.nn.Module):
+                self._modules.append((module.name, module._pt_module))
+
+    def on_action_end(self, state):
+        self._finalize_record()
+        self._emit(state["step"])
+        self._remove_module_hooks()
+        for obj, name, original in reversed(self._patched):
+            if original is None:
+                delattr(obj, name)
+            else:
+                setattr(obj, name, original)
+        self._patched = []
+        if self._chrome_trace_file is not None and (self._global_rank is None or self._global_rank == 0):
+            with open(self._chrome_trace_file, "w") as f:
+                json.dump({"traceEvents": self._trace_events, "displayTimeUnit": "ms"}, f)
+            logging.info(f"Saved Chrome trace of sampled steps to {self._chrome_trace_file}")
+
+    def _patch(self, obj, name, replacement):
+        # Remember the instance attribute (if any) to restore it later
+        self._patched.append((obj, name, obj.__dict__.get(name)))
+        setattr(obj, name, replacement)
+
+    def _timed_hook(self, callback, hook_name):
+        original = getattr(callback, hook_name)
+        event_name = f"{type(callback).__name__}.{hook_name}"
+
+        def timed_hook(*args, **kwargs):
+            # Deprecated ActionCallbacks are called without the state
+            state = args[0] if args else kwargs.get("state")
+            start = time.perf_counter()
+            self._before_event(hook_name, state, start)
+            result = original(*args, **kwargs)
+            end = time.perf_counter()
+            self._add_time("callbacks", start, end, "callbacks", event_name)
+            self._last_event_end = end
+            if hook_name == "on_batch_start":
+                self._compute_start = end
+            return result
+
+        return timed_hook
+
+    def _timed_optimizer_step(self, original):
+        def timed_step(*args, **kwargs):
+            start = time.perf_counter()
+            result = original(*args, **kwargs)
+            end = time.perf_counter()
+            self._add_time("optimizer", start, end, "optimizer", "optimizer.step")
+            self._last_event_end = end
+            return result
+
+        return timed_step
+
+    def _before_event(self, hook_name, state, now):
+        if hook_name in self._STEP_START_HOOKS or hook_name == "on_batch_start":
+            if not self._in_batch:
+                # First event of a new batch: the trainer was waiting for data since the last event
+                self._in_batch = True
+                if hook_name in self._STEP_START_HOOKS:
+                    self._finalize_record()
+                    step = state["step"] if state is not None else self._action.step
+                    if step % self._step_freq == 0:
+                        self._start_record(step)
+                if self._last_event_end is not None:
+                    self._add_time("data_wait", self._last_event_end, now, "data", "data_wait")
+        elif hook_name == "on_batch_end":
+            if self._in_batch and self._record is not None:
+                self._close_backward(now)
+                if self._compute_start is not None:
+                    self._add_time("compute", self._compute_start, now, "compute", "compute")
+            self._in_batch = False
+            self._compute_start = None
+        elif hook_name in self._STEP_END_HOOKS:
+            self._in_batch = False
+            self._remove_module_hooks()
+
+    def _start_record(self, step):
+        self._record = {
+            "step": step,
+            "begin": self._last_event_end if self._last_event_end is not None else time.perf_counter(),
+            "times": {},
+            "cuda_events": [],
+        }
+        self._compute_start = None
+        self._forward_starts = {}
+        self._open_backward = None
+        for name, module in self._modules:
+            self._module_hook_handles.append(module.register_forward_pre_hook(self._forward_pre_hook(name)))
+            self._module_hook_handles.append(module.register_forward_hook(self._forward_hook(name)))
+
+    def _remove_module_hooks(self):
+        for handle in self._module_hook_handles:
+            handle.remove()
+        self._module_hook_handles = []
+
+    def _add_time(self, metric, start, end, category, event_name):
+        if self._record is None:
+            return
+        times = self._record["times"]
+        times[metric] = times.get(metric, 0.0) + (end - start) * 1000.0
+        if self._chrome_trace_file is not None:
+            self._trace_events.append(
+                {
+                    "name": event_name,
+                    "cat": category,
+                    "ph": "X",
+                    "ts": (start - self._time_origin) * 1e6,
+                    "dur": (end - start) * 1e6,
+                    "pid": self._global_rank or 0,
+                    "tid": category,
+                    "args": {"step": self._record["step"]},
+                }
+            )
+
+    def _cuda_event(self, module):
+        if not self._use_cuda_events or not self._torch.cuda.is_available():
+            return None
+        param = next(module.parameters(), None)
+        if param is None or not param.is_cuda:
+            return None
+        event = self._torch.cuda.Event(enable_timing=True)
+        event.record()
+        return event
+
+    def _forward_pre_hook(self, name):
+        def hook(module, inputs):
+            self._forward_starts.setdefault(name, []).append((time.perf_counter(), self._cuda_event(module)))
+
+        return hook
+
+    def _forward_hook(self, name):
+        def hook(module, inputs, outputs):
+            start, start_event = self._forward_starts[name].pop()
+            self._add_time(f"forward/{name}", start, time.perf_counter(), "forward", name)
+            if start_event is not None:
+                self._record["cuda_events"].append((f"cuda_forward/{name}", start_event, self._cuda_event(module)))
+            # The gradient w.r.t. the module output is ready when the module's backward starts
+            output = self._first_tensor_requiring_grad(outputs)
+            if output is not None:
+                output.register_hook(self._backward_start_hook(name, module))
+
+        return hook
+
+    def _backward_start_hook(self, name, module):
+        def hook(grad):
+            # Backward of a module lasts until the backward of the next module starts (or the batch ends)
+            now = time.perf_counter()
+            event = self._cuda_event(module)
+            self._close_backward(now, event)
+            self._open_backward = (name, now, event)
+
+        return hook
+
+    def _close_backward(self, now, event=None):
+        if self._open_backward is None or self._record is None:
+            self._open_backward = None
+            return
+        name, start, start_event = self._open_backward
+        self._add_time(f"backward/{name}", start, now, "backward", name)
+        if start_event is not None:
+            if event is None:
+                event = self._torch.cuda.Event(enable_timing=True)
+                event.record()
+            self._record["cuda_events"].append((f"cuda_backward/{name}", start_event, event))
+        self._open_backward = None
+
+    def _first_tensor_requiring_grad(self, outputs):
+        if isinstance(outputs, self._torch.Tensor):
+            return outputs if outputs.requires_grad else None
+        if isinstance(outputs, dict):
+            outputs = list(outputs.values())
+        if isinstance(outputs, (list, tuple)):
+            for output in outputs:
+                output = self._first_tensor_requiring_grad(output)
+                if output is not None:
+                    return output
+        return None
+
+    def _finalize_record(self):
+        record = self._record
+        if record is None:
+            return
+        self._record = None
+        self._remove_module_hooks()
+        times = record["times"]
+        times["step"] = (self._last_event_end - record["begin"]) * 1000.0
+        if record["cuda_events"]:
+            self._torch.cuda.synchronize()
+            for metric, start_event, end_event in record["cuda_events"]:
+                times[metric] = times.get(metric, 0.0) + start_event.elapsed_time(end_event)
+        for metric, value in times.items():
+            if metric not in self._windows:
+                self._windows[metric] = collections.deque(maxlen=self._window)
+            self._windows[metric].append(value)
+
+        if self._last_emitted_step is None:
+            self._last_emitted_step = record["step"]
+        elif record["step"] - self._last_emitted_step >= self._log_freq:
+            self._emit(record["step"])
+
+    def _emit(self, step):
+        self._last_emitted_step = step
+        if self._global_rank is not None and self._global_rank != 0:
+            return
+        stats = self.stats
+        if not stats:
+            return
+        logging.info(f"Step time breakdown (ms) over the last {self._window} sampled steps at step {step}:")
+        for name in sorted(stats):
+            logging.info("  %s: %s", name, ", ".join(f"{q}={v:.3f}" for q, v in stats[name].items()))
+            if self._tb_writer is not None:
+                for q, v in stats[name].items():
+                    self._tb_writer.add_scalar(f"profile/{name}/{q}", v, step)
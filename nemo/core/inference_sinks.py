@@ -0,0 +1,232 @@
+# ! /usr/bin/python
+# -*- coding: utf-8 -*-
+
+# =============================================================================
+# Copyright (c) 2020, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+__all__ = ['InferenceSink', 'NpyShardSink', 'JsonlSink']
+
+import json
+import os
+import shutil
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+def _to_numpy(value):
+    """Converts a (framework) tensor into a numpy array, leaves other values unchanged."""
+    if hasattr(value, 'detach'):
+        value = value.detach()
+    if hasattr(value, 'cpu'):
+        value = value.cpu()
+    if hasattr(value, 'numpy'):
+        return value.numpy()
+    return value
+
+
+class InferenceSink(ABC):
+    """Abstract class for sinks consuming the results of streaming inference (see NeuralModuleFactory.infer
+    with the `sink` argument) batch by batch, so that memory is bounded by a single batch.
+
+    In distributed inference every rank writes its own part of the results; once all ranks have closed their
+    sinks, `merge()` is called on rank 0 to combine the parts.
+
+    Lifecycle: open() -> write() for every batch -> close() -> merge() (rank 0 only).
+    """
+
+    def __init__(self):
+        self._names = None
+        self._rank = 0
+        self._world_size = 1
+
+    @property
+    def names(self) -> Optional[List[str]]:
+        """ Names of the written tensors, in the order in which they were requested. """
+        return self._names
+
+    @property
+    def rank(self) -> int:
+        return self._rank
+
+    @property
+    def world_size(self) -> int:
+        return self._world_size
+
+    def open(self, names: List[str], rank: int = 0, world_size: int = 1):
+        """Prepares the sink for writing.
+
+        Args:
+            names: names of tensors that will be passed to write()
+            rank: global rank of the writing process
+            world_size: total number of writing processes
+        """
+        self._names = list(names)
+        self._rank = rank
+        self._world_size = world_size
+
+    @abstractmethod
+    def write(self, batch: Dict[str, object]):
+        """Consumes the values of all tensors for a single batch.
+
+        Args:
+            batch: dictionary mapping tensor names to their values for this batch
+        """
+        pass
+
+    def close(self):
+        """Finishes writing on the current rank."""
+        pass
+
+    def merge(self):
+        """Combines the parts written by all ranks. Called on rank 0 only, after all ranks called close()."""
+        pass
+
+
+class NpyShardSink(InferenceSink):
+    """Writes every (numeric) tensor of every batch to a separate `.npy` file and, on merge, an `index.json` file
+    listing the shards of each tensor in the order in which they were written (rank 0 first).
+
+    Shards are named `<prefix>.<tensor name>.rank<rank>.<batch index>.npy`.
+
+    Args:
+        output_dir (str): directory to write the shards to, created if needed
+        prefix (str): prefix of shard files. Defaults to "infer".
+    """
+
+    def __init__(self, output_dir: str, prefix: str = "infer"):
+        super().__init__()
+        self._output_dir = output_dir
+        self._prefix = prefix
+        self._shards = None
+        self._num_batches = 0
+
+    @property
+    def index_file(self) -> str:
+        return os.path.join(self._output_dir, f"{self._prefix}.index.json")
+
+    def _rank_index_file(self, rank):
+        return os.path.join(self._output_dir, f"{self._prefix}.rank{rank}.index.json")
+
+    def open(self, names, rank=0, world_size=1):
+        super().open(names, rank=rank, world_size=world_size)
+        os.makedirs(self._output_dir, exist_ok=True)
+        self._shards = {name: [] for name in self.names}
+        self._num_batches = 0
+
+    def write(self, batch):
+        for name, value in batch.items():
+            file_name = f"{self._prefix}.{name}.rank{self.rank}.{self._num_batches:06d}.npy"
+            np.save(os.path.join(self._output_dir, file_name), _to_numpy(value))
+            self._shards[name].append(file_name)
+        self._num_batches += 1
+
+    def close(self):
+        with open(self._rank_index_file(self.rank), "w") as f:
+            json.dump(self._shards, f)
+
+    def merge(self):
+        index = {name: [] for name in self.names}
+        for rank in range(self.world_size):
+            rank_index_file = self._rank_index_file(rank)
+            with open(rank_index_file, "r") as f:
+                rank_shards = json.load(f)
+            for name in self.names:
+                index[name] += rank_shards[name]
+            os.remove(rank_index_file)
+        with open(self.index_file, "w") as f:
+            json.dump(index, f, indent=2)
+
+    @staticmethod
+    def load(output_dir: str, prefix: str = "infer", mmap_mode: Optional[str] = 'r') -> Dict[str, list]:
+        """Loads the shards of all tensors written by a NpyShardSink.
+
+        Args:
+            output_dir (str): directory the sink wrote to
+            prefix (str): prefix of shard files. Defaults to "infer".
+            mmap_mode (str): passed to np.load. Defaults to "r", so shards are memory-mapped.
+
+        Returns:
+            Dictionary mapping tensor names to lists of per-batch arrays.
+        """
+        with open(os.path.join(output_dir, f"{prefix}.index.json"), "r") as f:
+            index = json.load(f)
+        return {
+            name: [np.load(os.path.join(output_dir, shard), mmap_mode=mmap_mode) for shard in shards]
+            for name, shards in index.items()
+        }
+
+
+class JsonlSink(InferenceSink):
+    """Writes one JSON line per example: the values of all tensors are split along the first (batch) axis.
+    In distributed inference every rank writes to `<path>.rank<rank>`, and merge() concatenates the parts
+    (rank 0 first) into `path`.
+
+    Args:
+        path (str): output file
+    """
+
+    def __init__(self, path: str):
+        super().__init__()
+        self._path = path
+        self._file = None
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    def _part_path(self, rank):
+        return f"{self._path}.rank{rank}"
+
+    def open(self, names, rank=0, world_size=1):
+        super().open(names, rank=rank, world_size=world_size)
+        out_path = self._path if world_size == 1 else self._part_path(rank)
+        dir_name = os.path.dirname(out_path)
+        if dir_name:
+            os.makedirs(dir_name, exist_ok=True)
+        self._file = open(out_path, "w")
+
+    def write(self, batch):
+        columns = {}
+        batch_size = None
+        for name, value in batch.items():
+            value = _to_numpy(value)
+            if isinstance(value, np.ndarray):
+                value = value.tolist()
+            if not isinstance(value, (list, tuple)):
+                raise ValueError(f"JsonlSink can only write values with a batch dimension, {name} has none")
+            if batch_size is not None and len(value) != batch_size:
+                raise ValueError(f"Batch size mismatch for {name}: {len(value)} vs {batch_size}")
+            batch_size = len(value)
+            columns[name] = value
+        for i in range(batch_size or 0):
+            self._file.write(json.dumps({name: column[i] for name, column in columns.items()}) + "\n")
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def merge(self):
+        if self.world_size == 1:
+            return
+        with open(self._path, "w") as out_f:
+            for rank in range(self.world_size):
+                part_path = self._part_path(rank)
+                with open(part_path, "r") as in_f:
+                    shutil.copyfileobj(in_f, out_f)
+                os.remove(part_path)
@@ -105,6 +105,10 @@ class NeuralModuleFactory(object):
             indication
         set_default (bool): (default True) True if should set this instance as
             default factory for modules instantiating.
+        prefetch_batches (bool): (default False) If set to True, train, eval
+            and infer actions move the next batch to the device (using pinned
+            memory and a side CUDA stream on GPUs, a background thread on
+            CPUs) while the current batch is being processed.
     """
 
     def __init__(
@@ -121,8 +125,10 @@ class NeuralModuleFactory(object):
         create_tb_writer=False,
         files_to_copy=None,
         add_time_to_log_dir=False,
+        prefetch_batches=False,
     ):
         self._local_rank = local_rank
+        self._prefetch_batches = prefetch_batches
         self._global_rank = None
 
         if isinstance(optimization_level, str):
@@ -287,6 +293,7 @@ class NeuralModuleFactory(object):
         gradient_predivide=False,
         amp_max_loss_scale=2.0 ** 24,
         reset=False,
+        defer_nan_check=False,
     ):
         if reset:
             self.reset_trainer()
@@ -303,6 +310,7 @@ class NeuralModuleFactory(object):
             synced_batchnorm_groupsize=synced_batchnorm_groupsize,
             gradient_predivide=gradient_predivide,
             amp_max_loss_scale=amp_max_loss_scale,
+            defer_nan_check=defer_nan_check,
         )
 
     def eval(self, callbacks: List[EvaluatorCallback]):
@@ -354,6 +362,7 @@ class NeuralModuleFactory(object):
         use_cache=False,
         offload_to_cpu=True,
         modules_to_restore=None,
+        sink=None,
     ):
         """Runs inference to obtain values for tensors
 
@@ -378,6 +387,11 @@ class NeuralModuleFactory(object):
             modules_to_restore (list): Defaults to None, in which case all
                 NMs inside callchain with weights will be restored. If
                 specified only the modules inside this list will be restored.
+            sink (InferenceSink): Defaults to None. If specified, values of
+                `tensors` are written into the sink batch by batch instead of
+                being accumulated in memory, and None is returned. In
+                distributed mode every rank writes its own results, which are
+                merged by rank 0 at the end. Can't be used with caching.
 
         Returns:
             List of evaluated tensors. Each element in the list is also a list
@@ -392,6 +406,49 @@ class NeuralModuleFactory(object):
             use_cache=use_cache,
             offload_to_cpu=offload_to_cpu,
             modules_to_restore=modules_to_restore,
+            sink=sink,
+        )
+
+    def infer_iter(
+        self,
+        tensors: List[NmTensor],
+        checkpoint_dir=None,
+        ckpt_pattern='',
+        verbose=False,
+        offload_to_cpu=True,
+        modules_to_restore=None,
+    ):
+        """Runs streaming inference, i.e. returns a generator yielding the
+        values of tensors batch by batch, so that memory usage is bounded by
+        a single batch instead of the whole dataset.
+
+        Args:
+            tensors (list[NmTensor]): List of NeMo tensors that we want to get
+                values of.
+            checkpoint_dir (str): Path to checkpoint directory. Default is None
+                which does not load checkpoints.
+            ckpt_pattern (str): Pattern used to check for checkpoints inside
+                checkpoint_dir. Default is '' which matches any checkpoints
+                inside checkpoint_dir.
+            verbose (bool): Controls printing. Defaults to False.
+            offload_to_cpu (bool): If True, all evaluated tensors are moved to
+                cpu memory after each inference batch. Defaults to True.
+            modules_to_restore (list): Defaults to None, in which case all
+                NMs inside callchain with weights will be restored. If
+                specified only the modules inside this list will be restored.
+
+        Returns:
+            Generator yielding, for every batch, a list with the values of
+            `tensors`. In distributed mode, every rank yields the results of
+            its own part of the dataset.
+        """
+        return self._trainer.infer_iter(
+            tensors=tensors,
+            checkpoint_dir=checkpoint_dir,
+            ckpt_pattern=ckpt_pattern,
+            verbose=verbose,
+            offload_to_cpu=offload_to_cpu,
+            modules_to_restore=modules_to_restore,
         )
 
     def clear_cache(self):
@@ -406,6 +463,7 @@ class NeuralModuleFactory(object):
                 global_rank=self._global_rank,
                 tb_writer=tb_writer,
                 optimization_level=self._optim_level,
+                prefetch_batches=self._prefetch_batches,
             )
             return instance
         else:
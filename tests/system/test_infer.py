@@ -16,6 +16,9 @@
 # limitations under the License.
 # =============================================================================
 
+import json
+import os
+import tempfile
 from unittest import TestCase
 
 import pytest
@@ -134,3 +137,70 @@ class TestInfer(TestCase):
                 tensors=[twenty_tensor, thirty_tensor], verbose=False, cache=True, use_cache=True
             )
         self.assertEqual(evaluated_tensors[0][0].squeeze().data, 10)
+
+    @pytest.mark.system
+    def test_infer_caching_with_prefetching(self):
+        self.nf = nemo.core.NeuralModuleFactory(placement=self.nf.placement, prefetch_batches=True)
+        data_source = nemo.backends.pytorch.common.ZerosDataLayer(
+            size=4,
+            dtype=torch.FloatTensor,
+            batch_size=2,
+            output_ports={
+                "dl_out": NeuralType((AxisType(AxisKind.Batch), AxisType(AxisKind.Dimension, 1)), ChannelType())
+            },
+        )
+        addten = AddsTen()
+        minusten = SubtractsTen()
+
+        zero_tensor = data_source()
+        ten_tensor = addten(mod_in=zero_tensor)
+        twenty_tensor = addten(mod_in=ten_tensor)
+
+        evaluated_tensors = self.nf.infer(tensors=[twenty_tensor], verbose=False, cache=True)
+        self.assertEqual(len(evaluated_tensors[0]), 2)
+        for batch in evaluated_tensors[0]:
+            self.assertTrue(torch.all(batch == 20))
+
+        new_ten_tensor = minusten(mod_in=twenty_tensor)
+        evaluated_tensors = self.nf.infer(tensors=[new_ten_tensor], verbose=False, use_cache=True)
+        self.assertEqual(len(evaluated_tensors[0]), 2)
+        for batch in evaluated_tensors[0]:
+            self.assertTrue(torch.all(batch == 10))
+
+    def _create_ten_tensor(self, size=6, batch_size=4):
+        data_source = nemo.backends.pytorch.common.ZerosDataLayer(
+            size=size,
+            dtype=torch.FloatTensor,
+            batch_size=batch_size,
+            output_ports={
+                "dl_out": NeuralType((AxisType(AxisKind.Batch), AxisType(AxisKind.Dimension, 1)), ChannelType())
+            },
+        )
+        addten = AddsTen()
+        return addten(mod_in=data_source())
+
+    @pytest.mark.system
+    def test_infer_iter(self):
+        ten_tensor = self._create_ten_tensor()
+        batches = list(self.nf.infer_iter(tensors=[ten_tensor]))
+        self.assertEqual([b[0].shape[0] for b in batches], [4, 2])
+        for batch in batches:
+            self.assertTrue(torch.all(batch[0] == 10))
+        # Gradients must not stay disabled for the caller.
+        self.assertTrue(torch.is_grad_enabled())
+
+    @pytest.mark.system
+    def test_infer_to_sinks(self):
+        ten_tensor = self._create_ten_tensor()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            jsonl_file = os.path.join(tmpdir, "out.jsonl")
+            result = self.nf.infer(tensors=[ten_tensor], verbose=False, sink=nemo.core.JsonlSink(jsonl_file))
+            self.assertIsNone(result)
+            with open(jsonl_file, "r") as f:
+                lines = [json.loads(line) for line in f]
+            self.assertEqual(lines, [{ten_tensor.unique_name: [10.0]}] * 6)
+
+            npy_dir = os.path.join(tmpdir, "npy")
+            self.nf.infer(tensors=[ten_tensor], verbose=False, sink=nemo.core.NpyShardSink(npy_dir))
+            shards = nemo.core.NpyShardSink.load(npy_dir)
+            self.assertEqual([s.shape for s in shards[ten_tensor.unique_name]], [(4, 1), (2, 1)])
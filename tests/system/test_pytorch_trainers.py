@@ -58,3 +58,49 @@ class TestPytorchTrainers(TestCase):
         optimizer.train(
             tensors_to_optimize=[loss_tensor], optimizer="sgd", optimization_params={"lr": 0.0003, "num_epochs": 2},
         )
+
+    @pytest.mark.system
+    def test_deferred_nan_check_train(self):
+        """ Gradient accumulation with the NaN/inf check done once per step """
+        data_source = nemo.backends.pytorch.tutorials.RealFunctionDataLayer(n=128, batch_size=16)
+        trainable_module = nemo.backends.pytorch.tutorials.TaylorNet(dim=4)
+        loss = nemo.backends.pytorch.tutorials.MSELoss()
+        x, y = data_source()
+        y_pred = trainable_module(x=x)
+        loss_tensor = loss(predictions=y_pred, target=y)
+
+        optimizer = nemo.backends.pytorch.actions.PtActions()
+        optimizer.train(
+            tensors_to_optimize=[loss_tensor],
+            optimizer="sgd",
+            optimization_params={"lr": 0.0003, "num_epochs": 1},
+            batches_per_step=2,
+            defer_nan_check=True,
+        )
+        self.assertEqual(optimizer.step, 4)
+
+        # Steps with NaN losses are skipped as a whole.
+        forward = trainable_module.forward
+        trainable_module.forward = lambda x: forward(x) * float('nan')
+        weights = [p.detach().clone() for p in trainable_module.parameters()]
+        optimizer = nemo.backends.pytorch.actions.PtActions()
+        optimizer.train(
+            tensors_to_optimize=[loss_tensor],
+            optimizer="sgd",
+            optimization_params={"lr": 0.0003, "num_epochs": 1},
+            batches_per_step=2,
+            defer_nan_check=True,
+        )
+        self.assertEqual(optimizer.step, 0)
+        for before, after in zip(weights, trainable_module.parameters()):
+            self.assertTrue(before.equal(after.detach()))
+
+        with self.assertRaisesRegex(ValueError, "Loss is NaN or inf"):
+            nemo.backends.pytorch.actions.PtActions().train(
+                tensors_to_optimize=[loss_tensor],
+                optimizer="sgd",
+                optimization_params={"lr": 0.0003, "num_epochs": 1},
+                batches_per_step=2,
+                stop_on_nan_loss=True,
+                defer_nan_check=True,
+            )
@@ -16,6 +16,7 @@
 # limitations under the License.
 # =============================================================================
 
+import json
 import os
 import shutil
 from io import StringIO
@@ -241,3 +242,37 @@ class TestNeMoCallbacks:
         # when grad accumlation steps != 1, num_steps != num_batches
         assert epoch_step_counter[0] == 4
         assert epoch_batch_counter[0] == 8
+
+    @pytest.mark.unit
+    def test_StepTimeProfiler(self, clean_up, tmpdir):
+        data_source = RealFunctionDataLayer(n=100, batch_size=1)
+        trainable_module = TaylorNet(dim=4)
+        loss = MSELoss()
+
+        # Create the graph by connnecting the modules.
+        x, y = data_source()
+        y_pred = trainable_module(x=x)
+        loss_tensor = loss(predictions=y_pred, target=y)
+
+        trace_file = str(tmpdir.join("trace.json"))
+        profiler = StepTimeProfiler(step_freq=2, log_freq=4, chrome_trace_file=trace_file)
+
+        self.nf.train(
+            tensors_to_optimize=[loss_tensor],
+            callbacks=[profiler],
+            optimization_params={"max_steps": 8, "lr": 0.01},
+            optimizer="sgd",
+        )
+
+        stats = profiler.stats
+        for name in ["data_wait", "compute", "optimizer", "callbacks", "step", f"forward/{trainable_module.name}"]:
+            assert name in stats
+            assert stats[name]["p50"] >= 0
+
+        with open(trace_file, "r") as f:
+            trace = json.load(f)
+        assert len(trace["traceEvents"]) > 0
+
+        # Both the profiler and the optimizer are restored once training is finished
+        assert "on_step_start" not in profiler.__dict__
+        assert "step" not in self.nf._trainer.optimizers[0].__dict__
@@ -0,0 +1,85 @@
+# ! /usr/bin/python
+# -*- coding: utf-8 -*-
+
+# =============================================================================
+# Copyright (c) 2020, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+import threading
+from unittest import TestCase
+
+import pytest
+import torch
+
+from nemo.backends.pytorch.prefetch import BatchPrefetcher, move_to_device
+
+
+class TestBatchPrefetcher(TestCase):
+    @staticmethod
+    def _batches(num_batches):
+        return [(torch.full((2, 3), float(i)), (torch.arange(i + 1), "text_{}".format(i))) for i in range(num_batches)]
+
+    @pytest.mark.unit
+    def test_move_to_device_keeps_structure(self):
+        batch = {"a": torch.zeros(2), "b": [torch.ones(1), (torch.ones(3), 7)], "c": None}
+        moved = move_to_device(batch, torch.device("cpu"), non_blocking=True)
+        self.assertEqual(set(moved.keys()), {"a", "b", "c"})
+        self.assertIsInstance(moved["b"], list)
+        self.assertIsInstance(moved["b"][1], tuple)
+        self.assertEqual(moved["b"][1][1], 7)
+        self.assertIsNone(moved["c"])
+        self.assertTrue(torch.equal(moved["b"][1][0], torch.ones(3)))
+
+    @pytest.mark.unit
+    def test_cpu_prefetcher_yields_all_batches_in_order(self):
+        batches = self._batches(7)
+        prefetcher = BatchPrefetcher(batches, torch.device("cpu"), depth=2)
+        self.assertEqual(len(prefetcher), 7)
+        # The prefetcher has to be re-iterable, once per epoch.
+        for _ in range(2):
+            fetched = list(prefetcher)
+            self.assertEqual(len(fetched), len(batches))
+            for (x, (y, s)), (ex, (ey, es)) in zip(fetched, batches):
+                self.assertTrue(torch.equal(x, ex))
+                self.assertTrue(torch.equal(y, ey))
+                self.assertEqual(s, es)
+
+    @pytest.mark.unit
+    def test_cpu_prefetcher_stops_producer_on_early_exit(self):
+        prefetcher = BatchPrefetcher(self._batches(100), torch.device("cpu"), depth=1)
+        num_threads = threading.active_count()
+        for i, _ in enumerate(prefetcher):
+            if i == 3:
+                break
+        self.assertEqual(threading.active_count(), num_threads)
+
+    @pytest.mark.unit
+    def test_cpu_prefetcher_propagates_loader_errors(self):
+        def failing_loader():
+            yield torch.zeros(1)
+            raise RuntimeError("broken batch")
+
+        class Loader:
+            def __iter__(self):
+                return failing_loader()
+
+        prefetcher = BatchPrefetcher(Loader(), torch.device("cpu"))
+        with self.assertRaisesRegex(RuntimeError, "broken batch"):
+            list(prefetcher)
+
+    @pytest.mark.unit
+    def test_invalid_depth(self):
+        with self.assertRaises(ValueError):
+            BatchPrefetcher([], torch.device("cpu"), depth=0)
@@ -0,0 +1,249 @@
+# ! /usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright 2020 NVIDIA. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import h5py
+import numpy as np
+import pytest
+
+import nemo.collections.nlp as nemo_nlp
+from nemo.collections.nlp.data import (
+    BertPretrainingDataset,
+    BertPretrainingPreprocessedDataset,
+    BertPretrainingPreprocessedShardedDataset,
+    SentencePieceTokenizer,
+    compile_bert_pretraining_corpus,
+    mask_whole_words,
+)
+
+
+def per_token_words(tokenizer, ids):
+    # Groups the tokens into words one token at a time, as the per-token masking did
+    words = [[0]]
+    for position in range(1, len(ids)):
+        if tokenizer.ids_to_tokens([ids[position]])[0].startswith('\u2581'):
+            words[-1].append(position)
+        else:
+            words.append([position])
+    return words
+
+
+class TestBertPretrainingDataset(TestCase):
+    def setUp(self):
+        self.tokenizer = SentencePieceTokenizer("./tests/data/m_common.model")
+        self.tokenizer.add_special_tokens(nemo_nlp.data.tokenizers.MODEL_SPECIAL_TOKENS['bert'])
+
+        self.data_dir = tempfile.mkdtemp()
+        self.documents = []
+        for doc_idx in range(3):
+            lines = [f"document {doc_idx} sentence {i} with a few more words" for i in range(20)]
+            self.documents.append(lines)
+            with open(os.path.join(self.data_dir, f"doc{doc_idx}.txt"), "w") as f:
+                # Empty lines are skipped
+                f.write("\n".join(lines[:10]) + "\n\n" + "\n".join(lines[10:]) + "\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir)
+
+    @pytest.mark.unit
+    def test_compile_corpus(self):
+        prefix = os.path.join(self.data_dir, "compiled", "corpus")
+        compile_bert_pretraining_corpus(self.tokenizer, self.data_dir, prefix, num_workers=2)
+
+        token_ids = np.fromfile(f"{prefix}.bin", dtype=np.uint16)
+        with np.load(f"{prefix}.idx.npz") as index:
+            sentence_offsets = index["sentence_offsets"]
+            doc_offsets = index["doc_offsets"]
+            filenames = list(index["filenames"])
+
+        self.assertEqual(filenames, ["doc0.txt", "doc1.txt", "doc2.txt"])
+        self.assertEqual(doc_offsets.tolist(), [0, 20, 40, 60])
+        for doc_idx, lines in enumerate(self.documents):
+            for i, line in enumerate(lines):
+                sentence = doc_offsets[doc_idx] + i
+                ids = token_ids[sentence_offsets[sentence] : sentence_offsets[sentence + 1]]
+                self.assertEqual(ids.tolist(), self.tokenizer.text_to_ids(line))
+
+    @pytest.mark.unit
+    def test_mmap_corpus_examples(self):
+        max_seq_length = 32
+        dataset = BertPretrainingDataset(
+            self.tokenizer,
+            self.data_dir,
+            max_seq_length=max_seq_length,
+            mask_probability=0.0,
+            tokenized_corpus_prefix=os.path.join(self.data_dir, "tokenized"),
+            use_mmap_corpus=True,
+            num_workers=1,
+        )
+        self.assertEqual(len(dataset), 60)
+
+        all_ids = [self.tokenizer.text_to_ids(line) for lines in self.documents for line in lines]
+        corpus_ids = sum(all_ids, [])
+        for idx in range(20):
+            input_ids, input_type_ids, input_mask, output_ids, output_mask, is_next = dataset[idx]
+            self.assertEqual(input_ids.shape, (max_seq_length,))
+            self.assertEqual(output_mask.sum(), 0)
+            self.assertTrue((input_ids == output_ids).all())
+
+            length = int(input_mask.sum())
+            ids = output_ids[:length].tolist()
+            sep = ids.index(self.tokenizer.sep_id)
+            self.assertEqual(ids[0], self.tokenizer.cls_id)
+            self.assertEqual(ids[-1], self.tokenizer.eos_id)
+            self.assertEqual(input_type_ids[: sep + 1].sum(), 0)
+            self.assertEqual(input_type_ids[sep + 1 : length].sum(), length - sep - 1)
+
+            # Both segments are contiguous spans of the corpus
+            for segment in (ids[1:sep], ids[sep + 1 : -1]):
+                self.assertTrue(
+                    any(corpus_ids[i : i + len(segment)] == segment for i in range(len(corpus_ids))), segment
+                )
+
+    @pytest.mark.unit
+    def test_mmap_corpus_tokenizer_change(self):
+        prefix = os.path.join(self.data_dir, "tokenized")
+        compile_bert_pretraining_corpus(self.tokenizer, self.data_dir, prefix, num_workers=1)
+        # Pretends the corpus was compiled with another tokenizer
+        with np.load(f"{prefix}.idx.npz") as index:
+            arrays = dict(index)
+        arrays["tokenizer_fingerprint"] = "another tokenizer"
+        arrays["sentence_offsets"][0] = 1
+        with open(f"{prefix}.idx.npz", "wb") as f:
+            np.savez(f, **arrays)
+
+        dataset = BertPretrainingDataset(
+            self.tokenizer, self.data_dir, tokenized_corpus_prefix=prefix, use_mmap_corpus=True, num_workers=1
+        )
+        self.assertEqual(dataset.sentence_offsets[0], 0)
+        with np.load(f"{prefix}.idx.npz") as index:
+            self.assertNotEqual(str(index["tokenizer_fingerprint"]), "another tokenizer")
+
+    @pytest.mark.unit
+    def test_mask_ids_words(self):
+        dataset = BertPretrainingDataset(self.tokenizer, self.data_dir, seed=0)
+        mask_id = self.tokenizer.token_to_id("[MASK]")
+        special_ids = (self.tokenizer.cls_id, self.tokenizer.sep_id)
+        for doc_idx, lines in enumerate(self.documents):
+            ids = [self.tokenizer.cls_id] + self.tokenizer.text_to_ids(lines[doc_idx]) + [self.tokenizer.sep_id]
+            ids += self.tokenizer.text_to_ids(lines[doc_idx + 1])
+            words = per_token_words(self.tokenizer, ids)
+            for mask_probability in [0.0, 0.5, 1.0]:
+                dataset.mask_probability = mask_probability
+                masked_ids, output_mask = dataset.mask_ids(ids)
+                for word in words:
+                    word_ids = [ids[position] for position in word]
+                    word_masked_ids = masked_ids[word].tolist()
+                    # Words are masked as a whole, words starting with a special token never
+                    self.assertEqual(len(set(output_mask[word])), 1)
+                    if word_ids[0] in special_ids or mask_probability == 0.0:
+                        self.assertEqual(output_mask[word[0]], 0)
+                    elif mask_probability == 1.0:
+                        self.assertEqual(output_mask[word[0]], 1)
+                    if output_mask[word[0]] == 0:
+                        self.assertEqual(word_masked_ids, word_ids)
+                    elif mask_id in word_masked_ids:
+                        self.assertEqual(word_masked_ids, [mask_id] * len(word))
+                    else:
+                        self.assertFalse(set(word_masked_ids) & set(special_ids))
+
+    @pytest.mark.unit
+    def test_mask_whole_words(self):
+        vocab_size, mask_id, special_ids = 1000, 999, (0, 1)
+        # Tokens 500 and above continue the word of the previous token
+        word_start = np.arange(vocab_size) < 500
+
+        rng = np.random.default_rng(0)
+        ids = rng.integers(2, vocab_size, size=(1000, 64))
+        ids[:, 0], ids[:, 30] = special_ids
+        valid_mask = np.ones(ids.shape, dtype=bool)
+        valid_mask[:, 60:] = False
+
+        masked_ids, output_mask = mask_whole_words(
+            ids, word_start, 0.15, mask_id, special_ids, np.random.default_rng(1), valid_mask=valid_mask
+        )
+        masked = output_mask.astype(bool)
+        self.assertEqual(output_mask[:, 60:].sum(), 0)
+        self.assertEqual(output_mask[:, [0, 30]].sum(), 0)
+        self.assertTrue((masked_ids[~masked] == ids[~masked]).all())
+        self.assertAlmostEqual((masked_ids[masked] == mask_id).mean(), 0.8, delta=0.03)
+        replaced = masked & (masked_ids != mask_id) & (masked_ids != ids)
+        self.assertFalse(np.isin(masked_ids[replaced], special_ids).any())
+
+        # Words are masked as a whole
+        continuation = ~word_start[ids] & valid_mask
+        continuation[:, 0] = False
+        self.assertTrue((masked[continuation] == np.roll(masked, 1, axis=1)[continuation]).all())
+
+        # Same seed, same masks
+        first = mask_whole_words(ids, word_start, 0.15, mask_id, special_ids, np.random.default_rng(2))
+        second = mask_whole_words(ids, word_start, 0.15, mask_id, special_ids, np.random.default_rng(2))
+        self.assertTrue((first[0] == second[0]).all())
+
+    @pytest.mark.unit
+    def test_sharded_preprocessed_dataset(self):
+        seq_length, max_pred_length = 32, 5
+        rng = np.random.default_rng(0)
+        files, num_rows = [], 0
+        for shard_idx, length in enumerate([37, 50, 13]):
+            input_ids = rng.integers(5, 1000, size=(length, seq_length))
+            # The first token identifies the row
+            input_ids[:, 0] = num_rows + np.arange(length)
+            num_rows += length
+            positions = np.zeros((length, max_pred_length), dtype=np.int64)
+            for row in range(length):
+                num_masked = rng.integers(0, max_pred_length + 1)
+                positions[row, :num_masked] = np.sort(rng.choice(np.arange(1, seq_length), num_masked, replace=False))
+
+            files.append(os.path.join(self.data_dir, f"shard{shard_idx}.hdf5"))
+            with h5py.File(files[-1], "w") as f:
+                f["input_ids"] = input_ids
+                f["input_mask"] = np.ones((length, seq_length), dtype=np.int64)
+                f["segment_ids"] = rng.integers(0, 2, size=(length, seq_length))
+                f["masked_lm_positions"] = positions
+                f["masked_lm_ids"] = rng.integers(5, 1000, size=(length, max_pred_length))
+                f["next_sentence_labels"] = rng.integers(0, 2, size=length)
+
+        expected = {}
+        for input_file in files:
+            dataset = BertPretrainingPreprocessedDataset(input_file, max_pred_length)
+            for i in range(len(dataset)):
+                expected[int(dataset[i][0][0])] = dataset[i]
+
+        world_size = 3
+        seen = []
+        for rank in range(world_size):
+            dataset = BertPretrainingPreprocessedShardedDataset(
+                files, max_pred_length, shuffle=True, chunk_size=8, global_rank=rank, world_size=world_size
+            )
+            self.assertEqual(len(dataset), num_rows)
+            samples = list(dataset)
+            for start in range(0, len(samples), 7):
+                batch = dataset.collate_fn(samples[start : start + 7])
+                for i in range(len(batch[0])):
+                    row = int(batch[0][i][0])
+                    seen.append(row)
+                    for expected_component, component in zip(expected[row], batch):
+                        self.assertTrue(np.array_equal(expected_component, component[i]))
+
+        # Every row is read by exactly one rank
+        self.assertEqual(sorted(seen), list(range(num_rows)))
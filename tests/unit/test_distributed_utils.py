@@ -0,0 +1,90 @@
+# ! /usr/bin/python
+# -*- coding: utf-8 -*-
+
+# =============================================================================
+# Copyright (c) 2020, NVIDIA CORPORATION.  All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+import os
+import tempfile
+from unittest import TestCase
+
+import pytest
+import torch
+import torch.distributed as dist
+import torch.multiprocessing as mp
+
+from nemo.backends.pytorch.distributed_utils import all_gather_ragged, pack_tensors, unpack_tensors
+
+
+def _rank_tensors(rank):
+    """ Tensors of different shapes, dtypes and ranks (also differing across workers). """
+    return [
+        torch.full((rank + 1, 3), float(rank)),
+        torch.tensor(rank, dtype=torch.int64),
+        torch.arange(2 * (rank + 1), dtype=torch.int32).reshape(1, rank + 1, 1, 1, 2),
+        torch.tensor([True, False] * (rank + 1)),
+        torch.zeros(0, 5, dtype=torch.float16),
+    ]
+
+
+def _gather_worker(rank, world_size, init_file, result_queue):
+    dist.init_process_group("gloo", init_method="file://" + init_file, rank=rank, world_size=world_size)
+    try:
+        gathered = all_gather_ragged(_rank_tensors(rank))
+        ok = len(gathered) == world_size
+        for src_rank, tensors in enumerate(gathered):
+            for received, expected in zip(tensors, _rank_tensors(src_rank)):
+                ok = ok and received.dtype == expected.dtype and torch.equal(received, expected)
+        result_queue.put((rank, ok))
+    finally:
+        dist.destroy_process_group()
+
+
+class TestDistributedUtils(TestCase):
+    @pytest.mark.unit
+    def test_pack_unpack_roundtrip(self):
+        tensors = _rank_tensors(2) + [torch.randn(2, 3, dtype=torch.float64)[:, 1]]
+        buffer = pack_tensors(tensors)
+        self.assertEqual(buffer.dtype, torch.uint8)
+        # Trailing padding has to be ignored.
+        unpacked = unpack_tensors(torch.cat([buffer, torch.zeros(13, dtype=torch.uint8)]))
+        self.assertEqual(len(unpacked), len(tensors))
+        for received, expected in zip(unpacked, tensors):
+            self.assertEqual(received.dtype, expected.dtype)
+            self.assertTrue(torch.equal(received, expected))
+
+    @pytest.mark.unit
+    def test_pack_empty_list(self):
+        self.assertEqual(unpack_tensors(pack_tensors([])), [])
+
+    @pytest.mark.unit
+    def test_all_gather_ragged_gloo(self):
+        world_size = 2
+        with tempfile.TemporaryDirectory() as tmpdir:
+            ctx = mp.get_context("spawn")
+            result_queue = ctx.SimpleQueue()
+            processes = []
+            for rank in range(world_size):
+                p = ctx.Process(
+                    target=_gather_worker, args=(rank, world_size, os.path.join(tmpdir, "init"), result_queue)
+                )
+                p.start()
+                processes.append(p)
+            for p in processes:
+                p.join(timeout=120)
+                self.assertEqual(p.exitcode, 0)
+            results = dict(result_queue.get() for _ in range(world_size))
+        self.assertEqual(results, {0: True, 1: True})
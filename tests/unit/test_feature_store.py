@@ -0,0 +1,98 @@
+# ! /usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright 2020 NVIDIA. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+import pytest
+
+from nemo.collections.nlp.data import SentencePieceTokenizer
+from nemo.collections.nlp.data.feature_store import (
+    RaggedArray,
+    features_cache_dir,
+    has_features,
+    load_features,
+    load_or_create_features,
+)
+
+
+class TestFeatureStore(TestCase):
+    def setUp(self):
+        self.tokenizer = SentencePieceTokenizer("./tests/data/m_common.model")
+        self.data_dir = tempfile.mkdtemp()
+        self.input_file = os.path.join(self.data_dir, "train.txt")
+        with open(self.input_file, "w") as f:
+            f.write("first line\nsecond line\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir)
+
+    @pytest.mark.unit
+    def test_cache_dir_fingerprint(self):
+        cache_dir = features_cache_dir(self.input_file, self.tokenizer, 128, prefix="train")
+        self.assertEqual(os.path.dirname(cache_dir), self.data_dir)
+        self.assertTrue(os.path.basename(cache_dir).startswith("train_features_"))
+        self.assertEqual(cache_dir, features_cache_dir(self.input_file, self.tokenizer, 128, prefix="train"))
+
+        # Any change of the parameters or of the input file contents leads to a different cache
+        self.assertNotEqual(cache_dir, features_cache_dir(self.input_file, self.tokenizer, 64, prefix="train"))
+        self.assertNotEqual(
+            cache_dir, features_cache_dir(self.input_file, self.tokenizer, 128, prefix="train", num_samples=1)
+        )
+        with open(self.input_file, "a") as f:
+            f.write("third line\n")
+        self.assertNotEqual(cache_dir, features_cache_dir(self.input_file, self.tokenizer, 128, prefix="train"))
+
+    @pytest.mark.unit
+    def test_load_or_create_features(self):
+        input_ids = np.arange(12, dtype=np.int32).reshape(3, 4)
+        tokens = [["a", "b"], [], ["ünïcode", "c", "d"]]
+        num_calls = []
+
+        def create_features():
+            num_calls.append(1)
+            features = {
+                'input_ids': input_ids,
+                'tokens': RaggedArray.from_string_lists(tokens),
+                'spans': RaggedArray.from_lists([[1, 2, 3], [4], []]),
+            }
+            return features, {'label_ids': {'O': 0, 'B': 1}}
+
+        cache_dir = features_cache_dir(self.input_file, self.tokenizer, 4)
+        self.assertFalse(has_features(cache_dir))
+        created, _ = load_or_create_features(cache_dir, create_features)
+        self.assertTrue(has_features(cache_dir))
+
+        features, metadata = load_or_create_features(cache_dir, create_features)
+        self.assertEqual(len(num_calls), 1)
+        self.assertEqual(metadata, {'label_ids': {'O': 0, 'B': 1}})
+        self.assertIsInstance(features['input_ids'], np.memmap)
+        self.assertTrue(np.array_equal(features['input_ids'], input_ids))
+        self.assertEqual([features['tokens'][i] for i in range(3)], tokens)
+        self.assertEqual([created['tokens'][i] for i in range(3)], tokens)
+        self.assertEqual(features['tokens'].lengths().tolist(), [2, 0, 3])
+        self.assertEqual([features['spans'][i].tolist() for i in range(3)], [[1, 2, 3], [4], []])
+
+        load_or_create_features(cache_dir, create_features, overwrite=True)
+        self.assertEqual(len(num_calls), 2)
+        load_or_create_features(cache_dir, create_features, use_cache=False)
+        self.assertEqual(len(num_calls), 3)
+        self.assertEqual(load_features(cache_dir)[1], metadata)
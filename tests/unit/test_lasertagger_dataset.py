@@ -0,0 +1,73 @@
+# ! /usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright 2020 NVIDIA. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+import os
+import shutil
+import tempfile
+from types import SimpleNamespace
+from unittest import TestCase
+
+import numpy as np
+import pytest
+import torch
+
+from nemo.collections.nlp.data.datasets.lasertagger_dataset import LaserTaggerDataset, examples_to_features
+from nemo.collections.nlp.data.feature_store import save_features
+
+
+class TestLaserTaggerDataset(TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir)
+
+    @pytest.mark.unit
+    def test_memory_mapped_features(self):
+        rng = np.random.RandomState(0)
+        examples = []
+        for _ in range(20):
+            length = rng.randint(3, 16)
+            padding = [0] * (16 - length)
+            features = {
+                'input_ids': rng.randint(1, 30000, size=length).tolist() + padding,
+                'input_mask': [1] * length + padding,
+                'segment_ids': [0] * 16,
+                'tgt_ids': rng.randint(1, 30000, size=16).tolist(),
+                'labels': [0] + rng.randint(0, 1000, size=length - 2).tolist() + [0] + padding,
+                'labels_mask': [0] + [1] * (length - 2) + [0] + padding,
+            }
+            examples.append(SimpleNamespace(features=features))
+
+        features_dir = os.path.join(self.data_dir, "lt_train_features")
+        save_features(features_dir, examples_to_features(examples))
+        dataset = LaserTaggerDataset(features_dir, use_t2t_decoder=False)
+        self.assertIsInstance(dataset.features['input_ids'], np.memmap)
+        self.assertEqual(len(dataset), len(examples))
+
+        examples_dataset = LaserTaggerDataset(examples, use_t2t_decoder=False)
+        for idx, example in enumerate(examples):
+            input_ids, input_mask, segment_ids, labels, labels_mask, _, _ = dataset[idx]
+            self.assertTrue(torch.equal(input_ids, torch.Tensor(example.features['input_ids']).long()))
+            self.assertTrue(torch.equal(input_mask, torch.Tensor(example.features['input_mask'])))
+            self.assertTrue(torch.equal(segment_ids, torch.Tensor(example.features['segment_ids']).long()))
+            self.assertTrue(torch.equal(labels, torch.Tensor(example.features['labels']).long()))
+            self.assertTrue(torch.equal(labels_mask, torch.Tensor(example.features['labels_mask'])))
+            for value, expected in zip(dataset[idx], examples_dataset[idx]):
+                self.assertEqual(value.dtype, expected.dtype)
+                self.assertTrue(torch.equal(value, expected))
@@ -0,0 +1,107 @@
+# ! /usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright 2020 NVIDIA. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+import os
+import sys
+from unittest import TestCase
+
+import numpy as np
+import pytest
+
+LASERTAGGER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../../examples/nlp/lasertagger')
+
+
+class TestLaserTaggerSARI(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # The example modules import each other from the official_lasertagger package
+        sys.path.insert(0, LASERTAGGER_DIR)
+        from official_lasertagger import sari_hook, score_lib
+
+        cls.sari_hook, cls.score_lib = sari_hook, score_lib
+
+    @classmethod
+    def tearDownClass(cls):
+        sys.path.remove(LASERTAGGER_DIR)
+
+    def _sentence(self, rng, vocab_size):
+        # Short sentences of few distinct IDs share many n-grams, zero IDs are ignored
+        return rng.randint(0, vocab_size, size=rng.randint(0, 12)).tolist()
+
+    @pytest.mark.unit
+    def test_get_sari_scores(self):
+        rng = np.random.RandomState(0)
+        for vocab_size in [3, 8, 50]:
+            batch = []
+            for _ in range(40):
+                source = self._sentence(rng, vocab_size)
+                # Predictions and targets mostly copy the source
+                prediction = [i for i in source if rng.rand() < 0.7] + self._sentence(rng, vocab_size)[:3]
+                targets = [[i for i in source if rng.rand() < 0.7] for _ in range(rng.randint(1, 4))]
+                if rng.rand() < 0.2:
+                    targets.append([])
+                batch.append((source, prediction, targets))
+
+            num_targets = max(len(targets) for _, _, targets in batch)
+            source_ids = np.zeros((len(batch), 12), dtype=np.int64)
+            prediction_ids = np.zeros((len(batch), 16), dtype=np.int64)
+            target_ids = np.zeros((len(batch), num_targets, 12), dtype=np.int64)
+            for idx, (source, prediction, targets) in enumerate(batch):
+                source_ids[idx, : len(source)] = source
+                prediction_ids[idx, : len(prediction)] = prediction
+                for target_idx, target in enumerate(targets):
+                    target_ids[idx, target_idx, : len(target)] = target
+
+            for beta_for_deletion in [0, 1]:
+                scores = self.sari_hook.get_sari_scores(
+                    source_ids, prediction_ids, target_ids, beta_for_deletion=beta_for_deletion
+                )
+                for idx, (source, prediction, targets) in enumerate(batch):
+                    expected = self.sari_hook.get_sari_score(
+                        source, prediction, targets, beta_for_deletion=beta_for_deletion
+                    )
+                    for score, expected_score in zip(scores, expected):
+                        self.assertAlmostEqual(score[idx], expected_score)
+
+    @pytest.mark.unit
+    def test_compute_sari_scores(self):
+        rng = np.random.RandomState(1)
+        words = ["a", "b", "c", "d", "<::::>", "."]
+        sources, predictions, target_lists = [], [], []
+        for _ in range(30):
+            sources.append(" ".join(rng.choice(words, size=rng.randint(1, 10))))
+            predictions.append(" ".join(rng.choice(words, size=rng.randint(0, 10))))
+            target_lists.append(
+                [" ".join(rng.choice(words, size=rng.randint(0, 10))) for _ in range(rng.randint(1, 4))]
+            )
+
+        for ignore_wikisplit_separators in [True, False]:
+            expected = np.zeros(4)
+            for source, prediction, targets in zip(sources, predictions, target_lists):
+                if ignore_wikisplit_separators:
+                    source, prediction = source.replace(" <::::> ", " "), prediction.replace(" <::::> ", " ")
+                    targets = [target.replace(" <::::> ", " ") for target in targets]
+                expected += self.sari_hook.get_sari_score(
+                    source.split(), prediction.split(), [target.split() for target in targets], beta_for_deletion=1
+                )
+            scores = self.score_lib.compute_sari_scores(
+                sources, predictions, target_lists, ignore_wikisplit_separators
+            )
+            for score, expected_score in zip(scores, expected / len(sources)):
+                self.assertAlmostEqual(score, expected_score)
+        self.assertEqual(self.score_lib.compute_sari_scores([], [], []), (0.0, 0.0, 0.0, 0.0))
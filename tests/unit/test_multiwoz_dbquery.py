@@ -0,0 +1,123 @@
+# ! /usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright 2020 NVIDIA. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+import json
+import os
+import random
+import shutil
+import tempfile
+from unittest import TestCase
+
+import pytest
+
+from nemo.collections.nlp.data.datasets.multiwoz_dataset.dbquery import Database
+
+
+def to_int(time):
+    return int(time.split(':')[0]) * 100 + int(time.split(':')[1])
+
+
+def scan_query(records, constraints, ignore_open=True):
+    # Checks every constraint against every record
+    found = []
+    for i, record in enumerate(records):
+        for key, val in constraints:
+            if val in ["", "dont care", "not mentioned", "don't care", "dontcare", "do n't care"]:
+                continue
+            try:
+                if key.lower() not in [k.lower() for k in record]:
+                    continue
+                if key == 'leaveAt':
+                    if to_int(val) > to_int(record[key]):
+                        break
+                elif key == 'arriveBy':
+                    if to_int(val) < to_int(record[key]):
+                        break
+                elif ignore_open and key in ['destination', 'departure']:
+                    continue
+                elif val.strip() != record[key].strip():
+                    break
+            except Exception:
+                continue
+        else:
+            found.append(i)
+    return found
+
+
+class TestMultiWOZDatabase(TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.data_dir, 'db'))
+        rng = random.Random(0)
+        self.trains = []
+        for i in range(300):
+            record = {
+                'day': rng.choice(['monday', 'tuesday', 'friday']),
+                'departure': rng.choice(['cambridge', 'ely']),
+                'destination': rng.choice(['london kings cross', 'ely ', 'stevenage']),
+                'leaveAt': '{:02d}:{:02d}'.format(rng.randint(5, 23), rng.choice([0, 15, 30, 45])),
+                'arriveBy': '{:02d}:{:02d}'.format(rng.randint(5, 23), rng.choice([0, 15, 30, 45])),
+                'price': rng.choice(['10.10 pounds', '4.40 pounds']),
+            }
+            # records without a slot or with values which aren't strings are not constrained by it
+            if i % 7 == 0:
+                del record['day']
+            if i % 11 == 0:
+                record['leaveAt'] = '?'
+            if i % 13 == 0:
+                record['price'] = {'amount': 10}
+            self.trains.append(record)
+        databases = {'restaurant': [], 'hotel': [], 'attraction': [], 'train': self.trains}
+        databases.update({'hospital': [{'department': 'acute medicine'}], 'police': [{'name': 'police'}]})
+        databases['taxi'] = {'taxi_colors': ['red'], 'taxi_types': ['bmw']}
+        for domain, records in databases.items():
+            with open(os.path.join(self.data_dir, 'db', f'{domain}_db.json'), 'w') as f:
+                json.dump(records, f)
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir)
+
+    @pytest.mark.unit
+    def test_query(self):
+        db = Database(self.data_dir)
+        rng = random.Random(1)
+        values = {
+            'day': ['monday', 'friday ', 'sunday', 'dontcare'],
+            'departure': ['cambridge', 'ely'],
+            'destination': ['ely', 'stevenage'],
+            'leaveAt': ['09:15', '17:00', '7', 'not mentioned'],
+            'arriveBy': ['12:30', '20:45'],
+            'price': ['4.40 pounds'],
+            'Day': ['monday'],
+            'stars': ['4'],
+        }
+        num_found = set()
+        for _ in range(200):
+            constraints = [[key, rng.choice(values[key])] for key in rng.sample(list(values), rng.randint(0, 5))]
+            for ignore_open in [True, False]:
+                expected = scan_query(self.trains, constraints, ignore_open)
+                found = db.query('train', constraints, ignore_open)
+                self.assertEqual([int(record['Ref']) for record in found], expected)
+                for record, i in zip(found, expected):
+                    self.assertEqual({k: v for k, v in record.items() if k != 'Ref'}, self.trains[i])
+                num_found.add(len(found))
+        self.assertIn(0, num_found)
+        self.assertGreater(len(num_found), 10)
+
+        self.assertEqual(db.query('police', []), [{'name': 'police'}])
+        self.assertEqual(db.query('taxi', [])[0]['taxi_types'], 'bmw')
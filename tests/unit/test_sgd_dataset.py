@@ -0,0 +1,105 @@
+# ! /usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright 2020 NVIDIA. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+import os
+import pickle
+import shutil
+import tempfile
+from types import SimpleNamespace
+from unittest import TestCase
+
+import numpy as np
+import pytest
+
+from nemo.collections.nlp.data.datasets.sgd_dataset.data_processor import EXAMPLE_FEATURES, examples_to_features
+from nemo.collections.nlp.data.datasets.sgd_dataset.sgd_dataset import SGDDataset
+from nemo.collections.nlp.data.feature_store import save_features
+
+
+class ExamplesDirProcessor(object):
+    def __init__(self, examples_dir):
+        self.examples_dir = examples_dir
+
+    def get_dialog_examples(self, dataset):
+        return self.examples_dir
+
+
+class TestSGDDataset(TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir)
+
+    def _example(self, rng, idx):
+        shapes = {
+            "utterance_ids": [16],
+            "utterance_segment": [16],
+            "utterance_mask": [16],
+            "start_char_idx": [16],
+            "end_char_idx": [16],
+            "categorical_slot_status": [3],
+            "cat_slot_status_mask": [3],
+            "categorical_slot_values": [3],
+            "cat_slot_values_mask": [3, 5],
+            "noncategorical_slot_status": [2],
+            "noncat_slot_status_mask": [2],
+            "noncategorical_slot_value_start": [2],
+            "noncategorical_slot_value_end": [2],
+            "num_slots": [],
+            "requested_slot_status": [5],
+            "requested_slot_mask": [5],
+            "intent_status_mask": [3],
+            "intent_status_labels": [],
+        }
+        example = SimpleNamespace(
+            example_id=f"train-1_{idx:05d}-00-Hotels_1",
+            example_id_num=[1, idx, 0, 7],
+            service_schema=SimpleNamespace(service_id=7),
+            is_real_example=True,
+        )
+        for name, shape in shapes.items():
+            setattr(example, name, rng.randint(-300, 30000, size=shape).tolist())
+        return example
+
+    @pytest.mark.unit
+    def test_columnar_examples(self):
+        rng = np.random.RandomState(0)
+        examples = [self._example(rng, idx) for idx in range(50)]
+        examples_dir = os.path.join(self.data_dir, "train_examples_features")
+        features = examples_to_features(examples)
+        self.assertEqual(features["service_id"].dtype, np.int8)
+        self.assertEqual(features["utterance_ids"].dtype, np.int16)
+        self.assertEqual(features["example_id"][3], "train-1_00003-00-Hotels_1")
+        save_features(examples_dir, features)
+
+        dataset = SGDDataset("train", ExamplesDirProcessor(examples_dir))
+        self.assertEqual(len(dataset), 50)
+        self.assertIsInstance(dataset.features["cat_slot_values_mask"], np.memmap)
+
+        # Pickled datasets (e.g. for data loader workers) map the features again
+        pickled_dataset = pickle.loads(pickle.dumps(dataset))
+        self.assertIsNone(pickled_dataset._features)
+
+        for idx, example in enumerate(examples):
+            for item in [dataset[idx], pickled_dataset[idx]]:
+                self.assertEqual(len(item), len(EXAMPLE_FEATURES))
+                for value, (name, dtype) in zip(item, EXAMPLE_FEATURES):
+                    expected = example.service_schema.service_id if name == "service_id" else getattr(example, name)
+                    self.assertEqual(value.dtype, dtype)
+                    self.assertTrue(np.array_equal(value, np.array(expected, dtype=dtype)))
@@ -0,0 +1,103 @@
+# ! /usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright 2020 NVIDIA. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+import copy
+from unittest import TestCase
+
+import pytest
+
+from nemo.collections.nlp.data.datasets.sgd_dataset.evaluate import (
+    ALL_SERVICES,
+    SEEN_SERVICES,
+    UNSEEN_SERVICES,
+    MetricsAggregator,
+    get_metrics,
+)
+
+
+def make_frame(service, active_intent, slot_values):
+    return {
+        "service": service,
+        "state": {"active_intent": active_intent, "requested_slots": [], "slot_values": slot_values},
+    }
+
+
+def make_dialog(dial_id, frames_per_turn):
+    turns = []
+    for frames in frames_per_turn:
+        turns.append({"speaker": "SYSTEM", "utterance": "how can i help", "frames": []})
+        turns.append({"speaker": "USER", "utterance": "a table for two", "frames": frames})
+    services = sorted({frame["service"] for frames in frames_per_turn for frame in frames})
+    return {"dialogue_id": dial_id, "services": services, "turns": turns}
+
+
+class TestSGDMetricsAggregator(TestCase):
+    def setUp(self):
+        slots = [
+            {"name": "city", "is_categorical": False, "possible_values": []},
+            {"name": "count", "is_categorical": True, "possible_values": ["1", "2"]},
+        ]
+        self.service_schemas = {
+            "Restaurants_1": {"service_name": "Restaurants_1", "slots": slots},
+            "Hotels_1": {"service_name": "Hotels_1", "slots": slots},
+        }
+        self.in_domain_services = {"Restaurants_1"}
+
+        self.dataset_ref = {
+            "1_00000": make_dialog(
+                "1_00000",
+                [
+                    [make_frame("Restaurants_1", "Reserve", {"count": ["2"]})],
+                    [make_frame("Restaurants_1", "Reserve", {"count": ["2"], "city": ["Paris"]})],
+                ],
+            ),
+            "1_00001": make_dialog(
+                "1_00001",
+                [
+                    [make_frame("Hotels_1", "Book", {"city": ["Oslo"]})],
+                    [make_frame("Hotels_1", "Book", {"city": ["Oslo"]}), make_frame("Restaurants_1", "NONE", {})],
+                ],
+            ),
+        }
+        self.dataset_hyp = copy.deepcopy(self.dataset_ref)
+        hyp_state = self.dataset_hyp["1_00000"]["turns"][3]["frames"][0]["state"]
+        hyp_state["slot_values"]["city"] = ["Rome"]
+        hyp_state = self.dataset_hyp["1_00001"]["turns"][1]["frames"][0]["state"]
+        hyp_state["active_intent"] = "NONE"
+
+    @pytest.mark.unit
+    def test_incremental_metrics(self):
+        for joint_acc_across_turn in [False, True]:
+            args = (self.service_schemas, self.in_domain_services, joint_acc_across_turn, True)
+            expected = get_metrics(self.dataset_ref, copy.deepcopy(self.dataset_hyp), *args)
+            self.assertEqual(expected[0][SEEN_SERVICES]["joint_goal_accuracy"], 50.0)
+            self.assertIn(UNSEEN_SERVICES, expected[0])
+
+            aggregator = MetricsAggregator(*args)
+            for dial_id in reversed(list(self.dataset_hyp)):
+                aggregator.add_dialog(dial_id, self.dataset_ref[dial_id], copy.deepcopy(self.dataset_hyp[dial_id]))
+            # Adding a dialogue again replaces its metrics
+            aggregator.add_dialog("1_00000", self.dataset_ref["1_00000"], self.dataset_ref["1_00000"])
+            self.assertEqual(len(aggregator), 2)
+            self.assertEqual(aggregator.aggregate()[0][SEEN_SERVICES]["joint_goal_accuracy"], 100.0)
+
+            aggregator.add_dialog("1_00000", self.dataset_ref["1_00000"], copy.deepcopy(self.dataset_hyp["1_00000"]))
+            all_metric_aggregate, per_frame_metric = aggregator.aggregate()
+            self.assertEqual(all_metric_aggregate, expected[0])
+            self.assertEqual(per_frame_metric, expected[1])
+            self.assertEqual(all_metric_aggregate[ALL_SERVICES]["active_intent_accuracy"], 80.0)
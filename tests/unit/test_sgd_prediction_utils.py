@@ -0,0 +1,235 @@
+# ! /usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright 2020 NVIDIA. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+import json
+import os
+import random
+import shutil
+import tempfile
+from unittest import TestCase
+
+import pytest
+import torch
+
+from nemo.collections.nlp.data.datasets.sgd_dataset.prediction_utils import (
+    MIN_SLOT_RELATION,
+    SlotsRelationIndex,
+    carry_over_slots,
+    get_carryover_value,
+    get_predicted_dialogs,
+)
+from nemo.collections.nlp.data.datasets.sgd_dataset.schema import Schema
+
+SERVICES = {
+    "Flights_1": {"origin": False, "destination": False, "passengers": True, "refundable": True},
+    "Hotels_1": {"city": False, "guests": True, "smoking": True},
+    "Restaurants_1": {"city": False, "party_size": True, "time": False},
+}
+
+
+def scan_carryover_value(slot, service, all_slot_values, slots_relation_list, sys_slots_last, sys_slots_agg):
+    # Scans the candidate list for the candidates of the slot, without the previous system actions of the service
+    extracted_value = None
+    for dmn, slt, freq in slots_relation_list.get((service, slot), []):
+        if freq < MIN_SLOT_RELATION:
+            continue
+        for values in [all_slot_values, sys_slots_agg, sys_slots_last]:
+            if dmn in values and slt in values[dmn]:
+                extracted_value = values[dmn][slt]
+    return extracted_value
+
+
+def scan_carry_over_slots(service, service_prev, all_slot_values, slots_relation_list, sys_slots_agg, sys_slots_last):
+    # Scans the whole candidate list for the candidates of the services
+    slot_values = dict(all_slot_values.get(service, {}))
+    for (service_dest, slot_dest), cands_list in slots_relation_list.items():
+        for service_src, slot_src, freq in cands_list:
+            if service_dest != service or service_src != service_prev or freq < MIN_SLOT_RELATION:
+                continue
+            for values in [all_slot_values, sys_slots_agg, sys_slots_last]:
+                if service_src in values and slot_src in values[service_src]:
+                    slot_values[slot_dest] = values[service_src][slot_src]
+    return slot_values
+
+
+class TestSGDPredictionUtils(TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        rng = random.Random(0)
+        services = []
+        for service, slots in SERVICES.items():
+            services.append(
+                {
+                    "service_name": service,
+                    "description": service,
+                    "slots": [
+                        {"name": slot, "description": slot, "is_categorical": is_cat, "possible_values": ["1", "2"]}
+                        for slot, is_cat in slots.items()
+                    ],
+                    "intents": [
+                        {"name": name, "description": name, "required_slots": list(slots), "optional_slots": {}}
+                        for name in ["Find", "Reserve"]
+                    ],
+                }
+            )
+        schema_path = os.path.join(self.data_dir, "schema.json")
+        with open(schema_path, "w") as f:
+            json.dump(services, f)
+        self.schemas = Schema([schema_path], add_carry_value=True, add_carry_status=True)
+
+        slots = [(service, slot) for service in SERVICES for slot in SERVICES[service]]
+        self.slots_relation_list = {}
+        for service, slot in rng.sample(slots, 8):
+            cands = [cand for cand in slots if cand[0] != service]
+            self.slots_relation_list[(service, slot)] = [
+                (cand_service, cand_slot, rng.choice([0.05, 0.5, 1.0]))
+                for cand_service, cand_slot in rng.sample(cands, rng.randint(1, 4))
+            ]
+        self.schemas._slots_relation_list = self.slots_relation_list
+
+        self.dialog_files = []
+        for file_idx in range(2):
+            dialogs = [self._dialog(rng, f"{file_idx + 1}_{idx:05d}") for idx in range(30)]
+            self.dialog_files.append(os.path.join(self.data_dir, f"dialogues_{file_idx:03d}.json"))
+            with open(self.dialog_files[-1], "w") as f:
+                json.dump(dialogs, f)
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir)
+
+    def _dialog(self, rng, dialog_id):
+        turns = []
+        for turn_idx in range(rng.randint(1, 8)):
+            frames = []
+            for service in rng.sample(list(SERVICES), rng.choice([1, 1, 2])):
+                if turn_idx % 2:
+                    actions = [{"slot": slot, "values": [f"{slot} {rng.randint(0, 3)}"]} for slot in SERVICES[service]]
+                    frames.append({"service": service, "actions": rng.sample(actions, rng.randint(0, 2))})
+                else:
+                    slot_values = {slot: [f"{slot} {rng.randint(0, 3)}", "1"] for slot in SERVICES[service]}
+                    frames.append({"service": service, "slots": [], "state": {"slot_values": slot_values}})
+            speaker = "SYSTEM" if turn_idx % 2 else "USER"
+            utterance = " ".join(rng.choice(["a", "city", "to", "two"]) for _ in range(6))
+            turns.append({"speaker": speaker, "utterance": utterance, "frames": frames})
+        return {"dialogue_id": dialog_id, "services": list(SERVICES), "turns": turns}
+
+    def _predictions(self):
+        generator = torch.Generator().manual_seed(0)
+
+        def randint(high, size):
+            return torch.randint(high, size, generator=generator)
+
+        predictions = []
+        for dialog_file in self.dialog_files:
+            with open(dialog_file) as f:
+                dialogs = json.load(f)
+            for dialog in dialogs:
+                for turn_idx, turn in enumerate(dialog["turns"]):
+                    for frame in turn["frames"]:
+                        service_schema = self.schemas.get_service_schema(frame["service"])
+                        num_cat = len(service_schema.categorical_slots)
+                        num_noncat = len(service_schema.non_categorical_slots)
+                        start = randint(10, (num_noncat,))
+                        prediction = {
+                            "example_id": f"test-{dialog['dialogue_id']}-{turn_idx:02d}-{frame['service']}",
+                            "is_real_example": torch.tensor([turn["speaker"] == "USER"]),
+                            "intent_status": randint(3, (1,)),
+                            "req_slot_status": torch.rand(len(service_schema.slots), generator=generator),
+                            "cat_slot_status": randint(4, (num_cat,)),
+                            "cat_slot_status_GT": randint(4, (num_cat,)),
+                            "cat_slot_status_p": torch.rand(num_cat, generator=generator),
+                            "cat_slot_value": randint(3, (num_cat,)),
+                            "cat_slot_value_GT": randint(3, (num_cat,)),
+                            "cat_slot_value_p": torch.rand(num_cat, generator=generator),
+                            "noncat_slot_status": randint(4, (num_noncat,)),
+                            "noncat_slot_status_GT": randint(4, (num_noncat,)),
+                            "noncat_slot_status_p": torch.rand(num_noncat, generator=generator),
+                            "noncat_slot_p": torch.rand(num_noncat, generator=generator),
+                            "noncat_slot_start": start,
+                            "noncat_slot_end": torch.min(start + randint(3, (num_noncat,)), torch.tensor(9)),
+                            # positive character indices are in the user utterance, negative ones in the system one
+                            "noncat_alignment_start": torch.tensor([0, 1, 3, 5, 9, -1, -3, 2, 0, 7]),
+                            "noncat_alignment_end": torch.tensor([0, 2, 4, 8, 11, -2, -6, 4, 0, 9]),
+                        }
+                        predictions.append(prediction)
+        return predictions
+
+    @pytest.mark.unit
+    def test_slots_relation_index(self):
+        rng = random.Random(1)
+        index = SlotsRelationIndex(self.slots_relation_list)
+        values = ["a", "b", "c"]
+        for _ in range(300):
+
+            def random_values():
+                return {
+                    service: {slot: rng.choice(values) for slot in rng.sample(list(slots), rng.randint(0, len(slots)))}
+                    for service, slots in rng.sample(list(SERVICES.items()), rng.randint(0, 3))
+                }
+
+            all_slot_values, sys_slots_agg, sys_slots_last = random_values(), random_values(), random_values()
+            service, service_prev = rng.sample(list(SERVICES), 2)
+            sys_slots_agg.setdefault(service, {})
+            for slot in SERVICES[service]:
+                expected = scan_carryover_value(
+                    slot, service, all_slot_values, self.slots_relation_list, sys_slots_last, sys_slots_agg
+                )
+                if slot in sys_slots_agg[service]:
+                    expected = sys_slots_agg[service][slot]
+                value = get_carryover_value(
+                    slot, {"service": service}, all_slot_values, index, service_prev, sys_slots_last, sys_slots_agg, {}
+                )
+                self.assertEqual(value, expected)
+
+            expected = scan_carry_over_slots(
+                service, service_prev, all_slot_values, self.slots_relation_list, sys_slots_agg, sys_slots_last
+            )
+            slot_values = dict(all_slot_values.get(service, {}))
+            carry_over_slots(
+                {"service": service}, all_slot_values, index, service_prev, slot_values, sys_slots_agg, sys_slots_last
+            )
+            self.assertEqual(slot_values, expected)
+
+    @pytest.mark.unit
+    def test_parallel_tracking(self):
+        for tracker_model in ["baseline", "nemotracker"]:
+            results = []
+            for num_workers in [1, 3]:
+                results.append(
+                    list(
+                        get_predicted_dialogs(
+                            self._predictions(),
+                            self.dialog_files,
+                            self.schemas,
+                            tracker_model,
+                            eval_debug=True,
+                            in_domain_services=set(SERVICES),
+                            num_workers=num_workers,
+                        )
+                    )
+                )
+            self.assertEqual(results[0], results[1])
+            self.assertEqual([result[0] for result in results[1]], self.dialog_files)
+            for _, ref_dialogs, pred_dialogs in results[1]:
+                self.assertEqual(len(ref_dialogs), 30)
+                for ref_dialog, pred_dialog in zip(ref_dialogs, pred_dialogs):
+                    self.assertEqual(ref_dialog["dialogue_id"], pred_dialog["dialogue_id"])
+                    for ref_turn, pred_turn in zip(ref_dialog["turns"], pred_dialog["turns"]):
+                        if ref_turn["speaker"] == "USER":
+                            self.assertTrue(all("slots" in frame for frame in ref_turn["frames"]))
+                            self.assertTrue(all("slots" not in frame for frame in pred_turn["frames"]))
@@ -0,0 +1,116 @@
+# ! /usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright 2020 NVIDIA. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+import json
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+import pytest
+import torch
+
+from nemo.collections.nlp.data.datasets.sgd_dataset.schema import Schema
+from nemo.collections.nlp.data.datasets.sgd_dataset.schema_embedding_store import (
+    EMBEDDING_TENSOR_NAMES,
+    SchemaEmbeddingStore,
+    encoder_fingerprint,
+    service_fingerprint,
+)
+
+
+class TestSchemaEmbeddingStore(TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir)
+
+    def _schemas(self, descriptions, add_carry_value=False):
+        services = []
+        for name, description in descriptions.items():
+            slots = [
+                {"name": "city", "description": "city", "is_categorical": False, "possible_values": []},
+                {"name": "count", "description": "count", "is_categorical": True, "possible_values": ["1", "2"]},
+            ]
+            intents = [
+                {"name": "Find", "description": "find", "required_slots": ["city", "count"], "optional_slots": {}}
+            ]
+            services.append({"service_name": name, "description": description, "slots": slots, "intents": intents})
+        schema_path = os.path.join(self.data_dir, "schema.json")
+        with open(schema_path, "w") as f:
+            json.dump(services, f)
+        return Schema([schema_path], add_carry_value=add_carry_value, add_carry_status=False)
+
+    def _embeddings(self, num_services, value):
+        shapes = {
+            "intent_emb": [2],
+            "req_slot_emb": [4],
+            "cat_slot_emb": [2],
+            "noncat_slot_emb": [2],
+            "cat_slot_value_emb": [2, 3],
+        }
+        return {name: np.full([num_services] + shapes[name] + [8], value) for name in EMBEDDING_TENSOR_NAMES}
+
+    @pytest.mark.unit
+    def test_service_fingerprint(self):
+        schemas = self._schemas({"Hotels_1": "hotels", "Buses_1": "buses"})
+        fingerprints = {s: service_fingerprint(schemas.get_service_schema(s)) for s in schemas.services}
+
+        changed = self._schemas({"Hotels_1": "hotels", "Buses_1": "long distance buses"})
+        self.assertEqual(service_fingerprint(changed.get_service_schema("Hotels_1")), fingerprints["Hotels_1"])
+        self.assertNotEqual(service_fingerprint(changed.get_service_schema("Buses_1")), fingerprints["Buses_1"])
+
+        # The carry-over value is embedded as a categorical slot value
+        with_carry_value = self._schemas({"Hotels_1": "hotels", "Buses_1": "buses"}, add_carry_value=True)
+        hotels = with_carry_value.get_service_schema("Hotels_1")
+        self.assertNotEqual(service_fingerprint(hotels), fingerprints["Hotels_1"])
+
+    @pytest.mark.unit
+    def test_encoder_fingerprint(self):
+        torch.manual_seed(0)
+        encoder = torch.nn.Linear(4, 4)
+        fingerprint = encoder_fingerprint(encoder)
+        self.assertEqual(encoder_fingerprint(encoder), fingerprint)
+        with torch.no_grad():
+            encoder.bias[0] += 1
+        self.assertNotEqual(encoder_fingerprint(encoder), fingerprint)
+
+    @pytest.mark.unit
+    def test_incremental_add(self):
+        store_dir = os.path.join(self.data_dir, "store")
+        store = SchemaEmbeddingStore(store_dir)
+        self.assertEqual(len(store), 0)
+        store.add(["a", "b"], self._embeddings(2, 1.0))
+        store.add(["c"], self._embeddings(1, 2.0))
+
+        store = SchemaEmbeddingStore(store_dir)
+        self.assertEqual(len(store), 3)
+        self.assertIn("b", store)
+        self.assertNotIn("d", store)
+        self.assertIsInstance(store.get("a")["cat_slot_value_emb"], np.memmap)
+        self.assertEqual(store.get("a")["cat_slot_value_emb"].shape, (2, 3, 8))
+        self.assertTrue(np.all(store.get("b")["intent_emb"] == 1.0))
+        self.assertTrue(np.all(store.get("c")["intent_emb"] == 2.0))
+
+        # Adding a service again replaces its embeddings
+        store.add(["a"], self._embeddings(1, 3.0))
+        self.assertEqual(len(store), 3)
+        self.assertTrue(np.all(store.get("a")["req_slot_emb"] == 3.0))
+        self.assertTrue(np.all(store.get("c")["req_slot_emb"] == 2.0))
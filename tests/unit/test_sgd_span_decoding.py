@@ -0,0 +1,50 @@
+# ! /usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright 2020 NVIDIA. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+from unittest import TestCase
+
+import pytest
+import torch
+
+from nemo.collections.nlp.callbacks.sgd_callback import get_best_spans
+
+
+def all_pairs_best_spans(start_scores, end_scores):
+    # Scores all (start, end) pairs and masks pairs with start > end
+    num_tokens = start_scores.size(-1)
+    total_scores = start_scores.unsqueeze(-1) + end_scores.unsqueeze(-2)
+    invalid = torch.ones(num_tokens, num_tokens, dtype=torch.bool).tril(-1)
+    total_scores = total_scores.masked_fill(invalid, 0).view(*start_scores.shape[:-1], -1)
+    span_scores, span_index = torch.max(total_scores, dim=-1)
+    return span_index // num_tokens, span_index % num_tokens, span_scores
+
+
+class TestSGDSpanDecoding(TestCase):
+    @pytest.mark.unit
+    def test_get_best_spans(self):
+        torch.manual_seed(0)
+        for round_logits in [False, True]:
+            logits = torch.randn(2, 8, 6, 40) * 2
+            if round_logits:
+                # many equal scores
+                logits = logits.round()
+            start_scores, end_scores = torch.softmax(logits, dim=-1)
+            for expected, result in zip(
+                all_pairs_best_spans(start_scores, end_scores), get_best_spans(start_scores, end_scores)
+            ):
+                self.assertTrue(torch.equal(expected, result))
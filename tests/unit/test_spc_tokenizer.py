@@ -21,7 +21,7 @@ from unittest import TestCase
 import pytest
 
 import nemo.collections.nlp as nemo_nlp
-from nemo.collections.nlp.data import SentencePieceTokenizer
+from nemo.collections.nlp.data import ParallelTokenizer, SentencePieceTokenizer
 
 
 class TestSPCTokenizer(TestCase):
@@ -112,3 +112,43 @@ class TestSPCTokenizer(TestCase):
 
         for i in range(len(result)):
             self.assertTrue(result[i] == tokens[i])
+
+    @pytest.mark.unit
+    def test_batch_text_to_ids(self):
+        tokenizer = SentencePieceTokenizer("./tests/data/m_common.model")
+        special_tokens = nemo_nlp.data.tokenizers.MODEL_SPECIAL_TOKENS['bert']
+        tokenizer.add_special_tokens(special_tokens)
+
+        texts = ["[CLS] a b c [MASK] e f [SEP] g h i [SEP]", "", "no special tokens", "[SEP][SEP]x"]
+        self.assertEqual(tokenizer.batch_text_to_ids(texts), [tokenizer.text_to_ids(text) for text in texts])
+        self.assertEqual(tokenizer.batch_text_to_tokens(texts), [tokenizer.text_to_tokens(text) for text in texts])
+
+    @pytest.mark.unit
+    def test_parallel_tokenizer(self):
+        tokenizer = SentencePieceTokenizer("./tests/data/m_common.model")
+        special_tokens = nemo_nlp.data.tokenizers.MODEL_SPECIAL_TOKENS['bert']
+        tokenizer.add_special_tokens(special_tokens)
+
+        texts = [f"[CLS] line {i} with {'some ' * (i % 7)}words [SEP]" for i in range(100)]
+        parallel_tokenizer = ParallelTokenizer(tokenizer, num_workers=3, chunk_size=7)
+        ids = parallel_tokenizer.text_to_ids(texts)
+
+        self.assertEqual(ids, [tokenizer.text_to_ids(text) for text in texts])
+        self.assertEqual(parallel_tokenizer.stats.num_lines, len(texts))
+        self.assertEqual(parallel_tokenizer.stats.num_tokens, sum(len(line_ids) for line_ids in ids))
+        self.assertEqual(parallel_tokenizer.stats.num_bytes, sum(len(text) for text in texts))
+        self.assertGreater(parallel_tokenizer.stats.tokens_per_second, 0)
+
+    @pytest.mark.unit
+    def test_overlapping_special_tokens(self):
+        tokenizer = SentencePieceTokenizer("./tests/data/m_common.model")
+        tokenizer.add_special_tokens(["<a>", "<a><b>", "(x|y)"])
+
+        # Of special tokens starting at the same position, the one added first is used
+        tokens = tokenizer.text_to_tokens("(x|y)<a><b>x")
+        self.assertEqual(tokens[:2], ["(x|y)", "<a>"])
+        self.assertNotIn("<a><b>", tokens)
+
+        tokenizer = SentencePieceTokenizer("./tests/data/m_common.model")
+        tokenizer.add_special_tokens(["<a><b>", "<a>"])
+        self.assertEqual(tokenizer.text_to_tokens("<a><b><a>"), ["<a><b>", "<a>"])
@@ -0,0 +1,174 @@
+# ! /usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright 2020 NVIDIA. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+import collections
+from types import SimpleNamespace
+from unittest import TestCase
+
+import numpy as np
+import pytest
+
+from nemo.collections.nlp.data.datasets.qa_squad_dataset.qa_squad_dataset import SquadDataset, _features_to_arrays
+from nemo.collections.nlp.metrics.squad_metrics import _get_best_indexes, _get_best_indexes_batch, get_final_text
+from nemo.collections.nlp.utils.functional_utils import _compute_softmax
+
+MAX_SEQ_LENGTH = 24
+WORDS = ["the", "quick", "brown", "fox", "jumps", "over", "lazy", "dog", "river", "bank"]
+
+
+def loop_predictions(examples, features, unique_ids, start_logits, end_logits, n_best_size, max_answer_length):
+    # Scores the n-best start and end indexes of every feature one pair at a time
+    unique_id_to_pos = {unique_id: index for index, unique_id in enumerate(unique_ids)}
+    all_predictions, all_nbest_json, scores_diff_json = {}, {}, {}
+    for example_index, example in enumerate(examples):
+        example_features = [feature for feature in features if feature.example_index == example_index]
+        prelim_predictions = []
+        score_null, min_null_feature_index, null_start_logit, null_end_logit = 1000000, 0, 0, 0
+        for feature_index, feature in enumerate(example_features):
+            pos = unique_id_to_pos[feature.unique_id]
+            if start_logits[pos][0] + end_logits[pos][0] < score_null:
+                score_null = start_logits[pos][0] + end_logits[pos][0]
+                min_null_feature_index = feature_index
+                null_start_logit, null_end_logit = start_logits[pos][0], end_logits[pos][0]
+            for start_index in _get_best_indexes(start_logits[pos], n_best_size):
+                for end_index in _get_best_indexes(end_logits[pos], n_best_size):
+                    if (
+                        start_index >= len(feature.tokens)
+                        or end_index >= len(feature.tokens)
+                        or start_index not in feature.token_to_orig_map
+                        or end_index not in feature.token_to_orig_map
+                        or not feature.token_is_max_context.get(start_index, False)
+                        or end_index < start_index
+                        or end_index - start_index + 1 > max_answer_length
+                    ):
+                        continue
+                    prelim_predictions.append(
+                        (
+                            feature_index,
+                            start_index,
+                            end_index,
+                            start_logits[pos][start_index],
+                            end_logits[pos][end_index],
+                        )
+                    )
+        prelim_predictions.append((min_null_feature_index, 0, 0, null_start_logit, null_end_logit))
+        prelim_predictions = sorted(prelim_predictions, key=lambda x: x[3] + x[4], reverse=True)
+
+        seen_predictions, nbest = set(), []
+        for feature_index, start_index, end_index, start_logit, end_logit in prelim_predictions:
+            if len(nbest) >= n_best_size:
+                break
+            feature = example_features[feature_index]
+            final_text = ""
+            if start_index > 0:
+                tok_text = " ".join(feature.tokens[start_index : end_index + 1]).replace(" ##", "").replace("##", "")
+                orig_tokens = example.doc_tokens[
+                    feature.token_to_orig_map[start_index] : feature.token_to_orig_map[end_index] + 1
+                ]
+                final_text = get_final_text(" ".join(tok_text.split()), " ".join(orig_tokens), True)
+                if final_text in seen_predictions:
+                    continue
+            seen_predictions.add(final_text)
+            nbest.append((final_text, start_logit, end_logit))
+        if "" not in seen_predictions:
+            nbest.append(("", null_start_logit, null_end_logit))
+        if len(nbest) == 1:
+            nbest.insert(0, ("empty", 0.0, 0.0))
+
+        probs = _compute_softmax([start_logit + end_logit for _, start_logit, end_logit in nbest])
+        all_nbest_json[example.qas_id] = [
+            collections.OrderedDict(text=text, probability=prob, start_logit=start_logit, end_logit=end_logit)
+            for (text, start_logit, end_logit), prob in zip(nbest, probs)
+        ]
+        best_non_null_entry = next(entry for entry in nbest if entry[0])
+        scores_diff_json[example.qas_id] = score_null - best_non_null_entry[1] - best_non_null_entry[2]
+        all_predictions[example.qas_id] = "" if scores_diff_json[example.qas_id] > 0.0 else best_non_null_entry[0]
+    return all_predictions, all_nbest_json, scores_diff_json
+
+
+class TestSquadPredictions(TestCase):
+    def _fixture(self, rng):
+        # SQuAD v2 examples, split into overlapping features (document spans) of [CLS] question [SEP] context [SEP]
+        examples, features = [], []
+        for example_index in range(6):
+            doc_tokens = [rng.choice(WORDS) for _ in range(rng.randint(5, 25))]
+            examples.append(SimpleNamespace(qas_id=f"q{example_index}", doc_tokens=doc_tokens, answers=[]))
+            for doc_span_index, span_start in enumerate(range(0, max(1, len(doc_tokens) - 4), 8)):
+                tokens = ["[CLS]", "where", "?", "[SEP]"]
+                token_to_orig_map, token_is_max_context = {}, {}
+                for orig_index in range(span_start, min(len(doc_tokens), span_start + 12)):
+                    # words are split into word pieces
+                    word = doc_tokens[orig_index]
+                    for piece in [word[:3], "##" + word[3:]] if len(word) > 3 else [word]:
+                        if len(tokens) < MAX_SEQ_LENGTH - 1:
+                            token_to_orig_map[len(tokens)] = orig_index
+                            token_is_max_context[len(tokens)] = rng.rand() < 0.8
+                            tokens.append(piece)
+                tokens.append("[SEP]")
+                features.append(
+                    SimpleNamespace(
+                        unique_id=1000 + len(features),
+                        example_index=example_index,
+                        doc_span_index=doc_span_index,
+                        tokens=tokens,
+                        token_to_orig_map=token_to_orig_map,
+                        token_is_max_context=token_is_max_context,
+                        input_ids=[0] * MAX_SEQ_LENGTH,
+                        segment_ids=[0] * MAX_SEQ_LENGTH,
+                        input_mask=[0] * MAX_SEQ_LENGTH,
+                        start_position=None,
+                        end_position=None,
+                        is_impossible=None,
+                    )
+                )
+        dataset = SquadDataset.__new__(SquadDataset)
+        dataset.examples = examples
+        dataset.features = _features_to_arrays(features, MAX_SEQ_LENGTH)
+        return dataset, examples, features
+
+    @pytest.mark.unit
+    def test_get_best_indexes_batch(self):
+        rng = np.random.RandomState(0)
+        for n_best_size in [1, 3, 20, 40]:
+            # rounded logits have many ties
+            for logits in [rng.randn(50, 30), np.round(rng.randn(50, 30)), rng.randint(0, 3, (50, 30))]:
+                best = _get_best_indexes_batch(logits, n_best_size)
+                for row, row_best in zip(logits.tolist(), best.tolist()):
+                    self.assertEqual(row_best, _get_best_indexes(row, n_best_size))
+
+    @pytest.mark.unit
+    def test_get_predictions(self):
+        rng = np.random.RandomState(1)
+        dataset, examples, features = self._fixture(rng)
+        unique_ids = [feature.unique_id for feature in features]
+        for n_best_size, max_answer_length in [(5, 10), (20, 3), (1, 30), (30, 30)]:
+            for round_logits in [False, True]:
+                order = rng.permutation(len(features))
+                start_logits, end_logits = rng.randn(2, len(features), MAX_SEQ_LENGTH)
+                if round_logits:
+                    start_logits, end_logits = np.round(start_logits), np.round(end_logits)
+                start_logits, end_logits = start_logits.tolist(), end_logits.tolist()
+                args = (
+                    [unique_ids[i] for i in order],
+                    [start_logits[i] for i in order],
+                    [end_logits[i] for i in order],
+                    n_best_size,
+                    max_answer_length,
+                )
+                predictions = dataset.get_predictions(*args, True, True, 0.0)
+                self.assertEqual(predictions, loop_predictions(examples, features, *args))
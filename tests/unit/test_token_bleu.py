@@ -0,0 +1,55 @@
+# ! /usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright 2020 NVIDIA. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+from unittest import TestCase
+
+import numpy as np
+import pytest
+
+from nemo.collections.nlp.metrics.sacrebleu import corpus_bleu
+from nemo.collections.nlp.metrics.token_bleu import bleu_from_statistics, bleu_statistics, remove_special_ids
+
+
+class TestTokenBLEU(TestCase):
+    @pytest.mark.unit
+    def test_remove_special_ids(self):
+        ids, lengths = remove_special_ids([[1, 5, 6, 2, 0], [1, 0, 7, 0, 8]], special_ids=[0, 1, 2])
+        self.assertEqual(lengths.tolist(), [2, 2])
+        self.assertEqual(ids[0, :2].tolist(), [5, 6])
+        self.assertEqual(ids[1, :2].tolist(), [7, 8])
+
+    @pytest.mark.unit
+    def test_matches_corpus_bleu(self):
+        rng = np.random.RandomState(0)
+        all_stats, hyps, refs = [], [], []
+        for _ in range(5):
+            hyp_ids = rng.randint(1, 8, size=(16, 20))
+            ref_ids = rng.randint(1, 8, size=(16, 15))
+            hyp_lengths = rng.randint(0, 21, size=16)
+            ref_lengths = rng.randint(1, 16, size=16)
+            all_stats.append(bleu_statistics(hyp_ids, ref_ids, hyp_lengths, ref_lengths))
+            hyps += [" ".join(map(str, ids[:length])) for ids, length in zip(hyp_ids, hyp_lengths)]
+            refs += [" ".join(map(str, ids[:length])) for ids, length in zip(ref_ids, ref_lengths)]
+
+        expected = corpus_bleu(hyps, [refs], tokenize="none")
+        result = bleu_from_statistics(np.concatenate(all_stats))
+        self.assertAlmostEqual(result.score, expected.score)
+        self.assertEqual(list(result.counts), list(expected.counts))
+        self.assertEqual(list(result.totals), list(expected.totals))
+        self.assertEqual(result.sys_len, expected.sys_len)
+        self.assertEqual(result.ref_len, expected.ref_len)
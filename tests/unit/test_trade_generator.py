@@ -0,0 +1,73 @@
+# ! /usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright 2020 NVIDIA. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+from unittest import TestCase
+
+import pytest
+import torch
+
+from nemo.collections.nlp.nm.trainables.dialogue_state_tracking.trade_generator_nm import TRADEGenerator
+
+
+class Vocab(object):
+    pad_id = 1
+    eos_id = 2
+
+    def __len__(self):
+        return 30
+
+
+@pytest.mark.usefixtures("neural_factory")
+class TestTRADEGenerator(TestCase):
+    @pytest.mark.unit
+    def test_inference_mode(self):
+        torch.manual_seed(0)
+        embedding = torch.nn.Embedding(len(Vocab()), 16)
+        with torch.no_grad():
+            # makes some of the slots emit EOS before the last step
+            embedding.weight[Vocab.eos_id] *= 4
+        slots = ['hotel-area', 'hotel-name', 'train-day', 'train-leaveat']
+        generator = TRADEGenerator(Vocab(), embedding, 16, 0.0, slots, 3, max_res_len=6)
+        inference_generator = TRADEGenerator(Vocab(), embedding, 16, 0.0, slots, 3, inference_mode=True)
+        inference_generator.load_state_dict(generator.state_dict())
+        self.assertIn('point_ids', inference_generator.output_ports)
+        generator.eval()
+        inference_generator.eval()
+
+        device = generator._device
+        encoder_hidden = torch.randn(5, 9, 16, device=device)
+        encoder_outputs = torch.randn(5, 9, 16, device=device)
+        dialog_ids = torch.randint(3, 30, (5, 9), device=device)
+        dialog_lens = torch.tensor([8, 3, 5, 7, 2], device=device)
+        # the targets only set the number of decoding steps
+        targets = torch.zeros(5, len(slots), 6, dtype=torch.long, device=device)
+        with torch.no_grad():
+            point_outputs, gate_outputs = generator.forward(encoder_hidden, encoder_outputs, dialog_ids, dialog_lens)
+            point_ids, point_probs, inference_gate_outputs = inference_generator.forward(
+                encoder_hidden, encoder_outputs, dialog_ids, dialog_lens, targets
+            )
+
+        # the greedy predictions of the dense outputs, padded after EOS
+        probs, ids = point_outputs.max(dim=-1)
+        eos_count = (ids == Vocab.eos_id).cumsum(dim=-1)
+        after_eos = (eos_count - (ids == Vocab.eos_id).long()) > 0
+        self.assertTrue(after_eos.any())
+        self.assertFalse(after_eos.all())
+        self.assertTrue(torch.equal(point_ids, ids.masked_fill(after_eos, Vocab.pad_id)))
+        self.assertTrue(torch.allclose(point_probs, probs.masked_fill(after_eos, 0), atol=1e-6))
+        self.assertTrue(torch.allclose(inference_gate_outputs, gate_outputs, atol=1e-6))
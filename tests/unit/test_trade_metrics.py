@@ -0,0 +1,101 @@
+# ! /usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright 2020 NVIDIA. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+from types import SimpleNamespace
+from unittest import TestCase
+
+import pytest
+import torch
+
+from nemo.collections.nlp.callbacks.state_tracking_trade_callback import eval_epochs_done_callback, eval_iter_callback
+
+DATA_DESC = SimpleNamespace(vocab=SimpleNamespace(pad_id=1), gating_dict={'ptr': 0, 'dontcare': 1, 'none': 2})
+
+
+def loop_metrics(point_ids, tgt_ids, gating_labels, gating_preds):
+    # Compares the slots one by one
+    ptr_code = DATA_DESC.gating_dict['ptr']
+    correct_turns, correct_slots, correct_gates, total_slots = 0, 0, 0, 0
+    for turn_idx in range(len(gating_labels)):
+        turn_wrong = False
+        for slot_idx in range(len(gating_labels[turn_idx])):
+            total_slots += 1
+            label, pred = gating_labels[turn_idx][slot_idx], gating_preds[turn_idx][slot_idx]
+            slot_eq = all(
+                p == t or t == DATA_DESC.vocab.pad_id
+                for p, t in zip(point_ids[turn_idx][slot_idx], tgt_ids[turn_idx][slot_idx])
+            )
+            correct_gates += label == pred
+            if label == ptr_code:
+                slot_correct = slot_eq
+            else:
+                slot_correct = label == pred or (slot_eq and pred == ptr_code)
+            if slot_correct:
+                correct_slots += 1
+            else:
+                turn_wrong = True
+        correct_turns += not turn_wrong
+    return correct_turns / len(gating_labels), correct_slots / total_slots, correct_gates / total_slots
+
+
+class TestTRADEMetrics(TestCase):
+    def _batch(self, generator, batch_size, num_slots=5, num_tokens=4, vocab_size=6):
+        tgt_ids = torch.randint(2, vocab_size, (batch_size, num_slots, num_tokens), generator=generator)
+        # targets of different lengths, padded
+        lengths = torch.randint(1, num_tokens + 1, (batch_size, num_slots, 1), generator=generator)
+        tgt_ids.masked_fill_(torch.arange(num_tokens) >= lengths, DATA_DESC.vocab.pad_id)
+        point_outputs = torch.randn(batch_size, num_slots, num_tokens, vocab_size, generator=generator)
+        # makes most of the predicted values correct
+        correct = torch.rand(batch_size, num_slots, num_tokens, 1, generator=generator) < 0.8
+        point_outputs += 10 * correct * torch.nn.functional.one_hot(tgt_ids, vocab_size)
+        gating_labels = torch.randint(0, 3, (batch_size, num_slots), generator=generator)
+        gate_outputs = torch.randn(batch_size, num_slots, 3, generator=generator)
+        correct = torch.rand(batch_size, num_slots, 1, generator=generator) < 0.7
+        gate_outputs += 10 * correct * torch.nn.functional.one_hot(gating_labels, 3)
+        return point_outputs, tgt_ids, gating_labels, gate_outputs
+
+    @pytest.mark.unit
+    def test_metrics(self):
+        generator = torch.Generator().manual_seed(0)
+        for point_name in ['point_outputs', 'point_ids']:
+            # batches of two workers in distributed evaluation
+            batches = [[self._batch(generator, batch_size) for batch_size in [7, 3]] for _ in range(4)]
+            global_vars = {}
+            for batch in batches:
+                tensors = {'IS_FROM_DIST_EVAL': True}
+                for name, idx in [(point_name, 0), ('tgt_ids', 1), ('gating_labels', 2), ('gate_outputs', 3)]:
+                    values_list = [worker_batch[idx] for worker_batch in batch]
+                    if name == 'point_ids':
+                        values_list = [values.argmax(dim=-1) for values in values_list]
+                    tensors[f'{name}~~~{name}'] = values_list
+                eval_iter_callback(tensors, global_vars, DATA_DESC)
+            self.assertEqual(global_vars['total_turns'], 40)
+            self.assertEqual(global_vars['total_slots'], 200)
+
+            worker_batches = [worker_batch for batch in batches for worker_batch in batch]
+            expected = loop_metrics(
+                torch.cat([point_outputs.argmax(dim=-1) for point_outputs, _, _, _ in worker_batches]).tolist(),
+                torch.cat([tgt_ids for _, tgt_ids, _, _ in worker_batches]).tolist(),
+                torch.cat([gating_labels for _, _, gating_labels, _ in worker_batches]).tolist(),
+                torch.cat([gate_outputs.argmax(dim=-1) for _, _, _, gate_outputs in worker_batches]).tolist(),
+            )
+            self.assertGreater(expected[0], 0)
+            self.assertLess(expected[0], 1)
+            metrics = eval_epochs_done_callback(global_vars, DATA_DESC)
+            for name, value in zip(['Joint_Goal_Acc', 'Slot_Acc', 'Gate_Acc'], expected):
+                self.assertAlmostEqual(metrics[name], value)
@@ -0,0 +1,86 @@
+# ! /usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright 2020 NVIDIA. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+from unittest import TestCase
+
+import pytest
+import torch
+
+from nemo.collections.nlp.nm.trainables.common.transformer.transformer_decoders import TransformerDecoder
+from nemo.collections.nlp.nm.trainables.common.transformer.transformer_generators import (
+    BeamSearchSequenceGenerator,
+    GreedySequenceGenerator,
+)
+from nemo.collections.nlp.nm.trainables.common.transformer.transformer_modules import TransformerEmbedding
+
+
+class LogSoftmax(torch.nn.Module):
+    def __init__(self, hidden_size, vocab_size):
+        super().__init__()
+        self.dense = torch.nn.Linear(hidden_size, vocab_size)
+
+    def forward(self, hidden_states):
+        return torch.log_softmax(self.dense(hidden_states), dim=-1)
+
+
+class TestTransformerKVCache(TestCase):
+    def setUp(self):
+        torch.manual_seed(0)
+        hidden_size, vocab_size = 32, 50
+        self.embedding = TransformerEmbedding(vocab_size, hidden_size, max_sequence_length=64).eval()
+        self.decoder = TransformerDecoder(3, hidden_size, inner_size=64, num_attention_heads=4).eval()
+        self.log_softmax = LogSoftmax(hidden_size, vocab_size).eval()
+        self.encoder_states = torch.randn(3, 7, hidden_size)
+        self.encoder_mask = torch.ones(3, 7)
+        self.encoder_mask[1, 5:] = 0
+
+    @pytest.mark.unit
+    def test_decoder_steps(self):
+        input_ids = torch.randint(3, 50, (3, 6))
+        input_mask = torch.ones(3, 1)
+        # Buffers for 4 positions grow when more are decoded
+        cache = self.decoder.init_cache(4)
+        mems = None
+        with torch.no_grad():
+            for i in range(input_ids.size(1)):
+                states = self.embedding(input_ids[:, i : i + 1], start_pos=i)
+                mems = self.decoder(states, input_mask, self.encoder_states, self.encoder_mask, mems, return_mems=True)
+                cached_states = self.decoder(states, input_mask, self.encoder_states, self.encoder_mask, cache=cache)
+                self.assertTrue(torch.allclose(mems[-1][:, -1:], cached_states, atol=1e-5))
+        self.assertEqual(cache.length, input_ids.size(1))
+
+    @pytest.mark.unit
+    def test_generators(self):
+        for generator_class, kwargs in [
+            (GreedySequenceGenerator, {}),
+            (BeamSearchSequenceGenerator, {'beam_size': 4, 'len_pen': 0.6}),
+        ]:
+            outputs = []
+            for use_kv_cache in [False, True]:
+                generator = generator_class(
+                    self.embedding,
+                    self.decoder,
+                    self.log_softmax,
+                    max_delta_length=10,
+                    use_kv_cache=use_kv_cache,
+                    **kwargs,
+                )
+                outputs.append(
+                    generator(encoder_hidden_states=self.encoder_states, encoder_input_mask=self.encoder_mask)
+                )
+            self.assertTrue(torch.equal(outputs[0], outputs[1]))
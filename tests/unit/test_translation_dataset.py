@@ -0,0 +1,136 @@
+# ! /usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright 2020 NVIDIA. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+import os
+import random
+import shutil
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+import pytest
+from torch.utils.data.distributed import DistributedSampler
+
+from nemo.collections.nlp.data import SentencePieceTokenizer, TokenBucketTranslationDataset, TranslationDataset
+from nemo.collections.nlp.data.datasets.machine_translation_dataset import pack_into_token_batches
+from nemo.collections.nlp.nm.data_layers import TranslationDataLayer
+
+
+@pytest.mark.usefixtures("neural_factory")
+class TestTokenBucketTranslationDataset(TestCase):
+    def setUp(self):
+        self.tokenizer = SentencePieceTokenizer("./tests/data/m_common.model")
+        self.tokenizer.add_special_tokens({'pad_token': '<pad>', 'bos_token': '<s>', 'eos_token': '</s>'})
+        self.data_dir = tempfile.mkdtemp()
+
+        random.seed(0)
+        words = ["the", "quick", "brown", "fox", "jumps", "over", "a", "lazy", "dog", "again", "and"]
+        sentences = [" ".join(random.choices(words, k=random.randint(0, 40))) for _ in range(300)]
+        translations = [" ".join(random.sample(s.split(), len(s.split()))) for s in sentences]
+        self.src_file = os.path.join(self.data_dir, "train.src")
+        self.tgt_file = os.path.join(self.data_dir, "train.tgt")
+        with open(self.src_file, "w") as f:
+            f.write("\n".join(sentences) + "\n")
+        with open(self.tgt_file, "w") as f:
+            f.write("\n".join(translations) + "\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir)
+
+    def _sentence_pairs(self, dataset):
+        # Maps sentence ids to source and target ids with the padding after </s> removed
+        eos_id = self.tokenizer.eos_id
+        pairs = {}
+        for i in range(len(dataset)):
+            src_ids, _, tgt_ids, _, labels, sent_ids = dataset[i]
+            tgt = np.concatenate([tgt_ids[:, :1], labels], axis=1)
+            for j in range(len(sent_ids)):
+                src_end = np.flatnonzero(src_ids[j] == eos_id)[-1] + 1
+                tgt_end = np.flatnonzero(tgt[j] == eos_id)[-1] + 1
+                pairs[int(sent_ids[j])] = (tuple(src_ids[j][:src_end]), tuple(tgt[j][:tgt_end]))
+        return pairs
+
+    @pytest.mark.unit
+    def test_same_sentence_pairs(self):
+        for clean in [False, True]:
+            args = (self.tokenizer, self.tokenizer, self.src_file, self.tgt_file, 512, clean)
+            dataset = TokenBucketTranslationDataset(*args)
+            reference = TranslationDataset(*args)
+
+            for i in range(len(dataset)):
+                src_ids, _, tgt_ids, _, labels, _ = dataset[i]
+                self.assertLessEqual(len(src_ids) * (src_ids.shape[1] + tgt_ids.shape[1] + 1), 512)
+
+            pairs = self._sentence_pairs(dataset)
+            reference_pairs = self._sentence_pairs(reference)
+            self.assertEqual(len(pairs), sum(len(dataset.batch_indices[i]) for i in range(len(dataset))))
+            self.assertEqual(sorted(pairs.values()), sorted(reference_pairs.values()))
+            if not clean:
+                self.assertEqual(pairs, reference_pairs)
+
+        # Token ids are cached
+        self.assertEqual(len([d for d in os.listdir(self.data_dir) if "_features_" in d]), 1)
+
+    @pytest.mark.unit
+    def test_batch_order_changes_between_epochs(self):
+        data_layer = TranslationDataLayer(
+            self.tokenizer,
+            self.tokenizer,
+            self.src_file,
+            self.tgt_file,
+            tokens_in_batch=256,
+            dataset_type=TokenBucketTranslationDataset,
+        )
+        # Without distributed training the data loader shuffles the batches, else every rank draws its share
+        num_batches = len(data_layer)
+        for samplers in [
+            [data_layer.data_iterator.sampler],
+            [DistributedSampler(data_layer._dataset, num_replicas=2, rank=rank) for rank in range(2)],
+        ]:
+            epochs = []
+            for epoch in range(2):
+                # As the training loop does at the start of every epoch
+                for sampler in samplers:
+                    if hasattr(sampler, 'set_epoch'):
+                        sampler.set_epoch(epoch)
+                epochs.append([list(sampler) for sampler in samplers])
+                self.assertEqual(set(sum(epochs[-1], [])), set(range(num_batches)))
+            for first, second in zip(*epochs):
+                self.assertNotEqual(first, second)
+
+        dataset = data_layer._dataset
+        batches = [tuple(batch[-1].tolist()) for batch in data_layer.data_iterator]
+        self.assertEqual(sorted(batches), sorted(tuple(dataset[i][-1].tolist()) for i in range(len(dataset))))
+
+    @pytest.mark.unit
+    def test_pack_into_token_batches(self):
+        rng = np.random.RandomState(0)
+        src_lengths = rng.randint(1, 60, size=5000)
+        tgt_lengths = rng.randint(1, 60, size=5000)
+        batches = pack_into_token_batches(src_lengths, tgt_lengths, 1024)
+
+        self.assertEqual(sorted(batches.values.tolist()), list(range(5000)))
+        for i in range(len(batches)):
+            batch = batches[i]
+            batch_tokens = len(batch) * (src_lengths[batch].max() + tgt_lengths[batch].max())
+            self.assertLessEqual(batch_tokens, 1024)
+            self.assertTrue(len(batch) % 8 == 0 or len(batch) < 8 or i == len(batches) - 1)
+
+        # Sentence pairs longer than tokens_in_batch get batches of their own
+        batches = pack_into_token_batches([10, 600, 10], [10, 600, 10], 1024)
+        self.assertEqual([batches[i].tolist() for i in range(len(batches))], [[0, 2], [1]])